@@ -4,8 +4,10 @@ Reduz carga no Oracle e melhora performance
 """
 
 import time
-from typing import Any, Optional, Callable, Dict
+from typing import Any, Optional, Callable, Dict, Hashable, Iterable, Set
 from logger_config import app_logger
+from change_feed import change_feed
+from metrics_registry import metricas, FamiliaMetrica
 import threading
 
 
@@ -18,6 +20,7 @@ class CacheEntry:
         self.ttl = ttl
         self.access_count = 0
         self.last_access = self.created_at
+        self.tags = set()
 
     def is_expired(self) -> bool:
         """Verifica se entrada expirou"""
@@ -47,7 +50,8 @@ class CacheManager:
     def _initialize(self):
         """Inicializa o cache"""
         self.logger = app_logger
-        self.cache: Dict[str, CacheEntry] = {}
+        self.cache: Dict[Hashable, CacheEntry] = {}
+        self.tags: Dict[str, Set[Hashable]] = {}
         self._lock = threading.RLock()
         self.hit_count = 0
         self.miss_count = 0
@@ -55,14 +59,14 @@ class CacheManager:
 
         self.logger.info("Cache Manager inicializado")
 
-    def get(self, key: str) -> Optional[Any]:
+    def get(self, key: Hashable) -> Optional[Any]:
         """Obtém valor do cache"""
         with self._lock:
             if key in self.cache:
                 entry = self.cache[key]
 
                 if entry.is_expired():
-                    del self.cache[key]
+                    self._remove(key)
                     self.miss_count += 1
                     return None
 
@@ -72,13 +76,39 @@ class CacheManager:
             self.miss_count += 1
             return None
 
-    def set(self, key: str, value: Any, ttl: float = 300.0):
-        """Define valor no cache"""
+    def set(self, key: Hashable, value: Any, ttl: float = 300.0,
+            tags: Optional[Iterable[str]] = None):
+        """
+        Define valor no cache
+
+        As tags (ex.: nomes de tabelas) permitem invalidar de uma vez
+        todas as entradas que dependem do mesmo dado.
+        """
         with self._lock:
-            if len(self.cache) >= self.max_size:
+            if key in self.cache:
+                self._remove(key)
+            elif len(self.cache) >= self.max_size:
                 self._evict_lru()
 
-            self.cache[key] = CacheEntry(value, ttl)
+            entry = CacheEntry(value, ttl)
+            entry.tags = {tag.upper() for tag in (tags or ())}
+            self.cache[key] = entry
+
+            for tag in entry.tags:
+                self.tags.setdefault(tag, set()).add(key)
+
+    def _remove(self, key: Hashable):
+        """Remove entrada e as suas referências nas tags"""
+        entry = self.cache.pop(key, None)
+        if entry is None:
+            return
+
+        for tag in entry.tags:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
 
     def _evict_lru(self):
         """Remove entrada menos usada (LRU)"""
@@ -87,29 +117,39 @@ class CacheManager:
 
         lru_key = min(self.cache.keys(),
                       key=lambda k: self.cache[k].last_access)
-        del self.cache[lru_key]
+        self._remove(lru_key)
         self.logger.debug(f"Evicted LRU cache entry: {lru_key}")
 
-    def invalidate(self, key: str):
+    def invalidate(self, key: Hashable):
         """Invalida entrada específica"""
         with self._lock:
-            if key in self.cache:
-                del self.cache[key]
+            self._remove(key)
 
     def invalidate_pattern(self, pattern: str):
         """Invalida entradas que correspondem a padrão"""
         with self._lock:
-            keys_to_delete = [k for k in self.cache.keys() if pattern in k]
+            keys_to_delete = [k for k in self.cache.keys() if pattern in str(k)]
             for key in keys_to_delete:
-                del self.cache[key]
+                self._remove(key)
 
             if keys_to_delete:
                 self.logger.debug(f"Invalidated {len(keys_to_delete)} cache entries")
 
+    def invalidate_tag(self, tag: str):
+        """Invalida todas as entradas marcadas com a tag"""
+        with self._lock:
+            keys_to_delete = list(self.tags.get(tag.upper(), ()))
+            for key in keys_to_delete:
+                self._remove(key)
+
+            if keys_to_delete:
+                self.logger.debug(f"Invalidated {len(keys_to_delete)} cache entries (tag {tag.upper()})")
+
     def clear(self):
         """Limpa todo o cache"""
         with self._lock:
             self.cache.clear()
+            self.tags.clear()
             self.logger.info("Cache limpo")
 
     def get_stats(self) -> dict:
@@ -155,3 +195,26 @@ def cached(ttl: float = 300.0, key_prefix: str = ""):
 
 # Instância global
 cache_manager = CacheManager()
+
+# Alterações confirmadas invalidam as entradas marcadas com a tabela
+# (na thread do commit, antes de o método DML retornar)
+change_feed.subscrever(
+    lambda alteracao: cache_manager.invalidate_tag(alteracao.tabela),
+    sincrono=True
+)
+
+
+def _coletar_metricas():
+    """Tamanho, acertos e falhas do CacheManager"""
+    stats = cache_manager.get_stats()
+    pedidos = FamiliaMetrica('inc_cache_pedidos_total', 'counter', 'Pedidos ao CacheManager por resultado')
+    pedidos.adicionar(stats['hits'], {'resultado': 'hit'})
+    pedidos.adicionar(stats['misses'], {'resultado': 'miss'})
+    entradas = FamiliaMetrica('inc_cache_entradas', 'gauge', 'Entradas no CacheManager')
+    entradas.adicionar(stats['size'])
+    taxa = FamiliaMetrica('inc_cache_taxa_acertos', 'gauge', 'Fração de pedidos servidos pela cache')
+    taxa.adicionar(stats['hit_rate'] / 100.0)
+    return [pedidos, entradas, taxa]
+
+
+metricas.registar_coletor('cache', _coletar_metricas)
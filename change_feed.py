@@ -0,0 +1,344 @@
+"""
+FEED DE ALTERAÇÕES (CHANGE FEED)
+Barramento de eventos em processo alimentado pelos métodos DML do
+OracleDatabase e, opcionalmente, pela tabela Log_Alteracoes_Pesquisa
+(preenchida por triggers), para manter índices e caches atualizados
+linha a linha
+"""
+
+import re
+import threading
+import time
+from datetime import datetime
+from queue import Queue
+from typing import Any, Callable, Iterable, List, Optional, Set
+
+from logger_config import app_logger
+from metrics_registry import metricas, FamiliaMetrica
+
+# Chave primária das tabelas indexadas pela pesquisa
+CHAVES_PRIMARIAS = {
+    'ANUNCIANTE_DADOS': 'NUM_ID_FISCAL',
+    'CAMPANHA_DADOS': 'COD_CAMP',
+    'PECAS_CRIATIVAS': 'ID_UNICOPECA',
+    'ESPACO_DADOS': 'ID_ESPACO',
+    'PAGAMENTOS': 'COD_PAGAMENTO',
+    'AGENCIA_DADOS': 'REG_COMERCIAL'
+}
+
+_DML_RE = re.compile(
+    r'^\s*(INSERT\s+INTO|UPDATE|DELETE\s+FROM|DELETE|MERGE\s+INTO)\s+"?([\w$#]+)"?',
+    re.IGNORECASE
+)
+_INSERT_RE = re.compile(
+    r'INSERT\s+INTO\s+"?[\w$#]+"?\s*\((?P<colunas>[^)]*)\)\s*VALUES\s*\((?P<valores>.*)\)',
+    re.IGNORECASE | re.DOTALL
+)
+_COMENTARIO_RE = re.compile(r'--[^\n]*')
+
+
+class AlteracaoRegisto:
+    """Alteração de uma linha (chave None = linhas desconhecidas da tabela)"""
+
+    __slots__ = ('tabela', 'operacao', 'chave', 'origem', 'data')
+
+    def __init__(
+            self,
+            tabela: str,
+            operacao: str,
+            chave: Any = None,
+            origem: str = 'aplicacao',
+            data: Optional[datetime] = None
+    ):
+        self.tabela = tabela.upper()
+        self.operacao = operacao
+        self.chave = chave
+        self.origem = origem
+        self.data = data or datetime.now()
+
+    def __repr__(self):
+        return f"AlteracaoRegisto({self.operacao} {self.tabela} chave={self.chave!r} origem={self.origem})"
+
+
+def _dividir_valores(texto: str) -> List[str]:
+    """Divide a lista VALUES por vírgulas de topo (ignora parênteses e aspas)"""
+    partes, atual, nivel, aspas = [], [], 0, False
+    for c in texto:
+        if c == "'":
+            aspas = not aspas
+        elif not aspas and c == '(':
+            nivel += 1
+        elif not aspas and c == ')':
+            nivel -= 1
+        elif not aspas and nivel == 0 and c == ',':
+            partes.append(''.join(atual).strip())
+            atual = []
+            continue
+        atual.append(c)
+    partes.append(''.join(atual).strip())
+    return partes
+
+
+def _valor_bind(expressao: str, params: Any) -> Any:
+    """Valor de uma expressão ':nome' nos parâmetros (None se não for bind)"""
+    match = re.fullmatch(r':(\w+)', expressao.strip())
+    if not match or not isinstance(params, dict):
+        return None
+    return params.get(match.group(1))
+
+
+def interpretar_dml(query: str) -> Optional[tuple]:
+    """
+    Identifica a tabela e a operação de um comando DML
+
+    Returns:
+        Tuple (tabela, operacao) em maiúsculas ou None se não for DML
+    """
+    match = _DML_RE.match(query)
+    if not match:
+        return None
+    operacao = match.group(1).split()[0].upper()
+    return match.group(2).upper(), operacao
+
+
+def chave_da_linha(query: str, tabela: str, operacao: str, params: Any) -> Any:
+    """
+    Chave primária da linha afetada, a partir das variáveis de ligação
+
+    Reconhece INSERT com a chave em bind e UPDATE/DELETE com
+    'WHERE <pk> = :nome'. Devolve None quando não é possível determinar.
+    """
+    pk = CHAVES_PRIMARIAS.get(tabela)
+    if pk is None:
+        return None
+
+    sql = _COMENTARIO_RE.sub('', query)
+
+    if operacao == 'INSERT':
+        match = _INSERT_RE.search(sql)
+        if not match:
+            return None
+        colunas = [c.strip().strip('"').upper() for c in match.group('colunas').split(',')]
+        valores = _dividir_valores(match.group('valores'))
+        if pk not in colunas or len(valores) != len(colunas):
+            return None
+        return _valor_bind(valores[colunas.index(pk)], params)
+
+    match = re.search(
+        rf'\bWHERE\s+(?:\w+\.)?{pk}\s*=\s*(:\w+)\s*$',
+        sql.strip(),
+        re.IGNORECASE
+    )
+    if not match:
+        return None
+    return _valor_bind(match.group(1), params)
+
+
+class ChangeFeed:
+    """
+    Barramento de alterações
+
+    Assinantes síncronos (ex.: invalidação de cache) correm na thread que
+    fez o commit, antes de o método DML retornar; os restantes (ex.:
+    atualização do índice local, que consulta o Oracle) correm por ordem
+    numa thread de despacho, fora da thread da interface.
+    """
+
+    def __init__(self):
+        self.logger = app_logger
+        self._lock = threading.Lock()
+        self._assinantes: List[tuple] = []
+        self._fila: Queue = Queue()
+        self._thread: Optional[threading.Thread] = None
+        self.eventos_publicados = 0
+        self.erros = 0
+
+    def subscrever(
+            self,
+            callback: Callable[[AlteracaoRegisto], None],
+            tabelas: Optional[Iterable[str]] = None,
+            sincrono: bool = False
+    ) -> None:
+        """
+        Regista um assinante
+
+        Args:
+            callback: Função chamada com cada AlteracaoRegisto
+            tabelas: Tabelas de interesse (None = todas)
+            sincrono: Chamar na thread do commit em vez da thread de despacho
+        """
+        filtro = {t.upper() for t in tabelas} if tabelas else None
+        with self._lock:
+            self._assinantes.append((callback, filtro, sincrono))
+            if not sincrono and self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="Inc_ChangeFeed",
+                    daemon=True
+                )
+                self._thread.start()
+
+    def cancelar(self, callback: Callable) -> None:
+        """Remove um assinante"""
+        with self._lock:
+            self._assinantes = [a for a in self._assinantes if a[0] != callback]
+
+    def publicar(self, eventos: Iterable[AlteracaoRegisto]) -> None:
+        """Entrega os eventos aos assinantes"""
+        eventos = list(eventos)
+        if not eventos:
+            return
+
+        with self._lock:
+            assinantes = list(self._assinantes)
+            self.eventos_publicados += len(eventos)
+
+        for callback, filtro, sincrono in assinantes:
+            if sincrono:
+                self._entregar(callback, filtro, eventos)
+
+        if any(not sincrono for _, _, sincrono in assinantes):
+            self._fila.put(eventos)
+
+    def _entregar(self, callback: Callable, filtro: Optional[Set[str]], eventos: List[AlteracaoRegisto]):
+        """Chama o assinante para os eventos que lhe interessam"""
+        for evento in eventos:
+            if filtro is not None and evento.tabela not in filtro:
+                continue
+            try:
+                callback(evento)
+            except Exception as e:
+                self.erros += 1
+                self.logger.warning(f"Erro ao aplicar {evento}: {e}")
+
+    def _run(self):
+        """Despacha eventos para os assinantes assíncronos"""
+        while True:
+            eventos = self._fila.get()
+            with self._lock:
+                assinantes = [a for a in self._assinantes if not a[2]]
+            for callback, filtro, _ in assinantes:
+                self._entregar(callback, filtro, eventos)
+            self._fila.task_done()
+
+    def aguardar(self, timeout: float = 5.0) -> bool:
+        """Espera que os eventos em fila sejam entregues (útil no encerramento)"""
+        limite = time.monotonic() + timeout
+        while self._fila.unfinished_tasks and time.monotonic() < limite:
+            time.sleep(0.01)
+        return not self._fila.unfinished_tasks
+
+    def get_stats(self) -> dict:
+        """Obtém estatísticas do feed"""
+        with self._lock:
+            return {
+                'assinantes': len(self._assinantes),
+                'publicados': self.eventos_publicados,
+                'pendentes': self._fila.qsize(),
+                'erros': self.erros
+            }
+
+
+class OracleChangeLogPoller:
+    """
+    Lê a tabela Log_Alteracoes_Pesquisa (triggers) e publica no feed
+
+    Cobre alterações feitas fora desta aplicação (SQL*Plus, outros
+    postos). As entregas são idempotentes, por isso uma alteração local
+    vista também pelos triggers apenas reaplica o mesmo delta.
+    """
+
+    SELECT_SQL = """
+        SELECT Id_alteracao, Tabela, Chave, Operacao, Data_alteracao
+        FROM Log_Alteracoes_Pesquisa
+        WHERE Id_alteracao > :ultimo
+        ORDER BY Id_alteracao
+        FETCH FIRST :lote ROWS ONLY
+    """
+
+    PURGE_SQL = """
+        DELETE FROM Log_Alteracoes_Pesquisa
+        WHERE Data_alteracao < SYSTIMESTAMP - NUMTODSINTERVAL(:horas, 'HOUR')
+    """
+
+    def __init__(
+            self,
+            db_connection,
+            feed: 'ChangeFeed',
+            intervalo: float = 5.0,
+            retencao_horas: float = 24.0,
+            lote: int = 500
+    ):
+        self.db = db_connection
+        self.feed = feed
+        self.logger = app_logger
+        self.intervalo = intervalo
+        self.retencao_horas = retencao_horas
+        self.lote = lote
+        self.ultimo_id = None
+        self._parar = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="Inc_ChangeLog",
+            daemon=True
+        )
+
+    def iniciar(self) -> None:
+        """Arranca a leitura periódica"""
+        self._thread.start()
+
+    def _run(self):
+        ultima_limpeza = time.monotonic()
+        while not self._parar.wait(self.intervalo):
+            try:
+                with self.db.sessao() as connection:
+                    cursor = connection.cursor()
+                    try:
+                        if self.ultimo_id is None:
+                            # Começa no fim: o índice foi carregado do estado atual
+                            cursor.execute("SELECT NVL(MAX(Id_alteracao), 0) FROM Log_Alteracoes_Pesquisa")
+                            self.ultimo_id = cursor.fetchone()[0]
+                            continue
+
+                        cursor.execute(self.SELECT_SQL, ultimo=self.ultimo_id, lote=self.lote)
+                        linhas = cursor.fetchall()
+
+                        if time.monotonic() - ultima_limpeza > 3600:
+                            cursor.execute(self.PURGE_SQL, horas=self.retencao_horas)
+                            connection.commit()
+                            ultima_limpeza = time.monotonic()
+                    finally:
+                        cursor.close()
+
+                if linhas:
+                    self.ultimo_id = linhas[-1][0]
+                    self.feed.publicar(
+                        AlteracaoRegisto(tabela, operacao, chave, 'oracle', data)
+                        for _, tabela, chave, operacao, data in linhas
+                    )
+            except Exception as e:
+                self.logger.warning(f"Erro ao ler Log_Alteracoes_Pesquisa: {e}")
+
+    def parar(self) -> None:
+        """Termina a leitura periódica"""
+        self._parar.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=self.intervalo + 1.0)
+
+
+# Instância global
+change_feed = ChangeFeed()
+
+
+def _coletar_metricas():
+    stats = change_feed.get_stats()
+    fila = FamiliaMetrica('inc_fila_pendentes', 'gauge', 'Itens em espera nas filas de background')
+    fila.adicionar(stats['pendentes'], {'fila': 'change_feed'})
+    eventos = FamiliaMetrica('inc_change_feed_eventos_total', 'counter', 'Alterações publicadas no change feed')
+    eventos.adicionar(stats['publicados'])
+    erros = FamiliaMetrica('inc_change_feed_erros_total', 'counter', 'Erros dos assinantes do change feed')
+    erros.adicionar(stats['erros'])
+    return [fila, eventos, erros]
+
+
+metricas.registar_coletor('change_feed', _coletar_metricas)
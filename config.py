@@ -55,6 +55,19 @@ LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 LOG_LEVEL = logging.INFO
 LOG_FILE = 'logs/app.log'
 
+LOG_CONFIG = {
+    'pasta': 'logs',  # Pasta dos ficheiros app_*.log
+    'nivel': LOG_LEVEL,  # Nível mínimo registado (INC_LOG_NIVEL=DEBUG ativa o trace)
+    'nivel_consola': logging.INFO,  # Nível mínimo mostrado na consola
+    'fila_max': 10000,  # Registos em espera para escrita (excedentes são descartados)
+    'max_bytes': 10 * 1024 * 1024,  # Tamanho a partir do qual se abre um novo ficheiro
+    'rotacao_segundos': 24 * 3600,  # Idade máxima de um ficheiro antes de rodar
+    'ficheiros_max': 20,  # Ficheiros app_*.log guardados (os mais antigos são apagados)
+    'medir_decoradores': False,  # log_execution/safe_operation registam a duração de cada chamada
+    'json': True,  # Também grava os registos em JSON (app_*.jsonl) com trace_id/span_id
+    'span_lento_segundos': 0.5,  # Spans mais lentos são registados em INFO (os restantes em DEBUG)
+}
+
 
 def setup_logging():
     """Configura o sistema de logging"""
@@ -82,7 +95,84 @@ DB_CONFIG = {
     'service': 'XEPDB1',
     'user': 'Gestao_Publicidade',
     'password': 'ISCTEM',
-    'timeout': 30  # Added timeout to prevent hanging connections
+    'timeout': 30,  # Added timeout to prevent hanging connections
+    'pool_min': 1,  # Sessões mantidas no pool
+    # Sessões máximas: as 6 da pesquisa em paralelo (uma por tabela) e
+    # folga para exportações, analytics e captura de planos
+    'pool_max': 10,
+    'pool_espera_segundos': 5  # Espera máxima por uma sessão livre (depois falha)
+}
+
+# =============================================================================
+# CONFIGURAÇÕES DE PESQUISA
+# =============================================================================
+
+SEARCH_CONFIG = {
+    'analytics_lote': 50,  # Eventos gravados por executemany
+    'analytics_intervalo': 5.0,  # Segundos máximos entre gravações
+    'analytics_fila_max': 1000,  # Eventos em espera antes de descartar
+    'ranking_bm25': True,  # Reordena candidatos com BM25 na aplicação
+    'ranking_candidatos_max': 100,  # Candidatos reordenados pelo BM25 (depois seguem a ordem do Oracle)
+    'fuzzy_fallback': True,  # Sem resultados exatos, tenta pesquisa aproximada
+    'fuzzy_orcamento_ms': 150,  # Tempo máximo da pesquisa aproximada
+    'pesquisa_paralela': False,  # Sem tipo_filtro, pesquisa as tabelas em paralelo
+    'cache_resultados': True,  # Reutiliza candidatos de pesquisas iguais ou mais amplas
+    'cache_ttl': 300,  # Segundos de validade dos resultados em cache
+    'historico_max': 20,  # Pesquisas recentes guardadas por utilizador
+    'historico_dir': 'historico',  # Pasta dos ficheiros de histórico
+    'historico_intervalo': 2.0,  # Segundos entre a alteração e a gravação
+    'change_log_oracle': False,  # Lê Log_Alteracoes_Pesquisa (triggers) além do feed local
+    'change_log_intervalo': 5.0,  # Segundos entre leituras do change log
+    'change_log_retencao_horas': 24,  # Horas guardadas em Log_Alteracoes_Pesquisa
+    'resultados_pagina': 20,  # Cards por página na vista de resultados
+    'exportacao_arraysize': 1000,  # Linhas por ida ao Oracle ao exportar
+    'exportacao_pagina': 500,  # Resultados pedidos ao motor de cada vez ao exportar a pesquisa
+    'exportacao_progresso': 1000,  # Linhas entre avisos de progresso da exportação
+}
+
+# =============================================================================
+# CONFIGURAÇÕES DE MONITORIZAÇÃO
+# =============================================================================
+
+PERF_CONFIG = {
+    'histograma_bits': 7,  # Bits significativos por bucket (erro relativo <= 1/64)
+    'janela_segundos': 60,  # Duração de cada fatia da janela deslizante
+    'janela_fatias': 15,  # Fatias guardadas (janela máxima = 15 minutos)
+    'operacoes_lentas_max': 100,  # Operações lentas guardadas para o relatório
+    'sql_instrucoes_max': 500,  # Impressões digitais de SQL guardadas
+    'sql_lenta_segundos': 1.0,  # Instrução SQL acima disto é registada como lenta
+    'queries_lentas_ficheiro': 'logs/queries_lentas.jsonl',  # Log JSONL das queries lentas
+    'queries_lentas_max_bytes': 5 * 1024 * 1024,  # Tamanho a partir do qual o log roda
+    'queries_lentas_backups': 5,  # Ficheiros antigos do log guardados
+    'queries_lentas_fila_max': 200,  # Ocorrências em espera antes de descartar
+    'queries_lentas_plano': True,  # Captura o plano (DBMS_XPLAN) e a espera (V$SQL)
+    'queries_lentas_intervalo_plano': 300,  # Segundos entre planos da mesma instrução
+    'queries_lentas_binds_texto': False,  # Grava o texto dos binds (senão só o comprimento)
+    'ui_lag_ativo': True,  # Mede o atraso do event loop do Tk
+    'ui_lag_intervalo': 0.1,  # Segundos entre batimentos do event loop
+    'ui_lag_limite': 0.25,  # Atraso a partir do qual a interface está bloqueada
+    'ui_lag_amostragem': 0.02,  # Segundos entre amostras da stack durante um bloqueio
+    'profiler_hz': 49,  # Amostras por segundo do profiler (INC_PROFILER_HZ)
+    'profiler_gravar_intervalo': 60,  # Segundos entre gravações intermédias do perfil
+    'profiler_stacks_max': 20000,  # Stacks distintas guardadas pelo profiler
+    'metricas_ficheiro': 'logs/metrics.prom',  # Ficheiro Prometheus reescrito periodicamente ('' = desligado)
+    'metricas_intervalo': 30,  # Segundos entre regravações do ficheiro de métricas
+    'metricas_porta': 0,  # Porto HTTP local para /metrics (0 = desligado; ex.: 9464)
+    'metricas_sql_max': 50,  # Instruções SQL (as mais lentas) exportadas como métricas
+}
+
+# =============================================================================
+# CONFIGURAÇÕES DO POOL DE THREADS
+# =============================================================================
+
+THREAD_POOL_CONFIG = {
+    'workers': 4,  # Threads Inc_DB_* do ThreadPool
+    # Tarefas em execução ao mesmo tempo por classe de prioridade
+    'limites': {'interativa': 4, 'normal': 3, 'bulk': 1},
+    'reservados_interativa': 1,  # Workers que só tarefas interativas podem ocupar
+    # Workers garantidos a uma classe com trabalho em fila (evita que bulk
+    # fique parado atrás de carga normal contínua)
+    'minimos': {'normal': 1, 'bulk': 1},
 }
 
 # =============================================================================
@@ -0,0 +1,12 @@
+"""
+Configuração comum dos testes (pytest)
+
+Os registos escritos durante os testes vão para uma pasta temporária:
+logs/ do repositório fica só com os registos da aplicação.
+"""
+
+import tempfile
+
+from config import LOG_CONFIG
+
+LOG_CONFIG['pasta'] = tempfile.mkdtemp(prefix='inc_testes_logs_')
@@ -5,8 +5,16 @@ Implementa pool de conexões e tratamento seguro
 
 import cx_Oracle
 import logging
+import threading
+from contextlib import contextmanager
 from logger_config import log_execution, safe_operation, app_logger
-from config import DB_CONFIG
+from config import DB_CONFIG, PERF_CONFIG
+from performance_monitor import perf_monitor
+from metrics_registry import metricas, FamiliaMetrica
+from slow_query_log import RegistoQueriesLentas, ProvedorPlanoOracle
+from change_feed import (
+    change_feed, AlteracaoRegisto, CHAVES_PRIMARIAS, interpretar_dml, chave_da_linha
+)
 
 
 class OracleDatabase:
@@ -14,7 +22,17 @@ class OracleDatabase:
 
     def __init__(self):
         self.connection = None
+        self.pool = None
+        self._pool_lock = threading.Lock()
         self.logger = app_logger
+
+        # Queries acima de PERF_CONFIG['sql_lenta_segundos'] vão para o log de queries lentas
+        self.queries_lentas = RegistoQueriesLentas(
+            ProvedorPlanoOracle(self) if PERF_CONFIG['queries_lentas_plano'] else None
+        )
+        perf_monitor.subscrever_sql_lento(self.queries_lentas.registar)
+        metricas.registar_coletor('oracle', self._coletar_metricas)
+
         self.connect()
 
     @log_execution
@@ -48,10 +66,108 @@ class OracleDatabase:
             self.connection = None
             return False
 
+    def get_pool(self):
+        """Obtém o pool de sessões Oracle (criado na primeira utilização)"""
+        with self._pool_lock:
+            if self.pool is None:
+                dsn = cx_Oracle.makedsn(
+                    DB_CONFIG['host'],
+                    DB_CONFIG['port'],
+                    service_name=DB_CONFIG['service']
+                )
+                self.pool = cx_Oracle.SessionPool(
+                    user=DB_CONFIG['user'],
+                    password=DB_CONFIG['password'],
+                    dsn=dsn,
+                    min=DB_CONFIG['pool_min'],
+                    max=DB_CONFIG['pool_max'],
+                    increment=1,
+                    threaded=True,
+                    getmode=cx_Oracle.SPOOL_ATTRVAL_TIMEDWAIT
+                )
+                # Sem sessões livres, acquire falha em vez de esperar indefinidamente
+                self.pool.wait_timeout = int(DB_CONFIG['pool_espera_segundos'] * 1000)
+                self.logger.info(
+                    f"Pool de sessões Oracle criado "
+                    f"({DB_CONFIG['pool_min']}-{DB_CONFIG['pool_max']} sessões)"
+                )
+            return self.pool
+
+    def _coletar_metricas(self):
+        """Estado da conexão, do pool de sessões e do log de queries lentas"""
+        conexao = FamiliaMetrica('inc_db_conexao_ativa', 'gauge', 'Conexão Oracle principal aberta (1/0)')
+        conexao.adicionar(1 if self.connection else 0)
+        familias = [conexao]
+
+        pool = self.pool
+        if pool is not None:
+            sessoes = FamiliaMetrica('inc_db_pool_sessoes', 'gauge', 'Sessões do pool Oracle por estado')
+            sessoes.adicionar(pool.busy, {'estado': 'ocupadas'})
+            sessoes.adicionar(pool.opened, {'estado': 'abertas'})
+            sessoes.adicionar(pool.max, {'estado': 'maximo'})
+            familias.append(sessoes)
+
+        fila = FamiliaMetrica('inc_fila_pendentes', 'gauge', 'Itens em espera nas filas de background')
+        fila.adicionar(self.queries_lentas.queue.qsize(), {'fila': 'queries_lentas'})
+        descartados = FamiliaMetrica('inc_fila_descartados_total', 'counter', 'Itens descartados por fila cheia')
+        descartados.adicionar(self.queries_lentas.descartadas, {'fila': 'queries_lentas'})
+        return familias + [fila, descartados]
+
+    @contextmanager
+    def sessao(self):
+        """Empresta uma sessão do pool, devolvida no fim do bloco with"""
+        pool = self.get_pool()
+        connection = pool.acquire()
+        try:
+            yield connection
+        finally:
+            pool.release(connection)
+
+    def _notificar_alteracao(self, query, params_list, cursor=None):
+        """
+        Publica no change feed as linhas alteradas por um DML confirmado
+
+        A chave vem das variáveis de ligação; num INSERT com a chave gerada
+        no SQL (ex.: seq.NEXTVAL) é lida pelo ROWID da linha inserida.
+        """
+        dml = interpretar_dml(query)
+        if not dml:
+            return
+        tabela, operacao = dml
+
+        eventos = []
+        for params in params_list:
+            chave = chave_da_linha(query, tabela, operacao, params)
+            if chave is None and operacao == 'INSERT' and cursor is not None \
+                    and tabela in CHAVES_PRIMARIAS and cursor.lastrowid:
+                try:
+                    cursor.execute(
+                        f"SELECT {CHAVES_PRIMARIAS[tabela]} FROM {tabela} WHERE ROWID = :rid",
+                        rid=cursor.lastrowid
+                    )
+                    linha = cursor.fetchone()
+                    chave = linha[0] if linha else None
+                except cx_Oracle.DatabaseError as e:
+                    self.logger.debug(f"Chave do INSERT em {tabela} não determinada: {e}")
+            if chave is None:
+                # Linhas desconhecidas: os assinantes tratam a tabela inteira
+                eventos = [AlteracaoRegisto(tabela, operacao)]
+                break
+            eventos.append(AlteracaoRegisto(tabela, operacao, chave))
+
+        change_feed.publicar(eventos)
+
     @log_execution
     def execute_query(self, query, params=None, fetch=True):
-        """Executa queries com tratamento seguro de erros"""
+        """
+        Executa queries com tratamento seguro de erros
+
+        Cada execução é medida (execução, leitura, linhas, bytes e idas à
+        base de dados) no perf_monitor, agrupada pela impressão digital do
+        SQL. O parse do Oracle acontece no execute e conta como execução.
+        """
         cursor = None
+        medicao = None
         try:
             if not self.connection:
                 self.logger.warning("Conexão perdida, reconectando...")
@@ -60,28 +176,40 @@ class OracleDatabase:
 
             cursor = self.connection.cursor()
 
+            medicao = perf_monitor.medir_sql(query, params)
             if params:
                 cursor.execute(query, params)
             else:
                 cursor.execute(query)
+            medicao.executada()
 
             if fetch and cursor.description:
                 columns = [col[0] for col in cursor.description]
                 rows = cursor.fetchall()
+                medicao.lida(rows, cursor.arraysize)
+                medicao.concluir()
                 self.logger.debug(f"Query retornou {len(rows)} linhas")
                 return (columns, rows)
             else:
+                linhas = cursor.rowcount
                 self.connection.commit()
+                medicao.executada()
+                medicao.concluir(linhas=linhas)
                 self.logger.debug("Query executada e confirmada")
+                self._notificar_alteracao(query, [params], cursor)
                 return True
 
         except cx_Oracle.DatabaseError as db_err:
             self.logger.error(f"Erro de banco de dados: {db_err}")
+            if medicao:
+                medicao.concluir(db_err)
             if self.connection:
                 self.connection.rollback()
             return False
         except Exception as e:
             self.logger.error(f"Erro na execução da query: {str(e)}")
+            if medicao:
+                medicao.concluir(e)
             if self.connection:
                 self.connection.rollback()
             return False
@@ -92,6 +220,87 @@ class OracleDatabase:
                 except:
                     pass
 
+    @log_execution
+    def execute_many(self, query, params_list):
+        """Executa DML em lote (executemany) com um único commit"""
+        if not params_list:
+            return True
+
+        cursor = None
+        medicao = None
+        try:
+            if not self.connection:
+                self.logger.warning("Conexão perdida, reconectando...")
+                if not self.connect():
+                    raise Exception("Falha ao reconectar ao Oracle")
+
+            cursor = self.connection.cursor()
+            # Do lote guarda-se só a primeira linha de binds (log de queries lentas)
+            medicao = perf_monitor.medir_sql(query, params_list[0])
+            cursor.executemany(query, params_list)
+            linhas = cursor.rowcount
+            self.connection.commit()
+            medicao.executada(idas=2)
+            medicao.concluir(linhas=linhas)
+            self.logger.debug(f"Lote de {len(params_list)} linhas executado e confirmado")
+            self._notificar_alteracao(query, params_list)
+            return True
+
+        except cx_Oracle.DatabaseError as db_err:
+            self.logger.error(f"Erro de banco de dados no lote: {db_err}")
+            if medicao:
+                medicao.concluir(db_err)
+            if self.connection:
+                self.connection.rollback()
+            return False
+        except Exception as e:
+            self.logger.error(f"Erro na execução do lote: {str(e)}")
+            if medicao:
+                medicao.concluir(e)
+            if self.connection:
+                self.connection.rollback()
+            return False
+        finally:
+            if cursor:
+                try:
+                    cursor.close()
+                except:
+                    pass
+
+    def iterar_query(self, query, params=None, arraysize=1000):
+        """
+        Percorre o resultado de uma query sem o carregar todo em memória
+
+        Usa uma sessão do pool (a conexão principal fica livre) e lê
+        `arraysize` linhas por ida à base de dados. Erros são registados
+        e propagados ao consumidor.
+
+        Yields:
+            Tuplos com as linhas, pela ordem do cursor
+        """
+        with self.sessao() as connection:
+            cursor = connection.cursor()
+            medicao = perf_monitor.medir_sql(query, params)
+            erro = None
+            try:
+                cursor.arraysize = arraysize
+                cursor.execute(query, params or {})
+                medicao.executada()
+                while True:
+                    rows = cursor.fetchmany()
+                    medicao.lida(rows, arraysize)
+                    if not rows:
+                        break
+                    yield from rows
+                    medicao.retomada()
+            except cx_Oracle.DatabaseError as db_err:
+                erro = db_err
+                self.logger.error(f"Erro de banco de dados na leitura em fluxo: {db_err}")
+                raise
+            finally:
+                medicao.concluir(erro)
+                cursor.close()
+
     @safe_operation(default_return=False)
     def test_connection(self):
         """Testa se a conexão está ativa"""
@@ -100,6 +309,19 @@ class OracleDatabase:
 
     def close(self):
         """Fecha a conexão com segurança"""
+        queries_lentas = getattr(self, 'queries_lentas', None)
+        if queries_lentas:
+            # Antes do pool: a captura de planos usa sessões do pool
+            queries_lentas.parar()
+
+        if self.pool:
+            try:
+                self.pool.close(force=True)
+                self.pool = None
+                self.logger.info("Pool de sessões Oracle fechado")
+            except Exception as e:
+                self.logger.error(f"Erro ao fechar pool: {str(e)}")
+
         if self.connection:
             try:
                 self.connection.close()
@@ -1,12 +1,156 @@
 """
 CONFIGURAÇÃO AVANÇADA DE LOGGING
 Fornece logging estruturado e tratamento de erros
+
+As threads da aplicação só colocam o registo numa fila limitada
+(QueueHandler); a escrita em ficheiro e na consola é feita por uma thread
+própria (QueueListener). Níveis desativados não chegam a criar o registo.
+
+Cada registo leva o trace_id/span_id da ação em curso (contexto_trace),
+para que as linhas das várias threads possam ser ligadas ao clique que as
+originou; o ficheiro app_*.jsonl tem os mesmos registos em JSON.
 """
 
+import atexit
+import copy
+import json
 import logging
-import traceback
+import os
+import sys
+import time
+from collections import deque
 from functools import wraps
+from contextvars import ContextVar
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from queue import Queue, Full
+from typing import Optional, Tuple, Union
+
+from config import LOG_CONFIG
+
+# Não usados no formato: poupa trabalho na criação de cada registo
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
+# (trace_id, span_id) da ação em curso; ver tracing.py
+contexto_trace: ContextVar[Optional[Tuple[str, str]]] = ContextVar('inc_trace', default=None)
+
+
+class FiltroTrace(logging.Filter):
+    """Marca o registo com o trace/span atuais (corre na thread que regista)"""
+
+    def filter(self, record):
+        if not hasattr(record, 'trace_id'):
+            contexto = contexto_trace.get()
+            record.trace_id, record.span_id = contexto if contexto else ('', '')
+        return True
+
+
+class FormatadorJSON(logging.Formatter):
+    """Um objeto JSON por linha, com os campos do span quando existem"""
+
+    def format(self, record):
+        evento = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'thread': record.threadName,
+            'local': f"{record.module}.{record.funcName}:{record.lineno}",
+            'msg': record.getMessage(),
+            'trace_id': getattr(record, 'trace_id', '') or None,
+            'span_id': getattr(record, 'span_id', '') or None,
+        }
+        span = getattr(record, 'span', None)
+        if span:
+            evento.update(span)
+        if record.exc_text:
+            evento['excecao'] = record.exc_text
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+
+class FilaLogHandler(QueueHandler):
+    """
+    QueueHandler com fila limitada
+
+    Com a fila cheia, registos abaixo de ERROR são descartados (e
+    contados) em vez de bloquear a thread; erros esperam até 1s por espaço.
+    """
+
+    def __init__(self, fila: Queue):
+        super().__init__(fila)
+        self.descartados = 0
+
+    def enqueue(self, record):
+        try:
+            if record.levelno >= logging.ERROR:
+                self.queue.put(record, timeout=1.0)
+            else:
+                self.queue.put_nowait(record)
+        except Full:
+            self.descartados += 1
+
+    def prepare(self, record):
+        # Como QueueHandler.prepare, mas a exceção fica em exc_text (campo próprio no JSON)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class FicheiroRotativoHandler(logging.FileHandler):
+    """
+    Escreve em logs/app_<data>_<hora>.log e abre um novo ficheiro quando o
+    atual passa `max_bytes` ou `rotacao_segundos`. Ao rodar, apaga os
+    ficheiros mais antigos criados por este processo além de `ficheiros_max`;
+    os de outras execuções nunca são tocados. Só é usado pela thread do listener.
+    """
+
+    def __init__(self, pasta: str, max_bytes: int, rotacao_segundos: float, ficheiros_max: int,
+                 extensao: str = 'log'):
+        self.pasta = pasta
+        self.extensao = extensao
+        self.max_bytes = max_bytes
+        self.rotacao_segundos = rotacao_segundos
+        self.ficheiros_max = ficheiros_max
+        super().__init__(self._novo_nome(), encoding='utf-8', delay=True)
+        self._proxima_rotacao = time.time() + rotacao_segundos
+        self._criados = deque([self.baseFilename])
+
+    def _novo_nome(self) -> str:
+        base = os.path.join(self.pasta, f'app_{datetime.now().strftime("%Y%m%d_%H%M%S")}')
+        # Várias rotações no mesmo segundo: sufixo sempre crescente (nunca reutiliza um nome)
+        self._sequencia = self._sequencia + 1 if base == getattr(self, '_base', None) else 0
+        self._base = base
+        nome = f'{base}.{self.extensao}' if not self._sequencia else f'{base}_{self._sequencia}.{self.extensao}'
+        while os.path.exists(nome):
+            self._sequencia += 1
+            nome = f'{base}_{self._sequencia}.{self.extensao}'
+        return os.path.abspath(nome)
+
+    def emit(self, record):
+        if self.stream is not None and (
+                time.time() >= self._proxima_rotacao or self.stream.tell() >= self.max_bytes):
+            self._rodar()
+        super().emit(record)
+
+    def _rodar(self):
+        self.stream.close()
+        self.stream = None
+        self.baseFilename = self._novo_nome()
+        self._proxima_rotacao = time.time() + self.rotacao_segundos
+        self._criados.append(self.baseFilename)
+        self._limpar()
+
+    def _limpar(self):
+        """Apaga os ficheiros deste processo mais antigos além do limite"""
+        while len(self._criados) > max(1, self.ficheiros_max):
+            try:
+                os.remove(self._criados.popleft())
+            except OSError:
+                pass
 
 
 class AppLogger:
@@ -23,17 +167,24 @@ class AppLogger:
 
     def _initialize(self):
         """Inicializa o logger"""
-        import os
-        os.makedirs('logs', exist_ok=True)
+        os.makedirs(LOG_CONFIG['pasta'], exist_ok=True)
 
         self._logger = logging.getLogger('INC_Publicidade')
-        self._logger.setLevel(logging.DEBUG)
+        # INC_LOG_NIVEL=DEBUG ativa o trace sem alterar a configuração
+        nivel = logging.getLevelName(os.environ.get('INC_LOG_NIVEL', '').upper())
+        self._logger.setLevel(nivel if isinstance(nivel, int) else LOG_CONFIG['nivel'])
+        self._logger.propagate = False
 
-        file_handler = logging.FileHandler(f'logs/app_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
+        file_handler = FicheiroRotativoHandler(
+            LOG_CONFIG['pasta'],
+            LOG_CONFIG['max_bytes'],
+            LOG_CONFIG['rotacao_segundos'],
+            LOG_CONFIG['ficheiros_max']
+        )
         file_handler.setLevel(logging.DEBUG)
 
         console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
+        console_handler.setLevel(LOG_CONFIG['nivel_consola'])
 
         formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - [%(funcName)s:%(lineno)d] - %(message)s'
@@ -41,47 +192,142 @@ class AppLogger:
 
         file_handler.setFormatter(formatter)
         console_handler.setFormatter(formatter)
+        handlers = [file_handler, console_handler]
+
+        if LOG_CONFIG['json']:
+            json_handler = FicheiroRotativoHandler(
+                LOG_CONFIG['pasta'],
+                LOG_CONFIG['max_bytes'],
+                LOG_CONFIG['rotacao_segundos'],
+                LOG_CONFIG['ficheiros_max'],
+                extensao='jsonl'
+            )
+            json_handler.setLevel(logging.DEBUG)
+            json_handler.setFormatter(FormatadorJSON())
+            handlers.append(json_handler)
 
-        self._logger.addHandler(file_handler)
-        self._logger.addHandler(console_handler)
+        # As threads da aplicação só enfileiram; o listener formata e escreve
+        self.fila_handler = FilaLogHandler(Queue(maxsize=LOG_CONFIG['fila_max']))
+        self.fila_handler.addFilter(FiltroTrace())
+        self._logger.addHandler(self.fila_handler)
+
+        self.listener = QueueListener(
+            self.fila_handler.queue,
+            *handlers,
+            respect_handler_level=True
+        )
+        self.listener.start()
+        atexit.register(self.encerrar)
 
     def get_logger(self):
         return self._logger
 
+    def encerrar(self):
+        """Escreve os registos em fila e termina a thread do listener"""
+        if getattr(self.listener, '_thread', None) is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            if self.fila_handler.descartados:
+                sys.stderr.write(f"Logging: {self.fila_handler.descartados} registos descartados (fila cheia)\n")
+
+
+_registar_duracao = None
+
+
+def _medir(nome: str, inicio_ns: int) -> None:
+    """Envia a duração de uma chamada decorada para o perf_monitor"""
+    global _registar_duracao
+    duracao = time.perf_counter_ns() - inicio_ns
+    if _registar_duracao is None:
+        # Importação tardia: performance_monitor importa este módulo
+        from performance_monitor import perf_monitor
+        _registar_duracao = perf_monitor.registar
+    _registar_duracao(nome, duracao)
 
-def log_execution(func):
-    """Decorator para logar execução de funções"""
+
+def _nome_medicao(func, medir) -> Optional[str]:
+    """Nome da métrica de um decorador (None se a medição está desligada)"""
+    if isinstance(medir, str):
+        return medir
+    if medir or (medir is None and LOG_CONFIG['medir_decoradores']):
+        return func.__qualname__
+    return None
+
+
+def log_execution(func=None, *, medir: Union[bool, str, None] = None):
+    """
+    Decorator para logar execução de funções
+
+    O trace (Iniciando/Sucesso) só é montado quando DEBUG está ativo.
+    Com `medir` (True ou nome da métrica) a duração de cada chamada é
+    registada no perf_monitor; por omissão segue LOG_CONFIG['medir_decoradores'].
+    Uso: @log_execution ou @log_execution(medir='ui.criar_sidebar')
+    """
+    if func is None:
+        return lambda f: log_execution(f, medir=medir)
+
+    nome_metrica = _nome_medicao(func, medir)
+    if getattr(func, '_log_execution', False) and nome_metrica is None:
+        # Já decorado: não empilhar outro wrapper
+        return func
+
+    logger = AppLogger().get_logger()
+    nome = func.__name__
 
     @wraps(func)
     def wrapper(*args, **kwargs):
-        logger = AppLogger().get_logger()
-        logger.debug(f"Iniciando: {func.__name__}")
+        trace = logger.isEnabledFor(logging.DEBUG)
+        if trace:
+            logger.debug("Iniciando: %s", nome)
+        inicio = time.perf_counter_ns() if nome_metrica else 0
         try:
             result = func(*args, **kwargs)
-            logger.debug(f"Sucesso: {func.__name__}")
-            return result
         except Exception as e:
-            logger.error(f"Erro em {func.__name__}: {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.error("Erro em %s: %s", nome, e, exc_info=True)
             raise
+        finally:
+            if nome_metrica:
+                _medir(nome_metrica, inicio)
+        if trace:
+            logger.debug("Sucesso: %s", nome)
+        return result
 
+    wrapper._log_execution = True
     return wrapper
 
 
-def safe_operation(default_return=None):
-    """Decorator para operações seguras com tratamento de erro"""
+def safe_operation(default_return=None, medir: Union[bool, str, None] = None):
+    """
+    Decorator para operações seguras com tratamento de erro
+
+    Aplicado várias vezes à mesma função (com o mesmo default_return)
+    fica um único wrapper. `medir` funciona como em log_execution.
+    """
 
     def decorator(func):
+        nome_metrica = _nome_medicao(func, medir)
+        if (getattr(func, '_safe_operation', False)
+                and func._safe_default is default_return and nome_metrica is None):
+            return func
+
+        logger = AppLogger().get_logger()
+        nome = func.__name__
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            logger = AppLogger().get_logger()
+            inicio = time.perf_counter_ns() if nome_metrica else 0
             try:
                 return func(*args, **kwargs)
             except Exception as e:
-                logger.error(f"Erro em {func.__name__}: {str(e)}")
-                logger.error(traceback.format_exc())
+                logger.error("Erro em %s: %s", nome, e, exc_info=True)
                 return default_return
+            finally:
+                if nome_metrica:
+                    _medir(nome_metrica, inicio)
 
+        wrapper._safe_operation = True
+        wrapper._safe_default = default_return
         return wrapper
 
     return decorator
@@ -17,10 +17,13 @@ import os
 # Adiciona o diretório atual ao path para importar módulos
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from config import COLORS, FONTS, WINDOW_CONFIG
+from config import COLORS, FONTS, WINDOW_CONFIG, PERF_CONFIG
 from logger_config import app_logger, log_execution, safe_operation
 from database_oracle import db
 from dashboard_stats import DashboardStats
+from sampling_profiler import profiler, iniciar_se_configurado
+from metrics_registry import iniciar_exportacao
+from tracing import acao
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
 
@@ -156,6 +159,13 @@ class MainApp(ctk.CTk):
         self._create_interface()
         self._verify_connection()
 
+        # Watchdog do event loop: regista lag e chamadas que bloqueiam a interface
+        self.lag_monitor = None
+        if PERF_CONFIG['ui_lag_ativo']:
+            from ui_watchdog import MonitorLagUI
+            self.lag_monitor = MonitorLagUI(self)
+            self.lag_monitor.iniciar()
+
     def _setup_window(self):
         self.title(WINDOW_CONFIG['title'])
         self.geometry(f"{WINDOW_CONFIG['width']}x{WINDOW_CONFIG['height']}")
@@ -229,6 +239,21 @@ class MainApp(ctk.CTk):
             )
             btn.pack(fill="x", padx=5, pady=2)
 
+        # Profiler por amostragem (ligar/desligar em execução)
+        self.profiler_btn = ctk.CTkButton(
+            nav_frame,
+            text=self._texto_profiler(),
+            command=self.toggle_profiler,
+            font=("Arial", 11),
+            fg_color="transparent",
+            hover_color=COLORS['dark_card'],
+            text_color=COLORS['text_secondary'],
+            anchor="w",
+            height=30,
+            corner_radius=8
+        )
+        self.profiler_btn.pack(side="bottom", fill="x", padx=5, pady=2)
+
         # Botão sair
         ctk.CTkButton(
             nav_frame,
@@ -305,6 +330,7 @@ class MainApp(ctk.CTk):
                 "• Credenciais corretas em config.py")
 
     @safe_operation()
+    @acao('abrir_dashboard')
     def show_dashboard(self):
         """Dashboard com dados REAIS da Oracle"""
         self.clear_content()
@@ -338,8 +364,6 @@ class MainApp(ctk.CTk):
         # Tabela de campanhas
         self._create_campaigns_table(container)
 
-    @safe_operation()
-    @safe_operation()
     @safe_operation()
     def _get_real_stats(self):
         """Busca estatísticas REAIS usando a VIEW criada"""
@@ -522,6 +546,7 @@ class MainApp(ctk.CTk):
         return []
 
     @safe_operation()
+    @acao('abrir_anunciantes')
     def show_anunciantes(self):
         self.clear_content()
         self.page_title.configure(text="Gestão de Anunciantes")
@@ -533,6 +558,7 @@ class MainApp(ctk.CTk):
             self._show_placeholder("Anunciantes", "👥")
 
     @safe_operation()
+    @acao('abrir_campanhas')
     def show_campanhas(self):
         self.clear_content()
         self.page_title.configure(text="Gestão de Campanhas")
@@ -544,6 +570,7 @@ class MainApp(ctk.CTk):
             self._show_placeholder("Campanhas", "📢")
 
     @safe_operation()
+    @acao('abrir_pecas')
     def show_pecas(self):
         self.clear_content()
         self.page_title.configure(text="Gestão de Peças Criativas")
@@ -555,6 +582,7 @@ class MainApp(ctk.CTk):
             self._show_placeholder("Peças Criativas", "🎨")
 
     @safe_operation()
+    @acao('abrir_espacos')
     def show_espacos(self):
         self.clear_content()
         self.page_title.configure(text="Gestão de Espaços Publicitários")
@@ -566,6 +594,7 @@ class MainApp(ctk.CTk):
             self._show_placeholder("Espaços Publicitários", "📺")
 
     @safe_operation()
+    @acao('abrir_pagamentos')
     def show_pagamentos(self):
         self.clear_content()
         self.page_title.configure(text="Gestão de Pagamentos")
@@ -577,9 +606,7 @@ class MainApp(ctk.CTk):
             self._show_placeholder("Pagamentos", "💳")
 
     @safe_operation()
-    @safe_operation()
-    # No método show_relatorios, mantenha apenas:
-    @safe_operation()
+    @acao('abrir_relatorios')
     def show_relatorios(self):
         self.clear_content()
         self.page_title.configure(text="Relatórios e Analytics")
@@ -622,9 +649,29 @@ class MainApp(ctk.CTk):
             height=35
         ).pack(pady=20)
 
+    @staticmethod
+    def _texto_profiler():
+        return "⏹️ Parar Profiler" if profiler.ativo else "🔬 Iniciar Profiler"
+
+    def toggle_profiler(self):
+        """Liga/desliga o profiler; ao desligar indica os ficheiros gerados"""
+        ficheiros = profiler.alternar()
+        self.profiler_btn.configure(text=self._texto_profiler())
+        if ficheiros:
+            messagebox.showinfo(
+                "Profiler",
+                "Perfil gravado em:\n" + "\n".join(ficheiros) +
+                "\n\nAbrir o .speedscope.json em https://www.speedscope.app"
+            )
+
     def quit_app(self):
         if messagebox.askyesno("Confirmar", "Deseja sair do sistema?"):
             self.logger.info("Encerrando aplicação...")
+            if self.lag_monitor:
+                self.lag_monitor.parar()
+            profiler.parar()
+            if getattr(self, 'search_engine', None):
+                self.search_engine.fechar()
             if self.db:
                 self.db.close()
             self.quit()
@@ -639,6 +686,12 @@ def start_application():
     print("🚀 INICIANDO SISTEMA DE GESTÃO DE PUBLICIDADE...")
     print("🎯 CONEXÃO ORACLE: localhost:1521/XEPDB1")
 
+    # INC_PROFILER=1 liga o profiler desde o arranque
+    iniciar_se_configurado()
+
+    # Métricas em formato Prometheus (ficheiro e/ou porto local, ver PERF_CONFIG)
+    iniciar_exportacao()
+
     app = MainApp()
     app.withdraw()
 
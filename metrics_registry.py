@@ -0,0 +1,373 @@
+"""
+REGISTO DE MÉTRICAS
+Contadores, medidores e histogramas de todos os subsistemas (pool Oracle,
+caches, pesquisa, filas, lag da interface), exportados no formato de texto
+do Prometheus por HTTP local e/ou num ficheiro reescrito periodicamente
+"""
+
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import PERF_CONFIG
+from logger_config import app_logger
+
+# Limites (segundos) dos buckets dos histogramas de latência
+BUCKETS_LATENCIA = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+TIPO_CONTEUDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+Etiquetas = Dict[str, str]
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_valor(valor: float) -> str:
+    if math.isinf(valor):
+        return '+Inf' if valor > 0 else '-Inf'
+    if math.isnan(valor):
+        return 'NaN'
+    if float(valor).is_integer() and abs(valor) < 1e15:
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class FamiliaMetrica:
+    """Métrica com todas as amostras (uma por combinação de etiquetas)"""
+
+    __slots__ = ('nome', 'tipo', 'ajuda', 'amostras')
+
+    def __init__(self, nome: str, tipo: str, ajuda: str):
+        self.nome = nome
+        self.tipo = tipo
+        self.ajuda = ajuda
+        self.amostras: List[Tuple[str, Etiquetas, float]] = []
+
+    def adicionar(self, valor: float, etiquetas: Optional[Etiquetas] = None, sufixo: str = '') -> 'FamiliaMetrica':
+        self.amostras.append((self.nome + sufixo, etiquetas or {}, valor))
+        return self
+
+    def adicionar_histograma(self, etiquetas: Etiquetas, buckets: Iterable[Tuple[float, int]],
+                             soma: float, contagem: int) -> 'FamiliaMetrica':
+        """Amostras _bucket (cumulativas), _sum e _count"""
+        for limite, acumulado in buckets:
+            self.adicionar(acumulado, dict(etiquetas, le=_formatar_valor(limite)), '_bucket')
+        self.adicionar(contagem, dict(etiquetas, le='+Inf'), '_bucket')
+        self.adicionar(soma, etiquetas, '_sum')
+        self.adicionar(contagem, etiquetas, '_count')
+        return self
+
+    def texto(self) -> str:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        for nome, etiquetas, valor in self.amostras:
+            if etiquetas:
+                pares = ','.join(f'{k}="{_escapar(v)}"' for k, v in etiquetas.items())
+                linhas.append(f"{nome}{{{pares}}} {_formatar_valor(valor)}")
+            else:
+                linhas.append(f"{nome} {_formatar_valor(valor)}")
+        return '\n'.join(linhas)
+
+
+class _Metrica:
+    """Base das métricas atualizadas diretamente pelo código"""
+
+    tipo = ''
+
+    def __init__(self, nome: str, ajuda: str, etiquetas: Tuple[str, ...] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+        self._valores: Dict[tuple, object] = {}
+
+    def _chave(self, etiquetas: Dict[str, str]) -> tuple:
+        if set(etiquetas) != set(self.etiquetas):
+            raise ValueError(f"{self.nome}: etiquetas esperadas {self.etiquetas}, recebidas {tuple(etiquetas)}")
+        return tuple(str(etiquetas[e]) for e in self.etiquetas)
+
+
+class Contador(_Metrica):
+    """Valor que só aumenta (nome deve terminar em _total)"""
+
+    tipo = 'counter'
+
+    def inc(self, valor: float = 1.0, **etiquetas) -> None:
+        if valor < 0:
+            raise ValueError("Um contador não pode diminuir")
+        chave = self._chave(etiquetas)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def familia(self) -> FamiliaMetrica:
+        familia = FamiliaMetrica(self.nome, self.tipo, self.ajuda)
+        with self._lock:
+            for chave, valor in self._valores.items():
+                familia.adicionar(valor, dict(zip(self.etiquetas, chave)))
+        return familia
+
+
+class Medidor(Contador):
+    """Valor que sobe e desce (ex.: tamanho de uma fila)"""
+
+    tipo = 'gauge'
+
+    def set(self, valor: float, **etiquetas) -> None:
+        chave = self._chave(etiquetas)
+        with self._lock:
+            self._valores[chave] = float(valor)
+
+    def inc(self, valor: float = 1.0, **etiquetas) -> None:
+        chave = self._chave(etiquetas)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def dec(self, valor: float = 1.0, **etiquetas) -> None:
+        self.inc(-valor, **etiquetas)
+
+
+class HistogramaMetrica(_Metrica):
+    """Distribuição de valores em buckets fixos"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nome: str, ajuda: str, etiquetas: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = BUCKETS_LATENCIA):
+        super().__init__(nome, ajuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, valor: float, **etiquetas) -> None:
+        chave = self._chave(etiquetas)
+        with self._lock:
+            estado = self._valores.get(chave)
+            if estado is None:
+                estado = self._valores[chave] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    estado[0][i] += 1
+                    break
+            estado[1] += valor
+            estado[2] += 1
+
+    def familia(self) -> FamiliaMetrica:
+        familia = FamiliaMetrica(self.nome, self.tipo, self.ajuda)
+        with self._lock:
+            for chave, (contagens, soma, total) in self._valores.items():
+                acumulado, buckets = 0, []
+                for limite, n in zip(self.buckets, contagens):
+                    acumulado += n
+                    buckets.append((limite, acumulado))
+                familia.adicionar_histograma(dict(zip(self.etiquetas, chave)), buckets, soma, total)
+        return familia
+
+
+def buckets_de_latencia(histograma, buckets: Tuple[float, ...] = BUCKETS_LATENCIA) -> List[Tuple[float, int]]:
+    """
+    Converte um HistogramaLatencia (buckets logarítmicos, ns) em buckets
+    cumulativos do Prometheus (segundos)
+
+    Cada bucket logarítmico conta no primeiro limite >= ao seu valor
+    máximo, pelo que as contagens nunca subestimam a latência.
+    """
+    contagens = [0] * len(buckets)
+    for indice, n in histograma.contagens.items():
+        valor = histograma.valor_maximo(indice) / 1e9
+        for i, limite in enumerate(buckets):
+            if valor <= limite:
+                contagens[i] += n
+                break
+    acumulado, resultado = 0, []
+    for limite, n in zip(buckets, contagens):
+        acumulado += n
+        resultado.append((limite, acumulado))
+    return resultado
+
+
+class RegistoMetricas:
+    """
+    Registo central
+
+    As métricas atualizadas pelo código (contador, medidor, histograma)
+    são criadas aqui; os subsistemas que já guardam estatísticas registam
+    um coletor, chamado só no momento da exportação.
+    """
+
+    def __init__(self):
+        self.logger = app_logger
+        self._lock = threading.Lock()
+        self._metricas: Dict[str, _Metrica] = {}
+        self._coletores: Dict[str, Callable[[], Iterable[FamiliaMetrica]]] = {}
+
+    def _obter(self, classe, nome: str, ajuda: str, etiquetas: Tuple[str, ...], **extra):
+        with self._lock:
+            metrica = self._metricas.get(nome)
+            if metrica is None:
+                metrica = self._metricas[nome] = classe(nome, ajuda, etiquetas, **extra)
+            elif type(metrica) is not classe:
+                raise ValueError(f"Métrica {nome} já registada como {metrica.tipo}")
+            return metrica
+
+    def contador(self, nome: str, ajuda: str, etiquetas: Tuple[str, ...] = ()) -> Contador:
+        return self._obter(Contador, nome, ajuda, etiquetas)
+
+    def medidor(self, nome: str, ajuda: str, etiquetas: Tuple[str, ...] = ()) -> Medidor:
+        return self._obter(Medidor, nome, ajuda, etiquetas)
+
+    def histograma(self, nome: str, ajuda: str, etiquetas: Tuple[str, ...] = (),
+                   buckets: Tuple[float, ...] = BUCKETS_LATENCIA) -> HistogramaMetrica:
+        return self._obter(HistogramaMetrica, nome, ajuda, etiquetas, buckets=buckets)
+
+    def registar_coletor(self, nome: str, coletor: Callable[[], Iterable[FamiliaMetrica]]) -> None:
+        """Regista (ou substitui) o coletor de um subsistema"""
+        with self._lock:
+            self._coletores[nome] = coletor
+
+    def remover_coletor(self, nome: str) -> None:
+        with self._lock:
+            self._coletores.pop(nome, None)
+
+    def coletar(self) -> List[FamiliaMetrica]:
+        """Todas as famílias; um coletor com erro é ignorado nessa exportação"""
+        with self._lock:
+            metricas = list(self._metricas.values())
+            coletores = list(self._coletores.items())
+
+        familias = [m.familia() for m in metricas]
+        for nome, coletor in coletores:
+            try:
+                familias.extend(coletor())
+            except Exception as e:
+                self.logger.warning(f"Erro no coletor de métricas '{nome}': {e}")
+        return familias
+
+    def exportar_texto(self) -> str:
+        """
+        Exposição no formato de texto do Prometheus (0.0.4)
+
+        Famílias com o mesmo nome vindas de coletores diferentes (ex.:
+        inc_fila_pendentes) são juntas num só bloco.
+        """
+        por_nome: Dict[str, FamiliaMetrica] = {}
+        for familia in self.coletar():
+            existente = por_nome.get(familia.nome)
+            if existente is None:
+                por_nome[familia.nome] = familia
+            elif existente.tipo == familia.tipo:
+                existente.amostras.extend(familia.amostras)
+            else:
+                self.logger.warning(f"Métrica {familia.nome} exportada com tipos diferentes")
+        return '\n'.join(f.texto() for f in por_nome.values()) + '\n'
+
+
+class GravadorMetricas:
+    """Reescreve um ficheiro .prom periodicamente (ex.: textfile collector do node_exporter)"""
+
+    def __init__(self, registo: RegistoMetricas, ficheiro: str, intervalo: float):
+        self.registo = registo
+        self.ficheiro = ficheiro
+        self.intervalo = intervalo
+        self.logger = app_logger
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="Inc_Metricas", daemon=True)
+
+    def iniciar(self) -> None:
+        self._thread.start()
+
+    def gravar(self) -> None:
+        """Escrita atómica: quem lê nunca vê um ficheiro a meio"""
+        pasta = os.path.dirname(self.ficheiro)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        temporario = self.ficheiro + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            f.write(self.registo.exportar_texto())
+        os.replace(temporario, self.ficheiro)
+
+    def _run(self):
+        while True:
+            try:
+                self.gravar()
+            except Exception as e:
+                self.logger.warning(f"Erro ao gravar métricas em {self.ficheiro}: {e}")
+            if self._parar.wait(self.intervalo):
+                return
+
+    def parar(self) -> None:
+        self._parar.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=self.intervalo + 1.0)
+
+
+class ServidorMetricas:
+    """Serve GET /metrics num porto local"""
+
+    def __init__(self, registo: RegistoMetricas, porta: int, endereco: str = '127.0.0.1'):
+        self.registo = registo
+        self.logger = app_logger
+
+        registo_metricas = registo
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                corpo = registo_metricas.exportar_texto().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', TIPO_CONTEUDO)
+                self.send_header('Content-Length', str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, formato, *args):
+                app_logger.debug(f"Métricas HTTP: {formato % args}")
+
+        self.servidor = ThreadingHTTPServer((endereco, porta), _Handler)
+        self.servidor.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self.servidor.serve_forever,
+            name="Inc_MetricasHTTP",
+            daemon=True
+        )
+
+    def iniciar(self) -> None:
+        self._thread.start()
+        endereco, porta = self.servidor.server_address[:2]
+        self.logger.info(f"Métricas disponíveis em http://{endereco}:{porta}/metrics")
+
+    def parar(self) -> None:
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+def iniciar_exportacao(registo: Optional[RegistoMetricas] = None) -> List[object]:
+    """
+    Arranca os exportadores ativos em PERF_CONFIG
+
+    Returns:
+        Exportadores iniciados (para parar no encerramento)
+    """
+    registo = registo or metricas
+    exportadores = []
+
+    if PERF_CONFIG['metricas_ficheiro']:
+        gravador = GravadorMetricas(registo, PERF_CONFIG['metricas_ficheiro'], PERF_CONFIG['metricas_intervalo'])
+        gravador.iniciar()
+        exportadores.append(gravador)
+
+    if PERF_CONFIG['metricas_porta']:
+        try:
+            servidor = ServidorMetricas(registo, PERF_CONFIG['metricas_porta'])
+            servidor.iniciar()
+            exportadores.append(servidor)
+        except OSError as e:
+            app_logger.warning(f"Porto de métricas {PERF_CONFIG['metricas_porta']} indisponível: {e}")
+
+    return exportadores
+
+
+# Instância global
+metricas = RegistoMetricas()
@@ -1,12 +1,325 @@
 """
 MONITOR DE PERFORMANCE
 Rastreia performance e otimiza operações
+
+As durações são guardadas em histogramas de buckets logarítmicos (estilo
+HDR): memória limitada por operação, percentis p50/p90/p99/p99.9 com erro
+relativo limitado e janelas deslizantes de tempo.
 """
 
+import hashlib
+import math
+import re
+import threading
 import time
-from typing import Optional, Callable
-from functools import wraps
+from collections import deque
+from typing import Any, Dict, List, Optional, Callable, Tuple
+from functools import lru_cache, wraps
 from logger_config import app_logger
+from config import PERF_CONFIG
+from metrics_registry import metricas, FamiliaMetrica, buckets_de_latencia
+from tracing import Span
+
+# Percentis calculados por get_stats (chave -> percentil)
+PERCENTIS = {'p50': 50.0, 'p90': 90.0, 'p99': 99.0, 'p999': 99.9}
+
+# Normalização de SQL para a impressão digital (fingerprint)
+_COMENTARIOS_SQL_RE = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+_TEXTO_SQL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMERO_SQL_RE = re.compile(r'(?<![\w:$#])\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b')
+_LISTA_IN_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_ESPACOS_RE = re.compile(r'\s+')
+_OPERADORES_RE = re.compile(r'\s*([=<>!,])\s*|(?<=\()\s+|\s+(?=\))')
+
+# Instrução com impressão digital nova quando o limite de instruções foi atingido
+OUTRAS_INSTRUCOES = 'outras'
+
+
+class HistogramaLatencia:
+    """
+    Histograma de durações em nanossegundos com buckets logarítmicos
+
+    Valores abaixo de 2^bits têm bucket próprio; acima disso cada potência
+    de 2 é dividida em 2^(bits-1) buckets, pelo que o erro relativo de um
+    percentil nunca passa de 1/2^(bits-1). O número de buckets é limitado
+    (cerca de 2^(bits-1) por potência de 2) e só os usados ocupam memória.
+    """
+
+    __slots__ = ('bits', '_limite', '_metade', 'contagens', 'total', 'soma_ns', 'min_ns', 'max_ns')
+
+    def __init__(self, bits: int = 7):
+        self.bits = bits
+        self._limite = 1 << bits
+        self._metade = 1 << (bits - 1)
+        self.contagens: Dict[int, int] = {}
+        self.total = 0
+        self.soma_ns = 0
+        self.min_ns = 0
+        self.max_ns = 0
+
+    def indice(self, valor_ns: int) -> int:
+        """Bucket de um valor"""
+        if valor_ns < self._limite:
+            return max(valor_ns, 0)
+        deslocamento = valor_ns.bit_length() - self.bits
+        return self._limite + (deslocamento - 1) * self._metade + (valor_ns >> deslocamento) - self._metade
+
+    def valor_maximo(self, indice: int) -> int:
+        """Maior valor que cabe num bucket"""
+        if indice < self._limite:
+            return indice
+        k = indice - self._limite
+        deslocamento = k // self._metade + 1
+        topo = self._metade + k % self._metade
+        return ((topo + 1) << deslocamento) - 1
+
+    def registar(self, valor_ns: int) -> None:
+        """Acrescenta uma duração"""
+        i = self.indice(valor_ns)
+        self.contagens[i] = self.contagens.get(i, 0) + 1
+        if not self.total or valor_ns < self.min_ns:
+            self.min_ns = valor_ns
+        if valor_ns > self.max_ns:
+            self.max_ns = valor_ns
+        self.total += 1
+        self.soma_ns += valor_ns
+
+    def juntar(self, outro: 'HistogramaLatencia') -> None:
+        """Soma as contagens de outro histograma com os mesmos bits"""
+        if not outro.total:
+            return
+        for i, n in outro.contagens.items():
+            self.contagens[i] = self.contagens.get(i, 0) + n
+        if not self.total or outro.min_ns < self.min_ns:
+            self.min_ns = outro.min_ns
+        self.max_ns = max(self.max_ns, outro.max_ns)
+        self.total += outro.total
+        self.soma_ns += outro.soma_ns
+
+    def percentil(self, p: float) -> int:
+        """Valor (ns) abaixo do qual estão p% das durações"""
+        if not self.total:
+            return 0
+        alvo = max(1, math.ceil(self.total * p / 100.0))
+        acumulado = 0
+        for i in sorted(self.contagens):
+            acumulado += self.contagens[i]
+            if acumulado >= alvo:
+                return min(self.valor_maximo(i), self.max_ns)
+        return self.max_ns
+
+
+class JanelaDeslizante:
+    """
+    Histogramas das últimas `fatias` × `segundos` de tempo
+
+    Anel de fatias indexado pelo número da fatia; uma fatia antiga é
+    reaproveitada quando o anel dá a volta.
+    """
+
+    def __init__(self, bits: int, segundos: float, fatias: int):
+        self.bits = bits
+        self.segundos = segundos
+        self._epocas = [-1] * fatias
+        self._fatias = [HistogramaLatencia(bits) for _ in range(fatias)]
+
+    def registar(self, valor_ns: int, agora: float) -> None:
+        epoca = int(agora // self.segundos)
+        i = epoca % len(self._fatias)
+        if self._epocas[i] != epoca:
+            self._epocas[i] = epoca
+            self._fatias[i] = HistogramaLatencia(self.bits)
+        self._fatias[i].registar(valor_ns)
+
+    def histograma(self, segundos: float, agora: float) -> HistogramaLatencia:
+        """Histograma das fatias que cobrem os últimos `segundos`"""
+        atual = int(agora // self.segundos)
+        n = min(len(self._fatias), max(1, math.ceil(segundos / self.segundos)))
+        resultado = HistogramaLatencia(self.bits)
+        for epoca, fatia in zip(self._epocas, self._fatias):
+            if atual - n < epoca <= atual:
+                resultado.juntar(fatia)
+        return resultado
+
+
+class MetricaOperacao:
+    """Histograma total, janela deslizante e última duração de uma operação"""
+
+    def __init__(self, bits: int, segundos: float, fatias: int):
+        self._lock = threading.Lock()
+        self.histograma = HistogramaLatencia(bits)
+        self.janela = JanelaDeslizante(bits, segundos, fatias)
+        self.ultimo_ns = 0
+
+    def registar(self, valor_ns: int) -> None:
+        agora = time.monotonic()
+        with self._lock:
+            self.histograma.registar(valor_ns)
+            self.janela.registar(valor_ns, agora)
+            self.ultimo_ns = valor_ns
+
+    def copia(self, janela: Optional[float] = None) -> HistogramaLatencia:
+        """Cópia do histograma (total ou da janela), para calcular fora do lock"""
+        with self._lock:
+            if janela is not None:
+                return self.janela.histograma(janela, time.monotonic())
+            copia = HistogramaLatencia(self.histograma.bits)
+            copia.juntar(self.histograma)
+            return copia
+
+
+@lru_cache(maxsize=1024)
+def impressao_sql(query: str) -> Tuple[str, str]:
+    """
+    Impressão digital de uma instrução SQL
+
+    Remove comentários, troca literais de texto e números por '?', junta
+    listas IN e espaços e passa a maiúsculas; instruções que só diferem
+    nos valores partilham a mesma impressão.
+
+    Returns:
+        Tuple (impressão de 16 caracteres, SQL normalizado)
+    """
+    sql = _COMENTARIOS_SQL_RE.sub(' ', query)
+    sql = _TEXTO_SQL_RE.sub('?', sql)
+    sql = _NUMERO_SQL_RE.sub('?', sql)
+    sql = _ESPACOS_RE.sub(' ', sql).strip().rstrip(';').upper()
+    sql = _OPERADORES_RE.sub(lambda m: m.group(1) or '', sql)
+    sql = _LISTA_IN_RE.sub('IN (?)', sql)
+    return hashlib.sha1(sql.encode('utf-8')).hexdigest()[:16], sql
+
+
+def tamanho_linhas(rows: List[tuple]) -> int:
+    """Estimativa dos bytes lidos (texto pelo comprimento, restantes 8 bytes)"""
+    total = 0
+    for row in rows:
+        for valor in row:
+            if valor is None:
+                continue
+            if isinstance(valor, (str, bytes)):
+                total += len(valor)
+            else:
+                total += 8
+    return total
+
+
+class EstatisticaSQL:
+    """Tempos e volumes acumulados de uma instrução SQL (por impressão digital)"""
+
+    def __init__(self, impressao: str, sql: str, bits: int):
+        self._lock = threading.Lock()
+        self.impressao = impressao
+        self.sql = sql
+        self.execucao = HistogramaLatencia(bits)
+        self.leitura = HistogramaLatencia(bits)
+        self.total = HistogramaLatencia(bits)
+        self.linhas = 0
+        self.bytes = 0
+        self.idas = 0
+        self.erros = 0
+        self.ultimo_erro: Optional[str] = None
+
+    def registar(self, execucao_ns: int, leitura_ns: int,
+                 linhas: int, bytes_lidos: int, idas: int, erro: Optional[str]) -> None:
+        with self._lock:
+            self.execucao.registar(execucao_ns)
+            self.leitura.registar(leitura_ns)
+            self.total.registar(execucao_ns + leitura_ns)
+            self.linhas += linhas
+            self.bytes += bytes_lidos
+            self.idas += idas
+            if erro is not None:
+                self.erros += 1
+                self.ultimo_erro = erro
+
+    def resumo(self) -> Dict[str, Any]:
+        """Estatísticas em segundos, para relatórios"""
+        with self._lock:
+            execucoes = self.total.total
+            return {
+                'impressao': self.impressao,
+                'sql': self.sql,
+                'execucoes': execucoes,
+                'erros': self.erros,
+                'ultimo_erro': self.ultimo_erro,
+                'linhas': self.linhas,
+                'bytes': self.bytes,
+                'idas': self.idas,
+                'execucao_avg': self.execucao.soma_ns / max(execucoes, 1) / 1e9,
+                'leitura_avg': self.leitura.soma_ns / max(execucoes, 1) / 1e9,
+                'total': self.total.soma_ns / 1e9,
+                'avg': self.total.soma_ns / max(execucoes, 1) / 1e9,
+                'p50': self.total.percentil(50.0) / 1e9,
+                'p99': self.total.percentil(99.0) / 1e9,
+                'max': self.total.max_ns / 1e9
+            }
+
+
+class MedicaoSQL:
+    """
+    Cronómetro de uma instrução SQL
+
+    Marca o fim de cada fase (execução, leitura) e entrega tudo ao
+    monitor em concluir(). O cx_Oracle não separa o parse: acontece
+    dentro do execute e conta como execução. As idas à base de dados são estimadas:
+    uma por execute/commit e uma por lote de `arraysize` linhas lidas.
+    Cada medição é também um span 'db' do trace em curso.
+    """
+
+    __slots__ = ('monitor', 'sql', 'params', 'inicio', '_marca', 'execucao_ns', 'leitura_ns',
+                 'linhas', 'bytes', 'idas', '_concluida', 'span')
+
+    def __init__(self, monitor: 'PerformanceMonitor', sql: str, params: Any = None):
+        self.monitor = monitor
+        self.sql = sql
+        self.params = params
+        self.inicio = self._marca = time.perf_counter_ns()
+        self.execucao_ns = self.leitura_ns = 0
+        self.linhas = self.bytes = self.idas = 0
+        self._concluida = False
+        self.span = Span('db', sql=impressao_sql(sql)[0])
+
+    def _decorrido(self) -> int:
+        agora = time.perf_counter_ns()
+        decorrido, self._marca = agora - self._marca, agora
+        return decorrido
+
+    def executada(self, idas: int = 1) -> None:
+        """Fim do execute/callproc/commit"""
+        self.execucao_ns += self._decorrido()
+        self.idas += idas
+
+    def lida(self, rows: List[tuple], arraysize: int = 100) -> None:
+        """Fim de uma leitura de linhas (fetchall/fetchmany)"""
+        self.leitura_ns += self._decorrido()
+        self.linhas += len(rows)
+        self.bytes += tamanho_linhas(rows)
+        self.idas += max(1, math.ceil(len(rows) / max(arraysize, 1)))
+
+    def retomada(self) -> None:
+        """Ignora o tempo desde a última marca (ex.: consumidor de um gerador)"""
+        self._marca = time.perf_counter_ns()
+
+    def concluir(self, erro: Optional[BaseException] = None, linhas: Optional[int] = None) -> None:
+        """Entrega a medição ao monitor (só a primeira chamada conta)"""
+        if self._concluida:
+            return
+        self._concluida = True
+        if linhas is not None:
+            self.linhas = linhas
+        self.monitor.registar_sql(
+            self.sql, self.execucao_ns, self.leitura_ns,
+            self.linhas, self.bytes, self.idas,
+            erro=None if erro is None else str(erro),
+            params=self.params
+        )
+        self.span.definir(
+            execucao_ms=round(self.execucao_ns / 1e6, 3),
+            leitura_ms=round(self.leitura_ns / 1e6, 3),
+            linhas=self.linhas,
+            idas=self.idas
+        )
+        self.span.terminar(erro)
 
 
 class PerformanceMonitor:
@@ -14,8 +327,54 @@ class PerformanceMonitor:
 
     def __init__(self):
         self.logger = app_logger
-        self.metrics = {}
-        self.slow_operations = []
+        self.metrics: Dict[str, MetricaOperacao] = {}
+        self.slow_operations = deque(maxlen=PERF_CONFIG['operacoes_lentas_max'])
+        self.sql: Dict[str, EstatisticaSQL] = {}
+        self._observadores_sql_lento: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+
+    def _metrica(self, operation_name: str) -> MetricaOperacao:
+        """Métrica de uma operação (criada na primeira utilização)"""
+        metrica = self.metrics.get(operation_name)
+        if metrica is None:
+            with self._lock:
+                metrica = self.metrics.get(operation_name)
+                if metrica is None:
+                    metrica = MetricaOperacao(
+                        PERF_CONFIG['histograma_bits'],
+                        PERF_CONFIG['janela_segundos'],
+                        PERF_CONFIG['janela_fatias']
+                    )
+                    self.metrics[operation_name] = metrica
+        return metrica
+
+    def registar(self, operation_name: str, duration_ns: int, max_duration: Optional[float] = None) -> None:
+        """
+        Regista a duração de uma operação
+
+        Args:
+            operation_name: Nome da operação
+            duration_ns: Duração em nanossegundos (time.perf_counter_ns)
+            max_duration: Limite em segundos acima do qual a operação é lenta
+        """
+        self._metrica(operation_name).registar(duration_ns)
+
+        if max_duration is None:
+            # Medições de alta frequência (ex.: ui.lag) não são registadas no log
+            return
+
+        duration = duration_ns / 1e9
+        if duration > max_duration:
+            self.logger.warning(
+                f"Operação lenta detectada: {operation_name} levou {duration:.2f}s"
+            )
+            self.slow_operations.append({
+                'operation': operation_name,
+                'duration': duration,
+                'timestamp': time.time()
+            })
+        else:
+            self.logger.debug(f"{operation_name} levou {duration:.3f}s")
 
     def measure_operation(self, operation_name: str, max_duration: float = 5.0):
         """Decorator para medir duração de operações"""
@@ -23,67 +382,198 @@ class PerformanceMonitor:
         def decorator(func: Callable):
             @wraps(func)
             def wrapper(*args, **kwargs):
-                start_time = time.time()
+                start_time = time.perf_counter_ns()
 
                 try:
                     result = func(*args, **kwargs)
                     return result
                 finally:
-                    duration = time.time() - start_time
-
-                    # Registra métrica
-                    if operation_name not in self.metrics:
-                        self.metrics[operation_name] = []
-
-                    self.metrics[operation_name].append(duration)
-
-                    # Aviso se lento
-                    if duration > max_duration:
-                        self.logger.warning(
-                            f"Operação lenta detectada: {operation_name} levou {duration:.2f}s"
-                        )
-                        self.slow_operations.append({
-                            'operation': operation_name,
-                            'duration': duration,
-                            'timestamp': time.time()
-                        })
-                    else:
-                        self.logger.debug(f"{operation_name} levou {duration:.3f}s")
+                    self.registar(operation_name, time.perf_counter_ns() - start_time, max_duration)
 
             return wrapper
 
         return decorator
 
-    def get_stats(self, operation_name: str) -> Optional[dict]:
-        """Obtém estatísticas de uma operação"""
-        if operation_name not in self.metrics:
+    def medir_sql(self, sql: str, params: Any = None) -> MedicaoSQL:
+        """Inicia a medição de uma instrução SQL"""
+        return MedicaoSQL(self, sql, params)
+
+    def subscrever_sql_lento(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Regista uma função chamada com cada instrução SQL lenta
+
+        A função corre na thread que executou o SQL, por isso deve apenas
+        enfileirar o trabalho (ver slow_query_log.RegistoQueriesLentas).
+        """
+        with self._lock:
+            self._observadores_sql_lento.append(callback)
+
+    def registar_sql(
+            self,
+            sql: str,
+            execucao_ns: int,
+            leitura_ns: int,
+            linhas: int = 0,
+            bytes_lidos: int = 0,
+            idas: int = 1,
+            erro: Optional[str] = None,
+            params: Any = None
+    ) -> None:
+        """
+        Regista uma execução de uma instrução SQL
+
+        As estatísticas são agrupadas pela impressão digital do SQL; acima
+        de PERF_CONFIG['sql_instrucoes_max'] impressões, as novas somam-se
+        em OUTRAS_INSTRUCOES para a memória ficar limitada.
+        """
+        impressao, normalizado = impressao_sql(sql)
+        estatistica = self.sql.get(impressao)
+        if estatistica is None:
+            with self._lock:
+                estatistica = self.sql.get(impressao)
+                if estatistica is None:
+                    if len(self.sql) >= PERF_CONFIG['sql_instrucoes_max']:
+                        impressao, normalizado = OUTRAS_INSTRUCOES, OUTRAS_INSTRUCOES
+                        estatistica = self.sql.get(impressao)
+                    if estatistica is None:
+                        estatistica = EstatisticaSQL(impressao, normalizado, PERF_CONFIG['histograma_bits'])
+                        self.sql[impressao] = estatistica
+
+        estatistica.registar(execucao_ns, leitura_ns, linhas, bytes_lidos, idas, erro)
+
+        duracao = (execucao_ns + leitura_ns) / 1e9
+        if duracao > PERF_CONFIG['sql_lenta_segundos']:
+            self.logger.warning(f"Instrução SQL lenta ({duracao:.2f}s, {linhas} linhas): {normalizado[:200]}")
+            self.slow_operations.append({
+                'operation': f"sql:{impressao}",
+                'duration': duracao,
+                'timestamp': time.time()
+            })
+            if self._observadores_sql_lento:
+                ocorrencia = {
+                    'impressao': impressao,
+                    'sql': sql,
+                    'params': params,
+                    'duracao': duracao,
+                    'execucao': execucao_ns / 1e9,
+                    'leitura': leitura_ns / 1e9,
+                    'linhas': linhas,
+                    'erro': erro,
+                    'timestamp': time.time()
+                }
+                for callback in list(self._observadores_sql_lento):
+                    try:
+                        callback(ocorrencia)
+                    except Exception as e:
+                        self.logger.debug(f"Erro ao notificar SQL lento: {e}")
+
+    def top_sql(self, n: int = 10, criterio: str = 'total') -> List[Dict[str, Any]]:
+        """
+        Instruções SQL mais lentas
+
+        Args:
+            n: Número de instruções
+            criterio: 'total' (tempo acumulado), 'avg', 'p99' ou 'max'
+
+        Returns:
+            Lista de resumos (ver EstatisticaSQL.resumo), do mais lento
+        """
+        resumos = [e.resumo() for e in list(self.sql.values())]
+        resumos.sort(key=lambda r: r[criterio], reverse=True)
+        return resumos[:n]
+
+    def get_stats(self, operation_name: str, janela: Optional[float] = None) -> Optional[dict]:
+        """
+        Obtém estatísticas de uma operação
+
+        Args:
+            operation_name: Nome da operação
+            janela: Segundos mais recentes a considerar (None = desde o início)
+
+        Returns:
+            Dict com count, avg, min, max, last e percentis em segundos
+        """
+        metrica = self.metrics.get(operation_name)
+        if metrica is None:
             return None
 
-        times = self.metrics[operation_name]
-        return {
-            'count': len(times),
-            'avg': sum(times) / len(times),
-            'min': min(times),
-            'max': max(times),
-            'last': times[-1]
+        histograma = metrica.copia(janela)
+        if not histograma.total:
+            return None
+
+        stats = {
+            'count': histograma.total,
+            'avg': histograma.soma_ns / histograma.total / 1e9,
+            'min': histograma.min_ns / 1e9,
+            'max': histograma.max_ns / 1e9,
+            'last': metrica.ultimo_ns / 1e9
         }
+        for chave, p in PERCENTIS.items():
+            stats[chave] = histograma.percentil(p) / 1e9
+        return stats
+
+    def coletar_metricas(self) -> List[FamiliaMetrica]:
+        """Histogramas das operações (pesquisa, ui.lag...) e totais por instrução SQL"""
+        operacoes = FamiliaMetrica(
+            'inc_operacao_duracao_segundos', 'histogram',
+            'Duração das operações medidas (pesquisa, lag da interface, bloqueios)'
+        )
+        for operation_name in list(self.metrics):
+            histograma = self.metrics[operation_name].copia()
+            operacoes.adicionar_histograma(
+                {'operacao': operation_name}, buckets_de_latencia(histograma),
+                histograma.soma_ns / 1e9, histograma.total
+            )
+
+        execucoes = FamiliaMetrica('inc_sql_execucoes_total', 'counter', 'Execuções por instrução SQL')
+        duracao = FamiliaMetrica('inc_sql_duracao_segundos_total', 'counter', 'Tempo acumulado por instrução SQL')
+        linhas = FamiliaMetrica('inc_sql_linhas_total', 'counter', 'Linhas lidas ou alteradas por instrução SQL')
+        erros = FamiliaMetrica('inc_sql_erros_total', 'counter', 'Erros por instrução SQL')
+        for resumo in self.top_sql(PERF_CONFIG['metricas_sql_max']):
+            etiquetas = {'impressao': resumo['impressao']}
+            execucoes.adicionar(resumo['execucoes'], etiquetas)
+            duracao.adicionar(resumo['total'], etiquetas)
+            linhas.adicionar(resumo['linhas'], etiquetas)
+            erros.adicionar(resumo['erros'], etiquetas)
 
-    def report(self):
+        lentas = FamiliaMetrica('inc_operacoes_lentas', 'gauge', 'Operações lentas guardadas para o relatório')
+        lentas.adicionar(len(self.slow_operations))
+        return [operacoes, execucoes, duracao, linhas, erros, lentas]
+
+    def report(self, janela: Optional[float] = None):
         """Gera relatório de performance"""
         self.logger.info("=== RELATÓRIO DE PERFORMANCE ===")
-        for operation_name, times in self.metrics.items():
-            stats = self.get_stats(operation_name)
+        for operation_name in list(self.metrics):
+            stats = self.get_stats(operation_name, janela)
+            if not stats:
+                continue
             self.logger.info(
                 f"{operation_name}: "
                 f"Execuções={stats['count']}, "
                 f"Média={stats['avg']:.3f}s, "
                 f"Min={stats['min']:.3f}s, "
+                f"P50={stats['p50']:.3f}s, "
+                f"P90={stats['p90']:.3f}s, "
+                f"P99={stats['p99']:.3f}s, "
+                f"P99.9={stats['p999']:.3f}s, "
                 f"Max={stats['max']:.3f}s"
             )
 
+        for resumo in self.top_sql(5):
+            self.logger.info(
+                f"SQL {resumo['impressao']}: "
+                f"Execuções={resumo['execucoes']}, "
+                f"Total={resumo['total']:.3f}s, "
+                f"P99={resumo['p99']:.3f}s, "
+                f"Linhas={resumo['linhas']}, "
+                f"Erros={resumo['erros']} - "
+                f"{resumo['sql'][:120]}"
+            )
+
         if self.slow_operations:
             self.logger.warning(f"Operações lentas detectadas: {len(self.slow_operations)}")
 
 
 # Instância global
 perf_monitor = PerformanceMonitor()
+metricas.registar_coletor('performance', perf_monitor.coletar_metricas)
@@ -1,12 +1,13 @@
 # relatorios_avancados.py
 import customtkinter as ctk
 from datetime import datetime, timedelta
-from tkinter import messagebox
+from tkinter import messagebox, ttk
 from typing import Dict, Any
 
 from config import COLORS
 from logger_config import app_logger
 from dashboard_stats import DashboardStats
+from performance_monitor import perf_monitor
 
 
 class RelatoriosAvancados:
@@ -72,6 +73,17 @@ class RelatoriosAvancados:
             width=250
         ).pack(side="left", padx=5)
 
+        ctk.CTkButton(
+            buttons_frame,
+            text="⏱️ Queries Mais Lentas",
+            command=self.show_queries_lentas,
+            font=("Arial", 13, "bold"),
+            fg_color=COLORS['danger'],
+            hover_color=COLORS['primary'],
+            height=45,
+            width=250
+        ).pack(side="left", padx=5)
+
         # Área de resultados
         self.resultados_frame = ctk.CTkScrollableFrame(
             self.container,
@@ -204,6 +216,53 @@ class RelatoriosAvancados:
         except Exception as e:
             messagebox.showerror("Erro", f"Erro: {e}")
 
+    def show_queries_lentas(self):
+        """Mostra as instruções SQL com mais tempo acumulado nesta sessão"""
+        for widget in self.resultados_frame.winfo_children():
+            widget.destroy()
+
+        instrucoes = perf_monitor.top_sql(20)
+
+        if not instrucoes:
+            ctk.CTkLabel(
+                self.resultados_frame,
+                text="📝 Ainda não foram executadas instruções SQL nesta sessão.",
+                font=("Arial", 12),
+                text_color=COLORS['text_secondary']
+            ).pack(pady=50)
+            return
+
+        columns = ('SQL', 'Execuções', 'Total', 'Média', 'P99', 'Máx', 'Linhas', 'KB', 'Idas', 'Erros')
+        tree = ttk.Treeview(self.resultados_frame, columns=columns, show='headings', height=15)
+
+        widths = [420, 80, 80, 80, 80, 80, 80, 70, 60, 60]
+        for col, width in zip(columns, widths):
+            tree.heading(col, text=col)
+            tree.column(col, width=width, anchor="w" if col == 'SQL' else "center")
+
+        for resumo in instrucoes:
+            tree.insert('', 'end', values=(
+                resumo['sql'][:150],
+                resumo['execucoes'],
+                f"{resumo['total']:.3f}s",
+                f"{resumo['avg'] * 1000:.1f}ms",
+                f"{resumo['p99'] * 1000:.1f}ms",
+                f"{resumo['max'] * 1000:.1f}ms",
+                resumo['linhas'],
+                f"{resumo['bytes'] / 1024:,.0f}",
+                resumo['idas'],
+                resumo['erros']
+            ))
+
+        tree.pack(fill="both", expand=True, padx=20, pady=20)
+
+        ctk.CTkLabel(
+            self.resultados_frame,
+            text="Tempos medidos na aplicação (execução, incluindo o parse, e leitura), agrupados por SQL normalizado",
+            font=("Arial", 11),
+            text_color=COLORS['text_secondary']
+        ).pack(pady=10)
+
     def _create_date_filters(self):
         """Cria filtros de data"""
         filter_frame = ctk.CTkFrame(self.container, fg_color="transparent")
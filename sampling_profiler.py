@@ -0,0 +1,258 @@
+"""
+PROFILER POR AMOSTRAGEM
+Amostra periodicamente a stack de todas as threads (Tk, Inc_DB_*, sugestões,
+...) e grava os resultados em logs/ nos formatos collapsed (flamegraph.pl,
+speedscope) e speedscope JSON. Pode ser ligado e desligado em execução
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from config import PERF_CONFIG
+from logger_config import app_logger
+
+# Variáveis de ambiente: INC_PROFILER=1 liga o profiler no arranque
+VARIAVEL_ATIVO = 'INC_PROFILER'
+VARIAVEL_HZ = 'INC_PROFILER_HZ'
+
+
+class ProfilerAmostragem:
+    """
+    Profiler de tempo real (wall clock) por amostragem
+
+    A thread do profiler percorre sys._current_frames() `frequencia` vezes
+    por segundo e conta cada stack (nome da thread + funções). Só há
+    trabalho por amostra: nada é instrumentado nas outras threads, e os
+    nomes das funções são guardados em cache por objeto de código. Threads
+    em espera (filas, eventos) também aparecem, por isso convém filtrar
+    pela thread no visualizador.
+    """
+
+    def __init__(
+            self,
+            frequencia: float = PERF_CONFIG['profiler_hz'],
+            pasta: str = 'logs',
+            intervalo_gravacao: float = PERF_CONFIG['profiler_gravar_intervalo'],
+            stacks_max: int = PERF_CONFIG['profiler_stacks_max']
+    ):
+        """
+        Args:
+            frequencia: Amostras por segundo
+            pasta: Pasta dos ficheiros gerados
+            intervalo_gravacao: Segundos entre gravações intermédias
+            stacks_max: Stacks distintas guardadas (as restantes são truncadas)
+        """
+        self.frequencia = frequencia
+        self.pasta = pasta
+        self.intervalo_gravacao = intervalo_gravacao
+        self.stacks_max = stacks_max
+        self.logger = app_logger
+
+        self.amostras: Counter = Counter()
+        self.total_amostras = 0
+        self.tempo_amostragem_ns = 0
+        self.ficheiro_base: Optional[str] = None
+
+        self._nomes: Dict[object, Tuple[str, str, int]] = {}
+        self._inicio = 0.0
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ativo(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def iniciar(self) -> bool:
+        """Começa uma nova sessão de amostragem (False se já estava ativo)"""
+        with self._lock:
+            if self.ativo:
+                return False
+            self.amostras = Counter()
+            self.total_amostras = 0
+            self.tempo_amostragem_ns = 0
+            self._inicio = time.monotonic()
+            self.ficheiro_base = os.path.join(
+                self.pasta, f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            )
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._run, name="Inc_Profiler", daemon=True)
+            self._thread.start()
+
+        self.logger.info(f"Profiler iniciado ({self.frequencia:g} Hz) -> {self.ficheiro_base}.*")
+        return True
+
+    def parar(self) -> Optional[List[str]]:
+        """
+        Termina a amostragem e grava os ficheiros
+
+        Returns:
+            Caminhos gravados ou None se o profiler não estava ativo
+        """
+        with self._lock:
+            if not self.ativo:
+                return None
+            self._parar.set()
+            self._thread.join()
+            self._thread = None
+
+        ficheiros = self.gravar()
+        duracao = time.monotonic() - self._inicio
+        self.logger.info(
+            f"Profiler parado: {self.total_amostras} amostras em {duracao:.1f}s, "
+            f"sobrecarga {self.sobrecarga():.2%} -> {', '.join(ficheiros)}"
+        )
+        return ficheiros
+
+    def alternar(self) -> Optional[List[str]]:
+        """Liga ou desliga (devolve os ficheiros gravados ao desligar)"""
+        if self.ativo:
+            return self.parar()
+        self.iniciar()
+        return None
+
+    def sobrecarga(self) -> float:
+        """Fração do tempo de execução gasta a amostrar"""
+        decorrido = time.monotonic() - self._inicio
+        return self.tempo_amostragem_ns / 1e9 / decorrido if decorrido > 0 else 0.0
+
+    def _run(self):
+        periodo = 1.0 / self.frequencia
+        proxima_gravacao = time.monotonic() + self.intervalo_gravacao
+
+        while not self._parar.wait(periodo):
+            inicio = time.perf_counter_ns()
+            self._amostrar()
+            self.tempo_amostragem_ns += time.perf_counter_ns() - inicio
+
+            if time.monotonic() >= proxima_gravacao:
+                # Gravação intermédia: não se perde tudo se a aplicação terminar mal
+                self.gravar()
+                proxima_gravacao = time.monotonic() + self.intervalo_gravacao
+
+    def _nome(self, code) -> Tuple[str, str, int]:
+        """(função, ficheiro, linha) de um objeto de código"""
+        nome = self._nomes.get(code)
+        if nome is None:
+            nome = (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+            self._nomes[code] = nome
+        return nome
+
+    def _amostrar(self):
+        """Conta a stack atual de cada thread (exceto a do profiler)"""
+        nomes_threads = {t.ident: t.name for t in threading.enumerate()}
+        proprio = threading.get_ident()
+
+        for ident, frame in sys._current_frames().items():
+            if ident == proprio:
+                continue
+            funcoes = []
+            while frame is not None:
+                funcoes.append(self._nome(frame.f_code))
+                frame = frame.f_back
+            funcoes.reverse()
+            chave = (nomes_threads.get(ident, f"thread-{ident}"), tuple(funcoes))
+
+            if chave not in self.amostras and len(self.amostras) >= self.stacks_max:
+                # Memória limitada: stacks novas ficam só com as 5 funções de fora
+                chave = (chave[0], chave[1][:5] + (('(truncado)', '', 0),))
+            self.amostras[chave] += 1
+            self.total_amostras += 1
+
+    def gravar(self) -> List[str]:
+        """Grava o estado atual (collapsed e speedscope) e devolve os caminhos"""
+        os.makedirs(self.pasta, exist_ok=True)
+        amostras = list(self.amostras.items())
+
+        collapsed = f"{self.ficheiro_base}.collapsed.txt"
+        self._gravar_atomico(collapsed, self._collapsed(amostras))
+
+        speedscope = f"{self.ficheiro_base}.speedscope.json"
+        self._gravar_atomico(speedscope, json.dumps(self._speedscope(amostras), ensure_ascii=False))
+
+        return [collapsed, speedscope]
+
+    @staticmethod
+    def _gravar_atomico(caminho: str, conteudo: str):
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            f.write(conteudo)
+        os.replace(temporario, caminho)
+
+    @staticmethod
+    def _collapsed(amostras) -> str:
+        """Uma linha por stack: 'thread;f1;f2;...;fn contagem'"""
+        linhas = []
+        for (thread, funcoes), contagem in amostras:
+            partes = [thread.replace(';', ':')]
+            partes.extend(f"{nome} ({ficheiro}:{linha})" for nome, ficheiro, linha in funcoes)
+            linhas.append(f"{';'.join(partes)} {contagem}")
+        linhas.sort()
+        return '\n'.join(linhas) + '\n'
+
+    def _speedscope(self, amostras) -> dict:
+        """Formato https://www.speedscope.app/file-format-schema.json (um perfil por thread)"""
+        frames: List[dict] = []
+        indices: Dict[Tuple[str, str, int], int] = {}
+        perfis: Dict[str, dict] = {}
+        periodo = 1.0 / self.frequencia
+
+        for (thread, funcoes), contagem in amostras:
+            stack = []
+            for funcao in funcoes:
+                indice = indices.get(funcao)
+                if indice is None:
+                    indice = indices[funcao] = len(frames)
+                    nome, ficheiro, linha = funcao
+                    frames.append({'name': nome, 'file': ficheiro, 'line': linha})
+                stack.append(indice)
+
+            perfil = perfis.get(thread)
+            if perfil is None:
+                perfil = perfis[thread] = {
+                    'type': 'sampled',
+                    'name': thread,
+                    'unit': 'seconds',
+                    'startValue': 0,
+                    'endValue': 0,
+                    'samples': [],
+                    'weights': []
+                }
+            perfil['samples'].append(stack)
+            perfil['weights'].append(contagem * periodo)
+            perfil['endValue'] += contagem * periodo
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': os.path.basename(self.ficheiro_base or 'profile'),
+            'exporter': 'INC Publicidade - sampling_profiler',
+            'shared': {'frames': frames},
+            'profiles': sorted(perfis.values(), key=lambda p: p['name'])
+        }
+
+
+def criar_profiler() -> ProfilerAmostragem:
+    """Profiler com a frequência de INC_PROFILER_HZ, se definida"""
+    frequencia = PERF_CONFIG['profiler_hz']
+    try:
+        frequencia = float(os.environ.get(VARIAVEL_HZ, frequencia))
+    except ValueError:
+        app_logger.warning(f"{VARIAVEL_HZ} inválido, a usar {frequencia:g} Hz")
+    return ProfilerAmostragem(frequencia=frequencia)
+
+
+def iniciar_se_configurado() -> bool:
+    """Liga o profiler global se INC_PROFILER=1 (chamado no arranque)"""
+    if os.environ.get(VARIAVEL_ATIVO, '').strip().lower() in ('1', 'true', 'sim', 'on'):
+        return profiler.iniciar()
+    return False
+
+
+# Instância global
+profiler = criar_profiler()
@@ -7,6 +7,11 @@
 
 -- ----------------------------------------------------------------------------
 -- 1. VIEW GLOBAL DE PESQUISA - TODOS OS DADOS UNIFICADOS (CORRIGIDA)
+-- CHAVE_REGISTRO (NUMBER) é a chave primária da tabela de origem: filtrar
+-- por TIPO_REGISTRO + CHAVE_REGISTRO usa o índice da chave primária
+-- DATA_REGISTRO_DT (DATE) é a coluna de data da origem (Data_inicio,
+-- Data_criacao) ou NULL nos tipos sem data; filtros por intervalo sobre ela
+-- são empurrados para cada ramo e usam os índices dessas colunas
 -- ----------------------------------------------------------------------------
 CREATE OR REPLACE VIEW V_PESQUISA_GLOBAL AS
 SELECT
@@ -19,7 +24,10 @@ SELECT
     'Porte: ' || Porte || ' | ' ||
     'Endereço: ' || NVL(Endereco, 'N/A') || ' | ' ||
     'Contatos: ' || NVL(Contactos, 'N/A') AS TEXTO_PESQUISAVEL,
-    TO_CHAR(SYSDATE, 'DD/MM/YYYY') AS DATA_REGISTRO
+    TO_CHAR(SYSDATE, 'DD/MM/YYYY') AS DATA_REGISTRO,
+    CAST(NULL AS VARCHAR2(20)) AS ESTADO_REGISTRO,
+    Num_id_fiscal AS CHAVE_REGISTRO,
+    CAST(NULL AS DATE) AS DATA_REGISTRO_DT
 FROM Anunciante_Dados
 UNION ALL
 SELECT
@@ -31,7 +39,14 @@ SELECT
     'Título: ' || NVL(Titulo, 'N/A') || ' | ' ||
     'Público: ' || NVL(Pub_alvo, 'N/A') || ' | ' ||
     'Orçamento: ' || TO_CHAR(NVL(Orc_alocado, 0)) AS TEXTO_PESQUISAVEL,
-    TO_CHAR(Data_inicio, 'DD/MM/YYYY') AS DATA_REGISTRO
+    TO_CHAR(Data_inicio, 'DD/MM/YYYY') AS DATA_REGISTRO,
+    CASE
+        WHEN Data_inicio > SYSDATE THEN 'AGENDADA'
+        WHEN Data_termino < TRUNC(SYSDATE) THEN 'CONCLUIDA'
+        ELSE 'ATIVA'
+    END AS ESTADO_REGISTRO,
+    Cod_camp AS CHAVE_REGISTRO,
+    Data_inicio AS DATA_REGISTRO_DT
 FROM Campanha_Dados
 UNION ALL
 SELECT
@@ -44,7 +59,10 @@ SELECT
     'Criador: ' || NVL(Criador, 'N/A') || ' | ' ||
     'Status: ' || NVL(Status_aprov, 'N/A') || ' | ' ||
     SUBSTR(NVL(TO_CHAR(Descricao), 'N/A'), 1, 200) AS TEXTO_PESQUISAVEL,
-    TO_CHAR(Data_criacao, 'DD/MM/YYYY') AS DATA_REGISTRO
+    TO_CHAR(Data_criacao, 'DD/MM/YYYY') AS DATA_REGISTRO,
+    CAST(NULL AS VARCHAR2(20)) AS ESTADO_REGISTRO,
+    Id_unicopeca AS CHAVE_REGISTRO,
+    Data_criacao AS DATA_REGISTRO_DT
 FROM Pecas_Criativas
 UNION ALL
 SELECT
@@ -59,7 +77,10 @@ SELECT
     'Visibilidade: ' || NVL(Visibilidade, 'N/A') || ' | ' ||
     'Disponibilidade: ' || NVL(Disponibilidade, 'N/A') || ' | ' ||
     'Proprietário: ' || NVL(Proprietario, 'N/A') AS TEXTO_PESQUISAVEL,
-    TO_CHAR(SYSDATE, 'DD/MM/YYYY') AS DATA_REGISTRO
+    TO_CHAR(SYSDATE, 'DD/MM/YYYY') AS DATA_REGISTRO,
+    CAST(NULL AS VARCHAR2(20)) AS ESTADO_REGISTRO,
+    Id_espaco AS CHAVE_REGISTRO,
+    CAST(NULL AS DATE) AS DATA_REGISTRO_DT
 FROM Espaco_Dados
 UNION ALL
 SELECT
@@ -70,7 +91,10 @@ SELECT
     'Código: ' || TO_CHAR(Cod_pagamento) || ' | ' ||
     'Método: ' || NVL(Metod_pagamento, 'N/A') || ' | ' ||
     'Preço: ' || TO_CHAR(NVL(Precos_dinam, 0)) AS TEXTO_PESQUISAVEL,
-    TO_CHAR(SYSDATE, 'DD/MM/YYYY') AS DATA_REGISTRO
+    TO_CHAR(SYSDATE, 'DD/MM/YYYY') AS DATA_REGISTRO,
+    CAST(NULL AS VARCHAR2(20)) AS ESTADO_REGISTRO,
+    Cod_pagamento AS CHAVE_REGISTRO,
+    CAST(NULL AS DATE) AS DATA_REGISTRO_DT
 FROM Pagamentos
 UNION ALL
 SELECT
@@ -82,7 +106,10 @@ SELECT
     'Nome: ' || NVL(Nome_age, 'N/A') || ' | ' ||
     'Equipe: ' || NVL(Equip_principal, 'N/A') || ' | ' ||
     'Capacidades: ' || NVL(Cap_tecnicas, 'N/A') AS TEXTO_PESQUISAVEL,
-    TO_CHAR(SYSDATE, 'DD/MM/YYYY') AS DATA_REGISTRO
+    TO_CHAR(SYSDATE, 'DD/MM/YYYY') AS DATA_REGISTRO,
+    CAST(NULL AS VARCHAR2(20)) AS ESTADO_REGISTRO,
+    Reg_comercial AS CHAVE_REGISTRO,
+    CAST(NULL AS DATE) AS DATA_REGISTRO_DT
 FROM Agencia_Dados;
 
 -- Verificar se criou
@@ -109,9 +136,17 @@ SELECT 'VIEW V_STATS_PESQUISA criada com sucesso!' AS STATUS FROM DUAL;
 CREATE OR REPLACE PROCEDURE SP_PESQUISA_GLOBAL(
     p_termo IN VARCHAR2,
     p_tipo IN VARCHAR2 DEFAULT NULL,
+    p_limite IN NUMBER DEFAULT 50,
+    p_offset IN NUMBER DEFAULT 0,
     p_cursor OUT SYS_REFCURSOR
 ) AS
+    v_padrao VARCHAR2(300) := '%' || UPPER(p_termo) || '%';
 BEGIN
+    -- Top-N com ORDER BY + FETCH: o Oracle mantém apenas p_offset + p_limite
+    -- linhas no sort (SORT ORDER BY STOPKEY) em vez de ordenar tudo.
+    -- DATA_REGISTRO_DT (NULL nos tipos sem data) serve à recência do ranking.
+    -- Empates de relevância por tipo e só depois por título: é a ordem em que a
+    -- pesquisa paralela junta os fluxos de cada tabela
     OPEN p_cursor FOR
         SELECT
             TIPO_REGISTRO,
@@ -119,34 +154,149 @@ BEGIN
             TITULO_PRINCIPAL,
             SUBTITULO,
             DATA_REGISTRO,
-            -- Cálculo de relevância (ranking)
-            CASE
-                WHEN UPPER(TITULO_PRINCIPAL) LIKE UPPER('%' || p_termo || '%') THEN 3
-                WHEN UPPER(SUBTITULO) LIKE UPPER('%' || p_termo || '%') THEN 2
-                ELSE 1
-            END AS RELEVANCIA
-        FROM V_PESQUISA_GLOBAL
-        WHERE
-            UPPER(TEXTO_PESQUISAVEL) LIKE UPPER('%' || p_termo || '%')
-            AND (p_tipo IS NULL OR TIPO_REGISTRO = p_tipo)
+            RELEVANCIA,
+            TEXTO_PESQUISAVEL,
+            DATA_REGISTRO_DT
+        FROM (
+            SELECT
+                TIPO_REGISTRO,
+                ID_REGISTRO,
+                TITULO_PRINCIPAL,
+                SUBTITULO,
+                DATA_REGISTRO,
+                TEXTO_PESQUISAVEL,
+                DATA_REGISTRO_DT,
+                -- Pré-ranking grosseiro; o ranking final (BM25) é feito na aplicação
+                CASE
+                    WHEN UPPER(TITULO_PRINCIPAL) LIKE v_padrao THEN 3
+                    WHEN UPPER(SUBTITULO) LIKE v_padrao THEN 2
+                    ELSE 1
+                END AS RELEVANCIA
+            FROM V_PESQUISA_GLOBAL
+            WHERE
+                UPPER(TEXTO_PESQUISAVEL) LIKE v_padrao
+                AND (p_tipo IS NULL OR TIPO_REGISTRO = p_tipo)
+        )
         ORDER BY
-            CASE
-                WHEN UPPER(TITULO_PRINCIPAL) LIKE UPPER('%' || p_termo || '%') THEN 3
-                WHEN UPPER(SUBTITULO) LIKE UPPER('%' || p_termo || '%') THEN 2
-                ELSE 1
-            END DESC,
-            TITULO_PRINCIPAL;
+            RELEVANCIA DESC,
+            TIPO_REGISTRO,
+            TITULO_PRINCIPAL,
+            ID_REGISTRO
+        OFFSET NVL(p_offset, 0) ROWS
+        FETCH NEXT NVL(p_limite, 50) ROWS ONLY;
 END;
 /
 
 SELECT 'PROCEDURE SP_PESQUISA_GLOBAL criada com sucesso!' AS STATUS FROM DUAL;
 
+-- ----------------------------------------------------------------------------
+-- 3.1 PROCEDURE: PESQUISA GLOBAL COM FACETAS
+-- Devolve no mesmo cursor a página ordenada (como SP_PESQUISA_GLOBAL) e as
+-- contagens por tipo, estado da campanha e período. As correspondências são
+-- lidas uma única vez (MATERIALIZE) e partilhadas pela página e pelas facetas.
+-- A faceta TIPO ignora p_tipo para permitir mudar de tipo sem nova pesquisa.
+-- Linhas de faceta: FACETA/VALOR_FACETA/TOTAL_FACETA preenchidos.
+-- ----------------------------------------------------------------------------
+CREATE OR REPLACE PROCEDURE SP_PESQUISA_GLOBAL_FACETAS(
+    p_termo IN VARCHAR2,
+    p_tipo IN VARCHAR2 DEFAULT NULL,
+    p_limite IN NUMBER DEFAULT 50,
+    p_offset IN NUMBER DEFAULT 0,
+    p_cursor OUT SYS_REFCURSOR
+) AS
+    v_padrao VARCHAR2(300) := '%' || UPPER(p_termo) || '%';
+BEGIN
+    OPEN p_cursor FOR
+        WITH correspondencias AS (
+            SELECT /*+ MATERIALIZE */
+                TIPO_REGISTRO,
+                ID_REGISTRO,
+                TITULO_PRINCIPAL,
+                SUBTITULO,
+                DATA_REGISTRO,
+                TEXTO_PESQUISAVEL,
+                DATA_REGISTRO_DT,
+                ESTADO_REGISTRO,
+                CASE
+                    WHEN UPPER(TITULO_PRINCIPAL) LIKE v_padrao THEN 3
+                    WHEN UPPER(SUBTITULO) LIKE v_padrao THEN 2
+                    ELSE 1
+                END AS RELEVANCIA,
+                CASE
+                    WHEN DATA_REGISTRO_DT IS NULL THEN 'SEM_DATA'
+                    WHEN DATA_REGISTRO_DT >= TRUNC(SYSDATE) - 30 THEN 'ULTIMOS_30_DIAS'
+                    WHEN DATA_REGISTRO_DT >= TRUNC(SYSDATE) - 90 THEN 'ULTIMOS_90_DIAS'
+                    WHEN DATA_REGISTRO_DT >= ADD_MONTHS(TRUNC(SYSDATE), -12) THEN 'ULTIMO_ANO'
+                    ELSE 'MAIS_ANTIGO'
+                END AS PERIODO
+            FROM V_PESQUISA_GLOBAL
+            WHERE UPPER(TEXTO_PESQUISAVEL) LIKE v_padrao
+        ),
+        filtradas AS (
+            SELECT *
+            FROM correspondencias
+            WHERE p_tipo IS NULL OR TIPO_REGISTRO = p_tipo
+        ),
+        pagina AS (
+            SELECT
+                TIPO_REGISTRO,
+                ID_REGISTRO,
+                TITULO_PRINCIPAL,
+                SUBTITULO,
+                DATA_REGISTRO,
+                RELEVANCIA,
+                TEXTO_PESQUISAVEL,
+                DATA_REGISTRO_DT,
+                ROW_NUMBER() OVER (
+                    ORDER BY RELEVANCIA DESC, TIPO_REGISTRO, TITULO_PRINCIPAL, ID_REGISTRO
+                ) AS POSICAO
+            FROM filtradas
+            ORDER BY RELEVANCIA DESC, TIPO_REGISTRO, TITULO_PRINCIPAL, ID_REGISTRO
+            OFFSET NVL(p_offset, 0) ROWS
+            FETCH NEXT NVL(p_limite, 50) ROWS ONLY
+        ),
+        facetas AS (
+            SELECT 'TIPO' AS FACETA, TIPO_REGISTRO AS VALOR_FACETA, COUNT(*) AS TOTAL_FACETA
+            FROM correspondencias
+            GROUP BY TIPO_REGISTRO
+            UNION ALL
+            SELECT 'ESTADO', ESTADO_REGISTRO, COUNT(*)
+            FROM filtradas
+            WHERE TIPO_REGISTRO = 'CAMPANHA'
+            GROUP BY ESTADO_REGISTRO
+            UNION ALL
+            SELECT 'PERIODO', PERIODO, COUNT(*)
+            FROM filtradas
+            GROUP BY PERIODO
+        )
+        SELECT
+            TIPO_REGISTRO, ID_REGISTRO, TITULO_PRINCIPAL, SUBTITULO,
+            DATA_REGISTRO, RELEVANCIA, TEXTO_PESQUISAVEL,
+            CAST(NULL AS VARCHAR2(20)) AS FACETA,
+            CAST(NULL AS VARCHAR2(100)) AS VALOR_FACETA,
+            CAST(NULL AS NUMBER) AS TOTAL_FACETA,
+            POSICAO,
+            DATA_REGISTRO_DT
+        FROM pagina
+        UNION ALL
+        SELECT
+            NULL, NULL, NULL, NULL, NULL, NULL, NULL,
+            FACETA, VALOR_FACETA, TOTAL_FACETA,
+            NULL, NULL
+        FROM facetas
+        ORDER BY FACETA NULLS FIRST, POSICAO;
+END;
+/
+
+SELECT 'PROCEDURE SP_PESQUISA_GLOBAL_FACETAS criada com sucesso!' AS STATUS FROM DUAL;
+
 -- ----------------------------------------------------------------------------
 -- 4. PROCEDURE: PESQUISA POR TABELA ESPECÍFICA - ANUNCIANTES
 -- ----------------------------------------------------------------------------
 CREATE OR REPLACE PROCEDURE SP_PESQUISA_ANUNCIANTES(
     p_termo IN VARCHAR2,
     p_campo IN VARCHAR2 DEFAULT 'TODOS',
+    p_limite IN NUMBER DEFAULT NULL,
     p_cursor OUT SYS_REFCURSOR
 ) AS
 BEGIN
@@ -175,6 +325,10 @@ BEGIN
                 WHERE UPPER(Porte) LIKE UPPER('%' || p_termo || '%')
                 ORDER BY Porte;
 
+        WHEN 'RANKING' THEN
+            -- Fluxo ordenado por relevância para a pesquisa em paralelo
+            SP_PESQUISA_GLOBAL(p_termo, 'ANUNCIANTE', p_limite, 0, p_cursor);
+
         ELSE -- TODOS
             OPEN p_cursor FOR
                 SELECT * FROM Anunciante_Dados
@@ -194,6 +348,7 @@ SELECT 'PROCEDURE SP_PESQUISA_ANUNCIANTES criada com sucesso!' AS STATUS FROM DU
 CREATE OR REPLACE PROCEDURE SP_PESQUISA_CAMPANHAS(
     p_termo IN VARCHAR2,
     p_campo IN VARCHAR2 DEFAULT 'TODOS',
+    p_limite IN NUMBER DEFAULT NULL,
     p_cursor OUT SYS_REFCURSOR
 ) AS
 BEGIN
@@ -222,6 +377,10 @@ BEGIN
                 WHERE TO_CHAR(Orc_alocado) LIKE '%' || p_termo || '%'
                 ORDER BY Orc_alocado DESC;
 
+        WHEN 'RANKING' THEN
+            -- Fluxo ordenado por relevância para a pesquisa em paralelo
+            SP_PESQUISA_GLOBAL(p_termo, 'CAMPANHA', p_limite, 0, p_cursor);
+
         ELSE -- TODOS
             OPEN p_cursor FOR
                 SELECT * FROM Campanha_Dados
@@ -241,6 +400,7 @@ SELECT 'PROCEDURE SP_PESQUISA_CAMPANHAS criada com sucesso!' AS STATUS FROM DUAL
 CREATE OR REPLACE PROCEDURE SP_PESQUISA_PECAS(
     p_termo IN VARCHAR2,
     p_campo IN VARCHAR2 DEFAULT 'TODOS',
+    p_limite IN NUMBER DEFAULT NULL,
     p_cursor OUT SYS_REFCURSOR
 ) AS
 BEGIN
@@ -263,6 +423,10 @@ BEGIN
                 WHERE UPPER(Status_aprov) LIKE UPPER('%' || p_termo || '%')
                 ORDER BY Status_aprov;
 
+        WHEN 'RANKING' THEN
+            -- Fluxo ordenado por relevância para a pesquisa em paralelo
+            SP_PESQUISA_GLOBAL(p_termo, 'PECA_CRIATIVA', p_limite, 0, p_cursor);
+
         ELSE -- TODOS
             OPEN p_cursor FOR
                 SELECT * FROM Pecas_Criativas
@@ -281,6 +445,7 @@ SELECT 'PROCEDURE SP_PESQUISA_PECAS criada com sucesso!' AS STATUS FROM DUAL;
 CREATE OR REPLACE PROCEDURE SP_PESQUISA_ESPACOS(
     p_termo IN VARCHAR2,
     p_campo IN VARCHAR2 DEFAULT 'TODOS',
+    p_limite IN NUMBER DEFAULT NULL,
     p_cursor OUT SYS_REFCURSOR
 ) AS
 BEGIN
@@ -309,6 +474,10 @@ BEGIN
                 WHERE UPPER(Proprietario) LIKE UPPER('%' || p_termo || '%')
                 ORDER BY Proprietario;
 
+        WHEN 'RANKING' THEN
+            -- Fluxo ordenado por relevância para a pesquisa em paralelo
+            SP_PESQUISA_GLOBAL(p_termo, 'ESPACO', p_limite, 0, p_cursor);
+
         ELSE -- TODOS
             OPEN p_cursor FOR
                 SELECT * FROM Espaco_Dados
@@ -322,6 +491,62 @@ END;
 
 SELECT 'PROCEDURE SP_PESQUISA_ESPACOS criada com sucesso!' AS STATUS FROM DUAL;
 
+-- ----------------------------------------------------------------------------
+-- 7.1 PROCEDURE: PESQUISA POR TABELA ESPECÍFICA - PAGAMENTOS
+-- ----------------------------------------------------------------------------
+CREATE OR REPLACE PROCEDURE SP_PESQUISA_PAGAMENTOS(
+    p_termo IN VARCHAR2,
+    p_campo IN VARCHAR2 DEFAULT 'TODOS',
+    p_limite IN NUMBER DEFAULT NULL,
+    p_cursor OUT SYS_REFCURSOR
+) AS
+BEGIN
+    CASE p_campo
+        WHEN 'RANKING' THEN
+            -- Fluxo ordenado por relevância para a pesquisa em paralelo
+            SP_PESQUISA_GLOBAL(p_termo, 'PAGAMENTO', p_limite, 0, p_cursor);
+
+        ELSE -- TODOS
+            OPEN p_cursor FOR
+                SELECT * FROM Pagamentos
+                WHERE UPPER(NVL(Metod_pagamento, '') || ' ' || NVL(Comprov_veic, '') || ' ' ||
+                           NVL(Reconc_financ, '')) LIKE UPPER('%' || p_termo || '%')
+                   OR TO_CHAR(Cod_pagamento) LIKE '%' || p_termo || '%'
+                ORDER BY Cod_pagamento DESC;
+    END CASE;
+END;
+/
+
+SELECT 'PROCEDURE SP_PESQUISA_PAGAMENTOS criada com sucesso!' AS STATUS FROM DUAL;
+
+-- ----------------------------------------------------------------------------
+-- 7.2 PROCEDURE: PESQUISA POR TABELA ESPECÍFICA - AGÊNCIAS
+-- ----------------------------------------------------------------------------
+CREATE OR REPLACE PROCEDURE SP_PESQUISA_AGENCIAS(
+    p_termo IN VARCHAR2,
+    p_campo IN VARCHAR2 DEFAULT 'TODOS',
+    p_limite IN NUMBER DEFAULT NULL,
+    p_cursor OUT SYS_REFCURSOR
+) AS
+BEGIN
+    CASE p_campo
+        WHEN 'RANKING' THEN
+            -- Fluxo ordenado por relevância para a pesquisa em paralelo
+            SP_PESQUISA_GLOBAL(p_termo, 'AGENCIA', p_limite, 0, p_cursor);
+
+        ELSE -- TODOS
+            OPEN p_cursor FOR
+                SELECT * FROM Agencia_Dados
+                WHERE UPPER(NVL(Nome_age, '') || ' ' || NVL(Equip_principal, '') || ' ' ||
+                           NVL(Cap_tecnicas, '')) LIKE UPPER('%' || p_termo || '%')
+                   OR TO_CHAR(Reg_comercial) LIKE '%' || p_termo || '%'
+                ORDER BY Nome_age;
+    END CASE;
+END;
+/
+
+SELECT 'PROCEDURE SP_PESQUISA_AGENCIAS criada com sucesso!' AS STATUS FROM DUAL;
+
 -- ----------------------------------------------------------------------------
 -- 8. TABELA PARA HISTÓRICO DE PESQUISAS (ANALYTICS)
 -- ----------------------------------------------------------------------------
@@ -331,11 +556,27 @@ CREATE TABLE Log_Pesquisas (
     Tipo_registro VARCHAR2(50),
     Qtd_resultados NUMBER,
     Data_pesquisa TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    Usuario VARCHAR2(100)
+    Usuario VARCHAR2(100),
+    -- Hora do servidor na inserção (Data_pesquisa vem do relógio do cliente)
+    Data_insercao TIMESTAMP DEFAULT SYSTIMESTAMP NOT NULL
 );
 
 SELECT 'TABELA Log_Pesquisas criada com sucesso!' AS STATUS FROM DUAL;
 
+-- Bases criadas antes de Data_insercao (com verificação)
+BEGIN
+    EXECUTE IMMEDIATE 'ALTER TABLE Log_Pesquisas ADD (Data_insercao TIMESTAMP DEFAULT SYSTIMESTAMP NOT NULL)';
+    DBMS_OUTPUT.PUT_LINE('Coluna Log_Pesquisas.Data_insercao criada');
+EXCEPTION
+    WHEN OTHERS THEN
+        IF SQLCODE = -1430 THEN
+            DBMS_OUTPUT.PUT_LINE('Coluna Log_Pesquisas.Data_insercao já existe');
+        ELSE
+            RAISE;
+        END IF;
+END;
+/
+
 -- Sequence para ID
 CREATE SEQUENCE Seq_log_pesquisas START WITH 1 INCREMENT BY 1;
 
@@ -355,33 +596,236 @@ BEGIN
     IF :NEW.Data_pesquisa IS NULL THEN
         :NEW.Data_pesquisa := CURRENT_TIMESTAMP;
     END IF;
+
+    -- Sempre a hora do servidor: é a referência do rollup incremental
+    :NEW.Data_insercao := SYSTIMESTAMP;
 END;
 /
 
 SELECT 'TRIGGER TRG_LOG_PESQUISAS criado com sucesso!' AS STATUS FROM DUAL;
 
 -- ----------------------------------------------------------------------------
--- 10. VIEW: TOP 10 PESQUISAS MAIS REALIZADAS
+-- 10. ANALYTICS AGREGADO: CONTAGENS POR HORA/DIA E TOP 10 PRÉ-CALCULADO
+-- Log_Pesquisas é lido incrementalmente (Id_log > última marca) por
+-- SP_ROLLUP_PESQUISAS, agendado no DBMS_SCHEDULER. As estatísticas passam
+-- a ser leituras de tabelas pequenas (Top_Pesquisas_Resumo e
+-- MV_STATS_PESQUISA) em vez de GROUP BY sobre o log e as tabelas base.
+-- O log bruto é purgado após p_retencao_dias (só linhas já agregadas).
 -- ----------------------------------------------------------------------------
+CREATE INDEX IDX_LOG_PESQ_DATA ON Log_Pesquisas(Data_pesquisa);
+
+CREATE TABLE Pesquisas_Hora (
+    Hora TIMESTAMP NOT NULL,
+    Termo_pesquisa VARCHAR2(255) NOT NULL,
+    Tipo_registro VARCHAR2(50) NOT NULL,
+    Total_pesquisas NUMBER NOT NULL,
+    Soma_resultados NUMBER NOT NULL,
+    Ultima_pesquisa TIMESTAMP,
+    CONSTRAINT PK_PESQUISAS_HORA PRIMARY KEY (Hora, Termo_pesquisa, Tipo_registro)
+);
+
+CREATE TABLE Pesquisas_Dia (
+    Dia DATE NOT NULL,
+    Termo_pesquisa VARCHAR2(255) NOT NULL,
+    Tipo_registro VARCHAR2(50) NOT NULL,
+    Total_pesquisas NUMBER NOT NULL,
+    Soma_resultados NUMBER NOT NULL,
+    Ultima_pesquisa TIMESTAMP,
+    CONSTRAINT PK_PESQUISAS_DIA PRIMARY KEY (Dia, Termo_pesquisa, Tipo_registro)
+);
+
+CREATE TABLE Top_Pesquisas_Resumo (
+    Posicao NUMBER PRIMARY KEY,
+    Termo_pesquisa VARCHAR2(255) NOT NULL,
+    Total_pesquisas NUMBER NOT NULL,
+    Media_resultados NUMBER,
+    Ultima_pesquisa TIMESTAMP
+);
+
+-- Marca de água do rollup (uma linha)
+CREATE TABLE Rollup_Pesquisas_Controlo (
+    Id NUMBER PRIMARY KEY CHECK (Id = 1),
+    Ultimo_id_log NUMBER NOT NULL,
+    Data_execucao TIMESTAMP
+);
+
+INSERT INTO Rollup_Pesquisas_Controlo (Id, Ultimo_id_log, Data_execucao)
+VALUES (1, 0, NULL);
+
+SELECT 'TABELAS de agregação de pesquisas criadas com sucesso!' AS STATUS FROM DUAL;
+
+-- Contagens por tipo: atualizada pelo rollup, não a cada leitura
+CREATE MATERIALIZED VIEW MV_STATS_PESQUISA
+BUILD IMMEDIATE
+REFRESH COMPLETE ON DEMAND
+AS
+SELECT
+    TIPO_REGISTRO,
+    COUNT(*) AS TOTAL_REGISTROS,
+    MIN(DATA_REGISTRO) AS PRIMEIRO_REGISTRO,
+    MAX(DATA_REGISTRO) AS ULTIMO_REGISTRO
+FROM V_PESQUISA_GLOBAL
+GROUP BY TIPO_REGISTRO;
+
+SELECT 'MATERIALIZED VIEW MV_STATS_PESQUISA criada com sucesso!' AS STATUS FROM DUAL;
+
+CREATE OR REPLACE PROCEDURE SP_ROLLUP_PESQUISAS(
+    p_retencao_dias IN NUMBER DEFAULT 90,
+    p_retencao_horas_dias IN NUMBER DEFAULT 14
+) AS
+    v_ultimo NUMBER;
+    v_novo NUMBER;
+BEGIN
+    SELECT Ultimo_id_log INTO v_ultimo
+    FROM Rollup_Pesquisas_Controlo
+    WHERE Id = 1
+    FOR UPDATE;
+
+    -- Linhas inseridas há mais de um minuto (hora do servidor): o Id e
+    -- Data_insercao são atribuídos no mesmo trigger, por isso todos os Ids
+    -- menores também são desse período e os lotes curtos do analytics já
+    -- estão confirmados. Data_pesquisa (relógio do cliente, evento anterior
+    -- à gravação em lote) não serve para este corte.
+    SELECT NVL(MAX(Id_log), v_ultimo) INTO v_novo
+    FROM Log_Pesquisas
+    WHERE Id_log > v_ultimo
+      AND Data_insercao < SYSTIMESTAMP - INTERVAL '1' MINUTE;
+
+    IF v_novo > v_ultimo THEN
+        MERGE INTO Pesquisas_Hora h
+        USING (
+            SELECT
+                CAST(TRUNC(Data_pesquisa, 'HH24') AS TIMESTAMP) AS Hora,
+                UPPER(TRIM(Termo_pesquisa)) AS Termo_pesquisa,
+                NVL(Tipo_registro, 'TODOS') AS Tipo_registro,
+                COUNT(*) AS Total_pesquisas,
+                SUM(NVL(Qtd_resultados, 0)) AS Soma_resultados,
+                MAX(Data_pesquisa) AS Ultima_pesquisa
+            FROM Log_Pesquisas
+            WHERE Id_log > v_ultimo AND Id_log <= v_novo
+            GROUP BY TRUNC(Data_pesquisa, 'HH24'), UPPER(TRIM(Termo_pesquisa)),
+                     NVL(Tipo_registro, 'TODOS')
+        ) n
+        ON (h.Hora = n.Hora AND h.Termo_pesquisa = n.Termo_pesquisa
+            AND h.Tipo_registro = n.Tipo_registro)
+        WHEN MATCHED THEN UPDATE SET
+            h.Total_pesquisas = h.Total_pesquisas + n.Total_pesquisas,
+            h.Soma_resultados = h.Soma_resultados + n.Soma_resultados,
+            h.Ultima_pesquisa = GREATEST(h.Ultima_pesquisa, n.Ultima_pesquisa)
+        WHEN NOT MATCHED THEN INSERT
+            (Hora, Termo_pesquisa, Tipo_registro, Total_pesquisas, Soma_resultados, Ultima_pesquisa)
+        VALUES
+            (n.Hora, n.Termo_pesquisa, n.Tipo_registro, n.Total_pesquisas, n.Soma_resultados, n.Ultima_pesquisa);
+
+        MERGE INTO Pesquisas_Dia d
+        USING (
+            SELECT
+                TRUNC(Data_pesquisa) AS Dia,
+                UPPER(TRIM(Termo_pesquisa)) AS Termo_pesquisa,
+                NVL(Tipo_registro, 'TODOS') AS Tipo_registro,
+                COUNT(*) AS Total_pesquisas,
+                SUM(NVL(Qtd_resultados, 0)) AS Soma_resultados,
+                MAX(Data_pesquisa) AS Ultima_pesquisa
+            FROM Log_Pesquisas
+            WHERE Id_log > v_ultimo AND Id_log <= v_novo
+            GROUP BY TRUNC(Data_pesquisa), UPPER(TRIM(Termo_pesquisa)),
+                     NVL(Tipo_registro, 'TODOS')
+        ) n
+        ON (d.Dia = n.Dia AND d.Termo_pesquisa = n.Termo_pesquisa
+            AND d.Tipo_registro = n.Tipo_registro)
+        WHEN MATCHED THEN UPDATE SET
+            d.Total_pesquisas = d.Total_pesquisas + n.Total_pesquisas,
+            d.Soma_resultados = d.Soma_resultados + n.Soma_resultados,
+            d.Ultima_pesquisa = GREATEST(d.Ultima_pesquisa, n.Ultima_pesquisa)
+        WHEN NOT MATCHED THEN INSERT
+            (Dia, Termo_pesquisa, Tipo_registro, Total_pesquisas, Soma_resultados, Ultima_pesquisa)
+        VALUES
+            (n.Dia, n.Termo_pesquisa, n.Tipo_registro, n.Total_pesquisas, n.Soma_resultados, n.Ultima_pesquisa);
+    END IF;
+
+    -- Top 10 dos últimos 30 dias a partir dos totais diários (tabela pequena)
+    DELETE FROM Top_Pesquisas_Resumo;
+    INSERT INTO Top_Pesquisas_Resumo
+        (Posicao, Termo_pesquisa, Total_pesquisas, Media_resultados, Ultima_pesquisa)
+    SELECT ROWNUM, Termo_pesquisa, Total_pesquisas, Media_resultados, Ultima_pesquisa
+    FROM (
+        SELECT
+            Termo_pesquisa,
+            SUM(Total_pesquisas) AS Total_pesquisas,
+            SUM(Soma_resultados) / SUM(Total_pesquisas) AS Media_resultados,
+            MAX(Ultima_pesquisa) AS Ultima_pesquisa
+        FROM Pesquisas_Dia
+        WHERE Dia >= TRUNC(SYSDATE) - 30
+        GROUP BY Termo_pesquisa
+        ORDER BY SUM(Total_pesquisas) DESC, Termo_pesquisa
+        FETCH FIRST 10 ROWS ONLY
+    );
+
+    -- Retenção: log bruto já agregado e detalhe por hora antigo
+    DELETE FROM Log_Pesquisas
+    WHERE Id_log <= v_novo
+      AND Data_pesquisa < SYSTIMESTAMP - NUMTODSINTERVAL(p_retencao_dias, 'DAY');
+
+    DELETE FROM Pesquisas_Hora
+    WHERE Hora < SYSTIMESTAMP - NUMTODSINTERVAL(p_retencao_horas_dias, 'DAY');
+
+    UPDATE Rollup_Pesquisas_Controlo
+    SET Ultimo_id_log = v_novo, Data_execucao = SYSTIMESTAMP
+    WHERE Id = 1;
+
+    COMMIT;
+
+    -- Refresh completo (atómico) das contagens por tipo
+    DBMS_MVIEW.REFRESH('MV_STATS_PESQUISA', 'C', atomic_refresh => TRUE);
+END;
+/
+
+SELECT 'PROCEDURE SP_ROLLUP_PESQUISAS criada com sucesso!' AS STATUS FROM DUAL;
+
+-- Top 10 (mesmas colunas de antes, agora lidas do resumo pré-calculado)
 CREATE OR REPLACE VIEW V_TOP_PESQUISAS AS
 SELECT
     Termo_pesquisa,
-    COUNT(*) AS Total_pesquisas,
-    AVG(Qtd_resultados) AS Media_resultados,
-    MAX(Data_pesquisa) AS Ultima_pesquisa
-FROM Log_Pesquisas
-WHERE Data_pesquisa >= SYSDATE - 30  -- Últimos 30 dias
-GROUP BY Termo_pesquisa
-ORDER BY COUNT(*) DESC
-FETCH FIRST 10 ROWS ONLY;
+    Total_pesquisas,
+    Media_resultados,
+    Ultima_pesquisa
+FROM Top_Pesquisas_Resumo
+ORDER BY Posicao;
 
 SELECT 'VIEW V_TOP_PESQUISAS criada com sucesso!' AS STATUS FROM DUAL;
 
+-- Execução periódica (requer privilégio CREATE JOB); sem ele, chamar
+-- SP_ROLLUP_PESQUISAS manualmente ou por um agendador externo
+BEGIN
+    DBMS_SCHEDULER.CREATE_JOB(
+        job_name => 'JOB_ROLLUP_PESQUISAS',
+        job_type => 'STORED_PROCEDURE',
+        job_action => 'SP_ROLLUP_PESQUISAS',
+        repeat_interval => 'FREQ=MINUTELY;INTERVAL=5',
+        enabled => TRUE,
+        comments => 'Agrega Log_Pesquisas e atualiza estatísticas de pesquisa'
+    );
+    DBMS_OUTPUT.PUT_LINE('Job JOB_ROLLUP_PESQUISAS criado');
+EXCEPTION
+    WHEN OTHERS THEN
+        IF SQLCODE = -27477 THEN
+            DBMS_OUTPUT.PUT_LINE('Job JOB_ROLLUP_PESQUISAS já existe');
+        ELSE
+            RAISE;
+        END IF;
+END;
+/
+
+-- Em Enterprise Edition com Partitioning, Log_Pesquisas pode ser criada com
+-- PARTITION BY RANGE (Data_pesquisa) INTERVAL (NUMTOYMINTERVAL(1, 'MONTH'))
+-- e a retenção feita com ALTER TABLE ... DROP PARTITION em vez do DELETE.
+
 -- ----------------------------------------------------------------------------
 -- 11. PROCEDURE: OBTER SUGESTÕES DE PESQUISA (AUTOCOMPLETE)
 -- ----------------------------------------------------------------------------
 CREATE OR REPLACE PROCEDURE SP_SUGESTOES_PESQUISA(
     p_termo IN VARCHAR2,
+    p_limite IN NUMBER DEFAULT 8,
     p_cursor OUT SYS_REFCURSOR
 ) AS
 BEGIN
@@ -390,7 +834,7 @@ BEGIN
         FROM V_PESQUISA_GLOBAL
         WHERE UPPER(TITULO_PRINCIPAL) LIKE UPPER(p_termo || '%')
         ORDER BY LENGTH(TITULO_PRINCIPAL), TITULO_PRINCIPAL
-        FETCH FIRST 8 ROWS ONLY;
+        FETCH FIRST NVL(p_limite, 8) ROWS ONLY;
 END;
 /
 
@@ -433,15 +877,29 @@ SELECT 'FUNÇÃO FN_RELEVANCIA_PESQUISA criada com sucesso!' AS STATUS FROM DUAL
 
 -- ----------------------------------------------------------------------------
 -- 13. PROCEDURE: PESQUISA AVANÇADA COM FILTROS MÚLTIPLOS
+-- O intervalo de datas é um predicado DATE sem OR/NVL sobre a coluna
+-- (DATA_REGISTRO_DT >= início AND < fim + 1): o Oracle empurra-o para cada
+-- ramo da view, usa IDX_CAMP_DATA_INICIO / IDX_PECA_DATA_CRIACAO e descarta
+-- os tipos sem data. Sem datas, o cursor não tem predicado de data.
 -- ----------------------------------------------------------------------------
 CREATE OR REPLACE PROCEDURE SP_PESQUISA_AVANCADA(
     p_termo IN VARCHAR2,
     p_tipo IN VARCHAR2 DEFAULT NULL,
     p_data_inicio IN DATE DEFAULT NULL,
     p_data_fim IN DATE DEFAULT NULL,
+    p_limite IN NUMBER DEFAULT 50,
+    p_offset IN NUMBER DEFAULT 0,
     p_cursor OUT SYS_REFCURSOR
 ) AS
+    v_padrao VARCHAR2(300) := '%' || UPPER(p_termo) || '%';
+    v_inicio DATE := NVL(TRUNC(p_data_inicio), DATE '0001-01-01');
+    v_fim DATE := NVL(TRUNC(p_data_fim), DATE '9999-12-30') + 1;
 BEGIN
+    IF p_data_inicio IS NULL AND p_data_fim IS NULL THEN
+        SP_PESQUISA_GLOBAL(p_termo, p_tipo, p_limite, p_offset, p_cursor);
+        RETURN;
+    END IF;
+
     OPEN p_cursor FOR
         SELECT
             TIPO_REGISTRO,
@@ -449,16 +907,39 @@ BEGIN
             TITULO_PRINCIPAL,
             SUBTITULO,
             DATA_REGISTRO,
-            FN_RELEVANCIA_PESQUISA(TEXTO_PESQUISAVEL, p_termo) AS SCORE_RELEVANCIA
-        FROM V_PESQUISA_GLOBAL
-        WHERE
-            UPPER(TEXTO_PESQUISAVEL) LIKE UPPER('%' || p_termo || '%')
-            AND (p_tipo IS NULL OR TIPO_REGISTRO = p_tipo)
-            AND (p_data_inicio IS NULL OR TO_DATE(DATA_REGISTRO, 'DD/MM/YYYY') >= p_data_inicio)
-            AND (p_data_fim IS NULL OR TO_DATE(DATA_REGISTRO, 'DD/MM/YYYY') <= p_data_fim)
+            SCORE_RELEVANCIA,
+            TEXTO_PESQUISAVEL,
+            DATA_REGISTRO_DT
+        FROM (
+            SELECT
+                TIPO_REGISTRO,
+                ID_REGISTRO,
+                TITULO_PRINCIPAL,
+                SUBTITULO,
+                DATA_REGISTRO,
+                TEXTO_PESQUISAVEL,
+                DATA_REGISTRO_DT,
+                -- Pré-ranking inline (evita chamar FN_RELEVANCIA_PESQUISA por linha);
+                -- o ranking final (BM25) é feito na aplicação
+                CASE
+                    WHEN UPPER(TITULO_PRINCIPAL) LIKE v_padrao THEN 3
+                    WHEN UPPER(SUBTITULO) LIKE v_padrao THEN 2
+                    ELSE 1
+                END AS SCORE_RELEVANCIA
+            FROM V_PESQUISA_GLOBAL
+            WHERE
+                DATA_REGISTRO_DT >= v_inicio
+                AND DATA_REGISTRO_DT < v_fim
+                AND UPPER(TEXTO_PESQUISAVEL) LIKE v_padrao
+                AND (p_tipo IS NULL OR TIPO_REGISTRO = p_tipo)
+        )
         ORDER BY
-            FN_RELEVANCIA_PESQUISA(TEXTO_PESQUISAVEL, p_termo) DESC,
-            TITULO_PRINCIPAL;
+            SCORE_RELEVANCIA DESC,
+            TITULO_PRINCIPAL,
+            TIPO_REGISTRO,
+            ID_REGISTRO
+        OFFSET NVL(p_offset, 0) ROWS
+        FETCH NEXT NVL(p_limite, 50) ROWS ONLY;
 END;
 /
 
@@ -534,6 +1015,140 @@ EXCEPTION
 END;
 /
 
+-- Índice para filtros de orçamento da pesquisa estruturada (orcamento>...)
+BEGIN
+    EXECUTE IMMEDIATE 'CREATE INDEX IDX_CAMP_ORCAMENTO ON Campanha_Dados(Orc_alocado)';
+    DBMS_OUTPUT.PUT_LINE('Índice IDX_CAMP_ORCAMENTO criado');
+EXCEPTION
+    WHEN OTHERS THEN
+        IF SQLCODE = -955 THEN
+            DBMS_OUTPUT.PUT_LINE('Índice IDX_CAMP_ORCAMENTO já existe');
+        ELSE
+            RAISE;
+        END IF;
+END;
+/
+
+-- Intervalos de datas da pesquisa avançada (DATA_REGISTRO_DT)
+BEGIN
+    EXECUTE IMMEDIATE 'CREATE INDEX IDX_CAMP_DATA_INICIO ON Campanha_Dados(Data_inicio)';
+    DBMS_OUTPUT.PUT_LINE('Índice IDX_CAMP_DATA_INICIO criado');
+EXCEPTION
+    WHEN OTHERS THEN
+        IF SQLCODE = -955 THEN
+            DBMS_OUTPUT.PUT_LINE('Índice IDX_CAMP_DATA_INICIO já existe');
+        ELSE
+            RAISE;
+        END IF;
+END;
+/
+
+BEGIN
+    EXECUTE IMMEDIATE 'CREATE INDEX IDX_PECA_DATA_CRIACAO ON Pecas_Criativas(Data_criacao)';
+    DBMS_OUTPUT.PUT_LINE('Índice IDX_PECA_DATA_CRIACAO criado');
+EXCEPTION
+    WHEN OTHERS THEN
+        IF SQLCODE = -955 THEN
+            DBMS_OUTPUT.PUT_LINE('Índice IDX_PECA_DATA_CRIACAO já existe');
+        ELSE
+            RAISE;
+        END IF;
+END;
+/
+
+-- ----------------------------------------------------------------------------
+-- 14.1 FEED DE ALTERAÇÕES (OPCIONAL)
+-- Triggers registam cada linha alterada nas tabelas pesquisáveis; a aplicação
+-- lê esta tabela (SEARCH_CONFIG['change_log_oracle']) para atualizar o índice
+-- local com alterações feitas fora dela. Linhas antigas são apagadas pelo
+-- próprio leitor (retenção configurável).
+-- ----------------------------------------------------------------------------
+CREATE TABLE Log_Alteracoes_Pesquisa (
+    Id_alteracao NUMBER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    Tabela VARCHAR2(30) NOT NULL,
+    Chave NUMBER,
+    Operacao VARCHAR2(10) NOT NULL,
+    Data_alteracao TIMESTAMP DEFAULT SYSTIMESTAMP NOT NULL
+);
+
+CREATE INDEX IDX_ALT_PESQ_DATA ON Log_Alteracoes_Pesquisa(Data_alteracao);
+
+SELECT 'TABELA Log_Alteracoes_Pesquisa criada com sucesso!' AS STATUS FROM DUAL;
+
+CREATE OR REPLACE TRIGGER TRG_ALT_PESQ_ANUNCIANTE
+AFTER INSERT OR UPDATE OR DELETE ON Anunciante_Dados
+FOR EACH ROW
+DECLARE
+    v_operacao VARCHAR2(10);
+BEGIN
+    v_operacao := CASE WHEN INSERTING THEN 'INSERT' WHEN UPDATING THEN 'UPDATE' ELSE 'DELETE' END;
+    INSERT INTO Log_Alteracoes_Pesquisa (Tabela, Chave, Operacao)
+    VALUES ('ANUNCIANTE_DADOS', NVL(:NEW.Num_id_fiscal, :OLD.Num_id_fiscal), v_operacao);
+END;
+/
+
+CREATE OR REPLACE TRIGGER TRG_ALT_PESQ_CAMPANHA
+AFTER INSERT OR UPDATE OR DELETE ON Campanha_Dados
+FOR EACH ROW
+DECLARE
+    v_operacao VARCHAR2(10);
+BEGIN
+    v_operacao := CASE WHEN INSERTING THEN 'INSERT' WHEN UPDATING THEN 'UPDATE' ELSE 'DELETE' END;
+    INSERT INTO Log_Alteracoes_Pesquisa (Tabela, Chave, Operacao)
+    VALUES ('CAMPANHA_DADOS', NVL(:NEW.Cod_camp, :OLD.Cod_camp), v_operacao);
+END;
+/
+
+CREATE OR REPLACE TRIGGER TRG_ALT_PESQ_PECA
+AFTER INSERT OR UPDATE OR DELETE ON Pecas_Criativas
+FOR EACH ROW
+DECLARE
+    v_operacao VARCHAR2(10);
+BEGIN
+    v_operacao := CASE WHEN INSERTING THEN 'INSERT' WHEN UPDATING THEN 'UPDATE' ELSE 'DELETE' END;
+    INSERT INTO Log_Alteracoes_Pesquisa (Tabela, Chave, Operacao)
+    VALUES ('PECAS_CRIATIVAS', NVL(:NEW.Id_unicoPeca, :OLD.Id_unicoPeca), v_operacao);
+END;
+/
+
+CREATE OR REPLACE TRIGGER TRG_ALT_PESQ_ESPACO
+AFTER INSERT OR UPDATE OR DELETE ON Espaco_Dados
+FOR EACH ROW
+DECLARE
+    v_operacao VARCHAR2(10);
+BEGIN
+    v_operacao := CASE WHEN INSERTING THEN 'INSERT' WHEN UPDATING THEN 'UPDATE' ELSE 'DELETE' END;
+    INSERT INTO Log_Alteracoes_Pesquisa (Tabela, Chave, Operacao)
+    VALUES ('ESPACO_DADOS', NVL(:NEW.Id_espaco, :OLD.Id_espaco), v_operacao);
+END;
+/
+
+CREATE OR REPLACE TRIGGER TRG_ALT_PESQ_PAGAMENTO
+AFTER INSERT OR UPDATE OR DELETE ON Pagamentos
+FOR EACH ROW
+DECLARE
+    v_operacao VARCHAR2(10);
+BEGIN
+    v_operacao := CASE WHEN INSERTING THEN 'INSERT' WHEN UPDATING THEN 'UPDATE' ELSE 'DELETE' END;
+    INSERT INTO Log_Alteracoes_Pesquisa (Tabela, Chave, Operacao)
+    VALUES ('PAGAMENTOS', NVL(:NEW.Cod_pagamento, :OLD.Cod_pagamento), v_operacao);
+END;
+/
+
+CREATE OR REPLACE TRIGGER TRG_ALT_PESQ_AGENCIA
+AFTER INSERT OR UPDATE OR DELETE ON Agencia_Dados
+FOR EACH ROW
+DECLARE
+    v_operacao VARCHAR2(10);
+BEGIN
+    v_operacao := CASE WHEN INSERTING THEN 'INSERT' WHEN UPDATING THEN 'UPDATE' ELSE 'DELETE' END;
+    INSERT INTO Log_Alteracoes_Pesquisa (Tabela, Chave, Operacao)
+    VALUES ('AGENCIA_DADOS', NVL(:NEW.Reg_comercial, :OLD.Reg_comercial), v_operacao);
+END;
+/
+
+SELECT 'TRIGGERS do feed de alterações criados com sucesso!' AS STATUS FROM DUAL;
+
 -- ----------------------------------------------------------------------------
 -- 15. TESTE RÁPIDO
 -- ----------------------------------------------------------------------------
@@ -543,6 +1158,10 @@ SELECT COUNT(*) AS TOTAL_REGISTROS FROM V_PESQUISA_GLOBAL;
 SELECT 'Testando VIEW V_STATS_PESQUISA...' AS STATUS FROM DUAL;
 SELECT * FROM V_STATS_PESQUISA;
 
+SELECT 'Testando MV_STATS_PESQUISA e V_TOP_PESQUISAS...' AS STATUS FROM DUAL;
+SELECT * FROM MV_STATS_PESQUISA;
+SELECT * FROM V_TOP_PESQUISAS;
+
 -- ----------------------------------------------------------------------------
 -- COMMIT E MENSAGEM FINAL
 -- ----------------------------------------------------------------------------
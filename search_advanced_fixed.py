@@ -12,6 +12,8 @@ class AdvancedSearchDialogFixed(ctk.CTkToplevel):
         super().__init__(parent)
         self.search_engine = search_engine
         self.callback = callback
+        self.data_inicio = None
+        self.data_fim = None
 
         self.title("Pesquisa Avançada")
         self.geometry("500x400")
@@ -106,6 +108,14 @@ class AdvancedSearchDialogFixed(ctk.CTkToplevel):
             )
             btn.grid(row=0, column=i, padx=2, pady=2)
 
+        self.periodo_label = ctk.CTkLabel(
+            main_frame,
+            text="Qualquer data",
+            font=("Arial", 11),
+            text_color=COLORS['text_secondary']
+        )
+        self.periodo_label.pack(anchor="w")
+
         # Botões de ação
         btn_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
         btn_frame.pack(side="bottom", fill="x", pady=20)
@@ -133,15 +143,17 @@ class AdvancedSearchDialogFixed(ctk.CTkToplevel):
         ).pack(side="right", padx=5)
 
     def set_periodo(self, dias):
-        """Define período rápido - não usado na pesquisa básica, apenas UI"""
-        if dias == 0:
-            messagebox.showinfo("Período", "Pesquisando dados de hoje")
-        elif dias == 7:
-            messagebox.showinfo("Período", "Pesquisando últimos 7 dias")
-        elif dias == 30:
-            messagebox.showinfo("Período", "Pesquisando últimos 30 dias")
+        """Define o período rápido usado como filtro de datas da pesquisa"""
+        hoje = datetime.now().date()
+        if dias == "month":
+            self.data_inicio = hoje.replace(day=1)
         else:
-            messagebox.showinfo("Período", "Pesquisando este mês")
+            self.data_inicio = hoje - timedelta(days=dias)
+        self.data_fim = hoje
+
+        self.periodo_label.configure(
+            text=f"De {self.data_inicio.strftime('%d/%m/%Y')} a {self.data_fim.strftime('%d/%m/%Y')}"
+        )
 
     def _execute_search(self):
         """Executa pesquisa simplificada"""
@@ -153,8 +165,11 @@ class AdvancedSearchDialogFixed(ctk.CTkToplevel):
 
         tipo = None if self.tipo_combo.get() == 'TODOS' else self.tipo_combo.get()
 
-        # Callback com dados simplificados
+        # Callback (datas só quando foi escolhido um período)
         if self.callback:
-            self.callback(termo, tipo)
+            if self.data_inicio or self.data_fim:
+                self.callback(termo, tipo, self.data_inicio, self.data_fim)
+            else:
+                self.callback(termo, tipo)
 
         self.destroy()
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""
+ANALYTICS DE PESQUISA ASSÍNCRONO
+Grava o histórico de pesquisas em lote, fora do caminho crítico da pesquisa
+"""
+
+import atexit
+import threading
+import time
+from datetime import datetime
+from queue import Queue, Full, Empty
+from typing import Optional
+
+import cx_Oracle
+
+from config import SEARCH_CONFIG
+from logger_config import app_logger
+from performance_monitor import perf_monitor
+
+
+class SearchAnalyticsWriter:
+    """Escritor em background para a tabela Log_Pesquisas"""
+
+    INSERT_SQL = """
+        INSERT INTO Log_Pesquisas
+            (Termo_pesquisa, Tipo_registro, Qtd_resultados, Data_pesquisa, Usuario)
+        VALUES (:1, :2, :3, :4, :5)
+    """
+
+    _PARAR = object()
+
+    def __init__(
+            self,
+            db_connection,
+            tamanho_lote: int = SEARCH_CONFIG['analytics_lote'],
+            intervalo: float = SEARCH_CONFIG['analytics_intervalo'],
+            fila_max: int = SEARCH_CONFIG['analytics_fila_max']
+    ):
+        """
+        Inicializa o escritor e arranca a thread de gravação
+
+        Args:
+            db_connection: Instância da conexão Oracle
+            tamanho_lote: Eventos acumulados antes de gravar
+            intervalo: Segundos máximos que um evento espera na fila
+            fila_max: Capacidade da fila (eventos extra são descartados)
+        """
+        self.db = db_connection
+        self.logger = app_logger
+        self.tamanho_lote = max(1, tamanho_lote)
+        self.intervalo = intervalo
+        self.queue = Queue(maxsize=fila_max)
+
+        self.eventos_gravados = 0
+        self.eventos_descartados = 0
+        self._encerrado = False
+
+        self.thread = threading.Thread(
+            target=self._run,
+            name="Inc_Analytics",
+            daemon=True
+        )
+        self.thread.start()
+        atexit.register(self.shutdown)
+
+    def registrar(
+            self,
+            termo: str,
+            tipo: Optional[str],
+            qtd_resultados: int,
+            usuario: str = 'Administrador'
+    ) -> bool:
+        """
+        Enfileira um evento de pesquisa sem bloquear
+
+        Returns:
+            True se o evento foi aceite, False se foi descartado
+        """
+        if self._encerrado:
+            return False
+
+        evento = (termo[:255], tipo, qtd_resultados, datetime.now(), usuario)
+        try:
+            self.queue.put_nowait(evento)
+            return True
+        except Full:
+            self.eventos_descartados += 1
+            # Evita inundar o log quando a base de dados está lenta
+            if self.eventos_descartados == 1 or self.eventos_descartados % 100 == 0:
+                self.logger.warning(
+                    f"Fila de analytics cheia - {self.eventos_descartados} eventos descartados"
+                )
+            return False
+
+    def _run(self):
+        """Acumula eventos e grava por tamanho de lote ou por tempo"""
+        lote = []
+        prazo = None
+
+        while True:
+            timeout = None if prazo is None else max(0.0, prazo - time.monotonic())
+            try:
+                evento = self.queue.get(timeout=timeout)
+            except Empty:
+                evento = None
+
+            if evento is self._PARAR:
+                self._drenar(lote)
+                self._gravar(lote)
+                return
+
+            if evento is not None:
+                if not lote:
+                    prazo = time.monotonic() + self.intervalo
+                lote.append(evento)
+
+            if lote and (len(lote) >= self.tamanho_lote or time.monotonic() >= prazo):
+                self._gravar(lote)
+                lote = []
+                prazo = None
+
+    def _drenar(self, lote: list):
+        """Move para o lote os eventos que ainda estão na fila"""
+        while True:
+            try:
+                evento = self.queue.get_nowait()
+            except Empty:
+                return
+            if evento is not self._PARAR:
+                lote.append(evento)
+
+    def _gravar(self, lote: list):
+        """
+        Grava um lote com executemany (falhas não afetam a pesquisa)
+
+        Usa uma sessão do pool com commit/rollback próprios: a conexão
+        principal é partilhada com a interface e um rollback aqui desfaria
+        DML dela ainda por confirmar.
+        """
+        if not lote:
+            return
+
+        try:
+            with self.db.sessao() as connection:
+                cursor = connection.cursor()
+                medicao = perf_monitor.medir_sql(self.INSERT_SQL, lote[0])
+                erro = None
+                try:
+                    cursor.executemany(self.INSERT_SQL, lote)
+                    connection.commit()
+                    medicao.executada(idas=2)
+                    self.eventos_gravados += len(lote)
+                except cx_Oracle.DatabaseError as db_err:
+                    erro = db_err
+                    connection.rollback()
+                    self.logger.warning(f"Falha ao gravar {len(lote)} eventos de analytics: {db_err}")
+                finally:
+                    medicao.concluir(erro, linhas=len(lote) if erro is None else 0)
+                    cursor.close()
+        except Exception as e:
+            self.logger.warning(f"Erro ao gravar analytics de pesquisa: {e}")
+
+    def shutdown(self, timeout: float = 5.0):
+        """Grava os eventos pendentes e termina a thread"""
+        if self._encerrado:
+            return
+
+        self._encerrado = True
+        try:
+            self.queue.put(self._PARAR, timeout=timeout)
+        except Full:
+            self.logger.warning("Fila de analytics cheia no encerramento")
+
+        self.thread.join(timeout=timeout)
+        self.logger.info(
+            f"Analytics de pesquisa encerrado: {self.eventos_gravados} gravados, "
+            f"{self.eventos_descartados} descartados"
+        )
+
+    def get_stats(self) -> dict:
+        """Obtém estatísticas do escritor"""
+        return {
+            'pendentes': self.queue.qsize(),
+            'gravados': self.eventos_gravados,
+            'descartados': self.eventos_descartados
+        }
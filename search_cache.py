@@ -0,0 +1,197 @@
+"""
+CACHE DE RESULTADOS DE PESQUISA
+Guarda os candidatos devolvidos pelo Oracle por consulta normalizada,
+invalidados por tabela quando os registos mudam
+"""
+
+from datetime import date
+from typing import List, Dict, Any, Optional, Tuple
+
+from cache_manager import cache_manager
+from config import SEARCH_CONFIG
+from logger_config import app_logger
+from search_ranking import _converter_data
+
+# Tabela de origem de cada TIPO_REGISTRO em V_PESQUISA_GLOBAL
+TABELAS_POR_TIPO = {
+    'ANUNCIANTE': 'ANUNCIANTE_DADOS',
+    'CAMPANHA': 'CAMPANHA_DADOS',
+    'PECA_CRIATIVA': 'PECAS_CRIATIVAS',
+    'ESPACO': 'ESPACO_DADOS',
+    'PAGAMENTO': 'PAGAMENTOS',
+    'AGENCIA': 'AGENCIA_DADOS'
+}
+
+Chave = Tuple[Any, ...]
+
+
+class SearchResultCache:
+    """
+    Cache de candidatos de pesquisa sobre o CacheManager
+
+    A chave é o tuplo (modo, termo em maiúsculas, tipo, data_inicio,
+    data_fim). Cada entrada guarda o prefixo ordenado dos candidatos e se
+    esse prefixo é o conjunto completo. Uma consulta mais restrita (com
+    tipo ou datas) é respondida filtrando uma entrada mais ampla: como a
+    ordem é a mesma, os candidatos filtrados são um prefixo exato da
+    resposta que o Oracle daria.
+    """
+
+    def __init__(self, ttl: float = SEARCH_CONFIG['cache_ttl']):
+        self.cache = cache_manager
+        self.logger = app_logger
+        self.ttl = ttl
+        self.hits_exatos = 0
+        self.hits_filtrados = 0
+
+    @staticmethod
+    def chave(
+            modo: str,
+            termo: str,
+            tipo: Optional[str] = None,
+            data_inicio: Any = None,
+            data_fim: Any = None
+    ) -> Chave:
+        """
+        Normaliza a consulta como as procedures a comparam
+
+        As procedures filtram com UPPER(...) LIKE, que distingue acentos e
+        espaços: 'saude ' e 'SAUDE' partilham a entrada, 'Saúde' não.
+        """
+        return (
+            'pesquisa',
+            modo,
+            termo.strip().upper(),
+            tipo.upper() if tipo else None,
+            _converter_data(data_inicio),
+            _converter_data(data_fim)
+        )
+
+    @staticmethod
+    def tags(chave: Chave) -> List[str]:
+        """Tabelas de que a consulta depende"""
+        tipo = chave[3]
+        if tipo in TABELAS_POR_TIPO:
+            return [TABELAS_POR_TIPO[tipo]]
+        return list(TABELAS_POR_TIPO.values())
+
+    def guardar(
+            self,
+            chave: Chave,
+            candidatos: List[Dict[str, Any]],
+            pedido: int,
+            facetas: Optional[Dict[str, Dict[str, int]]] = None
+    ) -> None:
+        """
+        Guarda os candidatos devolvidos para um pedido de `pedido` linhas
+
+        Recebe cópias para que o ranking posterior não altere a entrada.
+        As facetas já guardadas para a mesma chave são mantidas.
+        """
+        if facetas is None:
+            facetas = self.facetas(chave)
+
+        entrada = {
+            'candidatos': [dict(c) for c in candidatos],
+            'completo': len(candidatos) < pedido,
+            'facetas': facetas
+        }
+        self.cache.set(chave, entrada, self.ttl, tags=self.tags(chave))
+
+    def obter(self, chave: Chave, pedido: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Obtém os primeiros `pedido` candidatos, se a cache os garantir
+
+        Returns:
+            Cópia dos candidatos ou None se for preciso ir ao Oracle
+        """
+        entrada = self.cache.get(chave)
+        if entrada and (entrada['completo'] or len(entrada['candidatos']) >= pedido):
+            self.hits_exatos += 1
+            return [dict(c) for c in entrada['candidatos'][:pedido]]
+
+        for ampla in self._chaves_amplas(chave):
+            entrada = self.cache.get(ampla)
+            if not entrada:
+                continue
+
+            filtrados = [c for c in entrada['candidatos'] if self._corresponde(c, chave)]
+            if entrada['completo'] or len(filtrados) >= pedido:
+                self.hits_filtrados += 1
+                self.logger.debug(f"Pesquisa respondida a partir da cache de {ampla}")
+                return [dict(c) for c in filtrados[:pedido]]
+
+        return None
+
+    @staticmethod
+    def _chave_ranking(chave: Chave) -> Chave:
+        return ('ranking',) + tuple(chave[1:])
+
+    def guardar_ranking(self, chave: Chave, ordenados: List[Dict[str, Any]]) -> None:
+        """
+        Guarda a lista completa já ordenada pelo BM25 para a consulta
+
+        As páginas seguintes são cortadas desta lista: reordenar outra
+        janela de candidatos mudaria a ordem entre páginas.
+        """
+        self.cache.set(
+            self._chave_ranking(chave),
+            [dict(r) for r in ordenados],
+            self.ttl,
+            tags=self.tags(chave)
+        )
+
+    def obter_ranking(self, chave: Chave) -> Optional[List[Dict[str, Any]]]:
+        """Lista ordenada guardada para a chave exata (cópia) ou None"""
+        ordenados = self.cache.get(self._chave_ranking(chave))
+        if ordenados is None:
+            return None
+        return [dict(r) for r in ordenados]
+
+    def facetas(self, chave: Chave) -> Optional[Dict[str, Dict[str, int]]]:
+        """Contagens por faceta guardadas para a chave exata"""
+        entrada = self.cache.get(chave)
+        if not entrada or entrada['facetas'] is None:
+            return None
+        return {nome: dict(valores) for nome, valores in entrada['facetas'].items()}
+
+    @staticmethod
+    def _chaves_amplas(chave: Chave) -> List[Chave]:
+        """Consultas mais amplas cujo resultado contém o da chave"""
+        prefixo, modo, termo, tipo, inicio, fim = chave
+        amplas = []
+        if tipo is not None:
+            amplas.append((prefixo, modo, termo, None, inicio, fim))
+        if inicio is not None or fim is not None:
+            amplas.append((prefixo, modo, termo, tipo, None, None))
+            if tipo is not None:
+                amplas.append((prefixo, modo, termo, None, None, None))
+        return amplas
+
+    @staticmethod
+    def _corresponde(candidato: Dict[str, Any], chave: Chave) -> bool:
+        """
+        Aplica ao candidato os filtros de tipo e período da chave
+
+        O período usa DATA_REGISTRO_DT ('data_dt'), como SP_PESQUISA_AVANCADA:
+        os tipos sem data (DATA_REGISTRO é SYSDATE em texto) ficam de fora.
+        """
+        _, _, _, tipo, inicio, fim = chave
+        if tipo is not None and candidato.get('tipo') != tipo:
+            return False
+        if inicio is not None or fim is not None:
+            data: Optional[date] = _converter_data(candidato.get('data_dt'))
+            if data is None:
+                return False
+            if inicio is not None and data < inicio:
+                return False
+            if fim is not None and data > fim:
+                return False
+        return True
+
+    def get_stats(self) -> dict:
+        """Obtém estatísticas da cache de pesquisa"""
+        return {
+            'hits_exatos': self.hits_exatos,
+            'hits_filtrados': self.hits_filtrados
+        }
@@ -6,24 +6,139 @@
 ╚══════════════════════════════════════════════════════════════════════════════╝
 """
 
-from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+import atexit
+import heapq
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import date, datetime, timedelta
+from itertools import islice, takewhile
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Union, Callable
 import cx_Oracle
 from logger_config import app_logger, safe_operation
+from config import SEARCH_CONFIG
+from performance_monitor import perf_monitor
+from metrics_registry import metricas, FamiliaMetrica
+from search_analytics import SearchAnalyticsWriter
+from search_cache import SearchResultCache, TABELAS_POR_TIPO
+from search_ranking import BM25Ranker
+from search_index import LocalSearchIndex
+from search_highlight import obter_destacador
+from search_query import (
+    ErroConsulta, interpretar_consulta, compilar_sql, e_consulta_estruturada
+)
+from change_feed import change_feed, OracleChangeLogPoller
+from tracing import propagar
+
+
+class _SessoesEmCurso:
+    """
+    Sessões do pool em uso pelos fluxos de uma pesquisa paralela
+
+    future.cancel() não interrompe um fluxo já em execução; cancelar()
+    interrompe a chamada em curso em cada sessão (connection.cancel()),
+    para as sessões voltarem logo ao pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessoes: Dict[str, Any] = {}
+        self._terminada = False
+
+    def registar(self, chave: str, connection) -> bool:
+        """Associa a sessão ao fluxo (False se a pesquisa já terminou)"""
+        with self._lock:
+            if self._terminada:
+                return False
+            self._sessoes[chave] = connection
+            return True
+
+    def libertar(self, chave: str) -> None:
+        with self._lock:
+            self._sessoes.pop(chave, None)
+
+    def cancelar(self) -> int:
+        """Termina a pesquisa e interrompe os fluxos em curso (devolve quantos)"""
+        with self._lock:
+            self._terminada = True
+            sessoes = list(self._sessoes.values())
+        for connection in sessoes:
+            try:
+                connection.cancel()
+            except cx_Oracle.Error:
+                pass
+        return len(sessoes)
 
 
 class SearchEngine:
     """Motor de pesquisa avançado com suporte a múltiplas tabelas"""
 
-    def __init__(self, db_connection):
+    # Teto do arraysize dos REF CURSORs (linhas por ida à base de dados)
+    ARRAYSIZE_MAXIMO = 500
+
+    # Procedure de pesquisa de cada tipo de registro
+    PROCEDURES_POR_TIPO = {
+        'ANUNCIANTE': 'SP_PESQUISA_ANUNCIANTES',
+        'CAMPANHA': 'SP_PESQUISA_CAMPANHAS',
+        'PECA_CRIATIVA': 'SP_PESQUISA_PECAS',
+        'ESPACO': 'SP_PESQUISA_ESPACOS',
+        'PAGAMENTO': 'SP_PESQUISA_PAGAMENTOS',
+        'AGENCIA': 'SP_PESQUISA_AGENCIAS'
+    }
+
+    # Maior valor de RELEVANCIA do pré-ranking das procedures
+    MAX_RELEVANCIA_SQL = 3
+
+    # Facetas devolvidas por SP_PESQUISA_GLOBAL_FACETAS
+    FACETAS = ('TIPO', 'ESTADO', 'PERIODO')
+    MAX_LINHAS_FACETAS = 16
+
+    # Máximo de chaves do índice local passadas ao Oracle num IN (...)
+    MAX_IDS_ESTRUTURADA = 1000
+
+    # Tipo de registro de cada tabela (eventos do feed de alterações)
+    TIPO_POR_TABELA = {tabela: tipo for tipo, tabela in TABELAS_POR_TIPO.items()}
+
+    def __init__(self, db_connection, usuario: str = 'Administrador'):
         """
         Inicializa o motor de pesquisa
 
         Args:
             db_connection: Instância da conexão Oracle
+            usuario: Utilizador registado no analytics e no histórico
         """
         self.db = db_connection
         self.logger = app_logger
+        self.usuario = usuario
+        self.historico = SearchCache(usuario=usuario)
+        self.analytics = SearchAnalyticsWriter(db_connection)
+        self.ranker = BM25Ranker() if SEARCH_CONFIG['ranking_bm25'] else None
+        self.indice = LocalSearchIndex()
+        self._indice_lock = threading.Lock()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self.cache_resultados = SearchResultCache() if SEARCH_CONFIG['cache_resultados'] else None
+        # False depois de se ver que o esquema não tem MV_STATS_PESQUISA
+        self._mv_estatisticas = True
+
+        # Deltas por linha dos CRUD (e, opcionalmente, dos triggers Oracle)
+        change_feed.subscrever(self._aplicar_alteracao, tabelas=self.TIPO_POR_TABELA)
+        self.change_log = None
+        if SEARCH_CONFIG['change_log_oracle']:
+            self.change_log = OracleChangeLogPoller(
+                db_connection,
+                change_feed,
+                intervalo=SEARCH_CONFIG['change_log_intervalo'],
+                retencao_horas=SEARCH_CONFIG['change_log_retencao_horas']
+            )
+            self.change_log.iniciar()
+
+        metricas.registar_coletor('pesquisa', self._coletar_metricas)
+
         self.logger.info("SearchEngine inicializado")
 
         # Mapeamento de tipos de registro
@@ -41,15 +156,325 @@ class SearchEngine:
             'ANUNCIANTE': ['TODOS', 'NOME', 'NIF', 'CATEGORIA', 'PORTE'],
             'CAMPANHA': ['TODOS', 'TITULO', 'CODIGO', 'PUBLICO', 'ORCAMENTO'],
             'PECA_CRIATIVA': ['TODOS', 'TITULO', 'CRIADOR', 'STATUS'],
-            'ESPACO': ['TODOS', 'LOCAL', 'TIPO', 'DISPONIBILIDADE', 'PROPRIETARIO']
+            'ESPACO': ['TODOS', 'LOCAL', 'TIPO', 'DISPONIBILIDADE', 'PROPRIETARIO'],
+            'PAGAMENTO': ['TODOS'],
+            'AGENCIA': ['TODOS']
+        }
+
+    def _executar_procedure(
+            self,
+            procedure: str,
+            parametros: List[Any],
+            limite: int,
+            connection=None
+    ) -> List[tuple]:
+        """
+        Chama uma procedure de pesquisa e lê o REF CURSOR devolvido
+
+        O limite já é aplicado no servidor (FETCH FIRST), por isso o
+        arraysize do cursor é ajustado para trazer a página inteira (e o
+        sinal de fim de dados) numa única ida à base de dados.
+
+        Args:
+            procedure: Nome da procedure Oracle
+            parametros: Parâmetros de entrada (sem o cursor de saída)
+            limite: Número máximo de linhas esperadas
+            connection: Sessão a usar (por omissão, a conexão principal)
+
+        Returns:
+            Lista de linhas do cursor
+        """
+        cursor = (connection or self.db.connection).cursor()
+        medicao = perf_monitor.medir_sql(
+            f"BEGIN {procedure}({', '.join(':' + str(i + 1) for i in range(len(parametros) + 1))}); END;",
+            list(parametros)
+        )
+        erro = None
+        try:
+            result_cursor = cursor.var(cx_Oracle.CURSOR)
+            cursor.callproc(procedure, list(parametros) + [result_cursor])
+            medicao.executada()
+
+            ref_cursor = result_cursor.getvalue()
+            ref_cursor.arraysize = max(1, min(limite + 1, self.ARRAYSIZE_MAXIMO))
+            try:
+                rows = ref_cursor.fetchall()
+                medicao.lida(rows, ref_cursor.arraysize)
+                return rows
+            finally:
+                ref_cursor.close()
+        except cx_Oracle.DatabaseError as db_err:
+            erro = db_err
+            raise
+        finally:
+            medicao.concluir(erro)
+            cursor.close()
+
+    @staticmethod
+    def _janela_candidatos() -> int:
+        """
+        Número de candidatos a pedir ao Oracle para o ranking BM25
+
+        O Oracle só faz um pré-ranking grosseiro. A janela é fixa por
+        consulta: o BM25 ordena sempre o mesmo conjunto e as páginas são
+        cortadas dessa ordem (uma janela que crescesse com o offset
+        reordenava candidatos diferentes em cada página, repetindo e
+        saltando resultados). Depois da janela, as páginas seguem a ordem
+        do Oracle (_pagina_do_ranking).
+        """
+        return SEARCH_CONFIG['ranking_candidatos_max']
+
+    def _pagina_do_ranking(
+            self,
+            ordenados: List[Dict[str, Any]],
+            offset: int,
+            limite: int,
+            pagina_oracle: Callable[[int, int], List[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Corta uma página da janela ordenada pelo BM25
+
+        Uma janela cheia indica que há mais correspondências: as posições
+        seguintes continuam pela ordem do pré-ranking do Oracle, pedidas
+        só quando a página lá chega. Como a janela é o início dessa mesma
+        ordem, nada se repete nem fica inacessível.
+
+        Args:
+            ordenados: Janela de candidatos ordenada pelo BM25
+            pagina_oracle: Função (offset, limite) -> candidatos do Oracle
+                nessas posições
+        """
+        janela = self._janela_candidatos()
+        pagina = ordenados[offset:offset + limite]
+        if len(ordenados) < janela or offset + limite <= janela:
+            return pagina
+
+        inicio = max(offset, janela)
+        continuacao = pagina_oracle(inicio, offset + limite - inicio)
+        for resultado in continuacao:
+            resultado.pop('texto', None)
+        return pagina + continuacao
+
+    def _ranking_fixo(
+            self,
+            chave: tuple,
+            termo: str,
+            chave_score: str,
+            obter_candidatos
+    ) -> List[Dict[str, Any]]:
+        """
+        Lista completa ordenada pelo BM25 para a consulta `chave`
+
+        Guardada na cache de resultados, para as páginas seguintes serem
+        cortadas da mesma ordem sem voltar ao Oracle nem reordenar.
+
+        Args:
+            obter_candidatos: Função sem argumentos que devolve a janela de candidatos
+        """
+        if self.cache_resultados is not None:
+            ordenados = self.cache_resultados.obter_ranking(chave)
+            if ordenados is not None:
+                return ordenados
+
+        ordenados = self._ordenar_resultados(termo, obter_candidatos(), chave_score)
+        if self.cache_resultados is not None:
+            self.cache_resultados.guardar_ranking(chave, ordenados)
+        return ordenados
+
+    def _linha_para_resultado(self, row: tuple, chave_score: str, coluna_data: int = 7) -> Dict[str, Any]:
+        """
+        Converte uma linha das procedures globais em dicionário
+
+        'data' é o texto apresentado (DATA_REGISTRO, SYSDATE nos tipos sem
+        data); 'data_dt' é DATA_REGISTRO_DT, a data real ou None.
+        """
+        return {
+            'tipo': row[0],
+            'id': row[1],
+            'titulo': row[2],
+            'subtitulo': row[3],
+            'data': row[4],
+            chave_score: row[5] if len(row) > 5 else 1,
+            'texto': row[6] if len(row) > 6 else None,
+            'data_dt': row[coluna_data] if len(row) > coluna_data else None,
+            'icon': self.tipo_icons.get(row[0], '📄')
+        }
+
+    def _ordenar_resultados(
+            self,
+            termo: str,
+            resultados: List[Dict[str, Any]],
+            chave_score: str
+    ) -> List[Dict[str, Any]]:
+        """Aplica o ranking BM25 (se ativo) e remove campos auxiliares"""
+        if self.ranker:
+            return self.ranker.ordenar(termo, resultados, chave=chave_score)
+
+        for resultado in resultados:
+            resultado.pop('texto', None)
+        return resultados
+
+    def _candidatos_em_cache(self, chave: tuple, pedido: int) -> Optional[List[Dict[str, Any]]]:
+        """Candidatos da cache de resultados (None se for preciso ir ao Oracle)"""
+        if self.cache_resultados is None:
+            return None
+        return self.cache_resultados.obter(chave, pedido)
+
+    def _guardar_candidatos(
+            self,
+            chave: tuple,
+            candidatos: List[Dict[str, Any]],
+            pedido: int,
+            facetas: Optional[Dict[str, Dict[str, int]]] = None
+    ) -> None:
+        """Guarda candidatos (antes do ranking) na cache de resultados"""
+        if self.cache_resultados is not None:
+            self.cache_resultados.guardar(chave, candidatos, pedido, facetas)
+
+    def _obter_executor(self) -> ThreadPoolExecutor:
+        """Executor das pesquisas em paralelo (uma thread por tabela)"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=len(self.PROCEDURES_POR_TIPO),
+                    thread_name_prefix="Inc_Search_"
+                )
+            return self._executor
+
+    def _pesquisar_fluxo(
+            self,
+            procedure: str,
+            termo: str,
+            limite: int,
+            em_curso: Optional[_SessoesEmCurso] = None
+    ) -> List[Dict[str, Any]]:
+        """Pesquisa uma tabela numa sessão do pool (fluxo já ordenado)"""
+        with self.db.sessao() as connection:
+            if em_curso is not None and not em_curso.registar(procedure, connection):
+                return []  # A pesquisa terminou antes de este fluxo começar
+            try:
+                rows = self._executar_procedure(
+                    procedure,
+                    [termo, 'RANKING', limite],
+                    limite,
+                    connection
+                )
+            finally:
+                if em_curso is not None:
+                    em_curso.libertar(procedure)
+        return [self._linha_para_resultado(row, 'relevancia') for row in rows]
+
+    def _pesquisa_paralela(self, termo: str, pedido: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Pesquisa todas as tabelas em simultâneo e junta os fluxos ordenados
+
+        Cada tabela devolve no máximo `pedido` linhas ordenadas por
+        relevância e título. Os fluxos concluídos são intercalados (k-way
+        merge) por relevância, tipo e título, a ordem de SP_PESQUISA_GLOBAL
+        (cada fluxo tem um só tipo). A pesquisa termina antes dos outros
+        fluxos apenas quando a linha `pedido` fica estritamente antes da
+        melhor linha que um fluxo pendente ainda pode devolver (relevância
+        máxima do seu tipo): em empate espera.
+
+        Args:
+            termo: Termo de pesquisa
+            pedido: Número de resultados pretendidos
+
+        Returns:
+            Lista de resultados ordenada pelo pré-ranking, ou None se um
+            fluxo falhou (a junção ficaria incompleta)
+        """
+        executor = self._obter_executor()
+        em_curso = _SessoesEmCurso()
+        futures = {
+            executor.submit(propagar(self._pesquisar_fluxo), procedure, termo, pedido, em_curso): tipo
+            for tipo, procedure in self.PROCEDURES_POR_TIPO.items()
         }
 
+        def chave(resultado):
+            return (-resultado['relevancia'], resultado['tipo'],
+                    str(resultado['titulo'] or ''), resultado['id'])
+
+        fluxos = []
+        certos = []
+        pendentes = set(futures)
+        falhou = False
+
+        while pendentes and not falhou:
+            prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for future in prontos:
+                try:
+                    fluxos.append(future.result())
+                except Exception as e:
+                    self.logger.warning(f"Falha na pesquisa paralela de {futures[future]}: {e}")
+                    falhou = True
+
+            juntos = heapq.merge(*fluxos, key=chave)
+            if pendentes:
+                # Melhor chave que um fluxo pendente ainda pode devolver
+                limite = min((-self.MAX_RELEVANCIA_SQL, futures[f]) for f in pendentes)
+                juntos = takewhile(lambda r: chave(r) < limite, juntos)
+            certos = list(islice(juntos, pedido))
+            if len(certos) >= pedido:
+                break
+
+        if pendentes:
+            # Fluxos por começar são cancelados; os que já correm são interrompidos
+            # no Oracle (ORA-01013) para libertarem a sessão do pool
+            for future in pendentes:
+                future.cancel()
+            interrompidos = em_curso.cancelar()
+            self.logger.debug(
+                f"Pesquisa paralela terminou antes de {len(pendentes)} tabelas "
+                f"({interrompidos} chamadas interrompidas)"
+            )
+
+        return None if falhou else certos
+
+    def _candidatos_global(
+            self,
+            chave: tuple,
+            termo: str,
+            tipo_filtro: Optional[str],
+            sql_limite: int,
+            sql_offset: int,
+            paralelo: bool
+    ) -> List[Dict[str, Any]]:
+        """Candidatos da pesquisa global (cache, fluxos em paralelo ou SP_PESQUISA_GLOBAL)"""
+        resultados = self._candidatos_em_cache(chave, sql_offset + sql_limite)
+
+        if resultados is not None:
+            return resultados[sql_offset:]
+
+        if paralelo and not tipo_filtro:
+            # Uma sessão por tabela, fluxos intercalados por relevância
+            candidatos = self._pesquisa_paralela(termo.strip(), sql_offset + sql_limite)
+            if candidatos is not None:
+                self._guardar_candidatos(chave, candidatos, sql_offset + sql_limite)
+                return candidatos[sql_offset:]
+            # Um fluxo falhou: a junção parcial é descartada e a pesquisa
+            # repete-se numa só chamada, para não ordenar nem guardar resultados incompletos
+
+        # Chama procedure Oracle (limite e offset aplicados no servidor)
+        rows = self._executar_procedure(
+            'SP_PESQUISA_GLOBAL',
+            [termo.strip(), tipo_filtro, sql_limite, sql_offset],
+            sql_limite
+        )
+        resultados = [self._linha_para_resultado(row, 'relevancia') for row in rows]
+        if sql_offset == 0:
+            self._guardar_candidatos(chave, resultados, sql_limite)
+        return resultados
+
     @safe_operation()
+    @perf_monitor.measure_operation('pesquisa_global', max_duration=2.0)
     def pesquisa_global(
             self,
             termo: str,
             tipo_filtro: Optional[str] = None,
-            limite: int = 50
+            limite: int = 50,
+            offset: int = 0,
+            paralelo: Optional[bool] = None
     ) -> Tuple[bool, List[Dict[str, Any]]]:
         """
         Realiza pesquisa global em todas as tabelas
@@ -58,6 +483,9 @@ class SearchEngine:
             termo: Termo de pesquisa
             tipo_filtro: Filtro por tipo de registro (opcional)
             limite: Número máximo de resultados
+            offset: Número de resultados a saltar (paginação)
+            paralelo: Pesquisa as tabelas em paralelo quando não há
+                tipo_filtro (None = SEARCH_CONFIG['pesquisa_paralela'])
 
         Returns:
             Tuple (sucesso, lista de resultados)
@@ -66,41 +494,379 @@ class SearchEngine:
             return False, []
 
         try:
-            cursor = self.db.connection.cursor()
-            result_cursor = cursor.var(cx_Oracle.CURSOR)
+            if paralelo is None:
+                paralelo = SEARCH_CONFIG['pesquisa_paralela']
+
+            chave = SearchResultCache.chave('global', termo, tipo_filtro)
+
+            if self.ranker:
+                # Janela fixa de candidatos ordenada uma vez; a página é cortada dessa ordem
+                ordenados = self._ranking_fixo(
+                    chave, termo, 'relevancia',
+                    lambda: self._candidatos_global(
+                        chave, termo, tipo_filtro, self._janela_candidatos(), 0, paralelo
+                    )
+                )
+                resultados = self._pagina_do_ranking(
+                    ordenados, offset, limite,
+                    lambda o, n: self._candidatos_global(chave, termo, tipo_filtro, n, o, False)
+                )
+            else:
+                resultados = self._ordenar_resultados(
+                    termo,
+                    self._candidatos_global(chave, termo, tipo_filtro, limite, offset, paralelo),
+                    'relevancia'
+                )
+
+            # Sem correspondência exata: tenta pesquisa aproximada (acentos/erros)
+            if not resultados and offset == 0 and SEARCH_CONFIG['fuzzy_fallback']:
+                _, resultados = self._pesquisa_fuzzy(termo, tipo_filtro, limite)
+
+            # Registra pesquisa para analytics (páginas seguintes não são novas pesquisas)
+            if offset == 0:
+                self._registrar_pesquisa(termo, tipo_filtro, len(resultados))
 
-            # Chama procedure Oracle
-            cursor.callproc(
-                'SP_PESQUISA_GLOBAL',
-                [termo.strip(), tipo_filtro, result_cursor]
+            self.logger.info(f"Pesquisa global: '{termo}' - {len(resultados)} resultados")
+            return True, resultados
+
+        except Exception as e:
+            self.logger.error(f"Erro na pesquisa global: {e}")
+            return False, []
+
+    @safe_operation()
+    @perf_monitor.measure_operation('pesquisa_facetada', max_duration=2.0)
+    def pesquisa_facetada(
+            self,
+            termo: str,
+            tipo_filtro: Optional[str] = None,
+            limite: int = 50,
+            offset: int = 0
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Pesquisa global com contagens por faceta
+
+        A página e as facetas vêm do mesmo cursor (SP_PESQUISA_GLOBAL_FACETAS),
+        numa única ida ao Oracle. A faceta 'tipo' ignora tipo_filtro, para
+        permitir mudar de tipo sem nova pesquisa.
+
+        Args:
+            termo: Termo de pesquisa
+            tipo_filtro: Filtro por tipo de registro (opcional)
+            limite: Número máximo de resultados
+            offset: Número de resultados a saltar (paginação)
+
+        Returns:
+            Tuple (sucesso, {'resultados': [...], 'facetas': {'tipo': {...},
+            'estado': {...}, 'periodo': {...}}}); facetas é None quando os
+            resultados vêm da pesquisa aproximada
+        """
+        if not termo or len(termo.strip()) < 2:
+            return False, {}
+
+        try:
+            if self.ranker:
+                sql_limite, sql_offset = self._janela_candidatos(), 0
+            else:
+                sql_limite, sql_offset = limite, offset
+
+            # Candidatos e ranking partilham as entradas da pesquisa global (mesma ordem)
+            chave = SearchResultCache.chave('global', termo, tipo_filtro)
+            facetas = self.cache_resultados.facetas(chave) if self.cache_resultados else None
+            resultados = None
+            if facetas is not None:
+                resultados = self._candidatos_em_cache(chave, sql_offset + sql_limite)
+
+            if resultados is not None:
+                resultados = resultados[sql_offset:]
+            else:
+                rows = self._executar_procedure(
+                    'SP_PESQUISA_GLOBAL_FACETAS',
+                    [termo.strip(), tipo_filtro, sql_limite, sql_offset],
+                    sql_limite + self.MAX_LINHAS_FACETAS
+                )
+
+                resultados = []
+                facetas = {faceta.lower(): {} for faceta in self.FACETAS}
+                for row in rows:
+                    if row[7]:
+                        facetas[row[7].lower()][row[8]] = int(row[9])
+                    else:
+                        resultados.append(self._linha_para_resultado(row, 'relevancia', coluna_data=11))
+
+                if sql_offset == 0:
+                    self._guardar_candidatos(chave, resultados, sql_limite, facetas)
+
+            if self.ranker:
+                candidatos = resultados
+                resultados = self._pagina_do_ranking(
+                    self._ranking_fixo(chave, termo, 'relevancia', lambda: candidatos),
+                    offset, limite,
+                    lambda o, n: self._candidatos_global(chave, termo, tipo_filtro, n, o, False)
+                )
+            else:
+                resultados = self._ordenar_resultados(termo, resultados, 'relevancia')
+
+            correspondencias = sum(facetas['tipo'].values())
+
+            # Sem correspondência exata: tenta pesquisa aproximada (acentos/erros),
+            # como pesquisa_global; as contagens do Oracle (zero) deixam de se aplicar
+            if not resultados and offset == 0 and SEARCH_CONFIG['fuzzy_fallback']:
+                _, resultados = self._pesquisa_fuzzy(termo, tipo_filtro, limite)
+                if resultados:
+                    facetas = None
+
+            self._registrar_pesquisa(termo, tipo_filtro, len(resultados))
+
+            self.logger.info(
+                f"Pesquisa facetada: '{termo}' - {len(resultados)} resultados, "
+                f"{correspondencias} correspondências"
             )
+            return True, {'resultados': resultados, 'facetas': facetas}
 
-            # Processa resultados
-            resultados = []
-            for row in result_cursor.getvalue():
+        except Exception as e:
+            self.logger.error(f"Erro na pesquisa facetada: {e}")
+            return False, {}
+
+    @staticmethod
+    def converter_data(valor: Any) -> Optional[date]:
+        """
+        Converte um filtro de data para date
+
+        Aceita date, datetime ou texto 'DD/MM/AAAA' (vazio = sem filtro).
+
+        Raises:
+            ValueError: Texto numa data inválida
+        """
+        if valor is None:
+            return None
+        if isinstance(valor, datetime):
+            return valor.date()
+        if isinstance(valor, date):
+            return valor
+        texto = str(valor).strip()
+        if not texto:
+            return None
+        return datetime.strptime(texto, '%d/%m/%Y').date()
+
+    @staticmethod
+    def intervalo_periodo(periodo: str, hoje: Optional[date] = None) -> Tuple[Optional[date], Optional[date]]:
+        """
+        Datas (início, fim) de um valor da faceta 'periodo'
+
+        Corresponde aos escalões de SP_PESQUISA_GLOBAL_FACETAS, para
+        aprofundar a pesquisa com pesquisa_avancada.
+        """
+        hoje = hoje or date.today()
+        um_ano = hoje.replace(year=hoje.year - 1) if not (hoje.month == 2 and hoje.day == 29) \
+            else hoje.replace(year=hoje.year - 1, day=28)
+
+        intervalos = {
+            'ULTIMOS_30_DIAS': (hoje - timedelta(days=30), None),
+            'ULTIMOS_90_DIAS': (hoje - timedelta(days=90), hoje - timedelta(days=31)),
+            'ULTIMO_ANO': (um_ano, hoje - timedelta(days=91)),
+            'MAIS_ANTIGO': (None, um_ano - timedelta(days=1))
+        }
+        return intervalos.get(periodo, (None, None))
+
+    def e_consulta_estruturada(self, termo: str) -> bool:
+        """Indica se o termo usa campos (tipo:, orcamento>...) ou aspas"""
+        return e_consulta_estruturada(termo)
+
+    @safe_operation()
+    @perf_monitor.measure_operation('pesquisa_estruturada', max_duration=2.0)
+    def pesquisa_estruturada(
+            self,
+            consulta: str,
+            limite: int = 50
+    ) -> Tuple[bool, Union[List[Dict[str, Any]], str]]:
+        """
+        Pesquisa com a linguagem estruturada (ver search_query)
+
+        Ex.: tipo:campanha orcamento>100000 titulo:"5G"
+
+        O texto livre e o título são resolvidos no índice local; os
+        filtros de campo são compilados em SQL com variáveis de ligação
+        sobre a tabela base, restringido às chaves do índice quando há
+        texto. Os dados apresentados vêm do índice local.
+
+        Args:
+            consulta: Texto da consulta
+            limite: Número máximo de resultados
+
+        Returns:
+            Tuple (sucesso, lista de resultados); com a consulta inválida,
+            (False, mensagem do erro) para apresentar ao utilizador
+        """
+        try:
+            interpretada = interpretar_consulta(consulta)
+            tipos = interpretada.tipos_aplicaveis()
+        except ErroConsulta as e:
+            self.logger.warning(f"Consulta estruturada inválida '{consulta}': {e}")
+            return False, str(e)
+
+        indice = self._obter_indice()
+        if indice is None:
+            return False, []
+
+        texto = interpretada.texto_indice()
+        resultados = []
+
+        for tipo in tipos:
+            scores = None
+            if texto:
+                encontrados, _ = indice.pesquisar(
+                    texto, tipo=tipo, limite=self.MAX_IDS_ESTRUTURADA, max_distancia=0
+                )
+                scores = {
+                    str(doc['id']): score
+                    for doc, score in encontrados
+                    if interpretada.corresponde_texto(doc)
+                }
+                if not scores:
+                    continue
+
+            if interpretada.filtros or scores is None:
+                ids = None
+                if scores is not None:
+                    ids = [int(i) for i in scores if i.isdigit()]
+                    if not ids:
+                        continue
+
+                sql, binds = compilar_sql(interpretada, tipo, limite, ids)
+                result = self.db.execute_query(sql, binds)
+                if not result:
+                    self.logger.warning(f"Falha na pesquisa estruturada em {tipo}")
+                    continue
+                chaves = [str(row[0]) for row in result[1]]
+            else:
+                chaves = list(scores)
+
+            for chave in chaves:
+                documento = indice.documentos.get((tipo, chave))
+                if documento is None:
+                    continue
                 resultados.append({
-                    'tipo': row[0],
-                    'id': row[1],
-                    'titulo': row[2],
-                    'subtitulo': row[3],
-                    'data': row[4],
-                    'relevancia': row[5] if len(row) > 5 else 1,
-                    'icon': self.tipo_icons.get(row[0], '📄')
+                    'tipo': tipo,
+                    'id': chave,
+                    'titulo': documento.get('titulo'),
+                    'subtitulo': documento.get('subtitulo'),
+                    'data': documento.get('data'),
+                    'relevancia': round(scores.get(chave, 0.0), 4) if scores else 0.0,
+                    'icon': self.tipo_icons.get(tipo, '📄')
                 })
 
-            cursor.close()
+        resultados.sort(key=lambda r: (-r['relevancia'], str(r['titulo'] or '')))
+        resultados = resultados[:limite]
 
-            # Limita resultados
-            resultados = resultados[:limite]
+        self._registrar_pesquisa(consulta, tipos[0] if len(tipos) == 1 else None, len(resultados))
 
-            # Registra pesquisa para analytics
-            self._registrar_pesquisa(termo, tipo_filtro, len(resultados))
+        self.logger.info(f"Pesquisa estruturada: '{consulta}' - {len(resultados)} resultados")
+        return True, resultados
 
-            self.logger.info(f"Pesquisa global: '{termo}' - {len(resultados)} resultados")
-            return True, resultados
+    def _obter_indice(self) -> Optional[LocalSearchIndex]:
+        """Carrega o índice local na primeira utilização"""
+        if not self.indice.carregado:
+            with self._indice_lock:
+                if not self.indice.carregado and not self.indice.carregar(self.db):
+                    return None
+        return self.indice
+
+    def _aplicar_alteracao(self, alteracao) -> None:
+        """
+        Aplica ao índice local (e às sugestões) a alteração de uma linha
+
+        Corre na thread de despacho do feed. Se o índice ainda não foi
+        carregado não há nada a atualizar: a primeira carga já lê o
+        estado atual.
+        """
+        tipo = self.TIPO_POR_TABELA.get(alteracao.tabela)
+        if tipo is None or not self.indice.carregado:
+            return
+
+        if alteracao.chave is None:
+            self.indice.recarregar_tipo(self.db, tipo)
+        else:
+            self.indice.atualizar_registo(self.db, tipo, alteracao.chave)
+
+    def _pesquisa_fuzzy(
+            self,
+            termo: str,
+            tipo_filtro: Optional[str],
+            limite: int,
+            max_distancia: Optional[int] = None,
+            orcamento_ms: Optional[float] = None
+    ) -> Tuple[bool, List[Dict[str, Any]]]:
+        """Executa a pesquisa aproximada no índice local"""
+        indice = self._obter_indice()
+        if indice is None:
+            return False, []
+
+        if orcamento_ms is None:
+            orcamento_ms = SEARCH_CONFIG['fuzzy_orcamento_ms']
+
+        encontrados, completo = indice.pesquisar(
+            termo,
+            tipo=tipo_filtro,
+            limite=limite,
+            max_distancia=max_distancia,
+            orcamento_ms=orcamento_ms
+        )
+        if not completo:
+            self.logger.warning(
+                f"Pesquisa aproximada '{termo}' excedeu {orcamento_ms}ms - resultados parciais"
+            )
+
+        return True, [
+            {
+                'tipo': doc['tipo'],
+                'id': doc['id'],
+                'titulo': doc['titulo'],
+                'subtitulo': doc['subtitulo'],
+                'data': doc['data'],
+                'relevancia': round(score, 4),
+                'icon': self.tipo_icons.get(doc['tipo'], '📄')
+            }
+            for doc, score in encontrados
+        ]
+
+    @safe_operation()
+    def pesquisa_fuzzy(
+            self,
+            termo: str,
+            tipo_filtro: Optional[str] = None,
+            limite: int = 50,
+            max_distancia: Optional[int] = None,
+            orcamento_ms: Optional[float] = None
+    ) -> Tuple[bool, List[Dict[str, Any]]]:
+        """
+        Pesquisa tolerante a acentos e erros de digitação
+
+        'Mocambique' encontra 'Moçambique' e 'Vodacon' encontra 'Vodacom'.
+
+        Args:
+            termo: Termo de pesquisa
+            tipo_filtro: Filtro por tipo de registro (opcional)
+            limite: Número máximo de resultados
+            max_distancia: Erros tolerados por palavra (None = automático)
+            orcamento_ms: Tempo máximo de pesquisa (None = SEARCH_CONFIG)
+
+        Returns:
+            Tuple (sucesso, lista de resultados)
+        """
+        if not termo or len(termo.strip()) < 2:
+            return False, []
+
+        try:
+            success, resultados = self._pesquisa_fuzzy(
+                termo.strip(), tipo_filtro, limite, max_distancia, orcamento_ms
+            )
+            if success:
+                self._registrar_pesquisa(termo, tipo_filtro, len(resultados))
+                self.logger.info(f"Pesquisa aproximada: '{termo}' - {len(resultados)} resultados")
+            return success, resultados
 
         except Exception as e:
-            self.logger.error(f"Erro na pesquisa global: {e}")
+            self.logger.error(f"Erro na pesquisa aproximada: {e}")
             return False, []
 
     @safe_operation()
@@ -126,14 +892,7 @@ class SearchEngine:
 
         try:
             # Mapeia procedure correta
-            procedures = {
-                'ANUNCIANTE': 'SP_PESQUISA_ANUNCIANTES',
-                'CAMPANHA': 'SP_PESQUISA_CAMPANHAS',
-                'PECA_CRIATIVA': 'SP_PESQUISA_PECAS',
-                'ESPACO': 'SP_PESQUISA_ESPACOS'
-            }
-
-            procedure = procedures.get(tabela)
+            procedure = self.PROCEDURES_POR_TIPO.get(tabela)
             if not procedure:
                 self.logger.warning(f"Tabela não suportada: {tabela}")
                 return False, []
@@ -144,7 +903,7 @@ class SearchEngine:
             # Chama procedure específica
             cursor.callproc(
                 procedure,
-                [termo.strip(), campo, result_cursor]
+                [termo.strip(), campo, None, result_cursor]
             )
 
             # Processa resultados
@@ -168,6 +927,7 @@ class SearchEngine:
             return False, []
 
     @safe_operation()
+    @perf_monitor.measure_operation('obter_sugestoes', max_duration=0.5)
     def obter_sugestoes(self, termo: str, limite: int = 8) -> List[Dict[str, str]]:
         """
         Obtém sugestões de autocompletar baseadas no termo parcial
@@ -183,41 +943,48 @@ class SearchEngine:
             return []
 
         try:
-            cursor = self.db.connection.cursor()
-            result_cursor = cursor.var(cx_Oracle.CURSOR)
+            # Com o índice local carregado, a trie responde sem ir ao Oracle
+            if self.indice.carregado:
+                return [
+                    {
+                        'texto': titulo,
+                        'tipo': tipo,
+                        'icon': self.tipo_icons.get(tipo, '📄')
+                    }
+                    for titulo, tipo in self.indice.sugerir(termo.strip(), limite)
+                ]
 
-            # Chama procedure de sugestões
-            cursor.callproc(
+            # Chama procedure de sugestões (limite aplicado no servidor)
+            rows = self._executar_procedure(
                 'SP_SUGESTOES_PESQUISA',
-                [termo.strip(), result_cursor]
+                [termo.strip(), limite],
+                limite
             )
 
             # Processa sugestões
-            sugestoes = []
-            for row in result_cursor.getvalue():
-                if len(sugestoes) >= limite:
-                    break
-
-                sugestoes.append({
+            return [
+                {
                     'texto': row[0],
                     'tipo': row[1],
                     'icon': self.tipo_icons.get(row[1], '📄')
-                })
-
-            cursor.close()
-            return sugestoes
+                }
+                for row in rows
+            ]
 
         except Exception as e:
             self.logger.error(f"Erro ao obter sugestões: {e}")
             return []
 
     @safe_operation()
+    @perf_monitor.measure_operation('pesquisa_avancada', max_duration=2.0)
     def pesquisa_avancada(
             self,
             termo: str,
             tipo: Optional[str] = None,
-            data_inicio: Optional[datetime] = None,
-            data_fim: Optional[datetime] = None
+            data_inicio: Optional[Any] = None,
+            data_fim: Optional[Any] = None,
+            limite: int = 50,
+            offset: int = 0
     ) -> Tuple[bool, List[Dict[str, Any]]]:
         """
         Pesquisa avançada com múltiplos filtros
@@ -225,8 +992,10 @@ class SearchEngine:
         Args:
             termo: Termo de pesquisa
             tipo: Filtro por tipo de registro
-            data_inicio: Data inicial do filtro
-            data_fim: Data final do filtro
+            data_inicio: Data inicial do filtro (date, datetime ou 'DD/MM/AAAA')
+            data_fim: Data final do filtro, inclusive
+            limite: Número máximo de resultados
+            offset: Número de resultados a saltar (paginação)
 
         Returns:
             Tuple (sucesso, lista de resultados)
@@ -235,29 +1004,41 @@ class SearchEngine:
             return False, []
 
         try:
-            cursor = self.db.connection.cursor()
-            result_cursor = cursor.var(cx_Oracle.CURSOR)
-
-            # Chama procedure avançada
-            cursor.callproc(
-                'SP_PESQUISA_AVANCADA',
-                [termo.strip(), tipo, data_inicio, data_fim, result_cursor]
-            )
-
-            # Processa resultados
-            resultados = []
-            for row in result_cursor.getvalue():
-                resultados.append({
-                    'tipo': row[0],
-                    'id': row[1],
-                    'titulo': row[2],
-                    'subtitulo': row[3],
-                    'data': row[4],
-                    'score': row[5] if len(row) > 5 else 0,
-                    'icon': self.tipo_icons.get(row[0], '📄')
-                })
-
-            cursor.close()
+            # Datas como DATE (sem hora): o filtro é feito no Oracle por índice
+            data_inicio = self.converter_data(data_inicio)
+            data_fim = self.converter_data(data_fim)
+            if data_inicio and data_fim and data_inicio > data_fim:
+                data_inicio, data_fim = data_fim, data_inicio
+
+            chave = SearchResultCache.chave('avancada', termo, tipo, data_inicio, data_fim)
+
+            def candidatos(sql_limite: int, sql_offset: int) -> List[Dict[str, Any]]:
+                encontrados = self._candidatos_em_cache(chave, sql_offset + sql_limite)
+                if encontrados is not None:
+                    return encontrados[sql_offset:]
+
+                # Chama procedure avançada (limite e offset aplicados no servidor)
+                rows = self._executar_procedure(
+                    'SP_PESQUISA_AVANCADA',
+                    [termo.strip(), tipo, data_inicio, data_fim, sql_limite, sql_offset],
+                    sql_limite
+                )
+                encontrados = [self._linha_para_resultado(row, 'score') for row in rows]
+                if sql_offset == 0:
+                    self._guardar_candidatos(chave, encontrados, sql_limite)
+                return encontrados
+
+            if self.ranker:
+                # Janela fixa ordenada uma vez; a página é cortada dessa ordem
+                resultados = self._pagina_do_ranking(
+                    self._ranking_fixo(
+                        chave, termo, 'score', lambda: candidatos(self._janela_candidatos(), 0)
+                    ),
+                    offset, limite,
+                    lambda o, n: candidatos(n, o)
+                )
+            else:
+                resultados = self._ordenar_resultados(termo, candidatos(limite, offset), 'score')
 
             self.logger.info(
                 f"Pesquisa avançada: '{termo}' "
@@ -275,24 +1056,41 @@ class SearchEngine:
         """
         Obtém estatísticas gerais de pesquisa
 
+        Lê os resumos mantidos por SP_ROLLUP_PESQUISAS (MV_STATS_PESQUISA e
+        Top_Pesquisas_Resumo, via V_TOP_PESQUISAS): poucas linhas,
+        independentemente do tamanho de Log_Pesquisas.
+
         Returns:
             Dicionário com estatísticas
         """
         try:
-            # Estatísticas por tipo
-            success, result = self.db.execute_query(
-                "SELECT * FROM V_STATS_PESQUISA ORDER BY TOTAL_REGISTROS DESC"
-            )
-
-            if not success or not result:
+            # Estatísticas por tipo (a view antiga serve de alternativa
+            # em esquemas sem a materialized view)
+            result = None
+            if self._mv_estatisticas:
+                result = self.db.execute_query(
+                    "SELECT * FROM MV_STATS_PESQUISA ORDER BY TOTAL_REGISTROS DESC"
+                )
+            if not result:
+                result = self.db.execute_query(
+                    "SELECT * FROM V_STATS_PESQUISA ORDER BY TOTAL_REGISTROS DESC"
+                )
+                if result and self._mv_estatisticas:
+                    # A base responde mas a MV falhou: não existe neste esquema.
+                    # As chamadas seguintes vão direto à view (sem erro nem rollback)
+                    self._mv_estatisticas = False
+                    self.logger.info("MV_STATS_PESQUISA indisponível; estatísticas lidas de V_STATS_PESQUISA")
+
+            if not result or not result[1]:
                 return {}
 
+            rows = result[1]
             stats = {
-                'total_registros': sum(row[1] for row in result),
+                'total_registros': sum(row[1] for row in rows),
                 'por_tipo': {}
             }
 
-            for row in result:
+            for row in rows:
                 tipo = row[0]
                 stats['por_tipo'][tipo] = {
                     'total': row[1],
@@ -301,12 +1099,12 @@ class SearchEngine:
                     'icon': self.tipo_icons.get(tipo, '📄')
                 }
 
-            # Top pesquisas
-            success_top, result_top = self.db.execute_query(
+            # Top pesquisas (pré-calculado)
+            result_top = self.db.execute_query(
                 "SELECT * FROM V_TOP_PESQUISAS"
             )
 
-            if success_top and result_top:
+            if result_top and result_top[1]:
                 stats['top_pesquisas'] = [
                     {
                         'termo': row[0],
@@ -314,7 +1112,7 @@ class SearchEngine:
                         'media_resultados': row[2],
                         'ultima': row[3]
                     }
-                    for row in result_top[:10]
+                    for row in result_top[1][:10]
                 ]
 
             return stats
@@ -324,6 +1122,51 @@ class SearchEngine:
             return {}
 
     @safe_operation()
+    def obter_tendencias(
+            self,
+            termo: Optional[str] = None,
+            dias: int = 7,
+            por_hora: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Contagens agregadas de pesquisas por dia (ou hora)
+
+        Args:
+            termo: Termo a filtrar (None = todos)
+            dias: Janela em dias
+            por_hora: Usa Pesquisas_Hora em vez de Pesquisas_Dia
+
+        Returns:
+            Lista de {'periodo', 'termo', 'total', 'media_resultados'}
+        """
+        tabela, coluna = ('Pesquisas_Hora', 'Hora') if por_hora else ('Pesquisas_Dia', 'Dia')
+        result = self.db.execute_query(
+            f"""
+            SELECT {coluna}, Termo_pesquisa,
+                   SUM(Total_pesquisas),
+                   SUM(Soma_resultados) / SUM(Total_pesquisas)
+            FROM {tabela}
+            WHERE {coluna} >= TRUNC(SYSDATE) - :dias
+              AND (:termo IS NULL OR Termo_pesquisa = UPPER(TRIM(:termo)))
+            GROUP BY {coluna}, Termo_pesquisa
+            ORDER BY {coluna}, SUM(Total_pesquisas) DESC
+            """,
+            {'dias': dias, 'termo': termo}
+        )
+
+        if not result:
+            return []
+
+        return [
+            {
+                'periodo': row[0],
+                'termo': row[1],
+                'total': row[2],
+                'media_resultados': row[3]
+            }
+            for row in result[1]
+        ]
+
     @safe_operation()
     def _registrar_pesquisa(
             self,
@@ -332,23 +1175,48 @@ class SearchEngine:
             qtd_resultados: int
     ) -> None:
         """
-        Registra pesquisa no log para analytics - VERSÃO CORRIGIDA
+        Registra pesquisa no log para analytics
+
+        O evento é apenas enfileirado; a gravação em Log_Pesquisas é feita
+        em lote pelo SearchAnalyticsWriter, fora da latência da pesquisa.
         """
         try:
-            # 🆕 USAR execute_query EM VEZ DE execute_dml
-            self.db.execute_query(
-                """
-                INSERT INTO Log_Pesquisas
-                    (Termo_pesquisa, Tipo_registro, Qtd_resultados, Usuario)
-                VALUES (: 1, :2, :3, :4)
-                """,
-                (termo[:255], tipo, qtd_resultados, 'Administrador'),
-                fetch=False  # 🆕 IMPORTANTE: fetch=False para INSERT
-            )
+            self.analytics.registrar(termo, tipo, qtd_resultados, self.usuario)
+            self.historico.adicionar(termo.strip(), qtd_resultados)
         except Exception as e:
             # Não interrompe a pesquisa se falhar o log
             self.logger.warning(f"Erro ao registrar pesquisa no log: {e}")
 
+    def fechar(self) -> None:
+        """Liberta recursos do motor (grava analytics e histórico pendentes)"""
+        change_feed.cancelar(self._aplicar_alteracao)
+        metricas.remover_coletor('pesquisa')
+        if self.change_log:
+            self.change_log.parar()
+        self.analytics.shutdown()
+        self.historico.fechar()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    def _coletar_metricas(self) -> List[FamiliaMetrica]:
+        """Fila do analytics e cache de resultados (a latência vem do perf_monitor)"""
+        stats = self.analytics.get_stats()
+        fila = FamiliaMetrica('inc_fila_pendentes', 'gauge', 'Itens em espera nas filas de background')
+        fila.adicionar(stats['pendentes'], {'fila': 'analytics'})
+        descartados = FamiliaMetrica('inc_fila_descartados_total', 'counter', 'Itens descartados por fila cheia')
+        descartados.adicionar(stats['descartados'], {'fila': 'analytics'})
+        familias = [fila, descartados]
+
+        if self.cache_resultados:
+            cache = self.cache_resultados.get_stats()
+            hits = FamiliaMetrica(
+                'inc_pesquisa_cache_hits_total', 'counter', 'Pesquisas servidas pela cache de resultados'
+            )
+            hits.adicionar(cache['hits_exatos'], {'tipo': 'exato'})
+            hits.adicionar(cache['hits_filtrados'], {'tipo': 'filtrado'})
+            familias.append(hits)
+        return familias
+
     def get_campos_disponiveis(self, tabela: str) -> List[str]:
         """
         Retorna lista de campos pesquisáveis para uma tabela
@@ -393,32 +1261,34 @@ class SearchEngine:
         if len(termo) > 255:
             return False, "Termo muito longo (máximo 255 caracteres)"
 
-        # Caracteres perigosos para SQL Injection
-        caracteres_proibidos = ["'", '"', ';', '--', '/*', '*/']
+        # Caracteres perigosos para SQL Injection (aspas duplas delimitam
+        # frases na pesquisa estruturada; os valores vão sempre em binds)
+        caracteres_proibidos = ["'", ';', '--', '/*', '*/']
         for char in caracteres_proibidos:
             if char in termo:
                 return False, f"Caractere não permitido: {char}"
 
         return True, "OK"
 
-    def highlight_termo(self, texto: str, termo: str) -> str:
+    def highlight_termo(self, texto: str, termo: str) -> List[Tuple[int, int]]:
         """
-        Adiciona marcação para destacar termo no texto
+        Posições dos termos da pesquisa no texto, para destaque
+
+        Todos os termos são procurados numa só passagem, sem acentos nem
+        maiúsculas; o autómato é compilado uma vez por consulta. Use
+        aplicar_destaque (search_highlight) para obter texto marcado.
 
         Args:
             texto: Texto original
-            termo: Termo a destacar
+            termo: Pesquisa (um ou vários termos)
 
         Returns:
-            Texto com marcações
+            Lista de intervalos (início, fim) no texto original
         """
         if not texto or not termo:
-            return texto
+            return []
 
-        import re
-        # Case insensitive replace mantendo o case original
-        pattern = re.compile(re.escape(termo), re.IGNORECASE)
-        return pattern.sub(lambda m: f"<<{m.group()}>>", texto)
+        return obter_destacador(termo).destacar(texto)
 
 
 # =============================================================================
@@ -426,35 +1296,139 @@ class SearchEngine:
 # =============================================================================
 
 class SearchCache:
-    """Cache simples para pesquisas recentes"""
+    """
+    Histórico de pesquisas recentes por utilizador
+
+    OrderedDict protegido por lock: adicionar e mover para o início são
+    O(1). O histórico é gravado em disco por uma thread em background,
+    alguns segundos depois da última alteração, e relido no arranque.
+    """
 
-    def __init__(self, max_size: int = 20):
-        self.cache = []
+    def __init__(
+            self,
+            max_size: int = SEARCH_CONFIG['historico_max'],
+            usuario: Optional[str] = None,
+            diretorio: str = SEARCH_CONFIG['historico_dir'],
+            intervalo: float = SEARCH_CONFIG['historico_intervalo']
+    ):
+        """
+        Args:
+            max_size: Número máximo de termos guardados
+            usuario: Dono do histórico (None = apenas em memória)
+            diretorio: Pasta dos ficheiros de histórico
+            intervalo: Segundos entre a alteração e a gravação
+        """
+        self.cache: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
         self.max_size = max_size
+        self.logger = app_logger
+        self._lock = threading.Lock()
+
+        self.ficheiro = None
+        self.intervalo = intervalo
+        self._alterado = threading.Event()
+        self._encerrado = False
+        self._thread = None
+
+        if usuario:
+            nome = re.sub(r'[^\w.-]', '_', usuario)
+            self.ficheiro = os.path.join(diretorio, f"historico_{nome}.json")
+            self._carregar()
+            self._thread = threading.Thread(
+                target=self._run,
+                name="Inc_Historico",
+                daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.fechar)
 
     def adicionar(self, termo: str, resultados_count: int) -> None:
-        """Adiciona pesquisa ao cache"""
-        # Remove duplicatas
-        self.cache = [item for item in self.cache if item['termo'] != termo]
+        """Adiciona pesquisa ao histórico (ou move-a para o início)"""
+        with self._lock:
+            self.cache[termo] = {
+                'termo': termo,
+                'count': resultados_count,
+                'timestamp': datetime.now()
+            }
+            self.cache.move_to_end(termo, last=False)
 
-        # Adiciona no início
-        self.cache.insert(0, {
-            'termo': termo,
-            'count': resultados_count,
-            'timestamp': datetime.now()
-        })
+            # Limita tamanho (remove a mais antiga)
+            if len(self.cache) > self.max_size:
+                self.cache.popitem(last=True)
 
-        # Limita tamanho
-        if len(self.cache) > self.max_size:
-            self.cache = self.cache[:self.max_size]
+        self._alterado.set()
 
     def obter_recentes(self, limite: int = 10) -> List[Dict[str, Any]]:
         """Retorna pesquisas recentes"""
-        return self.cache[:limite]
+        with self._lock:
+            return [dict(item) for item in islice(self.cache.values(), limite)]
 
     def limpar(self) -> None:
-        """Limpa cache"""
-        self.cache = []
+        """Limpa histórico"""
+        with self._lock:
+            self.cache.clear()
+        self._alterado.set()
+
+    def _carregar(self) -> None:
+        """Lê o histórico gravado (ficheiro em falta ou inválido é ignorado)"""
+        try:
+            with open(self.ficheiro, 'r', encoding='utf-8') as f:
+                itens = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Histórico de pesquisa ignorado ({self.ficheiro}): {e}")
+            return
+
+        with self._lock:
+            for item in itens[:self.max_size]:
+                try:
+                    self.cache[item['termo']] = {
+                        'termo': item['termo'],
+                        'count': item.get('count', 0),
+                        'timestamp': datetime.fromisoformat(item['timestamp'])
+                    }
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+    def _run(self):
+        """Grava o histórico algum tempo depois de cada alteração"""
+        while not self._encerrado:
+            self._alterado.wait()
+            if self._encerrado:
+                break
+            time.sleep(self.intervalo)
+            self._alterado.clear()
+            self._gravar()
+
+    def _gravar(self) -> None:
+        """Grava o histórico de forma atómica (ficheiro temporário + replace)"""
+        with self._lock:
+            itens = [
+                {'termo': item['termo'], 'count': item['count'],
+                 'timestamp': item['timestamp'].isoformat()}
+                for item in self.cache.values()
+            ]
+
+        try:
+            os.makedirs(os.path.dirname(self.ficheiro) or '.', exist_ok=True)
+            temporario = self.ficheiro + '.tmp'
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(itens, f, ensure_ascii=False)
+            os.replace(temporario, self.ficheiro)
+        except OSError as e:
+            self.logger.warning(f"Erro ao gravar histórico de pesquisa: {e}")
+
+    def fechar(self) -> None:
+        """Grava alterações pendentes e termina a thread de gravação"""
+        if self._thread is None or self._encerrado:
+            return
+
+        self._encerrado = True
+        pendente = self._alterado.is_set()
+        self._alterado.set()
+        self._thread.join(timeout=self.intervalo + 1.0)
+        if pendente:
+            self._gravar()
 
 
 # =============================================================================
@@ -465,21 +1439,12 @@ class SearchExporter:
     """Classe para exportar resultados de pesquisa"""
 
     @staticmethod
-    def para_csv(resultados: List[Dict[str, Any]], filename: str = "pesquisa.csv") -> bool:
-        """Exporta resultados para CSV"""
-        import csv
+    def para_csv(resultados: Iterable[Dict[str, Any]], filename: str = "pesquisa.csv") -> bool:
+        """Exporta resultados para CSV (esquema fixo, escrito linha a linha)"""
+        from search_export import exportar
 
         try:
-            if not resultados:
-                return False
-
-            with open(filename, 'w', newline='', encoding='utf-8-sig') as f:
-                # Usa as chaves do primeiro resultado como headers
-                writer = csv.DictWriter(f, fieldnames=resultados[0].keys())
-                writer.writeheader()
-                writer.writerows(resultados)
-
-            return True
+            return exportar(resultados, filename, 'csv') > 0
 
         except Exception as e:
             app_logger.error(f"Erro ao exportar CSV: {e}")
@@ -0,0 +1,427 @@
+"""
+EXPORTAÇÃO DE PESQUISAS EM FLUXO
+Escreve CSV, JSON Lines e XLSX linha a linha, a partir do cursor Oracle
+ou das páginas do motor de pesquisa, sem materializar a lista completa
+"""
+
+import csv
+import json
+import os
+import re
+import threading
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from config import SEARCH_CONFIG
+from logger_config import app_logger
+from thread_manager import thread_pool
+
+# Esquema fixo: (campo do resultado, cabeçalho)
+CAMPOS_EXPORTACAO: Tuple[Tuple[str, str], ...] = (
+    ('tipo', 'Tipo'),
+    ('id', 'ID'),
+    ('titulo', 'Título'),
+    ('subtitulo', 'Subtítulo'),
+    ('data', 'Data'),
+    ('relevancia', 'Relevância'),
+)
+
+# Mesmo filtro e ordem de SP_PESQUISA_GLOBAL, sem FETCH FIRST
+EXPORTAR_SQL = """
+    SELECT
+        TIPO_REGISTRO,
+        ID_REGISTRO,
+        TITULO_PRINCIPAL,
+        SUBTITULO,
+        DATA_REGISTRO,
+        CASE
+            WHEN UPPER(TITULO_PRINCIPAL) LIKE :padrao THEN 3
+            WHEN UPPER(SUBTITULO) LIKE :padrao THEN 2
+            ELSE 1
+        END AS RELEVANCIA
+    FROM V_PESQUISA_GLOBAL
+    WHERE
+        UPPER(TEXTO_PESQUISAVEL) LIKE :padrao
+        AND (:tipo IS NULL OR TIPO_REGISTRO = :tipo)
+        {filtro_datas}
+    ORDER BY
+        RELEVANCIA DESC,
+        TIPO_REGISTRO,
+        TITULO_PRINCIPAL,
+        ID_REGISTRO
+"""
+
+
+# =============================================================================
+# FONTES
+# =============================================================================
+
+# Intervalo DATE como em SP_PESQUISA_AVANCADA (fim inclusive)
+FILTRO_DATAS_SQL = """
+        AND DATA_REGISTRO_DT >= :inicio
+        AND DATA_REGISTRO_DT < :fim + 1
+"""
+
+
+def iterar_oracle(
+        db,
+        termo: str,
+        tipo_filtro: Optional[str] = None,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None,
+        arraysize: int = SEARCH_CONFIG['exportacao_arraysize']
+) -> Iterator[Dict[str, Any]]:
+    """Todos os resultados da pesquisa, lidos do cursor em blocos"""
+    params = {'padrao': f"%{termo.strip().upper()}%", 'tipo': tipo_filtro}
+    filtro_datas = ''
+    if data_inicio or data_fim:
+        filtro_datas = FILTRO_DATAS_SQL.strip()
+        params['inicio'] = data_inicio or date(1, 1, 1)
+        params['fim'] = data_fim or date(9999, 12, 30)
+
+    sql = EXPORTAR_SQL.format(filtro_datas=filtro_datas)
+    for row in db.iterar_query(sql, params, arraysize=arraysize):
+        yield dict(zip((campo for campo, _ in CAMPOS_EXPORTACAO), row))
+
+
+def iterar_paginas(
+        carregar_pagina: Callable[[int, int], tuple],
+        carregados: Iterable[Dict[str, Any]] = (),
+        tamanho_pagina: int = SEARCH_CONFIG['exportacao_pagina']
+) -> Iterator[Dict[str, Any]]:
+    """
+    Resultados pela ordem apresentada na vista, página a página
+
+    Começa pelos resultados já carregados e pede os seguintes ao motor de
+    pesquisa: a janela ordenada pelo BM25 e, depois dela, a ordem do
+    Oracle. Uma pesquisa que caiu na pesquisa aproximada não tem páginas
+    seguintes e exporta só o que foi mostrado.
+
+    Args:
+        carregar_pagina: Função (offset, limite) -> (sucesso, resultados),
+            a mesma com que a vista pede páginas
+        carregados: Resultados já obtidos (do início da lista)
+        tamanho_pagina: Linhas pedidas de cada vez
+    """
+    offset = 0
+    for resultado in carregados:
+        offset += 1
+        yield resultado
+
+    while True:
+        success, pagina = carregar_pagina(offset, tamanho_pagina) or (False, [])
+        if not success:
+            raise RuntimeError(f"Falha ao obter resultados (offset {offset})")
+
+        yield from pagina
+        if len(pagina) < tamanho_pagina:
+            return
+        offset += tamanho_pagina
+
+
+# =============================================================================
+# ESCRITORES
+# =============================================================================
+
+class EscritorCSV:
+    """CSV com cabeçalho fixo (UTF-8 com BOM, para o Excel)"""
+
+    def __init__(self, filename: str):
+        self.file = open(filename, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([cabecalho for _, cabecalho in CAMPOS_EXPORTACAO])
+
+    def escrever(self, valores: Tuple[Any, ...]) -> None:
+        self.writer.writerow(['' if v is None else v for v in valores])
+
+    def fechar(self) -> None:
+        self.file.close()
+
+
+class EscritorJSONL:
+    """Um objeto JSON por linha, com os campos do esquema fixo"""
+
+    def __init__(self, filename: str):
+        self.file = open(filename, 'w', encoding='utf-8')
+        self.campos = [campo for campo, _ in CAMPOS_EXPORTACAO]
+
+    def escrever(self, valores: Tuple[Any, ...]) -> None:
+        self.file.write(json.dumps(
+            dict(zip(self.campos, valores)),
+            ensure_ascii=False,
+            default=_valor_json
+        ))
+        self.file.write('\n')
+
+    def fechar(self) -> None:
+        self.file.close()
+
+
+class EscritorXLSX:
+    """
+    XLSX escrito em fluxo (SpreadsheetML dentro de um ZIP)
+
+    Cada folha é comprimida à medida que as linhas chegam; acima do
+    limite de linhas do Excel abre-se uma nova folha. Não depende de
+    bibliotecas externas.
+    """
+
+    MAX_LINHAS_FOLHA = 1048576
+    _INVALIDOS_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+    def __init__(self, filename: str):
+        self.zip = zipfile.ZipFile(filename, 'w', compression=zipfile.ZIP_DEFLATED)
+        self.colunas = [chr(ord('A') + i) for i in range(len(CAMPOS_EXPORTACAO))]
+        self.folhas = 0
+        self.folha = None
+        self.linha = 0
+        self._buffer = []
+        self._nova_folha()
+
+    def _nova_folha(self) -> None:
+        """Fecha a folha atual e começa outra, com cabeçalho"""
+        self._fechar_folha()
+        self.folhas += 1
+        self.folha = self.zip.open(f'xl/worksheets/sheet{self.folhas}.xml', 'w', force_zip64=True)
+        self.folha.write(
+            b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            b'<sheetData>'
+        )
+        self.linha = 0
+        self._escrever_linha([cabecalho for _, cabecalho in CAMPOS_EXPORTACAO])
+
+    def _descarregar(self) -> None:
+        """Passa as linhas acumuladas ao compressor"""
+        if self._buffer:
+            self.folha.write(''.join(self._buffer).encode('utf-8'))
+            self._buffer = []
+
+    def _fechar_folha(self) -> None:
+        if self.folha is not None:
+            self._descarregar()
+            self.folha.write(b'</sheetData></worksheet>')
+            self.folha.close()
+            self.folha = None
+
+    def _celula(self, ref: str, valor: Any) -> str:
+        if valor is None:
+            return ''
+        if isinstance(valor, (int, float, Decimal)) and not isinstance(valor, bool):
+            return f'<c r="{ref}"><v>{valor}</v></c>'
+        if isinstance(valor, datetime):
+            valor = valor.strftime('%d/%m/%Y %H:%M')
+        elif isinstance(valor, date):
+            valor = valor.strftime('%d/%m/%Y')
+        texto = escape(self._INVALIDOS_RE.sub('', str(valor)))
+        return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+    def _escrever_linha(self, valores) -> None:
+        self.linha += 1
+        celulas = ''.join(
+            self._celula(f'{coluna}{self.linha}', valor)
+            for coluna, valor in zip(self.colunas, valores)
+        )
+        self._buffer.append(f'<row r="{self.linha}">{celulas}</row>')
+        if len(self._buffer) >= 500:
+            self._descarregar()
+
+    def escrever(self, valores: Tuple[Any, ...]) -> None:
+        if self.linha >= self.MAX_LINHAS_FOLHA:
+            self._nova_folha()
+        self._escrever_linha(valores)
+
+    def fechar(self) -> None:
+        self._fechar_folha()
+
+        folhas = range(1, self.folhas + 1)
+        self.zip.writestr('[Content_Types].xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + ''.join(
+                f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                for i in folhas
+            )
+            + '</Types>'
+        ))
+        self.zip.writestr('_rels/.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ))
+        self.zip.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + ''.join(
+                f'<sheet name="Pesquisa{"" if i == 1 else f" {i}"}" sheetId="{i}" r:id="rId{i}"/>'
+                for i in folhas
+            )
+            + '</sheets></workbook>'
+        ))
+        self.zip.writestr('xl/_rels/workbook.xml.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + ''.join(
+                f'<Relationship Id="rId{i}" '
+                'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                f'Target="worksheets/sheet{i}.xml"/>'
+                for i in folhas
+            )
+            + '</Relationships>'
+        ))
+        self.zip.close()
+
+
+def _valor_json(valor: Any) -> Any:
+    """Serializa datas e decimais do Oracle"""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return str(valor)
+
+
+ESCRITORES = {
+    'csv': EscritorCSV,
+    'jsonl': EscritorJSONL,
+    'xlsx': EscritorXLSX,
+}
+
+
+# =============================================================================
+# EXPORTAÇÃO
+# =============================================================================
+
+class ExportacaoCancelada(Exception):
+    """A exportação foi cancelada pelo utilizador"""
+
+
+def exportar(
+        resultados: Iterable[Dict[str, Any]],
+        filename: str,
+        formato: Optional[str] = None,
+        progresso: Optional[Callable[[int], None]] = None,
+        cancelar: Optional[threading.Event] = None,
+        intervalo_progresso: int = SEARCH_CONFIG['exportacao_progresso']
+) -> int:
+    """
+    Escreve os resultados no ficheiro, um a um
+
+    O ficheiro é escrito com nome temporário e só substitui o destino no
+    fim, para uma exportação interrompida não deixar ficheiros truncados.
+
+    Args:
+        resultados: Qualquer iterável de resultados (lista, iterar_oracle...)
+        filename: Ficheiro de destino
+        formato: 'csv', 'jsonl' ou 'xlsx' (por omissão, a extensão)
+        progresso: Chamado com o número de linhas escritas
+        cancelar: Evento que interrompe a exportação
+        intervalo_progresso: Linhas entre chamadas de progresso
+
+    Returns:
+        Número de linhas exportadas
+    """
+    formato = (formato or os.path.splitext(filename)[1].lstrip('.')).lower()
+    if formato not in ESCRITORES:
+        raise ValueError(f"Formato de exportação não suportado: {formato}")
+
+    temporario = f"{filename}.tmp"
+    escritor = ESCRITORES[formato](temporario)
+    campos = [campo for campo, _ in CAMPOS_EXPORTACAO]
+    total = 0
+
+    try:
+        for resultado in resultados:
+            if cancelar is not None and cancelar.is_set():
+                raise ExportacaoCancelada()
+            escritor.escrever(tuple(resultado.get(campo) for campo in campos))
+            total += 1
+            if progresso and total % intervalo_progresso == 0:
+                progresso(total)
+    except BaseException:
+        escritor.fechar()
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+        raise
+
+    escritor.fechar()
+    os.replace(temporario, filename)
+
+    if progresso:
+        progresso(total)
+
+    app_logger.info(f"Exportação {formato.upper()}: {total} linhas em {filename}")
+    return total
+
+
+class ExportacaoPesquisa:
+    """
+    Exportação no pool de threads, com prioridade bulk
+
+    Os callbacks correm na thread de trabalho; na interface devem ser
+    encaminhados com after().
+    """
+
+    def __init__(
+            self,
+            resultados: Iterable[Dict[str, Any]],
+            filename: str,
+            formato: Optional[str] = None,
+            progresso: Optional[Callable[[int], None]] = None,
+            concluido: Optional[Callable[[bool, Any], None]] = None
+    ):
+        self.resultados = resultados
+        self.filename = filename
+        self.formato = formato
+        self.progresso = progresso
+        self.concluido = concluido
+        self.cancelado = threading.Event()
+        self.task_id: Optional[str] = None
+
+    def iniciar(self) -> 'ExportacaoPesquisa':
+        """Arranca a exportação em background"""
+        self.task_id = thread_pool.submit_task(self._executar, prioridade='bulk', guardar_resultado=False)
+        return self
+
+    def cancelar(self) -> None:
+        """Pede a interrupção (o ficheiro parcial é apagado)"""
+        self.cancelado.set()
+
+    def _executar(self) -> int:
+        try:
+            total = exportar(
+                self.resultados,
+                self.filename,
+                self.formato,
+                progresso=self.progresso,
+                cancelar=self.cancelado
+            )
+        except ExportacaoCancelada:
+            app_logger.info(f"Exportação cancelada: {self.filename}")
+            if self.concluido:
+                self.concluido(False, None)
+            return 0
+        except Exception as e:
+            # Tratado aqui: o pool não volta a registar o erro
+            app_logger.error(f"Erro ao exportar pesquisa: {e}")
+            if self.concluido:
+                self.concluido(False, e)
+            return 0
+
+        if self.concluido:
+            self.concluido(True, total)
+        return total
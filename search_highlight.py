@@ -0,0 +1,120 @@
+"""
+DESTAQUE DE TERMOS NOS RESULTADOS
+Autómato Aho–Corasick com todos os termos da consulta, compilado uma vez
+por consulta; devolve intervalos (início, fim) no texto original,
+ignorando acentos e maiúsculas
+"""
+
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from search_ranking import normalizar_texto, tokenizar
+
+Intervalo = Tuple[int, int]
+
+
+class Destacador:
+    """
+    Procura todos os termos numa única passagem pelo texto
+
+    O texto é normalizado como no índice (sem acentos, maiúsculas) e os
+    intervalos encontrados são convertidos de volta para posições no
+    texto original. Intervalos sobrepostos ou contíguos são unidos.
+    """
+
+    def __init__(self, termos: Tuple[str, ...]):
+        self.termos = termos
+
+        # Estado 0 é a raiz; cada estado tem transições, ligação de falha
+        # e o comprimento do maior termo que termina nele
+        self.transicoes: List[Dict[str, int]] = [{}]
+        self.falha: List[int] = [0]
+        self.saida: List[int] = [0]
+
+        for termo in termos:
+            estado = 0
+            for c in termo:
+                proximo = self.transicoes[estado].get(c)
+                if proximo is None:
+                    proximo = len(self.transicoes)
+                    self.transicoes[estado][c] = proximo
+                    self.transicoes.append({})
+                    self.falha.append(0)
+                    self.saida.append(0)
+                estado = proximo
+            self.saida[estado] = max(self.saida[estado], len(termo))
+
+        # Ligações de falha em largura; a saída herda a do estado de falha
+        fila = deque(self.transicoes[0].values())
+        while fila:
+            estado = fila.popleft()
+            for c, proximo in self.transicoes[estado].items():
+                fila.append(proximo)
+                falha = self.falha[estado]
+                while falha and c not in self.transicoes[falha]:
+                    falha = self.falha[falha]
+                self.falha[proximo] = self.transicoes[falha].get(c, 0)
+                self.saida[proximo] = max(self.saida[proximo], self.saida[self.falha[proximo]])
+
+    def destacar(self, texto: str) -> List[Intervalo]:
+        """
+        Intervalos do texto original onde aparece algum termo
+
+        Returns:
+            Lista ordenada de (início, fim), com fim exclusivo
+        """
+        if not texto or not self.termos:
+            return []
+
+        # Texto normalizado e, para cada carácter, a posição original
+        normalizado: List[str] = []
+        origem: List[int] = []
+        for i, c in enumerate(texto):
+            for n in (c if c.isascii() else normalizar_texto(c)).upper():
+                normalizado.append(n)
+                origem.append(i)
+
+        intervalos: List[Intervalo] = []
+        transicoes, falha, saida = self.transicoes, self.falha, self.saida
+        estado = 0
+
+        for pos, c in enumerate(normalizado):
+            while estado and c not in transicoes[estado]:
+                estado = falha[estado]
+            estado = transicoes[estado].get(c, 0)
+
+            comprimento = saida[estado]
+            if comprimento:
+                inicio = origem[pos - comprimento + 1]
+                fim = origem[pos] + 1
+                while intervalos and inicio <= intervalos[-1][1]:
+                    anterior = intervalos.pop()
+                    inicio = min(inicio, anterior[0])
+                    fim = max(fim, anterior[1])
+                intervalos.append((inicio, fim))
+
+        return intervalos
+
+
+@lru_cache(maxsize=256)
+def _compilar(termos: Tuple[str, ...]) -> Destacador:
+    return Destacador(termos)
+
+
+def obter_destacador(consulta: str) -> Destacador:
+    """Destacador da consulta (reutilizado entre chamadas com os mesmos termos)"""
+    termos = tuple(sorted(set(tokenizar(consulta))))
+    return _compilar(termos)
+
+
+def aplicar_destaque(texto: str, intervalos: List[Intervalo], inicio: str = "<<", fim: str = ">>") -> str:
+    """Insere marcadores nos intervalos (para saída em texto)"""
+    partes = []
+    anterior = 0
+    for a, b in intervalos:
+        partes.append(texto[anterior:a])
+        partes.append(f"{inicio}{texto[a:b]}{fim}")
+        anterior = b
+    partes.append(texto[anterior:])
+    return ''.join(partes)
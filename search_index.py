@@ -0,0 +1,474 @@
+"""
+ÍNDICE LOCAL DE PESQUISA
+Índice invertido em memória sobre V_PESQUISA_GLOBAL, insensível a acentos,
+com pesquisa aproximada (erros de digitação) por poda de n-gramas
+"""
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Optional, Tuple, Set
+
+from logger_config import app_logger
+from search_ranking import tokenizar, normalizar_texto
+
+Chave = Tuple[str, str]
+
+
+def distancia_limitada(a: str, b: str, limite: int) -> Optional[int]:
+    """
+    Distância de Levenshtein com corte antecipado
+
+    Só calcula a faixa diagonal de largura 2*limite+1 e abandona assim
+    que nenhuma célula da linha pode ficar dentro do limite.
+
+    Returns:
+        Distância (<= limite) ou None se for maior que o limite
+    """
+    if abs(len(a) - len(b)) > limite:
+        return None
+    if a == b:
+        return 0
+
+    infinito = limite + 1
+    anterior = list(range(len(b) + 1))
+
+    for i in range(1, len(a) + 1):
+        inicio = max(1, i - limite)
+        fim = min(len(b), i + limite)
+        atual = [infinito] * (len(b) + 1)
+        atual[0] = i if i <= limite else infinito
+        minimo = atual[0]
+
+        for j in range(inicio, fim + 1):
+            custo = 0 if a[i - 1] == b[j - 1] else 1
+            valor = min(
+                anterior[j] + 1,
+                atual[j - 1] + 1,
+                anterior[j - 1] + custo
+            )
+            atual[j] = valor
+            if valor < minimo:
+                minimo = valor
+
+        if minimo > limite:
+            return None
+        anterior = atual
+
+    return anterior[len(b)] if anterior[len(b)] <= limite else None
+
+
+def distancia_automatica(termo: str) -> int:
+    """Erros tolerados conforme o comprimento do termo"""
+    if len(termo) <= 3:
+        return 0
+    if len(termo) <= 7:
+        return 1
+    return 2
+
+
+def normalizar_chave(chave: Any) -> str:
+    """Chave como em ID_REGISTRO (TO_CHAR da chave primária)"""
+    if isinstance(chave, float) and chave.is_integer():
+        chave = int(chave)
+    return str(chave).strip()
+
+
+class SuggestionTrie:
+    """
+    Trie de títulos (sem acentos, maiúsculas) para autocompletar
+
+    Percorre a subárvore do prefixo em largura: os títulos mais curtos
+    aparecem primeiro, como no ORDER BY LENGTH(TITULO_PRINCIPAL) de
+    SP_SUGESTOES_PESQUISA, e a procura pára assim que há sugestões
+    suficientes.
+    """
+
+    def __init__(self):
+        # Nó: [filhos {carácter: nó}, entradas {(titulo, tipo): contagem}]
+        self.raiz = [{}, {}]
+        self.total = 0
+
+    def adicionar(self, titulo: str, tipo: str) -> None:
+        """Acrescenta um título (títulos repetidos são contados)"""
+        no = self.raiz
+        for c in normalizar_texto(titulo):
+            no = no[0].setdefault(c, [{}, {}])
+        entrada = (titulo, tipo)
+        no[1][entrada] = no[1].get(entrada, 0) + 1
+        self.total += 1
+
+    def remover(self, titulo: str, tipo: str) -> None:
+        """Retira uma ocorrência do título e poda os nós vazios"""
+        caminho = [(None, self.raiz)]
+        no = self.raiz
+        for c in normalizar_texto(titulo):
+            no = no[0].get(c)
+            if no is None:
+                return
+            caminho.append((c, no))
+
+        entrada = (titulo, tipo)
+        if entrada not in no[1]:
+            return
+        no[1][entrada] -= 1
+        if not no[1][entrada]:
+            del no[1][entrada]
+        self.total -= 1
+
+        for i in range(len(caminho) - 1, 0, -1):
+            c, atual = caminho[i]
+            if atual[0] or atual[1]:
+                break
+            del caminho[i - 1][1][0][c]
+
+    def sugerir(self, prefixo: str, limite: int = 8) -> List[Tuple[str, str]]:
+        """Títulos (titulo, tipo) que começam pelo prefixo, mais curtos primeiro"""
+        no = self.raiz
+        for c in normalizar_texto(prefixo):
+            no = no[0].get(c)
+            if no is None:
+                return []
+
+        sugestoes: List[Tuple[str, str]] = []
+        nivel = [no]
+        while nivel and len(sugestoes) < limite:
+            entradas = sorted(entrada for atual in nivel for entrada in atual[1])
+            sugestoes.extend(entradas[:limite - len(sugestoes)])
+            nivel = [filho for atual in nivel for filho in atual[0].values()]
+
+        return sugestoes
+
+
+class LocalSearchIndex:
+    """Índice invertido com dicionário de termos indexado por n-gramas"""
+
+    N = 3
+    CAMPOS = ('titulo', 'subtitulo', 'texto')
+    PESO_TITULO = 3.0
+
+    def __init__(self):
+        self.logger = app_logger
+        self._lock = threading.RLock()
+
+        self.documentos: Dict[Chave, Dict[str, Any]] = {}
+        self.termos_doc: Dict[Chave, Set[str]] = {}
+        self.termos_titulo: Dict[Chave, Set[str]] = {}
+        self.postings: Dict[str, Set[Chave]] = defaultdict(set)
+        # n-grama -> {termo: ocorrências do n-grama no termo}
+        self.ngramas: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._termos_ordenados: Optional[List[str]] = None
+        self.sugestoes = SuggestionTrie()
+
+        self.carregado = False
+
+    # ------------------------------------------------------------------
+    # Construção
+    # ------------------------------------------------------------------
+
+    def carregar(self, db) -> bool:
+        """Carrega todos os registos de V_PESQUISA_GLOBAL"""
+        inicio = time.perf_counter()
+        result = db.execute_query(
+            """
+            SELECT TIPO_REGISTRO, ID_REGISTRO, TITULO_PRINCIPAL,
+                   SUBTITULO, TEXTO_PESQUISAVEL, DATA_REGISTRO
+            FROM V_PESQUISA_GLOBAL
+            """
+        )
+        if not result:
+            return False
+
+        with self._lock:
+            self.limpar()
+            for row in result[1]:
+                self.adicionar_documento(self._linha_para_documento(row))
+            self.carregado = True
+
+        self.logger.info(
+            f"Índice local carregado: {len(self.documentos)} registos, "
+            f"{len(self.postings)} termos em {time.perf_counter() - inicio:.2f}s"
+        )
+        return True
+
+    @staticmethod
+    def _linha_para_documento(row: tuple) -> Dict[str, Any]:
+        """Converte uma linha de V_PESQUISA_GLOBAL em documento"""
+        return {
+            'tipo': row[0],
+            'id': row[1],
+            'titulo': row[2],
+            'subtitulo': row[3],
+            'texto': row[4],
+            'data': row[5]
+        }
+
+    def atualizar_registo(self, db, tipo: str, chave: Any) -> bool:
+        """
+        Aplica a alteração de um registo (delta de uma linha)
+
+        Relê a linha pela chave primária (CHAVE_REGISTRO); se já não
+        existir, o registo é removido do índice.
+        """
+        result = db.execute_query(
+            """
+            SELECT TIPO_REGISTRO, ID_REGISTRO, TITULO_PRINCIPAL,
+                   SUBTITULO, TEXTO_PESQUISAVEL, DATA_REGISTRO
+            FROM V_PESQUISA_GLOBAL
+            WHERE TIPO_REGISTRO = :tipo AND CHAVE_REGISTRO = :chave
+            """,
+            {'tipo': tipo, 'chave': chave}
+        )
+        if not result:
+            return False
+
+        with self._lock:
+            if result[1]:
+                self.adicionar_documento(self._linha_para_documento(result[1][0]))
+            else:
+                self.remover_documento(tipo, normalizar_chave(chave))
+        return True
+
+    def recarregar_tipo(self, db, tipo: str) -> bool:
+        """Relê todos os registos de um tipo (alteração sem chave conhecida)"""
+        result = db.execute_query(
+            """
+            SELECT TIPO_REGISTRO, ID_REGISTRO, TITULO_PRINCIPAL,
+                   SUBTITULO, TEXTO_PESQUISAVEL, DATA_REGISTRO
+            FROM V_PESQUISA_GLOBAL
+            WHERE TIPO_REGISTRO = :tipo
+            """,
+            {'tipo': tipo}
+        )
+        if not result:
+            return False
+
+        with self._lock:
+            for chave in [c for c in self.documentos if c[0] == tipo]:
+                self.remover_documento(*chave)
+            for row in result[1]:
+                self.adicionar_documento(self._linha_para_documento(row))
+
+        self.logger.debug(f"Índice local: {len(result[1])} registos de {tipo} recarregados")
+        return True
+
+    def limpar(self) -> None:
+        """Esvazia o índice"""
+        with self._lock:
+            self.documentos.clear()
+            self.termos_doc.clear()
+            self.termos_titulo.clear()
+            self.postings.clear()
+            self.ngramas.clear()
+            self._termos_ordenados = None
+            self.sugestoes = SuggestionTrie()
+            self.carregado = False
+
+    @classmethod
+    def _ngramas(cls, termo: str) -> Dict[str, int]:
+        """N-gramas do termo (com marcadores de início e fim) e as suas ocorrências"""
+        marcado = '$' * (cls.N - 1) + termo + '$' * (cls.N - 1)
+        return Counter(marcado[i:i + cls.N] for i in range(len(marcado) - cls.N + 1))
+
+    def adicionar_documento(self, documento: Dict[str, Any]) -> None:
+        """Indexa (ou reindexa) um registo"""
+        chave = (str(documento['tipo']), str(documento['id']))
+
+        with self._lock:
+            if chave in self.documentos:
+                self.remover_documento(*chave)
+
+            termos = set()
+            for campo in self.CAMPOS:
+                termos.update(tokenizar(documento.get(campo)))
+
+            self.documentos[chave] = documento
+            self.termos_doc[chave] = termos
+            self.termos_titulo[chave] = set(tokenizar(documento.get('titulo')))
+            if documento.get('titulo'):
+                self.sugestoes.adicionar(documento['titulo'], chave[0])
+
+            for termo in termos:
+                if termo not in self.postings:
+                    for ngrama, vezes in self._ngramas(termo).items():
+                        self.ngramas[ngrama][termo] = vezes
+                    self._termos_ordenados = None
+                self.postings[termo].add(chave)
+
+    def remover_documento(self, tipo: str, id_registro: str) -> None:
+        """Remove um registo do índice"""
+        chave = (str(tipo), str(id_registro))
+
+        with self._lock:
+            if chave not in self.documentos:
+                return
+
+            for termo in self.termos_doc.pop(chave, ()):
+                docs = self.postings.get(termo)
+                if docs is None:
+                    continue
+                docs.discard(chave)
+                if not docs:
+                    del self.postings[termo]
+                    for ngrama in self._ngramas(termo):
+                        termos_ngrama = self.ngramas.get(ngrama)
+                        if termos_ngrama is not None:
+                            termos_ngrama.pop(termo, None)
+                            if not termos_ngrama:
+                                del self.ngramas[ngrama]
+                    self._termos_ordenados = None
+
+            self.termos_titulo.pop(chave, None)
+            documento = self.documentos.pop(chave)
+            if documento.get('titulo'):
+                self.sugestoes.remover(documento['titulo'], chave[0])
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def sugerir(self, prefixo: str, limite: int = 8) -> List[Tuple[str, str]]:
+        """Sugestões de autocompletar (titulo, tipo) pelo prefixo do título"""
+        with self._lock:
+            return self.sugestoes.sugerir(prefixo, limite)
+
+    def _termos_com_prefixo(self, prefixo: str, maximo: int = 50) -> List[str]:
+        """Termos do dicionário que começam pelo prefixo (pesquisa binária)"""
+        if self._termos_ordenados is None:
+            self._termos_ordenados = sorted(self.postings)
+
+        termos = self._termos_ordenados
+        encontrados = []
+        i = bisect_left(termos, prefixo)
+        while i < len(termos) and termos[i].startswith(prefixo) and len(encontrados) < maximo:
+            encontrados.append(termos[i])
+            i += 1
+        return encontrados
+
+    def expandir_termo(
+            self,
+            termo: str,
+            max_distancia: int,
+            prazo: Optional[float] = None
+    ) -> Dict[str, float]:
+        """
+        Termos do dicionário próximos do termo da consulta
+
+        Os candidatos são podados pelo número de n-gramas em comum
+        (lema dos q-gramas) antes de calcular a distância de edição.
+
+        Returns:
+            Dicionário termo -> distância (prefixos contam 0.5)
+        """
+        with self._lock:
+            correspondencias: Dict[str, float] = {}
+
+            if termo in self.postings:
+                correspondencias[termo] = 0.0
+
+            if len(termo) >= 3:
+                for candidato in self._termos_com_prefixo(termo):
+                    correspondencias.setdefault(candidato, 0.5)
+
+            if max_distancia <= 0:
+                return correspondencias
+
+            # Lema dos q-gramas: strings a distância <= k partilham pelo
+            # menos |s| + N - 1 - k*N n-gramas, contados com repetição
+            # (por n-grama, o mínimo das ocorrências nos dois termos)
+            ngramas_termo = self._ngramas(termo)
+            minimo_comum = len(termo) + self.N - 1 - max_distancia * self.N
+
+            contagem: Dict[str, int] = defaultdict(int)
+            for ngrama, vezes in ngramas_termo.items():
+                for candidato, vezes_candidato in self.ngramas.get(ngrama, {}).items():
+                    contagem[candidato] += min(vezes, vezes_candidato)
+
+            for candidato, comuns in contagem.items():
+                if candidato in correspondencias:
+                    continue
+                if comuns < minimo_comum or abs(len(candidato) - len(termo)) > max_distancia:
+                    continue
+                if prazo is not None and time.perf_counter() > prazo:
+                    break
+
+                distancia = distancia_limitada(termo, candidato, max_distancia)
+                if distancia is not None:
+                    correspondencias[candidato] = float(distancia)
+
+            return correspondencias
+
+    def pesquisar(
+            self,
+            consulta: str,
+            tipo: Optional[str] = None,
+            limite: int = 50,
+            max_distancia: Optional[int] = None,
+            orcamento_ms: Optional[float] = None
+    ) -> Tuple[List[Tuple[Dict[str, Any], float]], bool]:
+        """
+        Pesquisa aproximada: todos os termos da consulta têm de corresponder
+
+        Args:
+            consulta: Texto da pesquisa (acentos e maiúsculas ignorados)
+            tipo: Filtro por TIPO_REGISTRO
+            limite: Número máximo de resultados
+            max_distancia: Erros por termo (None = automático pelo comprimento)
+            orcamento_ms: Tempo máximo para expandir termos
+
+        Returns:
+            Tuple (lista de (documento, score), completo)
+        """
+        termos = list(dict.fromkeys(tokenizar(consulta)))
+        if not termos:
+            return [], True
+
+        prazo = None
+        if orcamento_ms is not None:
+            prazo = time.perf_counter() + orcamento_ms / 1000.0
+
+        with self._lock:
+            total_docs = max(1, len(self.documentos))
+            completo = True
+            pontuacao: Optional[Dict[Chave, float]] = None
+
+            for termo in termos:
+                distancia = distancia_automatica(termo) if max_distancia is None else max_distancia
+                expansoes = self.expandir_termo(termo, distancia, prazo)
+                if prazo is not None and time.perf_counter() > prazo:
+                    completo = False
+
+                melhores: Dict[Chave, float] = {}
+                for termo_indice, dist in expansoes.items():
+                    docs = self.postings.get(termo_indice, ())
+                    idf = math.log(1.0 + total_docs / (len(docs) + 0.5))
+                    peso = idf / (1.0 + dist)
+
+                    for chave in docs:
+                        if tipo and chave[0] != tipo:
+                            continue
+                        if pontuacao is not None and chave not in pontuacao:
+                            continue
+                        valor = peso * (self.PESO_TITULO if termo_indice in self.termos_titulo[chave] else 1.0)
+                        if valor > melhores.get(chave, 0.0):
+                            melhores[chave] = valor
+
+                if pontuacao is None:
+                    pontuacao = melhores
+                else:
+                    pontuacao = {
+                        chave: pontuacao[chave] + valor
+                        for chave, valor in melhores.items()
+                    }
+
+                if not pontuacao:
+                    break
+
+            ordenados = sorted(
+                (pontuacao or {}).items(),
+                key=lambda item: (-item[1], str(self.documentos[item[0]].get('titulo') or ''))
+            )[:limite]
+
+            return [(self.documentos[chave], score) for chave, score in ordenados], completo
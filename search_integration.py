@@ -1,13 +1,15 @@
 # search_integration.py
 import customtkinter as ctk
 from tkinter import messagebox
-from typing import Optional, List, Dict, Any
-import threading
+from typing import Optional, List, Dict, Any, Callable
+from datetime import date
 
-from config import COLORS
+from config import COLORS, SEARCH_CONFIG
 from logger_config import app_logger, safe_operation
 from search_engine import SearchEngine
 from search_widget import ModernSearchBar, SearchResultsView
+from thread_manager import thread_pool
+from tracing import acao
 
 
 def integrar_pesquisa(main_app_instance):
@@ -58,7 +60,9 @@ def adicionar_barra_pesquisa_dashboard(app_instance):
         search_bar = ModernSearchBar(
             dashboard_container,
             app_instance.search_engine,
-            on_search=lambda termo, tipo=None: handle_search(app_instance, termo, tipo),
+            on_search=lambda termo, tipo=None, data_inicio=None, data_fim=None: handle_search(
+                app_instance, termo, tipo, data_inicio=data_inicio, data_fim=data_fim
+            ),
             placeholder="🔍 Pesquisar anunciantes, campanhas, peças, espaços..."
         )
 
@@ -71,9 +75,20 @@ def adicionar_barra_pesquisa_dashboard(app_instance):
         app_logger.error(f"❌ Erro ao adicionar barra de pesquisa: {e}")
 
 
-def handle_search(app_instance, termo: str, tipo: Optional[str] = None):
+@acao('pesquisa')
+def handle_search(
+    app_instance,
+    termo: str,
+    tipo: Optional[str] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None
+):
     """
     Manipula evento de pesquisa
+
+    Com tipo (clique numa faceta), as contagens são refeitas para esse
+    tipo; os candidatos vêm da cache de pesquisa quando possível.
+    Com datas, usa a pesquisa avançada (intervalo filtrado no Oracle).
     """
     # Valida termo
     if not termo or len(termo.strip()) < 2:
@@ -83,12 +98,11 @@ def handle_search(app_instance, termo: str, tipo: Optional[str] = None):
     # Mostra loading
     show_loading(app_instance, termo)
 
-    # Executa pesquisa em thread
-    search_thread = threading.Thread(
-        target=lambda: perform_search(app_instance, termo, tipo),
-        daemon=True
+    # Executa pesquisa no pool (o contexto do trace segue com a tarefa)
+    thread_pool.submit_task(
+        perform_search, app_instance, termo, tipo, data_inicio, data_fim,
+        prioridade='interativa', guardar_resultado=False
     )
-    search_thread.start()
 
 
 def show_loading(app_instance, termo: str):
@@ -134,7 +148,13 @@ def show_loading(app_instance, termo: str):
     ).pack(pady=5)
 
 
-def perform_search(app_instance, termo: str, tipo: Optional[str] = None):
+def perform_search(
+    app_instance,
+    termo: str,
+    tipo: Optional[str] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None
+):
     """
     Executa pesquisa e exibe resultados
     """
@@ -146,16 +166,60 @@ def perform_search(app_instance, termo: str, tipo: Optional[str] = None):
             ))
             return
 
-        # Executa pesquisa
-        success, resultados = app_instance.search_engine.pesquisa_global(
-            termo,
-            tipo_filtro=tipo,
-            limite=100
-        )
+        search_engine = app_instance.search_engine
+        pagina = SEARCH_CONFIG['resultados_pagina']
+        erro_consulta = None
+
+        # Páginas seguintes pedidas pela vista de resultados quando necessárias
+        def carregar_pagina(offset: int, limite: int):
+            if data_inicio or data_fim:
+                return search_engine.pesquisa_avancada(
+                    termo,
+                    tipo=tipo,
+                    data_inicio=data_inicio,
+                    data_fim=data_fim,
+                    limite=limite,
+                    offset=offset
+                )
+            return search_engine.pesquisa_global(
+                termo,
+                tipo_filtro=tipo,
+                limite=limite,
+                offset=offset
+            )
+
+        if data_inicio or data_fim:
+            # Intervalo de datas: pesquisa avançada (filtro DATE no Oracle)
+            success, resultados = carregar_pagina(0, pagina) or (False, [])
+            facetas = None
+        elif search_engine.e_consulta_estruturada(termo):
+            # Sintaxe estruturada (tipo:campanha orcamento>100000 ...);
+            # sem offset, por isso a vista pagina a lista completa
+            success, resultados = search_engine.pesquisa_estruturada(
+                termo,
+                limite=100
+            ) or (False, [])
+            if not success and isinstance(resultados, str):
+                # Erro de sintaxe da consulta, não da base de dados
+                erro_consulta, resultados = resultados, []
+            facetas = None
+            carregar_pagina = None
+        else:
+            # Primeira página e contagens por faceta numa única ida ao Oracle.
+            # Num clique de faceta as contagens de estado/período são refeitas
+            # para o tipo escolhido (a faceta 'tipo' continua a contar todos)
+            success, pesquisa = search_engine.pesquisa_facetada(
+                termo,
+                tipo_filtro=tipo,
+                limite=pagina
+            ) or (False, {})
+            resultados = pesquisa.get('resultados', [])
+            facetas = pesquisa.get('facetas')
 
         # Atualiza UI na thread principal
         app_instance.after(0, lambda: display_search_results(
-            app_instance, termo, resultados, success
+            app_instance, termo, resultados, success, facetas, tipo, carregar_pagina,
+            erro_consulta
         ))
 
     except Exception as e:
@@ -165,10 +229,25 @@ def perform_search(app_instance, termo: str, tipo: Optional[str] = None):
         ))
 
 
-def display_search_results(app_instance, termo: str, resultados: List[Dict[str, Any]], success: bool):
+def display_search_results(
+    app_instance,
+    termo: str,
+    resultados: List[Dict[str, Any]],
+    success: bool,
+    facetas: Optional[Dict[str, Dict[str, int]]] = None,
+    tipo: Optional[str] = None,
+    carregar_pagina: Optional[Callable[[int, int], tuple]] = None,
+    erro_consulta: Optional[str] = None
+):
     """
-    Exibe resultados da pesquisa
+    Exibe resultados da pesquisa (primeira página; as restantes são
+    pedidas com carregar_pagina à medida que o utilizador navega)
     """
+    if erro_consulta:
+        messagebox.showwarning("Consulta inválida", erro_consulta)
+        app_instance.show_dashboard()
+        return
+
     if not success:
         messagebox.showerror(
             "Erro",
@@ -205,9 +284,23 @@ def display_search_results(app_instance, termo: str, resultados: List[Dict[str,
 
     # Visualizador de resultados
     if hasattr(app_instance, 'search_engine'):
-        results_view = SearchResultsView(container, app_instance.search_engine)
+        results_view = SearchResultsView(
+            container,
+            app_instance.search_engine,
+            on_facet=lambda tipo_faceta: handle_search(app_instance, termo, tipo_faceta)
+        )
         results_view.pack(fill="both", expand=True)
-        results_view.display_results(termo, resultados)
+        results_view.display_results(termo, resultados, facetas, tipo, carregar_pagina)
+
+        if results_view.total is not None:
+            total = results_view.total
+            app_instance.page_title.configure(
+                text=f"🔍 Resultados: '{termo}' ({total} encontrado{'s' if total != 1 else ''})"
+            )
+        else:
+            app_instance.page_title.configure(
+                text=f"🔍 Resultados: '{termo}' ({len(resultados)}+ encontrados)"
+            )
     else:
         # Fallback simples
         for resultado in resultados:
@@ -248,7 +341,9 @@ def show_search_results_view(app_instance):
         search_bar = ModernSearchBar(
             container,
             app_instance.search_engine,
-            on_search=lambda termo, tipo: handle_search(app_instance, termo, tipo),
+            on_search=lambda termo, tipo=None, data_inicio=None, data_fim=None: handle_search(
+                app_instance, termo, tipo, data_inicio=data_inicio, data_fim=data_fim
+            ),
             placeholder="Digite sua pesquisa aqui..."
         )
         search_bar.pack(fill="x", pady=(0, 30))
@@ -0,0 +1,354 @@
+"""
+LINGUAGEM DE CONSULTA ESTRUTURADA
+Interpreta consultas como  tipo:campanha orcamento>100000 titulo:"5G"
+e compila os filtros em SQL com variáveis de ligação sobre as tabelas base
+(usando os índices existentes); o texto livre é resolvido no índice local
+
+Sintaxe:
+    palavra            texto livre (todas as palavras têm de existir)
+    "frase exata"      texto livre, palavras seguidas
+    tipo:campanha      tipo de registro (vários: tipo:campanha,anunciante)
+    titulo:"5G"        palavras/frase no título (índice local)
+    titulo^vod         título começa por (índice UPPER(...) do Oracle)
+    orcamento>100000   comparação numérica (> >= < <= = :)
+    inicio>=2025-01-01 comparação de datas (AAAA-MM-DD ou DD/MM/AAAA)
+    estado:ativa       estado da campanha (ativa, agendada, concluida)
+    porte:grande       igualdade de texto (sem distinguir acentos)
+"""
+
+import re
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, Set
+
+from search_ranking import normalizar_texto
+
+
+class ErroConsulta(ValueError):
+    """Consulta estruturada inválida (mensagem apresentável ao utilizador)"""
+
+
+# Tabela base e chave primária de cada TIPO_REGISTRO
+TABELAS = {
+    'ANUNCIANTE': ('Anunciante_Dados', 'Num_id_fiscal'),
+    'CAMPANHA': ('Campanha_Dados', 'Cod_camp'),
+    'PECA_CRIATIVA': ('Pecas_Criativas', 'Id_unicoPeca'),
+    'ESPACO': ('Espaco_Dados', 'Id_espaco'),
+    'PAGAMENTO': ('Pagamentos', 'Cod_pagamento'),
+    'AGENCIA': ('Agencia_Dados', 'Reg_comercial')
+}
+
+# Nomes aceites em tipo: (sem acentos, singular)
+TIPOS_ALIAS = {
+    'ANUNCIANTE': 'ANUNCIANTE',
+    'CAMPANHA': 'CAMPANHA',
+    'PECA': 'PECA_CRIATIVA',
+    'PECA_CRIATIVA': 'PECA_CRIATIVA',
+    'ESPACO': 'ESPACO',
+    'PAGAMENTO': 'PAGAMENTO',
+    'AGENCIA': 'AGENCIA'
+}
+
+# Campo -> {tipo: (coluna, tipo de valor)}
+CAMPOS_SQL = {
+    'ID': {tipo: (pk, 'numero') for tipo, (_, pk) in TABELAS.items()},
+    'NIF': {
+        'ANUNCIANTE': ('Num_id_fiscal', 'numero'),
+        'CAMPANHA': ('Num_id_fiscal', 'numero'),  # idx_campanha_nif
+        'PECA_CRIATIVA': ('Num_id_fiscal', 'numero')  # idx_peca_nif
+    },
+    'ORCAMENTO': {'CAMPANHA': ('Orc_alocado', 'numero')},  # IDX_CAMP_ORCAMENTO
+    'INICIO': {'CAMPANHA': ('Data_inicio', 'data')},
+    'FIM': {'CAMPANHA': ('Data_termino', 'data')},  # IDX_CAMP_ATIVAS
+    'DATA': {
+        'CAMPANHA': ('Data_inicio', 'data'),
+        'PECA_CRIATIVA': ('Data_criacao', 'data')
+    },
+    'PRECO': {
+        'ESPACO': ('Preco_base', 'numero'),
+        'PAGAMENTO': ('Precos_dinam', 'numero')
+    },
+    'AVALIACAO': {'AGENCIA': ('Aval_desemp', 'numero')},
+    'PORTE': {'ANUNCIANTE': ('Porte', 'texto')},
+    'CATEGORIA': {'ANUNCIANTE': ('Cat_negocio', 'texto')},
+    'STATUS': {'PECA_CRIATIVA': ('Status_aprov', 'texto')},
+    'DISPONIBILIDADE': {'ESPACO': ('Disponibilidade', 'texto')},
+    'METODO': {'PAGAMENTO': ('Metod_pagamento', 'texto')}
+}
+
+# Expressão do título com índice baseado em função (prefixo com ^)
+TITULO_SQL = {
+    'ANUNCIANTE': 'UPPER(Nome_razao_soc)',  # IDX_ANUNC_NOME
+    'CAMPANHA': 'UPPER(Titulo)',  # IDX_CAMP_TITULO
+    'PECA_CRIATIVA': 'UPPER(Titulo)',  # IDX_PECA_TITULO
+    'ESPACO': 'UPPER(Local_fis_dig)',  # IDX_ESPACO_LOCAL
+    'AGENCIA': 'UPPER(Nome_age)'
+}
+
+# Estados da campanha, iguais ao ESTADO_REGISTRO de V_PESQUISA_GLOBAL
+# (intervalos sobre IDX_CAMP_ATIVAS)
+ESTADOS_CAMPANHA = {
+    'ATIVA': "Data_termino >= TRUNC(SYSDATE) AND Data_inicio <= SYSDATE",
+    'AGENDADA': "Data_inicio > SYSDATE",
+    'CONCLUIDA': "Data_termino < TRUNC(SYSDATE)"
+}
+
+CAMPOS_ALIAS = {'NOME': 'TITULO', 'LOCAL': 'TITULO', 'ORC': 'ORCAMENTO', 'VALOR': 'PRECO'}
+CAMPOS_TEXTO = {'TIPO', 'TITULO', 'ESTADO'}
+
+OPERADORES_SQL = {':': '=', '=': '=', '>': '>', '>=': '>=', '<': '<', '<=': '<='}
+
+_SEM_ACENTOS = "TRANSLATE(UPPER({}), 'ÁÀÂÃÉÊÍÓÔÕÚÜÇ', 'AAAAEEIOOOUUC')"
+
+_TOKEN_RE = re.compile(
+    r'''
+    (?P<campo>[^\W\d]\w*)(?P<op>>=|<=|:|>|<|=|\^)(?:"(?P<valor_q>[^"]*)"?|(?P<valor>[^\s"]+))
+    | "(?P<frase>[^"]*)"?
+    | (?P<palavra>[^\s"]+)
+    ''',
+    re.VERBOSE | re.UNICODE
+)
+
+_CAMPO_RE = re.compile(r'([^\W\d]\w*)(?:>=|<=|:|>|<|=|\^)', re.UNICODE)
+
+
+class Filtro:
+    """Filtro campo/operador/valor de uma consulta estruturada"""
+
+    __slots__ = ('campo', 'operador', 'valor')
+
+    def __init__(self, campo: str, operador: str, valor: Any):
+        self.campo = campo
+        self.operador = operador
+        self.valor = valor
+
+    def __repr__(self):
+        return f"Filtro({self.campo}{self.operador}{self.valor!r})"
+
+
+class ConsultaEstruturada:
+    """Consulta interpretada: tipos, filtros SQL e texto para o índice local"""
+
+    def __init__(self):
+        self.tipos: Optional[Set[str]] = None
+        self.filtros: List[Filtro] = []
+        self.palavras: List[str] = []
+        self.frases: List[str] = []
+        self.titulo: List[str] = []
+
+    def texto_indice(self) -> str:
+        """Texto a pesquisar no índice local (AND de todos os termos)"""
+        return ' '.join(self.palavras + self.frases + self.titulo)
+
+    def corresponde_texto(self, documento: Dict[str, Any]) -> bool:
+        """Confirma frases e título (o índice só garante os termos soltos)"""
+        titulo = normalizar_texto(documento.get('titulo'))
+        for texto in self.titulo:
+            if normalizar_texto(texto) not in titulo:
+                return False
+
+        if self.frases:
+            completo = ' '.join(
+                normalizar_texto(documento.get(campo))
+                for campo in ('titulo', 'subtitulo', 'texto')
+            )
+            for frase in self.frases:
+                if ' '.join(normalizar_texto(frase).split()) not in completo:
+                    return False
+
+        return True
+
+    def tipos_aplicaveis(self) -> List[str]:
+        """
+        Tipos em que todos os filtros existem
+
+        Sem tipo: explícito, os próprios campos escolhem os tipos
+        (orcamento>... só existe em campanhas).
+
+        Raises:
+            ErroConsulta: se um campo não existir no tipo pedido
+        """
+        tipos = []
+        for tipo in (sorted(self.tipos) if self.tipos else TABELAS):
+            em_falta = [f.campo for f in self.filtros if not _campo_existe(f, tipo)]
+            if not em_falta:
+                tipos.append(tipo)
+            elif self.tipos:
+                raise ErroConsulta(f"Campo '{em_falta[0].lower()}' não existe em {tipo}")
+
+        if not tipos:
+            raise ErroConsulta("Nenhum tipo de registro tem todos os campos da pesquisa")
+        return tipos
+
+
+def _campo_existe(filtro: Filtro, tipo: str) -> bool:
+    """Verifica se o filtro pode ser aplicado ao tipo"""
+    if filtro.campo == 'TITULO':
+        return tipo in TITULO_SQL
+    if filtro.campo == 'ESTADO':
+        return tipo == 'CAMPANHA'
+    return tipo in CAMPOS_SQL[filtro.campo]
+
+
+def _converter_valor(campo: str, tipo_valor: str, valor: str) -> Any:
+    """Converte o texto do valor para número ou data"""
+    if tipo_valor == 'numero':
+        try:
+            return float(valor.replace(',', '.'))
+        except ValueError:
+            raise ErroConsulta(f"Valor numérico inválido em {campo.lower()}: {valor}")
+
+    if tipo_valor == 'data':
+        for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+            try:
+                return datetime.strptime(valor, formato)
+            except ValueError:
+                continue
+        raise ErroConsulta(f"Data inválida em {campo.lower()}: {valor} (use AAAA-MM-DD)")
+
+    return ' '.join(normalizar_texto(valor).split())
+
+
+def e_consulta_estruturada(texto: str) -> bool:
+    """Indica se o texto usa a sintaxe estruturada (campos ou aspas)"""
+    if not texto:
+        return False
+    if '"' in texto:
+        return True
+    for match in _CAMPO_RE.finditer(texto):
+        campo = normalizar_texto(match.group(1))
+        campo = CAMPOS_ALIAS.get(campo, campo)
+        if campo in CAMPOS_SQL or campo in CAMPOS_TEXTO:
+            return True
+    return False
+
+
+def interpretar_consulta(texto: str) -> ConsultaEstruturada:
+    """
+    Interpreta o texto da consulta
+
+    Raises:
+        ErroConsulta: campo, operador ou valor inválido
+    """
+    consulta = ConsultaEstruturada()
+
+    for match in _TOKEN_RE.finditer(texto or ''):
+        if match.group('frase') is not None:
+            if match.group('frase').strip():
+                consulta.frases.append(match.group('frase').strip())
+            continue
+
+        if match.group('palavra') is not None:
+            consulta.palavras.append(match.group('palavra'))
+            continue
+
+        campo = normalizar_texto(match.group('campo'))
+        campo = CAMPOS_ALIAS.get(campo, campo)
+        operador = match.group('op')
+        valor = match.group('valor_q') if match.group('valor_q') is not None else match.group('valor')
+        valor = (valor or '').strip()
+
+        if campo not in CAMPOS_SQL and campo not in CAMPOS_TEXTO:
+            # Não é um campo conhecido: trata como texto livre
+            consulta.palavras.append(match.group(0).replace('"', ''))
+            continue
+
+        if not valor:
+            raise ErroConsulta(f"Falta o valor de {campo.lower()}")
+
+        if campo == 'TIPO':
+            if operador not in (':', '='):
+                raise ErroConsulta("Use tipo:valor")
+            tipos = set()
+            for nome in valor.split(','):
+                nome = normalizar_texto(nome).strip().replace(' ', '_')
+                tipo = TIPOS_ALIAS.get(nome) or TIPOS_ALIAS.get(nome.rstrip('S'))
+                if not tipo:
+                    raise ErroConsulta(f"Tipo desconhecido: {nome.lower()}")
+                tipos.add(tipo)
+            consulta.tipos = tipos if consulta.tipos is None else consulta.tipos & tipos
+            if not consulta.tipos:
+                raise ErroConsulta("Os filtros de tipo não têm nenhum tipo em comum")
+
+        elif campo == 'TITULO' and operador == ':':
+            consulta.titulo.append(valor)
+
+        elif campo == 'TITULO' and operador == '^':
+            consulta.filtros.append(Filtro('TITULO', '^', valor.upper()))
+
+        elif campo == 'ESTADO':
+            estado = normalizar_texto(valor)
+            if operador not in (':', '=') or estado not in ESTADOS_CAMPANHA:
+                raise ErroConsulta(
+                    f"Estado inválido: {valor} (use {', '.join(e.lower() for e in ESTADOS_CAMPANHA)})"
+                )
+            consulta.filtros.append(Filtro('ESTADO', '=', estado))
+
+        else:
+            if operador not in OPERADORES_SQL:
+                raise ErroConsulta(f"Operador {operador} não suportado em {campo.lower()}")
+            tipos_valor = {tipo_valor for _, tipo_valor in CAMPOS_SQL.get(campo, {}).values()}
+            tipo_valor = tipos_valor.pop() if len(tipos_valor) == 1 else 'texto'
+            if tipo_valor == 'texto' and OPERADORES_SQL[operador] != '=':
+                raise ErroConsulta(f"Use {campo.lower()}:valor")
+            consulta.filtros.append(
+                Filtro(campo, OPERADORES_SQL[operador], _converter_valor(campo, tipo_valor, valor))
+            )
+
+    return consulta
+
+
+def compilar_sql(
+        consulta: ConsultaEstruturada,
+        tipo: str,
+        limite: int,
+        ids: Optional[List[int]] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Compila os filtros do tipo num SELECT da chave primária
+
+    Os valores vão sempre em variáveis de ligação; as colunas e operadores
+    vêm das tabelas acima, nunca do texto do utilizador.
+
+    Args:
+        consulta: Consulta interpretada
+        tipo: TIPO_REGISTRO a consultar
+        limite: Número máximo de linhas
+        ids: Chaves já selecionadas pelo índice local (opcional)
+
+    Returns:
+        Tuple (sql, binds)
+    """
+    tabela, pk = TABELAS[tipo]
+    predicados = []
+    binds: Dict[str, Any] = {}
+
+    for i, filtro in enumerate(consulta.filtros, start=1):
+        nome = f"b{i}"
+        if filtro.campo == 'TITULO':
+            # LIKE 'PREFIXO%' sobre UPPER(coluna): range scan no índice
+            predicados.append(f"{TITULO_SQL[tipo]} LIKE :{nome}")
+            binds[nome] = filtro.valor.replace('%', '').replace('_', '') + '%'
+        elif filtro.campo == 'ESTADO':
+            predicados.append(f"({ESTADOS_CAMPANHA[filtro.valor]})")
+        else:
+            coluna, tipo_valor = CAMPOS_SQL[filtro.campo][tipo]
+            if tipo_valor == 'texto':
+                predicados.append(f"{_SEM_ACENTOS.format(coluna)} = :{nome}")
+            elif tipo_valor == 'data' and filtro.operador == '=':
+                predicados.append(f"{coluna} >= :{nome} AND {coluna} < :{nome} + 1")
+            else:
+                predicados.append(f"{coluna} {filtro.operador} :{nome}")
+            binds[nome] = filtro.valor
+
+    if ids is not None:
+        nomes = [f"i{i}" for i in range(1, len(ids) + 1)]
+        predicados.append(f"{pk} IN ({', '.join(':' + n for n in nomes)})")
+        binds.update(zip(nomes, ids))
+
+    sql = f"SELECT {pk} FROM {tabela}"
+    if predicados:
+        sql += " WHERE " + " AND ".join(predicados)
+    sql += f" ORDER BY {pk} DESC FETCH FIRST :limite ROWS ONLY"
+    binds['limite'] = int(limite)
+
+    return sql, binds
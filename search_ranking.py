@@ -0,0 +1,192 @@
+"""
+RANKING DE RELEVÂNCIA (BM25F)
+Ordena candidatos de pesquisa por BM25 com pesos por campo e recência
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from datetime import datetime, date
+from typing import List, Dict, Any, Optional, Sequence
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def normalizar_texto(texto: Any) -> str:
+    """Remove acentos e converte para maiúsculas ('Saúde' -> 'SAUDE')"""
+    if texto is None:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return sem_acentos.upper()
+
+
+def tokenizar(texto: Any) -> List[str]:
+    """Divide texto normalizado em termos"""
+    return _TOKEN_RE.findall(normalizar_texto(texto))
+
+
+def _converter_data(valor: Any) -> Optional[date]:
+    """Aceita date/datetime ou texto 'DD/MM/YYYY'"""
+    if valor is None:
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    try:
+        return datetime.strptime(str(valor).strip(), '%d/%m/%Y').date()
+    except ValueError:
+        return None
+
+
+class BM25Ranker:
+    """
+    Ranking BM25F sobre o conjunto de candidatos devolvido pelo Oracle
+
+    Cada campo (título, subtítulo, texto pesquisável) tem peso e
+    normalização de comprimento próprios; as frequências ponderadas são
+    combinadas antes da saturação k1, como no BM25F. A recência
+    (DATA_REGISTRO_DT, em 'data_dt') multiplica o score com decaimento
+    exponencial; registos sem data recebem um fator neutro.
+    """
+
+    PESOS_PADRAO = {'titulo': 3.0, 'subtitulo': 1.5, 'texto': 1.0}
+    B_PADRAO = {'titulo': 0.5, 'subtitulo': 0.6, 'texto': 0.75}
+
+    # Um termo da consulta que é prefixo de um termo do documento conta
+    # parcialmente (o Oracle faz LIKE '%termo%', não correspondência exata)
+    PESO_PREFIXO = 0.5
+
+    # Decaimento dado aos tipos sem data (anunciantes, espaços, pagamentos,
+    # agências): o de um registo com uma meia-vida de idade
+    DECAIMENTO_SEM_DATA = 0.5
+
+    def __init__(
+            self,
+            pesos: Optional[Dict[str, float]] = None,
+            k1: float = 1.2,
+            b: Optional[Dict[str, float]] = None,
+            peso_recencia: float = 0.2,
+            meia_vida_dias: float = 180.0
+    ):
+        self.pesos = dict(pesos or self.PESOS_PADRAO)
+        self.b = dict(self.B_PADRAO, **(b or {}))
+        self.k1 = k1
+        self.peso_recencia = peso_recencia
+        self.meia_vida_dias = meia_vida_dias
+
+    def pontuar(
+            self,
+            consulta: str,
+            documentos: Sequence[Dict[str, Any]],
+            hoje: Optional[date] = None
+    ) -> List[float]:
+        """
+        Calcula o score de cada documento para a consulta
+
+        Args:
+            consulta: Texto da pesquisa
+            documentos: Resultados com chaves 'titulo', 'subtitulo', 'texto', 'data_dt'
+            hoje: Data de referência para a recência (por omissão, hoje)
+
+        Returns:
+            Lista de scores, na mesma ordem dos documentos
+        """
+        termos = list(dict.fromkeys(tokenizar(consulta)))
+        n = len(documentos)
+        if not termos or n == 0:
+            return [0.0] * n
+
+        campos = list(self.pesos)
+
+        # Processamento por coluna: tokeniza cada campo uma única vez
+        tokens = {
+            campo: [tokenizar(doc.get(campo)) for doc in documentos]
+            for campo in campos
+        }
+        comprimentos = {
+            campo: [len(t) for t in tokens[campo]]
+            for campo in campos
+        }
+        medias = {
+            campo: (sum(comprimentos[campo]) / n) or 1.0
+            for campo in campos
+        }
+
+        # Frequência ponderada (BM25F) de cada termo em cada documento
+        tf_ponderada = {termo: [0.0] * n for termo in termos}
+        df = Counter()
+
+        for campo in campos:
+            peso = self.pesos[campo]
+            b = self.b.get(campo, 0.75)
+            media = medias[campo]
+
+            for i, (doc_tokens, comp) in enumerate(zip(tokens[campo], comprimentos[campo])):
+                if not doc_tokens:
+                    continue
+                contagem = Counter(doc_tokens)
+                normalizacao = 1.0 - b + b * comp / media
+
+                for termo in termos:
+                    freq = contagem.get(termo, 0)
+                    if not freq:
+                        freq = self.PESO_PREFIXO * sum(
+                            c for t, c in contagem.items() if t.startswith(termo)
+                        )
+                    if freq:
+                        tf_ponderada[termo][i] += peso * freq / normalizacao
+
+        for termo in termos:
+            df[termo] = sum(1 for tf in tf_ponderada[termo] if tf > 0)
+
+        idf = {
+            termo: math.log(1.0 + (n - df[termo] + 0.5) / (df[termo] + 0.5))
+            for termo in termos
+        }
+
+        scores = [0.0] * n
+        for termo in termos:
+            peso_idf = idf[termo]
+            for i, tf in enumerate(tf_ponderada[termo]):
+                if tf:
+                    scores[i] += peso_idf * tf * (self.k1 + 1.0) / (tf + self.k1)
+
+        # Recência: decaimento exponencial a partir de DATA_REGISTRO_DT. O
+        # texto DATA_REGISTRO não serve: é SYSDATE nos tipos sem data
+        if self.peso_recencia:
+            hoje = hoje or date.today()
+            for i, doc in enumerate(documentos):
+                data = _converter_data(doc.get('data_dt'))
+                if data is None:
+                    decaimento = self.DECAIMENTO_SEM_DATA
+                else:
+                    idade = max(0, (hoje - data).days)
+                    decaimento = 0.5 ** (idade / self.meia_vida_dias)
+                scores[i] *= 1.0 + self.peso_recencia * decaimento
+
+        return scores
+
+    def ordenar(
+            self,
+            consulta: str,
+            resultados: List[Dict[str, Any]],
+            chave: str = 'relevancia'
+    ) -> List[Dict[str, Any]]:
+        """
+        Ordena resultados por score (desc) e grava o score em `chave`
+
+        O campo auxiliar 'texto' é removido dos resultados.
+        """
+        scores = self.pontuar(consulta, resultados)
+
+        for resultado, score in zip(resultados, scores):
+            resultado[chave] = round(score, 4)
+            resultado.pop('texto', None)
+
+        return sorted(
+            resultados,
+            key=lambda r: (-r[chave], str(r.get('titulo') or ''))
+        )
@@ -7,14 +7,16 @@
 """
 
 import customtkinter as ctk
-from tkinter import messagebox, ttk
-from typing import Optional, Callable, List, Dict, Any
+from tkinter import messagebox, ttk, filedialog
+from typing import Optional, Callable, List, Dict, Any, Tuple
 from datetime import datetime
-import threading
 
-from config import COLORS, FONTS
-from search_engine import SearchEngine, SearchCache, SearchExporter
+from config import COLORS, FONTS, SEARCH_CONFIG
+from search_engine import SearchEngine, SearchCache
+from search_export import ExportacaoPesquisa, iterar_paginas
 from logger_config import app_logger
+from thread_manager import thread_pool
+from tracing import acao
 
 
 class ModernSearchBar(ctk.CTkFrame):
@@ -32,9 +34,9 @@ class ModernSearchBar(ctk.CTkFrame):
 
         self.search_engine = search_engine
         self.on_search_callback = on_search
-        self.cache = SearchCache()
+        self.cache = search_engine.historico
         self.sugestoes_window = None
-        self.search_thread = None
+        self.tarefa_sugestoes: Optional[str] = None
 
         self.configure(fg_color="transparent")
         self._create_widgets(placeholder)
@@ -112,18 +114,16 @@ class ModernSearchBar(ctk.CTkFrame):
             self._hide_suggestions()
             return
 
-        # Cancela thread anterior se existir
-        if self.search_thread and self.search_thread.is_alive():
+        # Ignora enquanto a pesquisa anterior estiver pendente
+        if thread_pool.pendente(self.tarefa_sugestoes):
             return
 
-        # Busca sugestões em thread
-        self.search_thread = threading.Thread(
-            target=self._load_suggestions,
-            args=(termo,),
-            daemon=True
+        # Busca sugestões no pool, à frente das tarefas normal e bulk
+        self.tarefa_sugestoes = thread_pool.submit_task(
+            self._load_suggestions, termo, prioridade='interativa', guardar_resultado=False
         )
-        self.search_thread.start()
 
+    @acao('sugestoes')
     def _load_suggestions(self, termo: str):
         """Carrega sugestões em background"""
         sugestoes = self.search_engine.obter_sugestoes(termo, limite=8)
@@ -396,25 +396,213 @@ class AdvancedSearchDialog(ctk.CTkToplevel):
 
         tipo = None if self.tipo_combo.get() == 'TODOS' else self.tipo_combo.get()
 
-        # Parse datas (simplificado)
-        data_inicio = None
-        data_fim = None
+        # Datas DD/MM/AAAA (vazias = sem limite)
+        try:
+            data_inicio = self.search_engine.converter_data(self.data_inicio.get())
+            data_fim = self.search_engine.converter_data(self.data_fim.get())
+        except ValueError:
+            messagebox.showwarning("Atenção", "Datas inválidas. Use o formato DD/MM/AAAA")
+            return
+
+        if data_inicio and data_fim and data_inicio > data_fim:
+            messagebox.showwarning("Atenção", "A data início deve ser anterior à data fim")
+            return
 
-        # Callback
+        # Callback (as datas só são passadas quando preenchidas, para
+        # manter compatíveis os callbacks (termo, tipo))
         if self.callback:
-            self.callback(termo, tipo, data_inicio, data_fim)
+            if data_inicio or data_fim:
+                self.callback(termo, tipo, data_inicio, data_fim)
+            else:
+                self.callback(termo, tipo)
 
         self.destroy()
 
 
+class ResultCard(ctk.CTkFrame):
+    """
+    Card de resultado reutilizável
+
+    Os widgets são criados uma única vez; preencher() apenas troca os
+    textos, para o mesmo card servir vários resultados ao mudar de página.
+    Título e subtítulo são caixas de texto só de leitura, para os termos
+    pesquisados serem destacados com a tag 'destaque'.
+    """
+
+    def __init__(self, parent, on_details: Callable, **kwargs):
+        super().__init__(
+            parent,
+            fg_color=COLORS['dark_card'],
+            corner_radius=12,
+            border_width=1,
+            border_color=COLORS['dark_border'],
+            **kwargs
+        )
+
+        self.on_details = on_details
+        self.resultado = None
+
+        # Conteúdo do card
+        content = ctk.CTkFrame(self, fg_color="transparent")
+        content.pack(fill="both", expand=True, padx=20, pady=15)
+
+        # Header do card
+        header = ctk.CTkFrame(content, fg_color="transparent")
+        header.pack(fill="x", pady=(0, 10))
+
+        # Ícone e tipo
+        self.icon_label = ctk.CTkLabel(
+            header,
+            text="",
+            font=("Arial", 12),
+            text_color=COLORS['accent']
+        )
+        self.icon_label.pack(side="left")
+
+        # ID
+        self.id_label = ctk.CTkLabel(
+            header,
+            text="",
+            font=("Arial", 10),
+            text_color=COLORS['text_disabled']
+        )
+        self.id_label.pack(side="right")
+
+        # Título
+        self.title_text = self._criar_texto(content, ("Arial", 15, "bold"), COLORS['text_primary'], 30)
+        self.title_text.pack(fill="x", pady=(0, 5))
+
+        # Subtítulo (só mostrado quando o resultado o tem)
+        self.subtitle_text = self._criar_texto(content, ("Arial", 12), COLORS['text_secondary'], 24)
+
+        # Footer com data e ações
+        footer = ctk.CTkFrame(content, fg_color="transparent")
+        footer.pack(fill="x", pady=(10, 0))
+
+        self.date_label = ctk.CTkLabel(
+            footer,
+            text="",
+            font=("Arial", 10),
+            text_color=COLORS['text_disabled']
+        )
+
+        # Botão ver detalhes
+        details_btn = ctk.CTkButton(
+            footer,
+            text="Ver Detalhes →",
+            command=lambda: self.on_details(self.resultado),
+            font=("Arial", 11),
+            fg_color="transparent",
+            hover_color=COLORS['dark_hover'],
+            text_color=COLORS['accent'],
+            width=100,
+            height=30
+        )
+        details_btn.pack(side="right")
+
+    @staticmethod
+    def _criar_texto(parent, font: tuple, cor: str, altura: int) -> ctk.CTkTextbox:
+        """Linha de texto só de leitura com a tag de destaque"""
+        caixa = ctk.CTkTextbox(
+            parent,
+            height=altura,
+            font=font,
+            text_color=cor,
+            fg_color="transparent",
+            border_width=0,
+            border_spacing=0,
+            wrap="none",
+            activate_scrollbars=False,
+            state="disabled"
+        )
+        caixa.tag_config("destaque", foreground=COLORS['accent'], underline=True)
+        return caixa
+
+    @staticmethod
+    def _mostrar_texto(caixa: ctk.CTkTextbox, texto: str, intervalos: List[Tuple[int, int]]):
+        """Troca o texto da caixa e marca os intervalos (posições em caracteres)"""
+        caixa.configure(state="normal")
+        caixa.delete("1.0", "end")
+        caixa.insert("1.0", texto)
+        for inicio, fim in intervalos:
+            caixa.tag_add("destaque", f"1.0+{inicio}c", f"1.0+{fim}c")
+        caixa.configure(state="disabled")
+
+    def preencher(
+        self,
+        resultado: Dict[str, Any],
+        destacar: Optional[Callable[[str], List[Tuple[int, int]]]] = None
+    ):
+        """
+        Mostra um resultado no card
+
+        Args:
+            resultado: Resultado da pesquisa
+            destacar: Função texto -> intervalos dos termos pesquisados
+        """
+        self.resultado = resultado
+
+        self.icon_label.configure(text=f"{resultado.get('icon', '📄')} {resultado.get('tipo', 'N/A')}")
+        self.id_label.configure(text=f"ID: {resultado.get('id', 'N/A')}")
+
+        titulo = str(resultado.get('titulo') or 'Sem título')
+        self._mostrar_texto(self.title_text, titulo, destacar(titulo) if destacar else [])
+
+        if 'subtitulo' in resultado:
+            subtitulo = str(resultado['subtitulo'] or '')
+            self._mostrar_texto(self.subtitle_text, subtitulo, destacar(subtitulo) if destacar else [])
+            self.subtitle_text.pack(fill="x", pady=(0, 5), after=self.title_text)
+        else:
+            self.subtitle_text.pack_forget()
+
+        if 'data' in resultado:
+            self.date_label.configure(text=f"📅 {resultado['data']}")
+            self.date_label.pack(side="left")
+        else:
+            self.date_label.pack_forget()
+
+
 class SearchResultsView(ctk.CTkFrame):
-    """Visualizador de resultados de pesquisa"""
+    """
+    Visualizador de resultados de pesquisa
+
+    Mostra uma página de cada vez com um conjunto fixo de cards
+    reutilizados. Com carregar_pagina, as páginas seguintes são pedidas
+    ao motor de pesquisa só quando necessárias (a seguinte é antecipada
+    em background).
+    """
 
-    def __init__(self, parent, search_engine: SearchEngine, **kwargs):
+    def __init__(
+        self,
+        parent,
+        search_engine: SearchEngine,
+        on_facet: Optional[Callable] = None,
+        tamanho_pagina: int = SEARCH_CONFIG['resultados_pagina'],
+        **kwargs
+    ):
         super().__init__(parent, **kwargs)
 
         self.search_engine = search_engine
+        self.on_facet = on_facet
+        self.tamanho_pagina = max(1, tamanho_pagina)
         self.current_results = []
+        self.current_facets = None
+
+        # Paginação
+        self.termo = ""
+        self.pagina = 0
+        self.total = None
+        self._carregar_pagina = None
+        self._fim = True
+        self._a_carregar = False
+        self._pagina_pedida = None
+        self._geracao = 0
+
+        # Cards reutilizados entre páginas
+        self._cards: List[ResultCard] = []
+        self._no_results = None
+        self._exportacao = None
+        self.tipo_ativo = None
 
         self.configure(fg_color="transparent")
         self._create_widgets()
@@ -460,48 +648,285 @@ class SearchResultsView(ctk.CTkFrame):
         )
         self.export_btn.pack(side="right", padx=5)
 
+        # Facetas (contagens por tipo, estado e período)
+        self.facets_frame = ctk.CTkFrame(self, fg_color="transparent")
+
         # Área de resultados com scroll
-        results_container = ctk.CTkFrame(self, fg_color="transparent")
-        results_container.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        self.results_container = ctk.CTkFrame(self, fg_color="transparent")
+        self.results_container.pack(fill="both", expand=True, padx=10, pady=(0, 10))
 
         self.results_scroll = ctk.CTkScrollableFrame(
-            results_container,
+            self.results_container,
             fg_color=COLORS['dark_bg'],
             corner_radius=0
         )
         self.results_scroll.pack(fill="both", expand=True)
 
-    def display_results(self, termo: str, resultados: List[Dict[str, Any]]):
-        """Exibe resultados da pesquisa"""
-        self.current_results = resultados
+        # Navegação entre páginas
+        self.pager_frame = ctk.CTkFrame(self.results_container, fg_color="transparent")
+
+        self.prev_btn = ctk.CTkButton(
+            self.pager_frame,
+            text="← Anterior",
+            command=lambda: self.ir_para_pagina(self.pagina - 1),
+            font=("Arial", 11),
+            fg_color=COLORS['secondary'],
+            hover_color=COLORS['secondary_dark'],
+            width=110,
+            height=32
+        )
+        self.prev_btn.pack(side="left")
+
+        self.next_btn = ctk.CTkButton(
+            self.pager_frame,
+            text="Seguinte →",
+            command=lambda: self.ir_para_pagina(self.pagina + 1),
+            font=("Arial", 11),
+            fg_color=COLORS['secondary'],
+            hover_color=COLORS['secondary_dark'],
+            width=110,
+            height=32
+        )
+        self.next_btn.pack(side="right")
+
+        self.page_label = ctk.CTkLabel(
+            self.pager_frame,
+            text="",
+            font=("Arial", 11),
+            text_color=COLORS['text_secondary']
+        )
+        self.page_label.pack(side="top", pady=4)
+
+    def display_results(
+        self,
+        termo: str,
+        resultados: List[Dict[str, Any]],
+        facetas: Optional[Dict[str, Dict[str, int]]] = None,
+        tipo_ativo: Optional[str] = None,
+        carregar_pagina: Optional[Callable[[int, int], tuple]] = None
+    ):
+        """
+        Exibe resultados da pesquisa (e facetas, se fornecidas)
+
+        Args:
+            termo: Termo pesquisado
+            resultados: Primeira página (ou todos os resultados, sem carregar_pagina)
+            facetas: Contagens por faceta
+            tipo_ativo: Tipo selecionado nas facetas
+            carregar_pagina: Função (offset, limite) -> (sucesso, resultados)
+                para pedir mais resultados ao motor de pesquisa
+        """
+        self._geracao += 1
+        self.termo = termo
+        self.tipo_ativo = tipo_ativo
+        self.current_results = list(resultados)
+        self.current_facets = facetas
+        self.pagina = 0
+        self._carregar_pagina = carregar_pagina
+        self._fim = carregar_pagina is None or len(resultados) < self.tamanho_pagina
+        self._a_carregar = False
+        self._pagina_pedida = None
+        self._show_facets(facetas, tipo_ativo)
+
+        # Total conhecido: contagens das facetas ou lista completa
+        self.total = None
+        if facetas and facetas.get('tipo'):
+            if tipo_ativo:
+                self.total = facetas['tipo'].get(tipo_ativo, 0)
+            else:
+                self.total = sum(facetas['tipo'].values())
+        elif self._fim:
+            self.total = len(self.current_results)
 
-        # Atualiza header
-        count = len(resultados)
+        self._update_header()
+        self._render_page()
+
+    def _update_header(self):
+        """Atualiza contagem de resultados e exportação"""
+        count = self.total if self.total is not None else len(self.current_results)
+        mais = "+" if self.total is None else ""
         self.results_label.configure(
-            text=f"🔍 '{termo}' - {count} resultado{'s' if count != 1 else ''} encontrado{'s' if count != 1 else ''}"
+            text=f"🔍 '{self.termo}' - {count}{mais} resultado{'s' if count != 1 else ''} encontrado{'s' if count != 1 else ''}"
         )
 
-        # Habilita/desabilita exportação
-        if count > 0:
+        # Habilita/desabilita exportação (desativada durante uma exportação)
+        if self._exportacao is not None:
+            pass
+        elif self.current_results:
             self.export_btn.configure(state="normal")
         else:
             self.export_btn.configure(state="disabled")
 
-        # Limpa resultados anteriores
-        for widget in self.results_scroll.winfo_children():
-            widget.destroy()
+    def _render_page(self):
+        """Preenche os cards com a página atual (sem criar widgets novos)"""
+        if self._no_results is not None:
+            self._no_results.destroy()
+            self._no_results = None
+
+        inicio = self.pagina * self.tamanho_pagina
+        pagina = self.current_results[inicio:inicio + self.tamanho_pagina]
 
-        if not resultados:
+        while len(self._cards) < len(pagina):
+            self._cards.append(ResultCard(self.results_scroll, on_details=self._show_details))
+
+        # Termos destacados em título e subtítulo (autómato compilado uma vez por pesquisa)
+        termo = self.termo
+
+        def destacar(texto: str) -> List[Tuple[int, int]]:
+            return self.search_engine.highlight_termo(texto, termo)
+
+        for card, resultado in zip(self._cards, pagina):
+            card.preencher(resultado, destacar)
+            if card.winfo_manager() != "pack":
+                card.pack(fill="x", padx=20, pady=8)
+
+        for card in self._cards[len(pagina):]:
+            card.pack_forget()
+
+        if not pagina:
             self._show_no_results()
+
+        self.results_scroll._parent_canvas.yview_moveto(0)
+        self._update_pager()
+
+        # Antecipa a página seguinte enquanto o utilizador lê esta
+        if inicio + self.tamanho_pagina >= len(self.current_results):
+            self._load_more()
+
+    def _update_pager(self):
+        """Mostra a navegação quando há mais de uma página"""
+        loaded_pages = max(1, -(-len(self.current_results) // self.tamanho_pagina))
+        has_next = self.pagina + 1 < loaded_pages or not self._fim
+
+        if self.pagina == 0 and not has_next:
+            self.pager_frame.pack_forget()
+            return
+
+        self.pager_frame.pack(fill="x", pady=(8, 0))
+
+        if self.total is not None:
+            pages = max(1, -(-self.total // self.tamanho_pagina))
+            texto = f"Página {self.pagina + 1} de {pages}"
+        else:
+            texto = f"Página {self.pagina + 1}"
+        if self._pagina_pedida is not None:
+            texto += " · a carregar..."
+
+        self.page_label.configure(text=texto)
+        self.prev_btn.configure(state="normal" if self.pagina > 0 else "disabled")
+        self.next_btn.configure(state="normal" if has_next else "disabled")
+
+    def ir_para_pagina(self, pagina: int):
+        """Mostra a página indicada, pedindo-a ao motor se ainda não foi carregada"""
+        if pagina < 0:
+            return
+
+        inicio = pagina * self.tamanho_pagina
+        if pagina == 0 or inicio < len(self.current_results):
+            self.pagina = pagina
+            self._pagina_pedida = None
+            self._render_page()
+        elif not self._fim:
+            # Mostrada quando a página chegar
+            self._pagina_pedida = pagina
+            self._update_pager()
+            self._load_more()
+
+    def _load_more(self):
+        """Pede a página seguinte ao motor em background"""
+        if self._fim or self._a_carregar or self._carregar_pagina is None:
+            return
+
+        self._a_carregar = True
+        geracao = self._geracao
+        offset = len(self.current_results)
+        carregar = self._carregar_pagina
+
+        def worker():
+            try:
+                success, resultados = carregar(offset, self.tamanho_pagina) or (False, [])
+            except Exception as e:
+                app_logger.error(f"Erro ao carregar página de resultados: {e}")
+                success, resultados = False, []
+            self.after(0, lambda: self._on_page_loaded(geracao, success, resultados))
+
+        thread_pool.submit_task(worker, prioridade='interativa', guardar_resultado=False)
+
+    def _on_page_loaded(self, geracao: int, success: bool, resultados: List[Dict[str, Any]]):
+        """Junta a página recebida (na thread da interface)"""
+        if geracao != self._geracao or not self.winfo_exists():
+            return  # Pesquisa entretanto substituída
+
+        self._a_carregar = False
+        self.current_results.extend(resultados)
+        if not success or len(resultados) < self.tamanho_pagina:
+            self._fim = True
+            if self.total is None:
+                self.total = len(self.current_results)
+        self._update_header()
+
+        pedida, self._pagina_pedida = self._pagina_pedida, None
+        if pedida is not None and pedida * self.tamanho_pagina < len(self.current_results):
+            self.pagina = pedida
+            self._render_page()
+        else:
+            self._update_pager()
+
+    def _show_facets(self, facetas: Optional[Dict[str, Dict[str, int]]], tipo_ativo: Optional[str]):
+        """Mostra contagens por faceta; os tipos permitem aprofundar a pesquisa"""
+        for widget in self.facets_frame.winfo_children():
+            widget.destroy()
+
+        if not facetas or not facetas.get('tipo'):
+            self.facets_frame.pack_forget()
             return
 
-        # Exibe resultados
-        for resultado in resultados:
-            self._create_result_card(resultado)
+        self.facets_frame.pack(fill="x", padx=10, pady=(0, 10), before=self.results_container)
+
+        tipos_frame = ctk.CTkFrame(self.facets_frame, fg_color="transparent")
+        tipos_frame.pack(fill="x")
+
+        botoes = [(None, f"Todos ({sum(facetas['tipo'].values())})")]
+        for tipo, total in sorted(facetas['tipo'].items(), key=lambda item: -item[1]):
+            icon = self.search_engine.tipo_icons.get(tipo, '📄')
+            botoes.append((tipo, f"{icon} {tipo} ({total})"))
+
+        for tipo, texto in botoes:
+            ativo = tipo == tipo_ativo
+            ctk.CTkButton(
+                tipos_frame,
+                text=texto,
+                command=lambda t=tipo: self.on_facet(t) if self.on_facet else None,
+                font=("Arial", 11, "bold" if ativo else "normal"),
+                fg_color=COLORS['accent'] if ativo else COLORS['dark_card'],
+                hover_color=COLORS['dark_hover'],
+                height=30,
+                width=0
+            ).pack(side="left", padx=(0, 6))
+
+        detalhes = []
+        if facetas.get('estado'):
+            detalhes.append("📢 Campanhas: " + " · ".join(
+                f"{estado} {total}" for estado, total in sorted(facetas['estado'].items())
+            ))
+        if facetas.get('periodo'):
+            detalhes.append("📅 Período: " + " · ".join(
+                f"{periodo.replace('_', ' ').title()} {total}"
+                for periodo, total in sorted(facetas['periodo'].items())
+            ))
+
+        for texto in detalhes:
+            ctk.CTkLabel(
+                self.facets_frame,
+                text=texto,
+                font=("Arial", 11),
+                text_color=COLORS['text_secondary'],
+                anchor="w"
+            ).pack(fill="x", pady=(6, 0))
 
     def _show_no_results(self):
         """Mostra mensagem de nenhum resultado"""
-        no_results = ctk.CTkFrame(
+        no_results = self._no_results = ctk.CTkFrame(
             self.results_scroll,
             fg_color=COLORS['dark_card'],
             corner_radius=12,
@@ -533,91 +958,6 @@ class SearchResultsView(ctk.CTkFrame):
             text_color=COLORS['text_secondary']
         ).pack(pady=5)
 
-    def _create_result_card(self, resultado: Dict[str, Any]):
-        """Cria card para cada resultado"""
-        card = ctk.CTkFrame(
-            self.results_scroll,
-            fg_color=COLORS['dark_card'],
-            corner_radius=12,
-            border_width=1,
-            border_color=COLORS['dark_border']
-        )
-        card.pack(fill="x", padx=20, pady=8)
-
-        # Conteúdo do card
-        content = ctk.CTkFrame(card, fg_color="transparent")
-        content.pack(fill="both", expand=True, padx=20, pady=15)
-
-        # Header do card
-        header = ctk.CTkFrame(content, fg_color="transparent")
-        header.pack(fill="x", pady=(0, 10))
-
-        # Ícone e tipo
-        icon_label = ctk.CTkLabel(
-            header,
-            text=f"{resultado.get('icon', '📄')} {resultado.get('tipo', 'N/A')}",
-            font=("Arial", 12),
-            text_color=COLORS['accent']
-        )
-        icon_label.pack(side="left")
-
-        # ID
-        id_label = ctk.CTkLabel(
-            header,
-            text=f"ID: {resultado.get('id', 'N/A')}",
-            font=("Arial", 10),
-            text_color=COLORS['text_disabled']
-        )
-        id_label.pack(side="right")
-
-        # Título
-        title_label = ctk.CTkLabel(
-            content,
-            text=resultado.get('titulo', 'Sem título'),
-            font=("Arial", 15, "bold"),
-            text_color=COLORS['text_primary'],
-            anchor="w"
-        )
-        title_label.pack(fill="x", pady=(0, 5))
-
-        # Subtítulo
-        if 'subtitulo' in resultado:
-            subtitle_label = ctk.CTkLabel(
-                content,
-                text=resultado['subtitulo'],
-                font=("Arial", 12),
-                text_color=COLORS['text_secondary'],
-                anchor="w"
-            )
-            subtitle_label.pack(fill="x", pady=(0, 5))
-
-        # Footer com data e ações
-        footer = ctk.CTkFrame(content, fg_color="transparent")
-        footer.pack(fill="x", pady=(10, 0))
-
-        if 'data' in resultado:
-            date_label = ctk.CTkLabel(
-                footer,
-                text=f"📅 {resultado['data']}",
-                font=("Arial", 10),
-                text_color=COLORS['text_disabled']
-            )
-            date_label.pack(side="left")
-
-        # Botão ver detalhes
-        details_btn = ctk.CTkButton(
-            footer,
-            text="Ver Detalhes →",
-            command=lambda r=resultado: self._show_details(r),
-            font=("Arial", 11),
-            fg_color="transparent",
-            hover_color=COLORS['dark_hover'],
-            text_color=COLORS['accent'],
-            width=100,
-            height=30
-        )
-        details_btn.pack(side="right")
-
     def _show_details(self, resultado: Dict[str, Any]):
         """Mostra detalhes de um resultado"""
         # TODO: Implementar janela de detalhes
@@ -629,20 +969,59 @@ class SearchResultsView(ctk.CTkFrame):
         )
 
     def _export_results(self):
-        """Exporta resultados"""
-        if not self.current_results:
+        """
+        Exporta os resultados (CSV, JSON Lines ou XLSX) em background
+
+        Pesquisas paginadas são exportadas por inteiro, pela ordem do
+        ecrã: os resultados já carregados e depois as páginas seguintes,
+        pedidas ao motor à medida que o ficheiro é escrito.
+        """
+        if not self.current_results or self._exportacao is not None:
             return
 
-        # Dialog simples de exportação
-        exporter = SearchExporter()
+        filename = filedialog.asksaveasfilename(
+            title="Exportar resultados",
+            initialfile="pesquisa_resultados.csv",
+            defaultextension=".csv",
+            filetypes=[
+                ("CSV", "*.csv"),
+                ("JSON Lines", "*.jsonl"),
+                ("Excel", "*.xlsx")
+            ]
+        )
+        if not filename:
+            return
 
-        if messagebox.askyesno("Exportar", "Deseja exportar os resultados para CSV?"):
-            success = exporter.para_csv(self.current_results, "pesquisa_resultados.csv")
+        if self._carregar_pagina is None or self._fim:
+            resultados = list(self.current_results)
+        else:
+            resultados = iterar_paginas(self._carregar_pagina, list(self.current_results))
+
+        def progresso(total: int):
+            self.after(0, lambda: self.export_btn.configure(text=f"📥 {total:,}".replace(",", " ")))
+
+        def concluido(success: bool, detalhe: Any):
+            self.after(0, lambda: self._on_export_done(success, detalhe))
+
+        self.export_btn.configure(state="disabled", text="📥 0")
+        self._exportacao = ExportacaoPesquisa(
+            resultados,
+            filename,
+            progresso=progresso,
+            concluido=concluido
+        ).iniciar()
+
+    def _on_export_done(self, success: bool, detalhe: Any):
+        """Fim da exportação (na thread da interface)"""
+        self._exportacao = None
+        if not self.winfo_exists():
+            return
 
-            if success:
-                messagebox.showinfo("Sucesso", "Resultados exportados com sucesso!")
-            else:
-                messagebox.showerror("Erro", "Falha ao exportar resultados")
+        self.export_btn.configure(state="normal", text="📥 Exportar")
+        if success:
+            messagebox.showinfo("Sucesso", f"{detalhe} resultados exportados com sucesso!")
+        elif detalhe is not None:
+            messagebox.showerror("Erro", "Falha ao exportar resultados")
 
 
 # =============================================================================
@@ -0,0 +1,346 @@
+"""
+LOG DE QUERIES LENTAS
+Guarda, para cada instrução SQL acima do limite, o SQL, as variáveis de
+ligação (redigidas), o plano de execução (DBMS_XPLAN.DISPLAY_CURSOR) e o
+perfil de espera, num ficheiro JSONL com rotação; a captura corre numa
+thread própria, fora do caminho crítico
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from datetime import date, datetime
+from queue import Queue, Full
+from typing import Any, Dict, List, Optional
+
+from config import PERF_CONFIG
+from logger_config import app_logger
+
+# Nomes de binds cujo valor nunca é gravado
+_BINDS_SENSIVEIS_RE = re.compile(
+    r'senha|password|pwd|nif|nuit|fiscal|email|telefone|contacto|iban|conta',
+    re.IGNORECASE
+)
+_BLOCO_PLSQL_RE = re.compile(r'^\s*BEGIN\s+(?:[\w$#]+\.)?([\w$#]+)\s*\(', re.IGNORECASE)
+
+
+def redigir_valor(nome: str, valor: Any, manter_texto: bool = False) -> Any:
+    """Valor de um bind seguro para gravar em log"""
+    if valor is None:
+        return None
+    if _BINDS_SENSIVEIS_RE.search(nome):
+        return '***'
+    if isinstance(valor, (bool, int, float)):
+        return valor
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, str):
+        return valor if manter_texto else f"<texto:{len(valor)}>"
+    if isinstance(valor, bytes):
+        return f"<bytes:{len(valor)}>"
+    return f"<{type(valor).__name__}>"
+
+
+def redigir_binds(params: Any, manter_texto: bool = False) -> Any:
+    """
+    Cópia redigida das variáveis de ligação
+
+    Números e datas são mantidos (influenciam o plano); texto fica só com
+    o comprimento, salvo `manter_texto`; binds com nomes sensíveis
+    (NIF, email, senha...) são sempre ocultados.
+    """
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {nome: redigir_valor(nome, valor, manter_texto) for nome, valor in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [redigir_valor(str(i + 1), valor, manter_texto) for i, valor in enumerate(params)]
+    return redigir_valor('', params, manter_texto)
+
+
+class ProvedorPlanoOracle:
+    """
+    Obtém plano e perfil de espera do cursor partilhado (V$SQL)
+
+    Usa uma sessão do pool. Para blocos 'BEGIN procedure(...)' devolve a
+    instrução SQL da procedure ativa mais recentemente. Requer acesso a
+    V$SQL e DBMS_XPLAN (ex.: SELECT_CATALOG_ROLE).
+    """
+
+    LOCALIZAR_SQL = """
+        SELECT sql_id, child_number
+        FROM v$sql
+        WHERE sql_text = SUBSTR(:texto, 1, 1000)
+        ORDER BY last_active_time DESC
+        FETCH FIRST 1 ROWS ONLY
+    """
+
+    LOCALIZAR_PROCEDURE_SQL = """
+        SELECT s.sql_id, s.child_number
+        FROM v$sql s
+        JOIN user_objects o ON o.object_id = s.program_id
+        WHERE o.object_name = :procedimento
+          AND s.command_type <> 47
+        ORDER BY s.last_active_time DESC, s.elapsed_time DESC
+        FETCH FIRST 1 ROWS ONLY
+    """
+
+    PLANO_SQL = """
+        SELECT plan_table_output
+        FROM TABLE(DBMS_XPLAN.DISPLAY_CURSOR(:sql_id, :child, 'TYPICAL'))
+    """
+
+    ESPERA_SQL = """
+        SELECT executions, elapsed_time, cpu_time, user_io_wait_time,
+               application_wait_time, concurrency_wait_time, cluster_wait_time,
+               plsql_exec_time, buffer_gets, disk_reads, rows_processed
+        FROM v$sql
+        WHERE sql_id = :sql_id AND child_number = :child
+    """
+
+    def __init__(self, db_connection):
+        self.db = db_connection
+
+    def capturar(self, sql: str) -> Dict[str, Any]:
+        """
+        Plano e perfil de espera de uma instrução
+
+        Returns:
+            Dict com sql_id, child, plano (linhas) e espera (médias por
+            execução, em segundos) ou erro_plano
+        """
+        with self.db.sessao() as connection:
+            cursor = connection.cursor()
+            try:
+                bloco = _BLOCO_PLSQL_RE.match(sql)
+                if bloco:
+                    cursor.execute(self.LOCALIZAR_PROCEDURE_SQL, procedimento=bloco.group(1).upper())
+                else:
+                    cursor.execute(self.LOCALIZAR_SQL, texto=sql)
+                linha = cursor.fetchone()
+                if not linha:
+                    return {'erro_plano': 'cursor não encontrado em V$SQL'}
+                sql_id, child = linha
+
+                cursor.execute(self.PLANO_SQL, sql_id=sql_id, child=child)
+                plano = [row[0] for row in cursor.fetchall()]
+
+                cursor.execute(self.ESPERA_SQL, sql_id=sql_id, child=child)
+                valores = cursor.fetchone()
+            finally:
+                cursor.close()
+
+        return {
+            'sql_id': sql_id,
+            'child': child,
+            'plano': plano,
+            'espera': self._perfil_espera(valores) if valores else None
+        }
+
+    @staticmethod
+    def _perfil_espera(valores: tuple) -> Dict[str, Any]:
+        """Médias por execução (tempos de V$SQL vêm em microssegundos)"""
+        execucoes = max(valores[0] or 0, 1)
+        tempos = ('tempo_total', 'cpu', 'io', 'aplicacao', 'concorrencia', 'cluster', 'plsql')
+        perfil = {'execucoes': valores[0] or 0}
+        for nome, valor in zip(tempos, valores[1:8]):
+            perfil[nome] = round((valor or 0) / execucoes / 1e6, 6)
+        perfil['buffer_gets'] = round((valores[8] or 0) / execucoes, 1)
+        perfil['leituras_disco'] = round((valores[9] or 0) / execucoes, 1)
+        perfil['linhas'] = round((valores[10] or 0) / execucoes, 1)
+        return perfil
+
+
+class ProvedorPlanoLocal:
+    """
+    Provedor falso, sem Oracle (testes e desenvolvimento)
+
+    Devolve um plano fixo e guarda as instruções pedidas em `pedidos`.
+    """
+
+    def __init__(self, plano: Optional[List[str]] = None, espera: Optional[Dict[str, Any]] = None):
+        self.plano = plano or [
+            "Plan hash value: 0",
+            "| Id | Operation        | Name |",
+            "|  0 | SELECT STATEMENT |      |"
+        ]
+        self.espera = espera or {'execucoes': 1, 'tempo_total': 0.0, 'cpu': 0.0, 'io': 0.0}
+        self.pedidos: List[str] = []
+
+    def capturar(self, sql: str) -> Dict[str, Any]:
+        self.pedidos.append(sql)
+        return {'sql_id': 'local', 'child': 0, 'plano': list(self.plano), 'espera': dict(self.espera)}
+
+
+class RegistoQueriesLentas:
+    """
+    Escritor em background do log de queries lentas
+
+    registar() só copia a ocorrência para uma fila limitada; a thread de
+    escrita redige os binds, pede o plano ao provedor (no máximo uma vez
+    por impressão digital em cada `intervalo_plano` segundos) e acrescenta
+    uma linha JSON ao ficheiro, rodando-o ao passar `max_bytes`.
+    """
+
+    _PARAR = object()
+
+    def __init__(
+            self,
+            provedor=None,
+            ficheiro: str = PERF_CONFIG['queries_lentas_ficheiro'],
+            max_bytes: int = PERF_CONFIG['queries_lentas_max_bytes'],
+            backups: int = PERF_CONFIG['queries_lentas_backups'],
+            fila_max: int = PERF_CONFIG['queries_lentas_fila_max'],
+            intervalo_plano: float = PERF_CONFIG['queries_lentas_intervalo_plano'],
+            manter_texto: bool = PERF_CONFIG['queries_lentas_binds_texto']
+    ):
+        """
+        Args:
+            provedor: Objeto com capturar(sql) (None = sem plano)
+            ficheiro: Caminho do ficheiro JSONL
+            max_bytes: Tamanho a partir do qual o ficheiro roda
+            backups: Ficheiros antigos guardados (.1 ... .n)
+            fila_max: Ocorrências em espera antes de descartar
+            intervalo_plano: Segundos entre capturas do plano da mesma instrução
+            manter_texto: Gravar o texto dos binds em vez do comprimento
+        """
+        self.provedor = provedor
+        self.ficheiro = ficheiro
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.intervalo_plano = intervalo_plano
+        self.manter_texto = manter_texto
+        self.logger = app_logger
+        self.queue = Queue(maxsize=fila_max)
+
+        self.registadas = 0
+        self.descartadas = 0
+        self._planos: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._encerrado = False
+        atexit.register(self.parar)
+
+    def registar(self, ocorrencia: Dict[str, Any]) -> bool:
+        """
+        Enfileira uma ocorrência de perf_monitor (ver subscrever_sql_lento)
+
+        Returns:
+            True se foi aceite, False se foi descartada
+        """
+        if self._encerrado:
+            return False
+
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run,
+                        name="Inc_QueriesLentas",
+                        daemon=True
+                    )
+                    self._thread.start()
+
+        ocorrencia = dict(ocorrencia)
+        params = ocorrencia.get('params')
+        if isinstance(params, (dict, list)):
+            # O chamador pode reutilizar o objeto de binds
+            ocorrencia['params'] = params.copy()
+
+        try:
+            self.queue.put_nowait(ocorrencia)
+            return True
+        except Full:
+            self.descartadas += 1
+            if self.descartadas == 1 or self.descartadas % 100 == 0:
+                self.logger.warning(
+                    f"Fila de queries lentas cheia - {self.descartadas} ocorrências descartadas"
+                )
+            return False
+
+    def _run(self):
+        while True:
+            ocorrencia = self.queue.get()
+            try:
+                if ocorrencia is self._PARAR:
+                    return
+                self._escrever(self._entrada(ocorrencia))
+                self.registadas += 1
+            except Exception as e:
+                self.logger.warning(f"Erro ao gravar query lenta: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _entrada(self, ocorrencia: Dict[str, Any]) -> Dict[str, Any]:
+        """Linha do log: ocorrência com binds redigidos e plano"""
+        entrada = {
+            'data': datetime.fromtimestamp(ocorrencia['timestamp']).isoformat(timespec='milliseconds'),
+            'impressao': ocorrencia['impressao'],
+            'duracao': round(ocorrencia['duracao'], 6),
+            'execucao': round(ocorrencia['execucao'], 6),
+            'leitura': round(ocorrencia['leitura'], 6),
+            'linhas': ocorrencia['linhas'],
+            'erro': ocorrencia['erro'],
+            'sql': ocorrencia['sql'],
+            'binds': redigir_binds(ocorrencia.get('params'), self.manter_texto)
+        }
+
+        if self.provedor is not None:
+            agora = time.monotonic()
+            ultima = self._planos.get(ocorrencia['impressao'])
+            if ultima is None or agora - ultima >= self.intervalo_plano:
+                self._planos[ocorrencia['impressao']] = agora
+                try:
+                    entrada.update(self.provedor.capturar(ocorrencia['sql']))
+                except Exception as e:
+                    entrada['erro_plano'] = str(e)
+            else:
+                entrada['plano_repetido'] = True
+
+        return entrada
+
+    def _escrever(self, entrada: Dict[str, Any]):
+        """Acrescenta a linha ao ficheiro, rodando-o se necessário"""
+        linha = json.dumps(entrada, ensure_ascii=False, default=str) + '\n'
+        pasta = os.path.dirname(self.ficheiro)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+        if os.path.exists(self.ficheiro) and os.path.getsize(self.ficheiro) + len(linha) > self.max_bytes:
+            self._rodar()
+
+        with open(self.ficheiro, 'a', encoding='utf-8') as f:
+            f.write(linha)
+
+    def _rodar(self):
+        """ficheiro -> ficheiro.1 -> ... -> ficheiro.<backups> (o mais antigo é apagado)"""
+        if self.backups <= 0:
+            os.remove(self.ficheiro)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            origem = f"{self.ficheiro}.{i}"
+            if os.path.exists(origem):
+                os.replace(origem, f"{self.ficheiro}.{i + 1}")
+        os.replace(self.ficheiro, f"{self.ficheiro}.1")
+
+    def aguardar(self, timeout: float = 5.0) -> bool:
+        """Espera que as ocorrências em fila sejam gravadas"""
+        limite = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < limite:
+            time.sleep(0.01)
+        return not self.queue.unfinished_tasks
+
+    def parar(self, timeout: float = 5.0):
+        """Grava o que está em fila e termina a thread"""
+        if self._encerrado:
+            return
+        self._encerrado = True
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self.queue.put(self._PARAR, timeout=timeout)
+            except Full:
+                return
+            self._thread.join(timeout=timeout)
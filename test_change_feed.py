@@ -0,0 +1,143 @@
+"""
+TESTES DO FEED DE ALTERAÇÕES
+Tabela, operação e chave a partir do DML, entrega aos assinantes e deltas
+por linha no índice local de pesquisa
+"""
+
+import threading
+
+from change_feed import AlteracaoRegisto, ChangeFeed, chave_da_linha, interpretar_dml
+from search_index import LocalSearchIndex, normalizar_chave
+
+
+def test_interpretar_dml():
+    """Tabela e operação em maiúsculas; SELECT e PL/SQL não são DML"""
+    assert interpretar_dml("INSERT INTO Campanha_Dados (Cod_camp) VALUES (:1)") == ('CAMPANHA_DADOS', 'INSERT')
+    assert interpretar_dml('  update "Pagamentos" set Valor = :v') == ('PAGAMENTOS', 'UPDATE')
+    assert interpretar_dml("DELETE FROM Espaco_Dados WHERE Id_espaco = :id") == ('ESPACO_DADOS', 'DELETE')
+    assert interpretar_dml("delete Agencia_Dados where Reg_comercial = :r") == ('AGENCIA_DADOS', 'DELETE')
+    assert interpretar_dml("MERGE INTO Pecas_Criativas p USING dual ON (1 = 1)") == ('PECAS_CRIATIVAS', 'MERGE')
+    assert interpretar_dml("SELECT * FROM Campanha_Dados") is None
+    assert interpretar_dml("BEGIN SP_PESQUISA_GLOBAL(:1, :2); END;") is None
+
+
+def test_chave_da_linha_insert():
+    """No INSERT a chave vem do bind na posição da coluna da chave primária"""
+    query = """
+        INSERT INTO Campanha_Dados (Titulo, Data_inicio, Cod_camp)
+        VALUES (:titulo, TO_DATE(:inicio, 'DD/MM/YYYY'), :codigo)
+    """
+    params = {'titulo': 'Verão, 2025', 'inicio': '01/06/2025', 'codigo': 'C-17'}
+    assert chave_da_linha(query, 'CAMPANHA_DADOS', 'INSERT', params) == 'C-17'
+
+    # Chave literal ou binds posicionais: linha desconhecida
+    assert chave_da_linha("INSERT INTO Campanha_Dados (Cod_camp) VALUES ('C-1')",
+                          'CAMPANHA_DADOS', 'INSERT', {}) is None
+    assert chave_da_linha("INSERT INTO Campanha_Dados (Cod_camp) VALUES (:1)",
+                          'CAMPANHA_DADOS', 'INSERT', ['C-1']) is None
+
+
+def test_chave_da_linha_update_delete():
+    """UPDATE/DELETE só com 'WHERE <pk> = :nome' identificam a linha"""
+    params = {'id': 42, 'valor': 10}
+    assert chave_da_linha("UPDATE Espaco_Dados SET Preco = :valor WHERE Id_espaco = :id",
+                          'ESPACO_DADOS', 'UPDATE', params) == 42
+    assert chave_da_linha("DELETE FROM Espaco_Dados e WHERE e.ID_ESPACO = :id -- remover",
+                          'ESPACO_DADOS', 'DELETE', params) == 42
+    assert chave_da_linha("UPDATE Espaco_Dados SET Preco = :valor WHERE Id_espaco = :id OR 1 = 1",
+                          'ESPACO_DADOS', 'UPDATE', params) is None
+    assert chave_da_linha("UPDATE Outra SET x = 1 WHERE id = :id", 'OUTRA', 'UPDATE', params) is None
+
+
+def test_assinantes_sincronos_e_em_background():
+    """Síncronos correm antes de publicar retornar; os outros na thread de despacho"""
+    feed = ChangeFeed()
+    sincronos, em_background = [], []
+    threads = set()
+
+    def no_despacho(evento):
+        threads.add(threading.current_thread().name)
+        em_background.append(evento.chave)
+
+    feed.subscrever(lambda evento: sincronos.append(evento.chave), tabelas=['campanha_dados'], sincrono=True)
+    feed.subscrever(no_despacho)
+
+    feed.publicar([AlteracaoRegisto('Campanha_Dados', 'UPDATE', 'C-1'),
+                   AlteracaoRegisto('PAGAMENTOS', 'DELETE', 9)])
+    assert sincronos == ['C-1']
+
+    assert feed.aguardar(2)
+    assert em_background == ['C-1', 9]
+    assert threads == {'Inc_ChangeFeed'}
+
+
+def test_erro_de_um_assinante_nao_para_o_feed():
+    """Uma exceção num assinante é contada e os eventos seguintes são entregues"""
+    feed = ChangeFeed()
+    recebidos = []
+
+    def assinante(evento):
+        if evento.chave == 1:
+            raise ValueError("falha")
+        recebidos.append(evento.chave)
+
+    feed.subscrever(assinante, sincrono=True)
+    feed.publicar([AlteracaoRegisto('PAGAMENTOS', 'UPDATE', 1), AlteracaoRegisto('PAGAMENTOS', 'UPDATE', 2)])
+
+    assert recebidos == [2]
+    assert feed.get_stats()['erros'] == 1
+
+
+class _BaseFalsa:
+    """execute_query sobre linhas de V_PESQUISA_GLOBAL em memória"""
+
+    def __init__(self, linhas):
+        self.linhas = linhas
+
+    def execute_query(self, query, params=None):
+        params = params or {}
+        linhas = [l for l in self.linhas
+                  if 'tipo' not in params or l[0] == params['tipo']]
+        if 'chave' in params:
+            linhas = [l for l in linhas if l[1] == normalizar_chave(params['chave'])]
+        return ['TIPO_REGISTRO'], linhas
+
+
+def _ids(indice, consulta):
+    resultados, _ = indice.pesquisar(consulta)
+    return sorted((documento['tipo'], documento['id']) for documento, _ in resultados)
+
+
+def test_deltas_por_linha_no_indice():
+    """Inserção, alteração e remoção de uma linha sem recarregar o índice"""
+    base = _BaseFalsa([('CAMPANHA', '1', 'Vodacom verão', '', 'vodacom verao', None)])
+    indice = LocalSearchIndex()
+    assert indice.carregar(base)
+
+    base.linhas.append(('CAMPANHA', '2', 'Tmcel inverno', '', 'tmcel inverno', None))
+    indice.atualizar_registo(base, 'CAMPANHA', 2.0)
+    assert _ids(indice, 'tmcel') == [('CAMPANHA', '2')]
+
+    base.linhas[0] = ('CAMPANHA', '1', 'Movitel verão', '', 'movitel verao', None)
+    indice.atualizar_registo(base, 'CAMPANHA', '1')
+    assert _ids(indice, 'vodacom') == []
+    assert _ids(indice, 'movitel') == [('CAMPANHA', '1')]
+
+    del base.linhas[1]
+    indice.atualizar_registo(base, 'CAMPANHA', 2)
+    assert _ids(indice, 'tmcel') == []
+    assert 'TMCEL' not in indice.postings
+
+
+def test_alteracao_sem_chave_recarrega_o_tipo():
+    """Sem chave conhecida, só os registos desse tipo são relidos"""
+    base = _BaseFalsa([('CAMPANHA', '1', 'Vodacom', '', 'vodacom', None),
+                       ('ANUNCIANTE', '7', 'Vodacom SA', '', 'vodacom sa', None)])
+    indice = LocalSearchIndex()
+    indice.carregar(base)
+
+    base.linhas = [('CAMPANHA', '3', 'Vodacom 5G', '', 'vodacom 5g', None),
+                   ('ANUNCIANTE', '8', 'Vodacom Lda', '', 'vodacom lda', None)]
+    indice.recarregar_tipo(base, 'CAMPANHA')
+
+    assert _ids(indice, 'vodacom') == [('ANUNCIANTE', '7'), ('CAMPANHA', '3')]
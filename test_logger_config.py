@@ -0,0 +1,103 @@
+"""
+TESTES DO LOGGING
+Rotação por tamanho e por tempo, retenção só dos ficheiros deste processo,
+fila limitada e formato JSON com o trace
+"""
+
+import json
+import logging
+import os
+from queue import Queue
+
+from logger_config import FicheiroRotativoHandler, FilaLogHandler, FiltroTrace, FormatadorJSON, contexto_trace
+
+
+def _registo(mensagem, nivel=logging.INFO):
+    return logging.LogRecord('INC_Publicidade', nivel, __file__, 1, mensagem, None, None)
+
+
+def _handler(pasta, **opcoes):
+    parametros = dict(max_bytes=10 ** 6, rotacao_segundos=3600, ficheiros_max=3)
+    parametros.update(opcoes)
+    handler = FicheiroRotativoHandler(str(pasta), **parametros)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    return handler
+
+
+def test_rotacao_por_tamanho_mantem_os_mais_recentes(tmp_path):
+    """Acima de max_bytes abre outro ficheiro; ficam só os ficheiros_max mais recentes"""
+    handler = _handler(tmp_path, max_bytes=50, ficheiros_max=3)
+    try:
+        for i in range(10):
+            handler.emit(_registo(f'linha {i:02d} ' + 'x' * 40))
+    finally:
+        handler.close()
+
+    nomes = sorted(os.listdir(tmp_path))
+    assert len(nomes) == 3
+    # Várias rotações no mesmo segundo não reutilizam nomes: cada ficheiro tem uma linha
+    conteudos = [(tmp_path / nome).read_text(encoding='utf-8') for nome in nomes]
+    assert all(c.count('\n') == 1 for c in conteudos)
+    assert sorted(c[:8] for c in conteudos) == ['linha 07', 'linha 08', 'linha 09']
+
+
+def test_rotacao_por_tempo(tmp_path):
+    """Passado rotacao_segundos, o registo seguinte vai para um ficheiro novo"""
+    handler = _handler(tmp_path, rotacao_segundos=0, ficheiros_max=10)
+    try:
+        for i in range(3):
+            handler.emit(_registo(f'linha {i}'))
+    finally:
+        handler.close()
+
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_retencao_nao_apaga_ficheiros_de_outras_execucoes(tmp_path):
+    """Logs de execuções anteriores (e outros ficheiros) nunca são apagados"""
+    antigos = ['app_20240101_080000.log', 'app_20240102_080000.log', 'notas.txt']
+    for nome in antigos:
+        (tmp_path / nome).write_text('anterior\n', encoding='utf-8')
+
+    handler = _handler(tmp_path, max_bytes=10, ficheiros_max=1)
+    try:
+        for i in range(5):
+            handler.emit(_registo(f'linha {i} ' + 'x' * 20))
+    finally:
+        handler.close()
+
+    nomes = set(os.listdir(tmp_path))
+    assert set(antigos) <= nomes
+    assert len(nomes - set(antigos)) == 1
+    assert all((tmp_path / nome).read_text(encoding='utf-8') == 'anterior\n' for nome in antigos)
+
+
+def test_fila_cheia_descarta_sem_bloquear():
+    """Abaixo de ERROR, com a fila cheia o registo é descartado e contado"""
+    handler = FilaLogHandler(Queue(maxsize=2))
+    for i in range(5):
+        handler.handle(_registo(f'info {i}'))
+
+    assert handler.descartados == 3
+    assert [handler.queue.get_nowait().getMessage() for _ in range(2)] == ['info 0', 'info 1']
+
+
+def test_json_com_trace_atual():
+    """O filtro corre na thread que regista e o JSON leva trace_id/span_id"""
+    token = contexto_trace.set(('t' * 32, 's' * 16))
+    try:
+        registo = _registo('pesquisa %s')
+        registo.args = ('vodacom',)
+        FiltroTrace().filter(registo)
+    finally:
+        contexto_trace.reset(token)
+    registo.span = {'duracao_ms': 12.5}
+
+    evento = json.loads(FormatadorJSON().format(registo))
+    assert evento['msg'] == 'pesquisa vodacom'
+    assert (evento['trace_id'], evento['span_id']) == ('t' * 32, 's' * 16)
+    assert evento['duracao_ms'] == 12.5 and evento['nivel'] == 'INFO'
+
+    sem_trace = _registo('sem ação')
+    FiltroTrace().filter(sem_trace)
+    assert json.loads(FormatadorJSON().format(sem_trace))['trace_id'] is None
@@ -0,0 +1,121 @@
+"""
+TESTES DO REGISTO DE MÉTRICAS
+Formato de texto do Prometheus, coletores dos subsistemas, conversão dos
+histogramas de latência e exportação por ficheiro e HTTP
+"""
+
+import urllib.request
+
+import pytest
+
+from metrics_registry import (
+    FamiliaMetrica, GravadorMetricas, RegistoMetricas, ServidorMetricas, TIPO_CONTEUDO, buckets_de_latencia
+)
+from performance_monitor import HistogramaLatencia
+
+
+def test_exposicao_contador_medidor_e_histograma():
+    """HELP/TYPE por família, etiquetas escapadas e buckets cumulativos com +Inf"""
+    registo = RegistoMetricas()
+    pedidos = registo.contador('inc_pedidos_total', 'Pedidos', ('modo',))
+    pedidos.inc(modo='global')
+    pedidos.inc(2, modo='com "aspas"\n')
+    fila = registo.medidor('inc_fila', 'Fila')
+    fila.set(5)
+    fila.dec(2)
+    latencia = registo.histograma('inc_latencia_segundos', 'Latência', buckets=(0.1, 1.0))
+    for valor in (0.05, 0.5, 0.5, 3.0):
+        latencia.observe(valor)
+
+    assert registo.exportar_texto() == '\n'.join([
+        '# HELP inc_pedidos_total Pedidos',
+        '# TYPE inc_pedidos_total counter',
+        'inc_pedidos_total{modo="global"} 1',
+        'inc_pedidos_total{modo="com \\"aspas\\"\\n"} 2',
+        '# HELP inc_fila Fila',
+        '# TYPE inc_fila gauge',
+        'inc_fila 3',
+        '# HELP inc_latencia_segundos Latência',
+        '# TYPE inc_latencia_segundos histogram',
+        'inc_latencia_segundos_bucket{le="0.1"} 1',
+        'inc_latencia_segundos_bucket{le="1"} 3',
+        'inc_latencia_segundos_bucket{le="+Inf"} 4',
+        'inc_latencia_segundos_sum 4.05',
+        'inc_latencia_segundos_count 4',
+    ]) + '\n'
+
+
+def test_erros_de_utilizacao():
+    """Etiquetas erradas, contador a descer e nome reutilizado com outro tipo"""
+    registo = RegistoMetricas()
+    contador = registo.contador('inc_erros_total', 'Erros', ('tipo',))
+    assert registo.contador('inc_erros_total', 'Erros', ('tipo',)) is contador
+
+    with pytest.raises(ValueError):
+        contador.inc(outra='x')
+    with pytest.raises(ValueError):
+        contador.inc(-1, tipo='x')
+    with pytest.raises(ValueError):
+        registo.medidor('inc_erros_total', 'Erros')
+
+
+def test_coletores_juntos_por_nome_e_erros_ignorados():
+    """Famílias iguais de coletores diferentes num só bloco; um coletor com erro não impede os outros"""
+    registo = RegistoMetricas()
+    registo.registar_coletor('a', lambda: [FamiliaMetrica('inc_fila_pendentes', 'gauge', 'Fila').adicionar(1, {'fila': 'a'})])
+    registo.registar_coletor('b', lambda: [FamiliaMetrica('inc_fila_pendentes', 'gauge', 'Fila').adicionar(2, {'fila': 'b'})])
+    registo.registar_coletor('falha', lambda: 1 / 0)
+
+    texto = registo.exportar_texto()
+    assert texto.count('# TYPE inc_fila_pendentes gauge') == 1
+    assert 'inc_fila_pendentes{fila="a"} 1\ninc_fila_pendentes{fila="b"} 2\n' in texto
+
+    registo.remover_coletor('b')
+    assert 'fila="b"' not in registo.exportar_texto()
+
+
+def test_buckets_de_latencia_nunca_subestimam():
+    """Cada bucket logarítmico conta no primeiro limite acima do seu valor máximo"""
+    histograma = HistogramaLatencia(bits=7)
+    for ns in (500_000, 1_000_000, 4_000_000, 2_000_000_000, 60_000_000_000):
+        histograma.registar(ns)
+
+    buckets = dict(buckets_de_latencia(histograma, (0.001, 0.005, 1.0, 10.0)))
+    # O bucket de 1ms vai um pouco além de 1ms: conta no limite seguinte
+    assert histograma.valor_maximo(histograma.indice(1_000_000)) > 1_000_000
+    assert buckets == {0.001: 1, 0.005: 3, 1.0: 3, 10.0: 4}
+
+
+def test_gravador_reescreve_o_ficheiro(tmp_path):
+    """gravar() substitui o ficheiro de uma vez, sem deixar o temporário"""
+    registo = RegistoMetricas()
+    medidor = registo.medidor('inc_ligacoes', 'Ligações')
+    ficheiro = tmp_path / 'metricas' / 'inc.prom'
+    gravador = GravadorMetricas(registo, str(ficheiro), intervalo=60)
+
+    medidor.set(1)
+    gravador.gravar()
+    medidor.set(7)
+    gravador.gravar()
+
+    assert ficheiro.read_text(encoding='utf-8').endswith('inc_ligacoes 7\n')
+    assert sorted(p.name for p in ficheiro.parent.iterdir()) == ['inc.prom']
+
+
+def test_servidor_http():
+    """GET /metrics devolve a exposição; outros caminhos 404"""
+    registo = RegistoMetricas()
+    registo.contador('inc_pedidos_total', 'Pedidos').inc(3)
+    servidor = ServidorMetricas(registo, porta=0)
+    servidor.iniciar()
+    try:
+        porta = servidor.servidor.server_address[1]
+        with urllib.request.urlopen(f'http://127.0.0.1:{porta}/metrics', timeout=5) as resposta:
+            assert resposta.headers['Content-Type'] == TIPO_CONTEUDO
+            assert 'inc_pedidos_total 3' in resposta.read().decode('utf-8')
+
+        with pytest.raises(urllib.error.HTTPError) as erro:
+            urllib.request.urlopen(f'http://127.0.0.1:{porta}/outro', timeout=5)
+        assert erro.value.code == 404
+    finally:
+        servidor.parar()
@@ -0,0 +1,143 @@
+"""
+TESTES DO MONITOR DE DESEMPENHO
+Percentis do histograma de latência com erro relativo limitado, janela
+deslizante, estatísticas por operação e impressão digital do SQL
+"""
+
+import math
+import random
+
+from performance_monitor import HistogramaLatencia, JanelaDeslizante, PerformanceMonitor, impressao_sql
+
+
+def _percentil_exato(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[max(1, math.ceil(len(ordenados) * p / 100.0)) - 1]
+
+
+def test_histograma_valores_pequenos_exatos():
+    """Abaixo de 2^bits cada valor tem bucket próprio"""
+    histograma = HistogramaLatencia(bits=7)
+    for valor in range(1, 101):
+        histograma.registar(valor)
+
+    assert histograma.percentil(50) == 50
+    assert histograma.percentil(99) == 99
+    assert histograma.percentil(100) == 100
+    assert (histograma.total, histograma.min_ns, histograma.max_ns) == (100, 1, 100)
+    assert HistogramaLatencia().percentil(99) == 0
+
+
+def test_histograma_erro_relativo_limitado():
+    """Percentis nunca abaixo do exato nem acima de 1/2^(bits-1) de erro"""
+    gerador = random.Random(42)
+    valores = [int(gerador.lognormvariate(15, 1.5)) for _ in range(20000)]
+    for bits in (5, 7):
+        histograma = HistogramaLatencia(bits=bits)
+        for valor in valores:
+            histograma.registar(valor)
+
+        erro_maximo = 1.0 / (1 << (bits - 1))
+        for p in (50, 90, 99, 99.9, 100):
+            exato = _percentil_exato(valores, p)
+            aproximado = histograma.percentil(p)
+            assert exato <= aproximado <= exato * (1 + erro_maximo), (bits, p, exato, aproximado)
+
+
+def test_histograma_indice_e_valor_maximo():
+    """Cada valor cabe no bucket que o índice lhe atribui e os buckets são crescentes"""
+    histograma = HistogramaLatencia(bits=4)
+    anterior = -1
+    for valor in list(range(0, 300)) + [10 ** 6, 10 ** 9, 2 ** 40 + 1]:
+        i = histograma.indice(valor)
+        assert i >= anterior
+        assert valor <= histograma.valor_maximo(i)
+        if i > 0:
+            assert valor > histograma.valor_maximo(i - 1)
+        anterior = i
+
+
+def test_histograma_juntar():
+    """Juntar dois histogramas equivale a registar tudo num só"""
+    gerador = random.Random(7)
+    valores = [gerador.randint(1, 10 ** 8) for _ in range(2000)]
+    a, b, total = HistogramaLatencia(), HistogramaLatencia(), HistogramaLatencia()
+    for i, valor in enumerate(valores):
+        (a if i % 2 else b).registar(valor)
+        total.registar(valor)
+    a.juntar(b)
+
+    assert a.contagens == total.contagens
+    assert (a.total, a.soma_ns, a.min_ns, a.max_ns) == (total.total, total.soma_ns, total.min_ns, total.max_ns)
+    assert a.percentil(95) == total.percentil(95)
+
+
+def test_janela_deslizante_esquece_fatias_antigas():
+    """Só as fatias dos últimos `segundos` entram; o anel reaproveita as antigas"""
+    janela = JanelaDeslizante(bits=7, segundos=10, fatias=3)
+    janela.registar(100, agora=5)     # fatia 0
+    janela.registar(200, agora=15)    # fatia 1
+    janela.registar(300, agora=25)    # fatia 2
+
+    assert janela.histograma(30, agora=25).total == 3
+    assert janela.histograma(10, agora=25).max_ns == 300
+    assert janela.histograma(20, agora=25).min_ns == 200
+
+    # A fatia 3 ocupa o lugar da 0; a fatia 1 já saiu de uma janela de 20s
+    janela.registar(400, agora=35)
+    ultimos = janela.histograma(30, agora=35)
+    assert (ultimos.total, ultimos.min_ns, ultimos.max_ns) == (3, 200, 400)
+    assert janela.histograma(20, agora=35).total == 2
+    assert janela.histograma(30, agora=100).total == 0
+
+
+def test_get_stats_em_segundos():
+    """count, avg, min, max, last e percentis convertidos para segundos"""
+    monitor = PerformanceMonitor()
+    assert monitor.get_stats('pesquisa') is None
+
+    for ms in (10, 20, 30, 40):
+        monitor.registar('pesquisa', ms * 1_000_000)
+
+    stats = monitor.get_stats('pesquisa')
+    assert stats['count'] == 4
+    assert stats['min'] == 0.01 and stats['max'] == 0.04 and stats['last'] == 0.04
+    assert abs(stats['avg'] - 0.025) < 1e-12
+    for chave in ('p50', 'p90', 'p99', 'p999'):
+        assert stats['min'] <= stats[chave] <= stats['max']
+    assert 0.02 <= stats['p50'] <= 0.02 * (1 + 1 / 64)
+    assert monitor.get_stats('pesquisa', janela=60)['count'] == 4
+
+
+def test_impressao_sql_ignora_valores_e_formatacao():
+    """Literais, listas IN, comentários, espaços e caixa não mudam a impressão"""
+    impressao, normalizado = impressao_sql(
+        "SELECT * FROM Campanha_Dados WHERE Titulo = 'O''Neil' AND Valor>10 -- filtro\n"
+        "  AND Id IN (1, 2,3) AND Cod = :cod AND Taxa = 1.5e3;"
+    )
+    outra, _ = impressao_sql(
+        "select *  from campanha_dados where titulo='x' and valor > 7 /* outro */ "
+        "and id in (4) and cod = :cod and taxa = 2"
+    )
+
+    assert normalizado == "SELECT * FROM CAMPANHA_DADOS WHERE TITULO=? AND VALOR>? AND ID IN (?) AND COD=:COD AND TAXA=?"
+    assert impressao == outra and len(impressao) == 16
+
+    # Binds e nomes com dígitos não são literais; binds diferentes são instruções diferentes
+    assert impressao_sql("SELECT col1 FROM t2 WHERE id = :p1")[1] == "SELECT COL1 FROM T2 WHERE ID=:P1"
+    assert impressao_sql("SELECT col1 FROM t2 WHERE id = :p2")[0] != impressao_sql("SELECT col1 FROM t2 WHERE id = :p1")[0]
+
+
+def test_registar_sql_agrupa_por_impressao():
+    """Execuções com valores diferentes somam-se na mesma instrução do top_sql"""
+    monitor = PerformanceMonitor()
+    monitor.registar_sql("SELECT * FROM Pagamentos WHERE Valor > 10", 2_000_000, 1_000_000, linhas=5)
+    monitor.registar_sql("SELECT * FROM Pagamentos WHERE Valor > 99", 4_000_000, 1_000_000, linhas=1, erro='ORA-01013')
+    monitor.registar_sql("SELECT 1 FROM dual", 1_000_000, 0)
+
+    lenta, rapida = monitor.top_sql(2)
+    assert lenta['sql'] == "SELECT * FROM PAGAMENTOS WHERE VALOR>?"
+    assert (lenta['execucoes'], lenta['linhas'], lenta['erros'], lenta['ultimo_erro']) == (2, 6, 1, 'ORA-01013')
+    assert abs(lenta['total'] - 0.008) < 1e-12
+    assert abs(lenta['execucao_avg'] - 0.003) < 1e-12 and abs(lenta['leitura_avg'] - 0.001) < 1e-12
+    assert rapida['execucoes'] == 1
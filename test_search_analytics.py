@@ -0,0 +1,147 @@
+"""
+TESTES DO ANALYTICS DE PESQUISA
+Gravação em lote por tamanho ou por tempo, descarte com a fila cheia e
+drenagem no encerramento, com uma base de dados falsa em memória
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+import cx_Oracle
+
+from search_analytics import SearchAnalyticsWriter
+
+
+class _Cursor:
+    def __init__(self, base):
+        self.base = base
+
+    def prepare(self, sql):
+        pass
+
+    def executemany(self, sql, linhas):
+        if self.base.falhar:
+            raise cx_Oracle.DatabaseError("ORA-00001")
+        self.base.pendentes.extend(linhas)
+
+    def close(self):
+        pass
+
+
+class _Conexao:
+    def __init__(self, base):
+        self.base = base
+
+    def cursor(self):
+        return _Cursor(self.base)
+
+    def commit(self):
+        self.base.lotes.append(list(self.base.pendentes))
+        self.base.pendentes.clear()
+
+    def rollback(self):
+        self.base.rollbacks += 1
+        self.base.pendentes.clear()
+
+
+class _BaseFalsa:
+    """Pool falso: cada lote confirmado fica em `lotes`"""
+
+    def __init__(self, bloquear=None):
+        self.lotes = []
+        self.pendentes = []
+        self.rollbacks = 0
+        self.falhar = False
+        self.bloquear = bloquear
+
+    @contextmanager
+    def sessao(self):
+        if self.bloquear is not None:
+            self.bloquear.wait(5)
+        yield _Conexao(self)
+
+
+def _esperar(condicao, timeout=2.0):
+    limite = time.monotonic() + timeout
+    while not condicao() and time.monotonic() < limite:
+        time.sleep(0.005)
+    return condicao()
+
+
+def test_grava_ao_completar_o_lote():
+    """Com `tamanho_lote` eventos o lote é gravado logo, num só executemany"""
+    base = _BaseFalsa()
+    escritor = SearchAnalyticsWriter(base, tamanho_lote=3, intervalo=60, fila_max=10)
+    try:
+        for termo in ('vodacom', 'tmcel', 'movitel'):
+            assert escritor.registrar(termo, None, 5, 'ana')
+
+        assert _esperar(lambda: len(base.lotes) == 1)
+        assert [evento[0] for evento in base.lotes[0]] == ['vodacom', 'tmcel', 'movitel']
+        assert base.lotes[0][0][1:3] == (None, 5) and base.lotes[0][0][4] == 'ana'
+        assert escritor.get_stats()['gravados'] == 3
+    finally:
+        escritor.shutdown()
+
+
+def test_grava_lote_incompleto_ao_fim_do_intervalo():
+    """Um evento sozinho não espera mais do que `intervalo` segundos"""
+    base = _BaseFalsa()
+    escritor = SearchAnalyticsWriter(base, tamanho_lote=100, intervalo=0.05, fila_max=10)
+    try:
+        escritor.registrar('vodacom', 'CAMPANHA', 2)
+        assert _esperar(lambda: len(base.lotes) == 1)
+        assert len(base.lotes[0]) == 1
+    finally:
+        escritor.shutdown()
+
+
+def test_descarta_com_a_fila_cheia():
+    """Com a base lenta e a fila cheia, registrar não bloqueia e descarta"""
+    libertar = threading.Event()
+    base = _BaseFalsa(bloquear=libertar)
+    escritor = SearchAnalyticsWriter(base, tamanho_lote=1, intervalo=60, fila_max=2)
+    try:
+        assert escritor.registrar('primeiro', None, 1)
+        assert _esperar(lambda: escritor.queue.qsize() == 0)  # a thread está presa a gravar
+
+        assert escritor.registrar('segundo', None, 1)
+        assert escritor.registrar('terceiro', None, 1)
+        inicio = time.monotonic()
+        assert not escritor.registrar('quarto', None, 1)
+        assert time.monotonic() - inicio < 0.1
+        assert escritor.get_stats()['descartados'] == 1
+
+        libertar.set()
+        assert _esperar(lambda: escritor.get_stats()['gravados'] == 3)
+    finally:
+        libertar.set()
+        escritor.shutdown()
+
+
+def test_encerramento_drena_a_fila():
+    """shutdown grava os eventos pendentes; depois disso nada é aceite"""
+    base = _BaseFalsa()
+    escritor = SearchAnalyticsWriter(base, tamanho_lote=100, intervalo=60, fila_max=50)
+    for i in range(5):
+        escritor.registrar(f'termo {i}', None, i)
+    escritor.shutdown()
+
+    assert [len(lote) for lote in base.lotes] == [5]
+    assert not escritor.thread.is_alive()
+    assert not escritor.registrar('tarde demais', None, 0)
+
+
+def test_falha_da_base_faz_rollback():
+    """Um erro Oracle desfaz o lote sem afetar quem pesquisa"""
+    base = _BaseFalsa()
+    base.falhar = True
+    escritor = SearchAnalyticsWriter(base, tamanho_lote=2, intervalo=60, fila_max=10)
+    try:
+        escritor.registrar('a', None, 1)
+        escritor.registrar('b', None, 1)
+        assert _esperar(lambda: base.rollbacks == 1)
+        assert base.lotes == [] and escritor.get_stats()['gravados'] == 0
+    finally:
+        escritor.shutdown()
@@ -0,0 +1,120 @@
+"""
+TESTES DA CACHE DE RESULTADOS DE PESQUISA
+Chave normalizada, prefixos completos, consultas mais restritas filtradas
+de uma entrada mais ampla e invalidação por tabela
+"""
+
+from datetime import date, datetime
+
+from cache_manager import cache_manager
+from search_cache import SearchResultCache
+
+
+def _cache():
+    """Cache de resultados sobre um CacheManager vazio"""
+    cache_manager.clear()
+    return SearchResultCache(ttl=60)
+
+
+def _candidato(tipo, i, data_dt=None, data='19/10/2026'):
+    return {'tipo': tipo, 'id': i, 'titulo': f'{tipo} {i}', 'relevancia': 3,
+            'data': data, 'data_dt': data_dt}
+
+
+def test_chave_normalizada():
+    """Espaços e maiúsculas não criam entradas diferentes; acentos sim (como o LIKE)"""
+    assert SearchResultCache.chave('global', ' vodacom ') == SearchResultCache.chave('global', 'VODACOM')
+    assert SearchResultCache.chave('global', 'saude') != SearchResultCache.chave('global', 'saúde')
+    assert SearchResultCache.chave('global', 'x', 'campanha')[3] == 'CAMPANHA'
+
+
+def test_prefixo_so_responde_ate_onde_e_garantido():
+    """Um prefixo incompleto não responde a pedidos maiores; um conjunto completo sim"""
+    cache = _cache()
+    chave = SearchResultCache.chave('global', 'vodacom')
+    cache.guardar(chave, [_candidato('CAMPANHA', i) for i in range(10)], pedido=10)
+
+    assert [c['id'] for c in cache.obter(chave, 5)] == [0, 1, 2, 3, 4]
+    assert cache.obter(chave, 11) is None
+
+    cache.guardar(chave, [_candidato('CAMPANHA', i) for i in range(3)], pedido=10)
+    assert len(cache.obter(chave, 50)) == 3
+
+
+def test_devolve_copias():
+    """Alterar os candidatos devolvidos não altera a entrada"""
+    cache = _cache()
+    chave = SearchResultCache.chave('global', 'vodacom')
+    cache.guardar(chave, [_candidato('CAMPANHA', 1)], pedido=10)
+
+    cache.obter(chave, 10)[0]['relevancia'] = 99
+    assert cache.obter(chave, 10)[0]['relevancia'] == 3
+
+
+def test_consulta_por_tipo_filtra_entrada_ampla():
+    """tipo_filtro é respondido pela entrada sem tipo, pela mesma ordem"""
+    cache = _cache()
+    candidatos = [_candidato('CAMPANHA' if i % 2 else 'ANUNCIANTE', i) for i in range(8)]
+    cache.guardar(SearchResultCache.chave('global', 'vodacom'), candidatos, pedido=50)
+
+    filtrados = cache.obter(SearchResultCache.chave('global', 'vodacom', 'CAMPANHA'), 50)
+    assert [c['id'] for c in filtrados] == [1, 3, 5, 7]
+    assert cache.get_stats()['hits_filtrados'] == 1
+
+    # Outro modo não partilha entradas
+    assert cache.obter(SearchResultCache.chave('avancada', 'vodacom', 'CAMPANHA'), 50) is None
+
+
+def test_entrada_ampla_incompleta_nao_responde():
+    """Sem o conjunto completo, poucos filtrados não chegam para o pedido"""
+    cache = _cache()
+    candidatos = [_candidato('ANUNCIANTE', i) for i in range(9)] + [_candidato('CAMPANHA', 9)]
+    cache.guardar(SearchResultCache.chave('global', 'vodacom'), candidatos, pedido=10)
+
+    chave_tipo = SearchResultCache.chave('global', 'vodacom', 'CAMPANHA')
+    assert cache.obter(chave_tipo, 5) is None
+    assert [c['id'] for c in cache.obter(chave_tipo, 1)] == [9]
+
+
+def test_periodo_filtra_por_data_registro_dt():
+    """
+    O período usa DATA_REGISTRO_DT: tipos sem data (DATA_REGISTRO é SYSDATE
+    em texto) ficam de fora, como no Oracle
+    """
+    cache = _cache()
+    candidatos = [
+        _candidato('CAMPANHA', 1, datetime(2025, 3, 1, 10, 30), data='01/03/2025'),
+        _candidato('CAMPANHA', 2, date(2025, 1, 15), data='15/01/2025'),
+        _candidato('ANUNCIANTE', 3),  # sem data: 'data' é a data de hoje
+        _candidato('PECA_CRIATIVA', 4, date(2025, 3, 31), data='31/03/2025'),
+    ]
+    cache.guardar(SearchResultCache.chave('avancada', 'vodacom'), candidatos, pedido=50)
+
+    marco = cache.obter(SearchResultCache.chave('avancada', 'vodacom', None, '01/03/2025', '31/03/2025'), 50)
+    assert [c['id'] for c in marco] == [1, 4]
+
+    desde_2025 = cache.obter(SearchResultCache.chave('avancada', 'vodacom', None, date(2025, 1, 1)), 50)
+    assert [c['id'] for c in desde_2025] == [1, 2, 4]
+
+    campanhas_antes_de_fevereiro = cache.obter(
+        SearchResultCache.chave('avancada', 'vodacom', 'CAMPANHA', None, date(2025, 2, 1)), 50
+    )
+    assert [c['id'] for c in campanhas_antes_de_fevereiro] == [2]
+
+
+def test_invalidacao_por_tabela():
+    """Alterar uma tabela apaga as consultas que dependem dela e o ranking guardado"""
+    cache = _cache()
+    global_ = SearchResultCache.chave('global', 'vodacom')
+    campanhas = SearchResultCache.chave('global', 'vodacom', 'CAMPANHA')
+    anunciantes = SearchResultCache.chave('global', 'vodacom', 'ANUNCIANTE')
+    for chave in (global_, campanhas, anunciantes):
+        cache.guardar(chave, [_candidato('CAMPANHA', 1)], pedido=10)
+    cache.guardar_ranking(global_, [_candidato('CAMPANHA', 1)])
+
+    cache_manager.invalidate_tag('campanha_dados')
+
+    assert cache.obter(campanhas, 10) is None
+    assert cache.obter_ranking(global_) is None
+    assert cache.cache.get(global_) is None
+    assert cache.obter(anunciantes, 10) is not None
@@ -0,0 +1,368 @@
+"""
+TESTES DO MOTOR DE PESQUISA
+Pesquisa paralela por tabela, sem Oracle (os fluxos e as procedures são
+substituídos por listas em memória), contagens por faceta, paginação,
+filtro de datas, estatísticas e histórico de pesquisas recentes
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from cache_manager import cache_manager
+import pytest
+
+from config import SEARCH_CONFIG
+from logger_config import app_logger
+from search_cache import SearchResultCache
+from search_engine import SearchCache, SearchEngine
+from search_ranking import BM25Ranker
+
+
+def _linha(tipo, i, relevancia=3, titulo=None):
+    """Resultado de um fluxo (já convertido por _linha_para_resultado)"""
+    return {'tipo': tipo, 'id': i, 'titulo': titulo or f'{tipo} {i:03d}', 'subtitulo': '',
+            'data': None, 'relevancia': relevancia, 'texto': None, 'data_dt': None}
+
+
+def _motor_com_fluxos(fluxos, linhas_sequenciais=()):
+    """
+    SearchEngine sem Oracle
+
+    `fluxos` associa a procedure de cada tabela a uma função que devolve o
+    fluxo (pode esperar ou lançar exceções); SP_PESQUISA_GLOBAL lê de
+    `linhas_sequenciais`.
+    """
+    cache_manager.clear()
+    motor = SearchEngine.__new__(SearchEngine)
+    motor.logger = app_logger
+    motor.ranker = None
+    motor.cache_resultados = SearchResultCache()
+    motor.tipo_icons = {}
+    motor._executor = None
+    motor._executor_lock = threading.Lock()
+    motor.chamadas = []
+    motor.janelas = []
+
+    def pesquisar_fluxo(procedure, termo, limite, em_curso=None):
+        return fluxos.get(procedure, lambda: [])()[:limite]
+
+    def executar_procedure(procedure, parametros, limite, connection=None):
+        motor.chamadas.append(procedure)
+        motor.janelas.append((parametros[2], parametros[3]))
+        return list(linhas_sequenciais)[parametros[3]:parametros[3] + parametros[2]]
+
+    motor._pesquisar_fluxo = pesquisar_fluxo
+    motor._executar_procedure = executar_procedure
+    motor._registrar_pesquisa = lambda *args: None
+    return motor
+
+
+def test_empate_na_relevancia_maxima_espera_pelo_fluxo_pendente():
+    """Um fluxo lento de relevância máxima não perde o lugar para um fluxo rápido"""
+    def anunciantes():
+        time.sleep(0.1)
+        return [_linha('ANUNCIANTE', i) for i in range(5)]
+
+    motor = _motor_com_fluxos({
+        'SP_PESQUISA_ANUNCIANTES': anunciantes,
+        'SP_PESQUISA_CAMPANHAS': lambda: [_linha('CAMPANHA', i) for i in range(5)],
+    })
+
+    resultados = motor._pesquisa_paralela('vodacom', 5)
+    assert [(r['tipo'], r['id']) for r in resultados] == [('ANUNCIANTE', i) for i in range(5)]
+
+
+def test_termina_antes_quando_nenhum_fluxo_pendente_pode_superar():
+    """Com `pedido` linhas à frente de tudo o que falta, não espera pelos outros fluxos"""
+    libertar = threading.Event()
+
+    def bloqueado():
+        libertar.wait(5)
+        return [_linha('CAMPANHA', 0)]
+
+    motor = _motor_com_fluxos({
+        'SP_PESQUISA_ANUNCIANTES': lambda: [_linha('ANUNCIANTE', i) for i in range(5)],
+        'SP_PESQUISA_CAMPANHAS': bloqueado,
+    })
+    try:
+        inicio = time.monotonic()
+        resultados = motor._pesquisa_paralela('vodacom', 3)
+        assert time.monotonic() - inicio < 1
+        assert [r['id'] for r in resultados] == [0, 1, 2]
+    finally:
+        libertar.set()
+
+
+def test_relevancia_abaixo_do_maximo_espera_pelos_fluxos():
+    """Linhas abaixo da relevância máxima só são certas com todos os fluxos concluídos"""
+    def campanhas():
+        time.sleep(0.05)
+        return [_linha('CAMPANHA', 0, relevancia=2)]
+
+    motor = _motor_com_fluxos({
+        'SP_PESQUISA_ANUNCIANTES': lambda: [_linha('ANUNCIANTE', i, relevancia=1) for i in range(3)],
+        'SP_PESQUISA_CAMPANHAS': campanhas,
+    })
+
+    resultados = motor._pesquisa_paralela('vodacom', 3)
+    assert [(r['tipo'], r['id']) for r in resultados] == [('CAMPANHA', 0), ('ANUNCIANTE', 0), ('ANUNCIANTE', 1)]
+
+
+def test_fluxo_com_erro_nao_fica_em_cache():
+    """Sem um dos fluxos, a junção parcial é descartada e repetida numa só chamada"""
+    def falha():
+        raise RuntimeError("ORA-03113")
+
+    completas = [('ANUNCIANTE', 1, 'Vodacom', '', None, 3, None, None),
+                 ('CAMPANHA', 7, 'Vodacom 5G', '', None, 3, None, None)]
+    motor = _motor_com_fluxos({
+        'SP_PESQUISA_ANUNCIANTES': lambda: [_linha('ANUNCIANTE', 1, titulo='Vodacom')],
+        'SP_PESQUISA_CAMPANHAS': falha,
+    }, linhas_sequenciais=completas)
+
+    assert motor._pesquisa_paralela('vodacom', 10) is None
+
+    success, resultados = motor.pesquisa_global('vodacom', limite=10, paralelo=True)
+    assert success
+    assert [(r['tipo'], r['id']) for r in resultados] == [('ANUNCIANTE', 1), ('CAMPANHA', 7)]
+    assert motor.chamadas == ['SP_PESQUISA_GLOBAL']
+
+    chave = SearchResultCache.chave('global', 'vodacom', None)
+    assert [r['id'] for r in motor.cache_resultados.obter(chave, 10)] == [1, 7]
+
+
+def _linhas_facetas():
+    """Cursor de SP_PESQUISA_GLOBAL_FACETAS: página primeiro, facetas depois"""
+    return [
+        ('CAMPANHA', 7, 'Vodacom 5G', 'Ativa', '01/03/2025', 3, 'texto', None, None, None, 1,
+         datetime(2025, 3, 1)),
+        ('ANUNCIANTE', 1, 'Vodacom', 'Grande', '19/10/2026', 3, 'texto', None, None, None, 2, None),
+        (None,) * 7 + ('TIPO', 'CAMPANHA', 4, None, None),
+        (None,) * 7 + ('TIPO', 'ANUNCIANTE', 1, None, None),
+        (None,) * 7 + ('ESTADO', 'ATIVA', 3, None, None),
+        (None,) * 7 + ('ESTADO', 'CONCLUIDA', 1, None, None),
+        (None,) * 7 + ('PERIODO', 'ULTIMO_ANO', 4, None, None),
+        (None,) * 7 + ('PERIODO', 'SEM_DATA', 1, None, None),
+    ]
+
+
+def test_facetas_no_mesmo_cursor_da_pagina():
+    """Página e contagens vêm de uma só chamada; a data real vem de DATA_REGISTRO_DT"""
+    motor = _motor_com_fluxos({}, linhas_sequenciais=_linhas_facetas())
+
+    success, dados = motor.pesquisa_facetada('vodacom')
+    assert success
+    assert [(r['tipo'], r['id']) for r in dados['resultados']] == [('CAMPANHA', 7), ('ANUNCIANTE', 1)]
+    assert dados['resultados'][0]['data_dt'] == datetime(2025, 3, 1)
+    assert dados['resultados'][1]['data_dt'] is None
+    assert dados['facetas'] == {
+        'tipo': {'CAMPANHA': 4, 'ANUNCIANTE': 1},
+        'estado': {'ATIVA': 3, 'CONCLUIDA': 1},
+        'periodo': {'ULTIMO_ANO': 4, 'SEM_DATA': 1},
+    }
+    assert motor.chamadas == ['SP_PESQUISA_GLOBAL_FACETAS']
+
+
+def test_facetas_repetidas_saem_da_cache():
+    """A mesma pesquisa facetada e a pesquisa global do termo não voltam ao Oracle"""
+    motor = _motor_com_fluxos({}, linhas_sequenciais=_linhas_facetas())
+    motor.pesquisa_facetada('vodacom')
+
+    success, dados = motor.pesquisa_facetada(' VODACOM ')
+    assert success and dados['facetas']['tipo'] == {'CAMPANHA': 4, 'ANUNCIANTE': 1}
+    success, resultados = motor.pesquisa_global('vodacom', paralelo=False)
+    assert success and [r['id'] for r in resultados] == [7, 1]
+    assert motor.chamadas == ['SP_PESQUISA_GLOBAL_FACETAS']
+
+
+def _linhas_oracle(n):
+    """Linhas de SP_PESQUISA_GLOBAL já pela ordem do pré-ranking do Oracle"""
+    linhas = []
+    for i in range(n):
+        # Relevâncias do Oracle que não coincidem com a ordem BM25
+        titulo = f"Vodacom {'vodacom ' * (i % 4)}registo {i:03d}"
+        linhas.append(('CAMPANHA', i, titulo, f'sub {i}', '01/01/2025', 3 - i % 3,
+                       f'{titulo} texto {"rede " * (i % 5)}', datetime(2025, 1, 1) + timedelta(days=i % 90)))
+    linhas.sort(key=lambda linha: (-linha[5], linha[0], linha[2], linha[1]))
+    return linhas
+
+
+def _todas_as_paginas(motor, tamanho):
+    """IDs de todas as páginas da pesquisa global, pela ordem apresentada"""
+    ids, offset = [], 0
+    while True:
+        success, pagina = motor.pesquisa_global('vodacom', limite=tamanho, offset=offset, paralelo=False)
+        assert success
+        ids.extend(r['id'] for r in pagina)
+        if len(pagina) < tamanho:
+            return ids
+        offset += tamanho
+
+
+def test_paginacao_alcanca_resultados_depois_da_janela(monkeypatch):
+    """A janela sai ordenada pelo BM25; depois dela as páginas seguem a ordem do Oracle"""
+    monkeypatch.setitem(SEARCH_CONFIG, 'ranking_candidatos_max', 50)
+    linhas = _linhas_oracle(130)
+    janela = BM25Ranker().ordenar('vodacom', [
+        {'id': l[1], 'titulo': l[2], 'subtitulo': l[3], 'texto': l[6], 'data_dt': l[7]} for l in linhas[:50]
+    ])
+
+    motor = _motor_com_fluxos({}, linhas_sequenciais=linhas)
+    motor.ranker = BM25Ranker()
+    ids = _todas_as_paginas(motor, 20)
+
+    assert len(ids) == len(set(ids)) == 130
+    assert ids == [r['id'] for r in janela] + [l[1] for l in linhas[50:]]
+
+
+def test_paginacao_so_pede_ao_oracle_o_necessario(monkeypatch):
+    """A primeira página pede só a janela; as seguintes à janela, só a página"""
+    monkeypatch.setitem(SEARCH_CONFIG, 'ranking_candidatos_max', 50)
+    motor = _motor_com_fluxos({}, linhas_sequenciais=_linhas_oracle(130))
+    motor.ranker = BM25Ranker()
+
+    for offset in (0, 20):
+        motor.pesquisa_global('vodacom', limite=20, offset=offset, paralelo=False)
+    assert motor.janelas == [(50, 0)]
+
+    success, pagina = motor.pesquisa_global('vodacom', limite=20, offset=40, paralelo=False)
+    assert success and len(pagina) == 20
+    assert all('texto' not in r for r in pagina)
+    motor.pesquisa_global('vodacom', limite=20, offset=100, paralelo=False)
+    assert motor.janelas == [(50, 0), (10, 50), (20, 100)]
+
+
+def test_janela_incompleta_nao_volta_ao_oracle(monkeypatch):
+    """Com menos correspondências do que a janela, a lista ordenada já é tudo"""
+    monkeypatch.setitem(SEARCH_CONFIG, 'ranking_candidatos_max', 50)
+    motor = _motor_com_fluxos({}, linhas_sequenciais=_linhas_oracle(30))
+    motor.ranker = BM25Ranker()
+
+    assert len(_todas_as_paginas(motor, 20)) == 30
+    assert motor.janelas == [(50, 0)]
+
+
+def test_converter_data():
+    """date, datetime ou 'DD/MM/AAAA'; vazio é sem filtro e texto inválido é erro"""
+    assert SearchEngine.converter_data('05/03/2025') == date(2025, 3, 5)
+    assert SearchEngine.converter_data(datetime(2025, 3, 5, 23, 59)) == date(2025, 3, 5)
+    assert SearchEngine.converter_data(' ') is None
+    assert SearchEngine.converter_data(None) is None
+    with pytest.raises(ValueError):
+        SearchEngine.converter_data('31/02/2025')
+
+
+def test_pesquisa_avancada_passa_datas_ao_oracle():
+    """As datas chegam à procedure como DATE (sem hora), pela ordem certa"""
+    motor = _motor_com_fluxos({})
+    parametros = []
+
+    def executar_procedure(procedure, params, limite, connection=None):
+        parametros.append((procedure, params))
+        return [('CAMPANHA', 7, 'Vodacom 5G', '', '01/03/2025', 2, 'texto', datetime(2025, 3, 1))]
+
+    motor._executar_procedure = executar_procedure
+
+    success, resultados = motor.pesquisa_avancada('vodacom', 'CAMPANHA', '31/03/2025', datetime(2025, 3, 1, 15, 0))
+    assert success and resultados[0]['score'] == 2
+    assert parametros == [('SP_PESQUISA_AVANCADA',
+                           ['vodacom', 'CAMPANHA', date(2025, 3, 1), date(2025, 3, 31), 50, 0])]
+
+
+def test_intervalo_periodo_segue_os_escaloes_das_facetas():
+    """Cada escalão da faceta 'periodo' dá um intervalo contíguo, sem sobreposição"""
+    hoje = date(2025, 6, 15)
+    assert SearchEngine.intervalo_periodo('ULTIMOS_30_DIAS', hoje) == (date(2025, 5, 16), None)
+    assert SearchEngine.intervalo_periodo('ULTIMOS_90_DIAS', hoje) == (date(2025, 3, 17), date(2025, 5, 15))
+    assert SearchEngine.intervalo_periodo('ULTIMO_ANO', hoje) == (date(2024, 6, 15), date(2025, 3, 16))
+    assert SearchEngine.intervalo_periodo('MAIS_ANTIGO', hoje) == (None, date(2024, 6, 14))
+    assert SearchEngine.intervalo_periodo('SEM_DATA', hoje) == (None, None)
+
+
+class _BaseEstatisticas:
+    """execute_query que falha (False) nos objetos em falta, como o OracleDatabase"""
+
+    def __init__(self, em_falta):
+        self.em_falta = set(em_falta)
+        self.consultas = []
+
+    def execute_query(self, query, params=None):
+        objeto = query.split('FROM ')[1].split()[0]
+        self.consultas.append(objeto)
+        if objeto in self.em_falta:
+            return False
+        if objeto == 'V_TOP_PESQUISAS':
+            return ['TERMO'], [('vodacom', 12, 4.5, None)]
+        return ['TIPO_REGISTRO'], [('CAMPANHA', 40, None, None), ('ANUNCIANTE', 2, None, None)]
+
+
+def _motor_estatisticas(base):
+    motor = SearchEngine.__new__(SearchEngine)
+    motor.logger = app_logger
+    motor.db = base
+    motor.tipo_icons = {}
+    motor._mv_estatisticas = True
+    return motor
+
+
+def test_estatisticas_sem_a_mv_vao_direto_a_view():
+    """Depois de a MV falhar com a base a responder, não se volta a tentar"""
+    base = _BaseEstatisticas({'MV_STATS_PESQUISA'})
+    motor = _motor_estatisticas(base)
+
+    for _ in range(3):
+        stats = motor.obter_estatisticas()
+        assert stats['total_registros'] == 42
+        assert stats['top_pesquisas'][0]['termo'] == 'vodacom'
+
+    assert base.consultas == ['MV_STATS_PESQUISA', 'V_STATS_PESQUISA', 'V_TOP_PESQUISAS'] + \
+        ['V_STATS_PESQUISA', 'V_TOP_PESQUISAS'] * 2
+
+
+def test_estatisticas_com_a_base_em_baixo_voltam_a_tentar_a_mv():
+    """Uma falha de ambas as consultas não é tomada como falta da MV"""
+    base = _BaseEstatisticas({'MV_STATS_PESQUISA', 'V_STATS_PESQUISA'})
+    motor = _motor_estatisticas(base)
+    assert motor.obter_estatisticas() == {}
+
+    base.em_falta.clear()
+    assert motor.obter_estatisticas()['total_registros'] == 42
+    assert base.consultas[2:] == ['MV_STATS_PESQUISA', 'V_TOP_PESQUISAS']
+
+
+def test_historico_move_para_o_inicio():
+    """Repetir um termo move-o para o início sem duplicar; o mais antigo sai"""
+    historico = SearchCache(max_size=3)
+    for termo in ('vodacom', 'tmcel', 'movitel'):
+        historico.adicionar(termo, 1)
+    historico.adicionar('vodacom', 7)
+    historico.adicionar('mcel', 2)
+
+    recentes = historico.obter_recentes()
+    assert [item['termo'] for item in recentes] == ['mcel', 'vodacom', 'movitel']
+    assert recentes[1]['count'] == 7
+
+
+def test_historico_persistido_por_utilizador():
+    """O histórico é gravado em background e relido por uma nova instância"""
+    with tempfile.TemporaryDirectory() as pasta:
+        historico = SearchCache(usuario='ana/maria', diretorio=pasta, intervalo=0.01)
+        historico.adicionar('vodacom', 3)
+        historico.adicionar('tmcel', 1)
+        historico.fechar()
+
+        ficheiro = os.path.join(pasta, 'historico_ana_maria.json')
+        with open(ficheiro, encoding='utf-8') as f:
+            assert [item['termo'] for item in json.load(f)] == ['tmcel', 'vodacom']
+
+        relido = SearchCache(usuario='ana/maria', diretorio=pasta, intervalo=0.01)
+        try:
+            assert [(item['termo'], item['count']) for item in relido.obter_recentes()] == [
+                ('tmcel', 1), ('vodacom', 3)
+            ]
+        finally:
+            relido.fechar()
@@ -0,0 +1,206 @@
+"""
+TESTES DA EXPORTAÇÃO DE PESQUISAS
+Escritores CSV, JSONL e XLSX, ficheiro temporário, cancelamento e
+exportação pela ordem da vista de resultados
+"""
+
+import csv
+import json
+import os
+import re
+import tempfile
+import threading
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+import search_export
+from search_export import EscritorXLSX, ExportacaoCancelada, ExportacaoPesquisa, exportar, iterar_paginas
+
+RESULTADOS = [
+    {'tipo': 'CAMPANHA', 'id': 12, 'titulo': 'Vodacom 5G', 'subtitulo': 'Nacional',
+     'data': date(2025, 3, 1), 'relevancia': 2.5, 'icon': '📢'},
+    {'tipo': 'ANUNCIANTE', 'id': 400123456, 'titulo': 'Sal & Pimenta <Lda>', 'subtitulo': None,
+     'data': datetime(2024, 12, 31, 18, 30), 'relevancia': Decimal('1.25')},
+    {'tipo': 'ESPACO', 'id': 3, 'titulo': 'Outdoor\x01 Maputo', 'subtitulo': 'Av. 24 de Julho',
+     'data': None, 'relevancia': 1},
+]
+
+
+def _exportar(pasta, formato, resultados=RESULTADOS, **kwargs):
+    """Exporta para `pasta` e devolve (ficheiro, total)"""
+    ficheiro = os.path.join(pasta, f'pesquisa.{formato}')
+    return ficheiro, exportar(resultados, ficheiro, **kwargs)
+
+
+def test_exportar_csv():
+    """CSV com BOM, cabeçalho fixo, None vazio e só os campos do esquema"""
+    with tempfile.TemporaryDirectory() as pasta:
+        ficheiro, total = _exportar(pasta, 'csv')
+
+        assert total == 3
+        assert os.listdir(pasta) == ['pesquisa.csv']
+        with open(ficheiro, 'rb') as f:
+            assert f.read(3) == b'\xef\xbb\xbf'
+        with open(ficheiro, encoding='utf-8-sig', newline='') as f:
+            linhas = list(csv.reader(f))
+
+    assert linhas[0] == ['Tipo', 'ID', 'Título', 'Subtítulo', 'Data', 'Relevância']
+    assert linhas[1] == ['CAMPANHA', '12', 'Vodacom 5G', 'Nacional', '2025-03-01', '2.5']
+    assert linhas[2][2:4] == ['Sal & Pimenta <Lda>', '']
+    assert len(linhas) == 4
+
+
+def test_exportar_jsonl():
+    """Um objeto por linha; datas em ISO e decimais como número"""
+    with tempfile.TemporaryDirectory() as pasta:
+        ficheiro, total = _exportar(pasta, 'jsonl')
+        with open(ficheiro, encoding='utf-8') as f:
+            objetos = [json.loads(linha) for linha in f]
+
+    assert total == len(objetos) == 3
+    assert objetos[0] == {'tipo': 'CAMPANHA', 'id': 12, 'titulo': 'Vodacom 5G', 'subtitulo': 'Nacional',
+                          'data': '2025-03-01', 'relevancia': 2.5}
+    assert objetos[1]['data'] == '2024-12-31T18:30:00'
+    assert objetos[1]['relevancia'] == 1.25
+    assert objetos[2]['data'] is None
+
+
+def test_exportar_xlsx():
+    """XLSX válido: partes obrigatórias, números como <v>, texto escapado"""
+    with tempfile.TemporaryDirectory() as pasta:
+        ficheiro, total = _exportar(pasta, 'xlsx')
+        with zipfile.ZipFile(ficheiro) as z:
+            assert z.testzip() is None
+            nomes = set(z.namelist())
+            folha = z.read('xl/worksheets/sheet1.xml').decode('utf-8')
+
+    assert total == 3
+    assert {'[Content_Types].xml', '_rels/.rels', 'xl/workbook.xml',
+            'xl/_rels/workbook.xml.rels', 'xl/worksheets/sheet1.xml'} <= nomes
+
+    assert len(re.findall(r'<row r="\d+">', folha)) == 4
+    assert '<c r="B2"><v>12</v></c>' in folha
+    assert '<c r="F3"><v>1.25</v></c>' in folha
+    assert 'Sal &amp; Pimenta &lt;Lda&gt;' in folha
+    assert '31/12/2024 18:30' in folha and '01/03/2025' in folha
+    assert 'Outdoor Maputo' in folha and '\x01' not in folha
+    assert '<c r="D3"' not in folha  # subtítulo vazio não gera célula
+
+
+def test_exportar_xlsx_varias_folhas():
+    """Acima do limite de linhas abre-se nova folha com cabeçalho"""
+    limite_original = EscritorXLSX.MAX_LINHAS_FOLHA
+    EscritorXLSX.MAX_LINHAS_FOLHA = 3
+    try:
+        with tempfile.TemporaryDirectory() as pasta:
+            resultados = [dict(RESULTADOS[0], id=i) for i in range(5)]
+            ficheiro, total = _exportar(pasta, 'xlsx', resultados)
+            with zipfile.ZipFile(ficheiro) as z:
+                folhas = sorted(n for n in z.namelist() if n.startswith('xl/worksheets/'))
+                livro = z.read('xl/workbook.xml').decode('utf-8')
+                contagens = [len(re.findall(r'<row ', z.read(n).decode('utf-8'))) for n in folhas]
+    finally:
+        EscritorXLSX.MAX_LINHAS_FOLHA = limite_original
+
+    assert total == 5
+    assert folhas == ['xl/worksheets/sheet1.xml', 'xl/worksheets/sheet2.xml', 'xl/worksheets/sheet3.xml']
+    assert contagens == [3, 3, 2]  # cabeçalho + 2 linhas por folha
+    assert 'name="Pesquisa 3"' in livro
+
+
+def test_exportar_progresso_e_iterador():
+    """Aceita qualquer iterável e chama o progresso no intervalo e no fim"""
+    chamadas = []
+    resultados = (dict(RESULTADOS[0], id=i) for i in range(7))
+    with tempfile.TemporaryDirectory() as pasta:
+        _, total = _exportar(pasta, 'jsonl', resultados, progresso=chamadas.append, intervalo_progresso=3)
+
+    assert total == 7
+    assert chamadas == [3, 6, 7]
+
+
+def test_exportar_cancelada_nao_deixa_ficheiros():
+    """Cancelar a meio apaga o temporário e não toca no destino"""
+    cancelar = threading.Event()
+
+    def resultados():
+        for i in range(100):
+            if i == 10:
+                cancelar.set()
+            yield dict(RESULTADOS[0], id=i)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        ficheiro = os.path.join(pasta, 'pesquisa.csv')
+        with open(ficheiro, 'w') as f:
+            f.write('anterior')
+
+        with pytest.raises(ExportacaoCancelada):
+            exportar(resultados(), ficheiro, cancelar=cancelar)
+
+        assert os.listdir(pasta) == ['pesquisa.csv']
+        with open(ficheiro) as f:
+            assert f.read() == 'anterior'
+
+
+def test_exportar_formato_invalido():
+    """Formato desconhecido é rejeitado antes de criar ficheiros"""
+    with tempfile.TemporaryDirectory() as pasta:
+        with pytest.raises(ValueError, match='pdf'):
+            exportar(RESULTADOS, os.path.join(pasta, 'pesquisa.pdf'))
+        assert os.listdir(pasta) == []
+    assert set(search_export.ESCRITORES) == {'csv', 'jsonl', 'xlsx'}
+
+
+def _carregar_pagina(total, pedidos, falhar_em=None):
+    """carregar_pagina da vista sobre `total` resultados numerados"""
+    def carregar(offset, limite):
+        pedidos.append((offset, limite))
+        if offset == falhar_em:
+            return False, []
+        return True, [dict(RESULTADOS[0], id=i) for i in range(offset, min(offset + limite, total))]
+    return carregar
+
+
+def test_iterar_paginas_continua_depois_dos_carregados():
+    """Primeiro os resultados já mostrados, depois as páginas seguintes do motor"""
+    pedidos = []
+    carregados = [dict(RESULTADOS[0], id=i) for i in range(20)]
+
+    ids = [r['id'] for r in iterar_paginas(_carregar_pagina(57, pedidos), carregados, tamanho_pagina=15)]
+
+    assert ids == list(range(57))
+    assert pedidos == [(20, 15), (35, 15), (50, 15)]
+
+
+def test_iterar_paginas_sem_paginas_seguintes():
+    """Uma pesquisa aproximada (sem páginas no Oracle) exporta o que foi mostrado"""
+    pedidos = []
+    fuzzy = [dict(RESULTADOS[1], id=i) for i in range(3)]
+
+    def carregar(offset, limite):
+        pedidos.append(offset)
+        return True, []
+
+    assert [r['id'] for r in iterar_paginas(carregar, fuzzy)] == [0, 1, 2]
+    assert pedidos == [3]
+
+
+def test_exportacao_com_erro_termina_sem_relancar():
+    """Uma página que falha é registada uma vez e comunicada a concluido"""
+    concluidos = []
+    with tempfile.TemporaryDirectory() as pasta:
+        ficheiro = os.path.join(pasta, 'pesquisa.csv')
+        exportacao = ExportacaoPesquisa(
+            iterar_paginas(_carregar_pagina(100, [], falhar_em=20), tamanho_pagina=10),
+            ficheiro,
+            concluido=lambda sucesso, detalhe: concluidos.append((sucesso, detalhe))
+        )
+
+        assert exportacao._executar() == 0
+        assert os.listdir(pasta) == []
+
+    assert len(concluidos) == 1
+    assert concluidos[0][0] is False and 'offset 20' in str(concluidos[0][1])
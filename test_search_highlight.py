@@ -0,0 +1,61 @@
+"""
+TESTES DO DESTAQUE DE TERMOS
+Intervalos no texto original sem acentos nem maiúsculas, vários termos
+numa passagem e reutilização do autómato por consulta
+"""
+
+from search_engine import SearchEngine
+from search_highlight import aplicar_destaque, obter_destacador
+
+
+def test_intervalos_sem_acentos_nem_maiusculas():
+    """'saude publica' encontra 'Saúde Pública' nas posições do texto original"""
+    texto = 'Campanha de Saúde Pública em Maputo'
+    intervalos = obter_destacador('saude publica').destacar(texto)
+
+    assert intervalos == [(12, 17), (18, 25)]
+    assert [texto[a:b] for a, b in intervalos] == ['Saúde', 'Pública']
+
+
+def test_acentos_na_consulta():
+    """A consulta também é normalizada: 'Peça' encontra 'PECA'"""
+    assert obter_destacador('Peça').destacar('PECA criativa') == [(0, 4)]
+
+
+def test_normalizacao_que_muda_o_comprimento():
+    """Caracteres que normalizam em vários continuam a apontar para o original"""
+    texto = 'Große Straße'
+    intervalos = obter_destacador('strasse').destacar(texto)
+    assert [texto[a:b] for a, b in intervalos] == ['Straße']
+
+
+def test_varios_termos_numa_passagem():
+    """Termos sobrepostos ou contíguos dão um só intervalo"""
+    destacador = obter_destacador('vodacom voda rede')
+    texto = 'A Vodacom e a rede móvel Vodacom'
+
+    assert destacador.destacar(texto) == [(2, 9), (14, 18), (25, 32)]
+    assert obter_destacador('ab bc').destacar('xabcx') == [(1, 4)]
+    assert obter_destacador('xyz').destacar(texto) == []
+    assert destacador.destacar('') == []
+
+
+def test_automato_reutilizado_por_consulta():
+    """A mesma consulta (em qualquer ordem ou caixa) reutiliza o autómato"""
+    assert obter_destacador('rede Vodacom') is obter_destacador('VODACOM rede rede')
+
+
+def test_aplicar_destaque():
+    """Marcadores nos intervalos, para saída em texto"""
+    texto = 'Saúde Pública'
+    intervalos = obter_destacador('publica').destacar(texto)
+    assert aplicar_destaque(texto, intervalos) == 'Saúde <<Pública>>'
+    assert aplicar_destaque(texto, intervalos, '[', ']') == 'Saúde [Pública]'
+
+
+def test_highlight_termo_do_motor():
+    """highlight_termo devolve os intervalos (texto ou termo vazios: nenhum)"""
+    motor = SearchEngine.__new__(SearchEngine)
+    assert motor.highlight_termo('Rádio Moçambique', 'mocambique radio') == [(0, 5), (6, 16)]
+    assert motor.highlight_termo('', 'radio') == []
+    assert motor.highlight_termo('Rádio', '') == []
@@ -0,0 +1,63 @@
+"""
+TESTES DO ÍNDICE LOCAL DE PESQUISA
+Distância de edição limitada e filtro de n-gramas (lema dos q-gramas) da
+pesquisa aproximada
+"""
+
+from search_index import LocalSearchIndex, distancia_limitada
+
+
+def test_distancia_limitada():
+    """Levenshtein com corte: None acima do limite"""
+    assert distancia_limitada('VODACOM', 'VODACOM', 2) == 0
+    assert distancia_limitada('VODACOM', 'VODAKOM', 2) == 1
+    assert distancia_limitada('VODACOM', 'VDACON', 2) == 2
+    assert distancia_limitada('VODACOM', 'VDAKON', 2) is None
+    assert distancia_limitada('CASA', 'CASAMENTO', 3) is None
+    assert distancia_limitada('', 'AB', 2) == 2
+    assert distancia_limitada('ABC', 'CBA', 1) is None
+
+
+def _indice(*titulos):
+    indice = LocalSearchIndex()
+    for i, titulo in enumerate(titulos):
+        indice.adicionar_documento({'tipo': 'CAMPANHA', 'id': i, 'titulo': titulo})
+    return indice
+
+
+def test_filtro_ngramas_encontra_vizinhos():
+    """Termos a distância <= k passam o filtro dos q-gramas"""
+    indice = _indice('Vodacom', 'Movitel', 'Tmcel')
+
+    assert indice.expandir_termo('VODAKOM', 1) == {'VODACOM': 1.0}
+    assert indice.expandir_termo('MOVITEL', 1) == {'MOVITEL': 0.0}
+    assert indice.expandir_termo('XPTO', 1) == {}
+
+
+def test_filtro_ngramas_conta_repeticoes():
+    """N-gramas repetidos contam com repetição (AAAAAA está a 1 de AAAAAB)"""
+    indice = _indice('aaaaaa', 'abababab')
+
+    assert indice.expandir_termo('AAAAAB', 1) == {'AAAAAA': 1.0}
+    assert indice.expandir_termo('ABABABAA', 1) == {'ABABABAB': 1.0}
+
+
+def test_filtro_ngramas_igual_a_busca_exaustiva():
+    """O filtro nunca descarta um termo que a distância aceitaria"""
+    termos = ['AAAAAA', 'AAAABA', 'BANANA', 'ANANAS', 'CAMPANHA', 'CAMPANHAS', 'CAMPAINHA', 'PANHA', 'ABAB']
+    indice = _indice(*termos)
+
+    for consulta in ('AAAAAB', 'BANAN', 'CAMPANH', 'ANANA', 'ABBA', 'CAMPINHA'):
+        for k in (1, 2):
+            encontrados = set(indice.expandir_termo(consulta, k))
+            exaustiva = {t for t in termos if distancia_limitada(consulta, t, k) is not None}
+            assert encontrados >= exaustiva, (consulta, k, exaustiva - encontrados)
+
+
+def test_remover_documento_limpa_ngramas():
+    """Remover o último documento de um termo tira-o do filtro"""
+    indice = _indice('Vodacom')
+    indice.remover_documento('CAMPANHA', '0')
+
+    assert indice.expandir_termo('VODAKOM', 1) == {}
+    assert not indice.ngramas
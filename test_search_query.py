@@ -0,0 +1,88 @@
+"""
+TESTES DA LINGUAGEM DE PESQUISA ESTRUTURADA
+Interpretação de campos, tipos e frases, mensagens de erro e SQL com binds
+"""
+
+from datetime import date
+
+from search_query import ErroConsulta, compilar_sql, e_consulta_estruturada, interpretar_consulta
+
+
+def _erro_consulta(texto):
+    """Mensagem de ErroConsulta da consulta (None se for válida)"""
+    try:
+        interpretar_consulta(texto).tipos_aplicaveis()
+    except ErroConsulta as e:
+        return str(e)
+    return None
+
+
+def test_deteta_consulta_estruturada():
+    """Campos conhecidos e aspas ativam a sintaxe; texto simples não"""
+    assert e_consulta_estruturada('tipo:campanha')
+    assert e_consulta_estruturada('orcamento>100000')
+    assert e_consulta_estruturada('"vodacom 5g"')
+    assert not e_consulta_estruturada('vodacom 5g')
+    assert not e_consulta_estruturada('http://exemplo')
+    assert not e_consulta_estruturada('')
+
+
+def test_interpreta_tipos_filtros_e_texto():
+    """Separa tipos, filtros SQL, palavras, frases e título"""
+    consulta = interpretar_consulta('tipo:campanhas orc>=1000,5 titulo:"5G" "rede movel" vodacom')
+
+    assert consulta.tipos == {'CAMPANHA'}
+    assert consulta.palavras == ['vodacom']
+    assert consulta.frases == ['rede movel']
+    assert consulta.titulo == ['5G']
+    assert len(consulta.filtros) == 1
+    filtro = consulta.filtros[0]
+    assert (filtro.campo, filtro.operador, filtro.valor) == ('ORCAMENTO', '>=', 1000.5)
+    assert consulta.texto_indice() == 'vodacom rede movel 5G'
+
+
+def test_campos_escolhem_os_tipos():
+    """Sem tipo:, só ficam os tipos onde todos os campos existem"""
+    assert interpretar_consulta('orcamento>100').tipos_aplicaveis() == ['CAMPANHA']
+    assert interpretar_consulta('preco<500').tipos_aplicaveis() == ['ESPACO', 'PAGAMENTO']
+
+
+def test_erros_de_consulta():
+    """Erros de sintaxe têm mensagem apresentável ao utilizador"""
+    assert _erro_consulta('orcamento>abc') == 'Valor numérico inválido em orcamento: abc'
+    assert 'Data inválida em inicio' in _erro_consulta('inicio>=31-12-2025')
+    assert _erro_consulta('tipo:foguete') == 'Tipo desconhecido: foguete'
+    assert _erro_consulta('tipo:anunciante orcamento>1') == "Campo 'orcamento' não existe em ANUNCIANTE"
+    assert _erro_consulta('porte>grande') == 'Use porte:valor'
+    assert 'Estado inválido' in _erro_consulta('estado:parada')
+    assert _erro_consulta('orcamento>100 avaliacao>3') == 'Nenhum tipo de registro tem todos os campos da pesquisa'
+    assert _erro_consulta('tipo:campanha vodacom') is None
+
+
+def test_compila_sql_com_binds():
+    """Valores vão sempre em binds; colunas e operadores vêm das tabelas"""
+    consulta = interpretar_consulta("tipo:campanha orcamento>100000 titulo^vo%d inicio=2025-03-01 estado:ativa")
+    sql, binds = compilar_sql(consulta, 'CAMPANHA', 50, ids=[7, 9])
+
+    assert sql.startswith('SELECT Cod_camp FROM Campanha_Dados WHERE ')
+    assert 'Orc_alocado > :b1' in sql
+    assert 'UPPER(Titulo) LIKE :b2' in sql
+    assert 'Data_inicio >= :b3 AND Data_inicio < :b3 + 1' in sql
+    assert 'Data_termino >= TRUNC(SYSDATE)' in sql
+    assert 'Cod_camp IN (:i1, :i2)' in sql
+    assert sql.endswith('FETCH FIRST :limite ROWS ONLY')
+    assert "'" not in sql.split('WHERE')[1].replace("TRUNC(SYSDATE)", '')
+
+    assert binds['b1'] == 100000.0
+    assert binds['b2'] == 'VOD%'
+    assert binds['b3'].date() == date(2025, 3, 1)
+    assert (binds['i1'], binds['i2'], binds['limite']) == (7, 9, 50)
+    assert 'b4' not in binds
+
+
+def test_compila_texto_sem_acentos():
+    """Igualdade de texto compara sem acentos nos dois lados"""
+    sql, binds = compilar_sql(interpretar_consulta('categoria:"Telecomunicações"'), 'ANUNCIANTE', 10)
+
+    assert "TRANSLATE(UPPER(Cat_negocio)" in sql
+    assert binds['b1'] == 'TELECOMUNICACOES'
@@ -0,0 +1,74 @@
+"""
+TESTES DO RANKING BM25F
+Pesos por campo, IDF e recência a partir de DATA_REGISTRO_DT
+"""
+
+from datetime import date, datetime, timedelta
+
+from search_ranking import BM25Ranker, normalizar_texto, tokenizar
+
+HOJE = date(2025, 6, 1)
+
+
+def test_tokenizar_sem_acentos():
+    """Termos em maiúsculas e sem acentos"""
+    assert normalizar_texto('Saúde Pública') == 'SAUDE PUBLICA'
+    assert tokenizar('Peça-criativa: Maputo, 2025!') == ['PECA', 'CRIATIVA', 'MAPUTO', '2025']
+    assert tokenizar(None) == []
+
+
+def test_titulo_pesa_mais_que_texto():
+    """O termo no título vale mais do que no texto pesquisável"""
+    ranker = BM25Ranker(peso_recencia=0)
+    resultados = ranker.ordenar('vodacom', [
+        {'id': 1, 'titulo': 'Campanha de verão', 'texto': 'patrocinada pela vodacom'},
+        {'id': 2, 'titulo': 'Vodacom 5G', 'texto': 'rede nacional'},
+        {'id': 3, 'titulo': 'Sem relação', 'texto': 'outra marca'},
+    ])
+
+    assert [r['id'] for r in resultados] == [2, 1, 3]
+    assert resultados[0]['relevancia'] > resultados[1]['relevancia'] > 0
+    assert resultados[2]['relevancia'] == 0
+    assert all('texto' not in r for r in resultados)
+
+
+def test_termo_raro_pesa_mais():
+    """O IDF favorece o termo que aparece em menos documentos"""
+    scores = BM25Ranker(peso_recencia=0).pontuar('rede satelite', [
+        {'titulo': 'rede movel'},
+        {'titulo': 'rede fixa'},
+        {'titulo': 'rede satelite'},
+    ])
+    assert scores[2] > scores[0] == scores[1]
+
+
+def test_prefixo_conta_parcialmente():
+    """'voda' encontra VODACOM com peso de prefixo, abaixo do termo exato"""
+    scores = BM25Ranker(peso_recencia=0).pontuar('voda', [{'titulo': 'Vodacom'}, {'titulo': 'Voda'}])
+    assert 0 < scores[0] < scores[1]
+
+
+def test_recencia_usa_data_registro_dt():
+    """Com o mesmo texto, o registo mais recente sobe"""
+    ranker = BM25Ranker()
+    antigo = {'titulo': 'Vodacom', 'data_dt': datetime.combine(HOJE - timedelta(days=720), datetime.min.time())}
+    recente = {'titulo': 'Vodacom', 'data_dt': HOJE - timedelta(days=10)}
+    score_antigo, score_recente = ranker.pontuar('vodacom', [antigo, recente], hoje=HOJE)
+    assert score_recente > score_antigo
+
+
+def test_sem_data_tem_recencia_neutra():
+    """
+    Tipos sem data (DATA_REGISTRO é SYSDATE em texto) não recebem o bónus
+    máximo: ficam entre um registo de hoje e um com vários anos
+    """
+    ranker = BM25Ranker()
+    sem_data = {'titulo': 'Vodacom', 'data': HOJE.strftime('%d/%m/%Y'), 'data_dt': None}
+    de_hoje = {'titulo': 'Vodacom', 'data_dt': HOJE}
+    antigo = {'titulo': 'Vodacom', 'data_dt': HOJE - timedelta(days=1500)}
+
+    score_sem_data, score_hoje, score_antigo = ranker.pontuar('vodacom', [sem_data, de_hoje, antigo], hoje=HOJE)
+    assert score_hoje > score_sem_data > score_antigo
+
+    base = BM25Ranker(peso_recencia=0).pontuar('vodacom', [sem_data, de_hoje, antigo])[0]
+    assert abs(score_sem_data - base * (1 + ranker.peso_recencia * ranker.DECAIMENTO_SEM_DATA)) < 1e-9
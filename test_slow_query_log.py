@@ -0,0 +1,92 @@
+"""
+TESTES DO LOG DE QUERIES LENTAS
+Binds redigidos, plano do ProvedorPlanoLocal (uma vez por instrução) e
+rotação do ficheiro JSONL
+"""
+
+import json
+import os
+import tempfile
+import time
+from datetime import date, datetime
+
+from slow_query_log import ProvedorPlanoLocal, RegistoQueriesLentas, redigir_binds
+
+
+def test_redigir_binds():
+    """Números e datas ficam; texto fica só com o comprimento; sensíveis ocultos"""
+    binds = redigir_binds({
+        'termo': 'vodacom',
+        'limite': 50,
+        'inicio': date(2025, 1, 31),
+        'nif': 400123456,
+        'email_contacto': 'a@b.mz',
+        'foto': b'\x00\x01\x02',
+        'vazio': None,
+    })
+
+    assert binds == {
+        'termo': '<texto:7>',
+        'limite': 50,
+        'inicio': '2025-01-31',
+        'nif': '***',
+        'email_contacto': '***',
+        'foto': '<bytes:3>',
+        'vazio': None,
+    }
+    assert redigir_binds({'termo': 'vodacom', 'senha': 'x'}, manter_texto=True) == {'termo': 'vodacom', 'senha': '***'}
+    assert redigir_binds(['vodacom', 10, datetime(2025, 1, 1, 12)]) == ['<texto:7>', 10, '2025-01-01T12:00:00']
+    assert redigir_binds(None) is None
+
+
+def _ocorrencia(impressao, params, sql="SELECT * FROM Campanha_Dados WHERE Titulo = :termo"):
+    return {
+        'timestamp': time.time(), 'impressao': impressao, 'duracao': 1.5,
+        'execucao': 1.2, 'leitura': 0.29, 'linhas': 10, 'erro': None, 'sql': sql, 'params': params
+    }
+
+
+def _linhas_jsonl(ficheiro):
+    with open(ficheiro, encoding='utf-8') as f:
+        return [json.loads(linha) for linha in f]
+
+
+def test_registo_queries_lentas_com_plano_local():
+    """Cada ocorrência gera uma linha JSON com binds redigidos e o plano (uma vez por instrução)"""
+    with tempfile.TemporaryDirectory() as pasta:
+        ficheiro = os.path.join(pasta, 'lentas', 'queries.jsonl')
+        provedor = ProvedorPlanoLocal()
+        registo = RegistoQueriesLentas(provedor, ficheiro=ficheiro, intervalo_plano=60)
+
+        params = {'termo': 'vodacom', 'nif': 400123456}
+        assert registo.registar(_ocorrencia('abc', params))
+        params['termo'] = 'alterado depois'  # o chamador reutiliza o dicionário
+        assert registo.registar(_ocorrencia('abc', {'termo': 'tmcel', 'nif': 1}))
+        assert registo.registar(_ocorrencia('def', None, sql="BEGIN SP_PESQUISA_GLOBAL(:1, :2); END;"))
+        assert registo.aguardar()
+        registo.parar()
+
+        primeira, segunda, terceira = _linhas_jsonl(ficheiro)
+        assert primeira['binds'] == {'termo': '<texto:7>', 'nif': '***'}
+        assert primeira['plano'] == provedor.plano and primeira['sql_id'] == 'local'
+        assert primeira['duracao'] == 1.5 and primeira['linhas'] == 10
+        assert segunda.get('plano_repetido') and 'plano' not in segunda
+        assert terceira['plano'] == provedor.plano
+        assert provedor.pedidos == [primeira['sql'], terceira['sql']]
+        assert registo.registadas == 3 and registo.descartadas == 0
+        assert not registo.registar(_ocorrencia('ghi', None))
+
+
+def test_registo_queries_lentas_roda_ficheiro():
+    """Acima de max_bytes o ficheiro roda e só ficam `backups` ficheiros antigos"""
+    with tempfile.TemporaryDirectory() as pasta:
+        ficheiro = os.path.join(pasta, 'queries.jsonl')
+        registo = RegistoQueriesLentas(None, ficheiro=ficheiro, max_bytes=600, backups=2)
+        for i in range(12):
+            registo.registar(_ocorrencia(f'i{i}', {'limite': i}))
+        assert registo.aguardar()
+        registo.parar()
+
+        assert sorted(os.listdir(pasta)) == ['queries.jsonl', 'queries.jsonl.1', 'queries.jsonl.2']
+        assert all(os.path.getsize(os.path.join(pasta, nome)) <= 600 for nome in os.listdir(pasta))
+        assert _linhas_jsonl(ficheiro)[-1]['binds'] == {'limite': 11}
@@ -0,0 +1,156 @@
+"""
+TESTES DO POOL DE THREADS
+Agendador com classes de prioridade (limites, mínimos e worker reservado
+ao trabalho interativo) e tarefas do ThreadPool
+"""
+
+import threading
+import time
+
+import pytest
+
+from thread_manager import AgendadorPrioridades, thread_pool
+
+
+def _esperar(condicao, timeout=2.0):
+    limite = time.monotonic() + timeout
+    while not condicao() and time.monotonic() < limite:
+        time.sleep(0.005)
+    return condicao()
+
+
+_lock_ativas = threading.Lock()
+
+
+def _bloqueante(ativas, classe, libertar):
+    """Tarefa que conta as ativas da sua classe e espera por `libertar`"""
+    def tarefa():
+        with _lock_ativas:
+            ativas[classe] += 1
+        try:
+            libertar.wait(5)
+        finally:
+            with _lock_ativas:
+                ativas[classe] -= 1
+        return classe
+    return tarefa
+
+
+def test_agendador_bulk_corre_com_carga_normal():
+    """3 bulk e depois 5 normal: bulk recebe o seu worker mínimo"""
+    agendador = AgendadorPrioridades(
+        workers=4, limites={'interativa': 4, 'normal': 3, 'bulk': 1},
+        reservados_interativa=1, minimos={'normal': 1, 'bulk': 1}, prefixo="Inc_Teste_"
+    )
+    libertar = threading.Event()
+    ativas = {'normal': 0, 'bulk': 0, 'interativa': 0}
+    try:
+        futuros = [agendador.submit('bulk', _bloqueante(ativas, 'bulk', libertar)) for _ in range(3)]
+        futuros += [agendador.submit('normal', _bloqueante(ativas, 'normal', libertar)) for _ in range(5)]
+
+        assert _esperar(lambda: ativas['normal'] + ativas['bulk'] == 3)
+        time.sleep(0.05)
+        assert ativas == {'normal': 2, 'bulk': 1, 'interativa': 0}
+
+        # O último worker continua reservado ao trabalho interativo
+        interativa = agendador.submit('interativa', lambda: 'ok')
+        assert interativa.result(timeout=1) == 'ok'
+
+        libertar.set()
+        assert sorted(f.result(timeout=5) for f in futuros) == ['bulk'] * 3 + ['normal'] * 5
+    finally:
+        libertar.set()
+        agendador.shutdown()
+
+
+def test_agendador_interativa_passa_a_frente():
+    """Com os workers ocupados, a tarefa interativa sai antes das normais em fila"""
+    agendador = AgendadorPrioridades(
+        workers=2, limites={'interativa': 2, 'normal': 2, 'bulk': 1},
+        reservados_interativa=1, minimos={}, prefixo="Inc_Teste_"
+    )
+    libertar = threading.Event()
+    ativas = {'normal': 0, 'bulk': 0, 'interativa': 0}
+    ordem = []
+    try:
+        primeira = agendador.submit('normal', _bloqueante(ativas, 'normal', libertar))
+        assert _esperar(lambda: ativas['normal'] == 1)
+        normais = [agendador.submit('normal', ordem.append, f'n{i}') for i in range(3)]
+        interativa = agendador.submit('interativa', ordem.append, 'i')
+
+        interativa.result(timeout=1)
+        assert ordem == ['i']
+        assert agendador.pendentes() == {'interativa': 0, 'normal': 3, 'bulk': 0}
+
+        libertar.set()
+        for futuro in [primeira] + normais:
+            futuro.result(timeout=5)
+        assert ordem == ['i', 'n0', 'n1', 'n2']
+    finally:
+        libertar.set()
+        agendador.shutdown()
+
+
+def test_agendador_limite_por_classe_e_erros():
+    """Nunca mais bulk em paralelo do que o limite; exceções chegam ao Future"""
+    agendador = AgendadorPrioridades(
+        workers=4, limites={'interativa': 4, 'normal': 3, 'bulk': 1},
+        reservados_interativa=1, minimos={'normal': 1, 'bulk': 1}, prefixo="Inc_Teste_"
+    )
+    maximo = [0]
+    ativas = [0]
+    lock = threading.Lock()
+
+    def bulk():
+        with lock:
+            ativas[0] += 1
+            maximo[0] = max(maximo[0], ativas[0])
+        time.sleep(0.01)
+        with lock:
+            ativas[0] -= 1
+
+    def falha():
+        raise ValueError("falhou")
+
+    try:
+        futuros = [agendador.submit('bulk', bulk) for _ in range(6)]
+        erro = agendador.submit('normal', falha)
+        for futuro in futuros:
+            futuro.result(timeout=5)
+        assert maximo[0] == 1
+        assert isinstance(erro.exception(timeout=5), ValueError)
+
+        with pytest.raises(ValueError):
+            agendador.submit('urgente', bulk)
+    finally:
+        agendador.shutdown()
+
+    with pytest.raises(RuntimeError):
+        agendador.submit('normal', bulk)
+
+
+
+def test_pendente_e_guardar_resultado():
+    """pendente() segue a tarefa até terminar; sem guardar_resultado a entrada é removida"""
+    libertar = threading.Event()
+    guardada = thread_pool.submit_task(libertar.wait, 5, prioridade='interativa')
+    esquecida = thread_pool.submit_task(lambda: 'ok', prioridade='interativa', guardar_resultado=False)
+
+    assert thread_pool.pendente(guardada)
+    assert _esperar(lambda: esquecida not in thread_pool.active_tasks)
+    assert not thread_pool.pendente(esquecida)
+    assert not thread_pool.pendente(None)
+
+    libertar.set()
+    assert thread_pool.get_result(guardada, timeout=5) is True
+    assert guardada not in thread_pool.active_tasks
+    assert thread_pool.get_result(esquecida) is None
+
+
+def test_erro_da_tarefa_nao_quebra_o_pool():
+    """Uma exceção na tarefa dá None em get_result e o worker continua disponível"""
+    def falha():
+        raise ValueError("falhou")
+
+    assert thread_pool.get_result(thread_pool.submit_task(falha), timeout=5) is None
+    assert thread_pool.get_result(thread_pool.submit_task(sum, [1, 2, 3]), timeout=5) == 6
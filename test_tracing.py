@@ -0,0 +1,116 @@
+"""
+TESTES DO RASTREIO DE AÇÕES
+Spans aninhados e propagação do trace para ThreadPool.submit_task,
+BackgroundTask e DatabaseOperationThread
+"""
+
+import logging
+import threading
+
+import pytest
+
+from config import LOG_CONFIG
+from logger_config import app_logger, contexto_trace
+from thread_manager import BackgroundTask, DatabaseOperationThread, thread_pool
+from tracing import acao, propagar, span, trace_atual
+
+
+class _Spans(logging.Handler):
+    """Guarda os campos dos spans terminados (em qualquer thread)"""
+
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.spans = []
+
+    def emit(self, record):
+        campos = getattr(record, 'span', None)
+        if campos:
+            self.spans.append(dict(campos, trace_id=record.trace_id, span_id=record.span_id,
+                                   thread=record.threadName))
+
+    def por_nome(self, nome):
+        return next(s for s in self.spans if s['span'] == nome)
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    """Todos os spans passam a ser registados (INFO) e capturados"""
+    monkeypatch.setitem(LOG_CONFIG, 'span_lento_segundos', 0)
+    handler = _Spans()
+    app_logger.addHandler(handler)
+    try:
+        yield handler
+    finally:
+        app_logger.removeHandler(handler)
+
+
+def test_spans_aninhados(spans):
+    """O filho herda o trace e aponta para o pai; acao() começa sempre um trace novo"""
+    with span('clique') as pai:
+        with span('filho', tabela='CAMPANHA_DADOS') as filho:
+            assert contexto_trace.get() == (pai.trace_id, filho.span_id)
+        assert trace_atual() == pai.trace_id
+
+        @acao('outra_acao')
+        def outra():
+            return trace_atual()
+
+        assert outra() != pai.trace_id
+    assert trace_atual() is None
+
+    registado = spans.por_nome('filho')
+    assert (registado['trace_id'], registado['pai_id'], registado['tabela']) == (pai.trace_id, pai.span_id, 'CAMPANHA_DADOS')
+    assert spans.por_nome('clique')['pai_id'] is None
+
+
+def test_span_com_erro(spans):
+    """A exceção propaga-se e o span é registado com o erro"""
+    with pytest.raises(ValueError):
+        with span('falha'):
+            raise ValueError('ORA-00942')
+    assert spans.por_nome('falha')['erro'] == 'ORA-00942'
+
+
+def test_submit_task_corre_no_trace_de_quem_submete(spans):
+    """A tarefa do pool é um span filho do span que a submeteu"""
+    def tarefa_de_teste():
+        return contexto_trace.get(), threading.current_thread().name
+
+    with span('abrir_campanhas') as pai:
+        task_id = thread_pool.submit_task(tarefa_de_teste, prioridade='interativa')
+    (trace_id, span_id), thread = thread_pool.get_result(task_id, timeout=5)
+
+    assert trace_id == pai.trace_id and thread.startswith('Inc_DB_')
+    registado = spans.por_nome('tarefa.tarefa_de_teste')
+    assert (registado['span_id'], registado['pai_id']) == (span_id, pai.span_id)
+
+
+def test_background_task_e_thread_db(spans):
+    """BackgroundTask e DatabaseOperationThread levam o trace de quem as cria"""
+    class _Base:
+        def execute_query(self, query, params=None, fetch=True):
+            return trace_atual()
+
+    with span('relatorio') as pai:
+        tarefa = BackgroundTask(trace_atual)
+        tarefa.start()
+        thread_db = DatabaseOperationThread(_Base(), "SELECT 1 FROM dual")
+    thread_db.start()
+
+    assert tarefa.wait(5) and tarefa.get_result() == pai.trace_id
+    thread_db.join(5)
+    assert thread_db.result == pai.trace_id
+
+    for nome in ('background.trace_atual', 'thread_db'):
+        assert spans.por_nome(nome)['pai_id'] == pai.span_id
+
+
+def test_propagar_para_thread_propria():
+    """propagar() leva o contexto para uma thread criada à mão"""
+    resultado = []
+    with span('clique') as pai:
+        alvo = propagar(lambda: resultado.append(trace_atual()))
+    thread = threading.Thread(target=alvo)
+    thread.start()
+    thread.join(5)
+    assert resultado == [pai.trace_id]
@@ -0,0 +1,28 @@
+"""
+TESTES DO MONITOR DE LAG DA INTERFACE
+Locais de bloqueio e nomes de métricas limitados
+"""
+
+from collections import Counter
+
+import ui_watchdog
+from performance_monitor import perf_monitor
+from ui_watchdog import MonitorLagUI
+
+
+def test_metricas_de_bloqueio_limitadas(monkeypatch):
+    """Acima de _METRICAS_MAX locais, os bloqueios novos somam-se em 'outros'"""
+    monkeypatch.setattr(ui_watchdog, '_METRICAS_MAX', 3)
+    monitor = MonitorLagUI(root=None)
+    antes = set(perf_monitor.metrics)
+
+    for i in range(6):
+        monitor._fim_bloqueio(300_000_000, Counter({f'teste_watchdog.py:{i} em f': 2}))
+    monitor._fim_bloqueio(300_000_000, Counter({'teste_watchdog.py:0 em f': 1}))
+
+    novas = {nome for nome in perf_monitor.metrics if nome.startswith('ui.bloqueio:')} - antes
+    assert novas == {f'ui.bloqueio:teste_watchdog.py:{i} em f' for i in range(3)} | {'ui.bloqueio:outros'}
+    assert perf_monitor.get_stats('ui.bloqueio:teste_watchdog.py:0 em f')['count'] == 2
+    assert perf_monitor.get_stats('ui.bloqueio:outros')['count'] == 3
+    assert monitor.bloqueios == 7
+    assert monitor.amostras['teste_watchdog.py:5 em f'] == 2
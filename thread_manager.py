@@ -3,13 +3,23 @@ GESTOR DE THREADS COM SINCRONIZAÇÃO E POOL
 Garante operações thread-safe e evita race conditions
 """
 
+import contextvars
+import itertools
 import threading
+from collections import deque
 from queue import Queue, Empty
-from typing import Callable, Any, Optional
-from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Any, Dict, Optional
+from concurrent.futures import Future
+from config import THREAD_POOL_CONFIG
 from logger_config import app_logger
+from metrics_registry import metricas, FamiliaMetrica
+from performance_monitor import perf_monitor
+from tracing import span
 import time
 
+# Classes de prioridade, da mais urgente para a menos urgente
+PRIORIDADES = ('interativa', 'normal', 'bulk')
+
 
 class ThreadSafeQueue:
     """Fila thread-safe para comunicação entre threads"""
@@ -37,10 +47,11 @@ class ThreadSafeQueue:
 
 
 class DatabaseOperationThread(threading.Thread):
-    """Thread segura para operações de banco de dados"""
+    """Thread segura para operações de banco de dados (no trace de quem a cria)"""
 
     def __init__(self, db_connection, query: str, params: dict = None, callback: Callable = None):
         super().__init__(daemon=True)
+        self._contexto = contextvars.copy_context()
         self.db_connection = db_connection
         self.query = query
         self.params = params
@@ -51,14 +62,18 @@ class DatabaseOperationThread(threading.Thread):
 
     def run(self):
         """Executa operação de banco de dados"""
+        self._contexto.run(self._executar)
+
+    def _executar(self):
         try:
             self.logger.debug(f"Iniciando thread para query: {self.query[:50]}...")
 
-            self.result = self.db_connection.execute_query(
-                self.query,
-                self.params,
-                fetch=True
-            )
+            with span('thread_db'):
+                self.result = self.db_connection.execute_query(
+                    self.query,
+                    self.params,
+                    fetch=True
+                )
 
             if self.callback:
                 self.callback(self.result, None)
@@ -70,6 +85,116 @@ class DatabaseOperationThread(threading.Thread):
                 self.callback(None, e)
 
 
+class AgendadorPrioridades:
+    """
+    Executor com classes de prioridade (interativa, normal, bulk)
+
+    Cada classe tem a sua fila FIFO e um limite de tarefas em execução.
+    Um worker livre escolhe sempre a classe mais urgente com trabalho e
+    abaixo do limite. As classes normal e bulk nunca ocupam os últimos
+    `reservados_interativa` workers, por isso uma tarefa interativa não
+    fica à espera de exportações ou relatórios longos. Entre normal e
+    bulk, uma classe com trabalho em fila abaixo do seu mínimo tem lugar
+    guardado: a outra não ocupa os workers que lhe faltam.
+    """
+
+    def __init__(
+            self,
+            workers: int = THREAD_POOL_CONFIG['workers'],
+            limites: Optional[Dict[str, int]] = None,
+            reservados_interativa: int = THREAD_POOL_CONFIG['reservados_interativa'],
+            minimos: Optional[Dict[str, int]] = None,
+            prefixo: str = "Inc_DB_"
+    ):
+        self.workers = workers
+        self.limites = dict(limites or THREAD_POOL_CONFIG['limites'])
+        self.minimos = dict(THREAD_POOL_CONFIG['minimos'] if minimos is None else minimos)
+        # Pelo menos um worker fica sempre livre para trabalho interativo
+        self.max_nao_interativas = max(1, workers - max(1, reservados_interativa))
+        self.filas: Dict[str, deque] = {classe: deque() for classe in PRIORIDADES}
+        self.ativas: Dict[str, int] = {classe: 0 for classe in PRIORIDADES}
+        self._condicao = threading.Condition()
+        self._encerrado = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"{prefixo}{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, prioridade: str, func: Callable, *args, **kwargs) -> Future:
+        """Coloca a tarefa no fim da fila da sua classe"""
+        if prioridade not in self.filas:
+            raise ValueError(f"Prioridade desconhecida: {prioridade}")
+
+        future = Future()
+        with self._condicao:
+            if self._encerrado:
+                raise RuntimeError("Pool de threads encerrado")
+            self.filas[prioridade].append((future, func, args, kwargs, time.perf_counter_ns()))
+            self._condicao.notify()
+        return future
+
+    def _em_falta(self, classe: str) -> int:
+        """Workers que faltam a uma classe com trabalho em fila para o seu mínimo"""
+        if not self.filas[classe]:
+            return 0
+        return max(0, self.minimos.get(classe, 0) - self.ativas[classe])
+
+    def _proxima(self):
+        """Tarefa seguinte (chamar com a condição adquirida) ou None"""
+        nao_interativas = self.ativas['normal'] + self.ativas['bulk']
+        for classe in PRIORIDADES:
+            fila = self.filas[classe]
+            if not fila or self.ativas[classe] >= self.limites.get(classe, self.workers):
+                continue
+            if classe != 'interativa':
+                guardados = sum(self._em_falta(outra) for outra in ('normal', 'bulk') if outra != classe)
+                if nao_interativas + guardados >= self.max_nao_interativas:
+                    continue
+            return classe, fila.popleft()
+        return None
+
+    def _worker(self):
+        while True:
+            with self._condicao:
+                tarefa = self._proxima()
+                while tarefa is None:
+                    if self._encerrado and not any(self.filas.values()):
+                        return
+                    self._condicao.wait()
+                    tarefa = self._proxima()
+                classe, (future, func, args, kwargs, submetida) = tarefa
+                self.ativas[classe] += 1
+
+            try:
+                if future.set_running_or_notify_cancel():
+                    perf_monitor.registar(f"thread_pool.espera:{classe}", time.perf_counter_ns() - submetida)
+                    try:
+                        future.set_result(func(*args, **kwargs))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self._condicao:
+                    self.ativas[classe] -= 1
+                    # Um lugar livre pode desbloquear outra classe: acordar todos
+                    self._condicao.notify_all()
+
+    def pendentes(self) -> Dict[str, int]:
+        """Tarefas em fila por classe"""
+        with self._condicao:
+            return {classe: len(fila) for classe, fila in self.filas.items()}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Não aceita novas tarefas; os workers terminam quando as filas esvaziam"""
+        with self._condicao:
+            self._encerrado = True
+            self._condicao.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
 class ThreadPool:
     """Pool de threads gerenciado para operações assincronas"""
 
@@ -87,28 +212,60 @@ class ThreadPool:
     def _initialize(self):
         """Inicializa o pool"""
         self.logger = app_logger
-        self.executor = ThreadPoolExecutor(
-            max_workers=4,  # Limited to 4 threads to prevent resource exhaustion
-            thread_name_prefix="Inc_DB_"
-        )
+        self.executor = AgendadorPrioridades(prefixo="Inc_DB_")
         self.active_tasks = {}
+        self._ids = itertools.count(1)
         self._lock = threading.Lock()
-
-    def submit_task(self, func: Callable, *args, **kwargs) -> Optional[str]:
-        """Submete uma tarefa para execução"""
+        metricas.registar_coletor('thread_pool', self._coletar_metricas)
+
+    def _coletar_metricas(self):
+        """Tarefas em fila e em execução por classe de prioridade"""
+        pendentes = self.executor.pendentes()
+        fila = FamiliaMetrica('inc_fila_pendentes', 'gauge', 'Itens em espera nas filas de background')
+        ativas = FamiliaMetrica('inc_thread_pool_ativas', 'gauge', 'Tarefas do pool em execução por prioridade')
+        for classe in PRIORIDADES:
+            fila.adicionar(pendentes[classe], {'fila': 'thread_pool', 'prioridade': classe})
+            ativas.adicionar(self.executor.ativas[classe], {'prioridade': classe})
+        return [fila, ativas]
+
+    def submit_task(
+            self,
+            func: Callable,
+            *args,
+            prioridade: str = 'normal',
+            guardar_resultado: bool = True,
+            **kwargs
+    ) -> Optional[str]:
+        """
+        Submete uma tarefa para execução
+
+        Args:
+            func: Função a executar
+            prioridade: 'interativa' (sugestões, pesquisa), 'normal' ou
+                'bulk' (exportações, relatórios longos)
+            guardar_resultado: False para tarefas cujo resultado não é
+                pedido com get_result (a entrada é removida no fim)
+        """
         try:
-            task_id = f"task_{int(time.time() * 1000)}"
+            task_id = f"task_{int(time.time() * 1000)}_{next(self._ids)}"
 
-            future = self.executor.submit(self._run_with_error_handling, func, *args, **kwargs)
+            # A tarefa corre no trace de quem a submeteu
+            contexto = contextvars.copy_context()
+            future = self.executor.submit(
+                prioridade, contexto.run, self._run_with_error_handling, func, *args, **kwargs
+            )
 
             with self._lock:
                 self.active_tasks[task_id] = {
                     'future': future,
                     'start_time': time.time(),
-                    'func_name': func.__name__
+                    'func_name': func.__name__,
+                    'prioridade': prioridade
                 }
+            if not guardar_resultado:
+                future.add_done_callback(lambda _: self._esquecer(task_id))
 
-            self.logger.debug(f"Tarefa submetida: {task_id}")
+            self.logger.debug(f"Tarefa submetida: {task_id} ({prioridade})")
             return task_id
 
         except Exception as e:
@@ -119,11 +276,22 @@ class ThreadPool:
     def _run_with_error_handling(func: Callable, *args, **kwargs) -> Any:
         """Executa função com tratamento de erro"""
         try:
-            return func(*args, **kwargs)
+            with span(f"tarefa.{func.__name__}"):
+                return func(*args, **kwargs)
         except Exception as e:
             app_logger.error(f"Erro na execução de thread: {str(e)}")
             raise
 
+    def _esquecer(self, task_id: str) -> None:
+        with self._lock:
+            self.active_tasks.pop(task_id, None)
+
+    def pendente(self, task_id: Optional[str]) -> bool:
+        """Indica se a tarefa ainda está em fila ou em execução"""
+        with self._lock:
+            task = self.active_tasks.get(task_id)
+        return task is not None and not task['future'].done()
+
     def get_result(self, task_id: str, timeout: float = 30.0) -> Optional[Any]:
         """Obtém resultado de uma tarefa"""
         with self._lock:
@@ -172,14 +340,17 @@ class BackgroundTask:
             return
 
         self.is_running = True
-        self.thread = threading.Thread(target=self._run, daemon=True)
+        # A tarefa corre no trace de quem a iniciou
+        contexto = contextvars.copy_context()
+        self.thread = threading.Thread(target=contexto.run, args=(self._run,), daemon=True)
         self.thread.start()
 
     def _run(self):
         """Executa a tarefa"""
         try:
             self.logger.debug(f"Iniciando tarefa: {self.func.__name__}")
-            self.result = self.func(*self.args, **self.kwargs)
+            with span(f"background.{self.func.__name__}"):
+                self.result = self.func(*self.args, **self.kwargs)
             self.logger.debug(f"Tarefa concluída: {self.func.__name__}")
         except Exception as e:
             self.logger.error(f"Erro na tarefa: {str(e)}")
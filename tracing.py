@@ -0,0 +1,130 @@
+"""
+RASTREIO DE AÇÕES (TRACE/SPAN)
+Liga os registos de log de uma ação do utilizador (um clique, uma
+pesquisa) através de todas as threads que ela envolve
+
+Cada ação recebe um trace_id; cada etapa (tarefa em background, chamada
+à base de dados) é um span com o seu span_id e o do pai. O contexto vive
+numa ContextVar (logger_config.contexto_trace) e é copiado para as
+threads em ThreadPool.submit_task, BackgroundTask e DatabaseOperationThread.
+No fim de cada span é registada uma linha com a duração: em DEBUG, ou em
+INFO acima de LOG_CONFIG['span_lento_segundos'] ou com erro.
+"""
+
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+from config import LOG_CONFIG
+from logger_config import app_logger, contexto_trace
+
+
+def _novo_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def _novo_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+class Span:
+    """Uma etapa cronometrada de um trace"""
+
+    __slots__ = ('nome', 'trace_id', 'span_id', 'pai_id', 'atributos', 'inicio', '_terminado')
+
+    def __init__(self, nome: str, novo_trace: bool = False, **atributos):
+        contexto = None if novo_trace else contexto_trace.get()
+        self.nome = nome
+        self.trace_id = contexto[0] if contexto else _novo_trace_id()
+        self.pai_id = contexto[1] if contexto else None
+        self.span_id = _novo_span_id()
+        self.atributos: Dict[str, Any] = atributos
+        self.inicio = time.perf_counter_ns()
+        self._terminado = False
+
+    def definir(self, **atributos) -> None:
+        """Acrescenta atributos registados no fim do span"""
+        self.atributos.update(atributos)
+
+    def terminar(self, erro: Optional[BaseException] = None) -> None:
+        """Regista o span (só a primeira chamada conta)"""
+        if self._terminado:
+            return
+        self._terminado = True
+        duracao = (time.perf_counter_ns() - self.inicio) / 1e6
+
+        lento = duracao >= LOG_CONFIG['span_lento_segundos'] * 1000
+        nivel = logging.INFO if lento or erro is not None else logging.DEBUG
+        if not app_logger.isEnabledFor(nivel):
+            return
+
+        campos = {'span': self.nome, 'pai_id': self.pai_id, 'duracao_ms': round(duracao, 3)}
+        campos.update(self.atributos)
+        if erro is not None:
+            campos['erro'] = str(erro)
+        app_logger.log(
+            nivel,
+            "Span %s: %.1f ms%s", self.nome, duracao, f" (erro: {erro})" if erro is not None else '',
+            extra={'trace_id': self.trace_id, 'span_id': self.span_id, 'span': campos}
+        )
+
+
+@contextmanager
+def span(nome: str, novo_trace: bool = False, **atributos):
+    """
+    Executa o bloco como span filho do contexto atual
+
+    Os registos feitos dentro do bloco (nesta thread e nas tarefas que ele
+    submeter) levam o span_id deste span. Sem trace ativo, ou com
+    novo_trace=True, começa um trace novo.
+    """
+    atual = Span(nome, novo_trace, **atributos)
+    token = contexto_trace.set((atual.trace_id, atual.span_id))
+    try:
+        yield atual
+    except BaseException as e:
+        atual.terminar(e)
+        raise
+    finally:
+        contexto_trace.reset(token)
+        atual.terminar()
+
+
+def acao(nome: str):
+    """Decorator: cada chamada é uma ação do utilizador (um trace novo)"""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(nome, novo_trace=True):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def propagar(func: Callable) -> Callable:
+    """
+    Liga `func` ao contexto atual para ser executada noutra thread
+
+    Cada chamada corre numa cópia própria do contexto (um Context não pode
+    estar ativo em duas threads ao mesmo tempo).
+    """
+    contexto = contextvars.copy_context()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return contexto.copy().run(func, *args, **kwargs)
+
+    return wrapper
+
+
+def trace_atual() -> Optional[str]:
+    """trace_id da ação em curso (None fora de um trace)"""
+    contexto = contexto_trace.get()
+    return contexto[0] if contexto else None
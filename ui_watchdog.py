@@ -0,0 +1,178 @@
+"""
+MONITOR DE LAG DA INTERFACE
+Mede o atraso do event loop do Tk com um batimento periódico (after) e,
+quando a interface bloqueia, amostra a stack da thread principal a partir
+de uma thread auxiliar para identificar a chamada responsável
+"""
+
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import PERF_CONFIG
+from logger_config import app_logger
+from performance_monitor import perf_monitor
+
+# Ficheiros da aplicação (os restantes são bibliotecas: tkinter, customtkinter...)
+_PASTA_APP = os.path.dirname(os.path.abspath(__file__))
+
+# Locais de bloqueio distintos guardados (os restantes contam em 'outros')
+_LOCAIS_MAX = 200
+
+# Locais com métrica 'ui.bloqueio:<local>' própria (os restantes em 'ui.bloqueio:outros')
+_METRICAS_MAX = 20
+
+
+def _local_da_stack(stack: traceback.StackSummary) -> str:
+    """Chamada mais interna em código da aplicação (ou a mais interna de todas)"""
+    for frame in reversed(stack):
+        caminho = os.path.abspath(frame.filename)
+        if caminho.startswith(_PASTA_APP) and caminho != os.path.abspath(__file__):
+            return f"{os.path.basename(frame.filename)}:{frame.lineno} em {frame.name}"
+    if stack:
+        frame = stack[-1]
+        return f"{os.path.basename(frame.filename)}:{frame.lineno} em {frame.name}"
+    return 'desconhecido'
+
+
+class MonitorLagUI:
+    """
+    Watchdog do event loop
+
+    O batimento corre na thread do Tk a cada `intervalo` segundos e regista
+    o atraso em perf_monitor ('ui.lag'). A thread auxiliar verifica a cada
+    `amostragem` segundos há quanto tempo não há batimento; acima de
+    `limite` amostra a stack da thread principal. No fim de cada bloqueio
+    a duração é registada em 'ui.bloqueio:<local>', sendo o local a
+    chamada da aplicação mais vezes vista nas amostras; a partir de
+    _METRICAS_MAX locais as métricas novas somam-se em 'ui.bloqueio:outros'.
+    """
+
+    def __init__(
+            self,
+            root,
+            intervalo: float = PERF_CONFIG['ui_lag_intervalo'],
+            limite: float = PERF_CONFIG['ui_lag_limite'],
+            amostragem: float = PERF_CONFIG['ui_lag_amostragem']
+    ):
+        self.root = root
+        self.intervalo = intervalo
+        self.limite = limite
+        self.amostragem = amostragem
+        self.logger = app_logger
+
+        self.amostras: Counter = Counter()
+        self.stacks: Dict[str, str] = {}
+        self.bloqueios = 0
+        self._locais_metrica: Set[str] = set()
+
+        self._thread_principal: Optional[int] = None
+        self._ultimo_batimento = 0
+        self._after_id = None
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def iniciar(self) -> None:
+        """Agenda o primeiro batimento (chamar na thread do Tk)"""
+        self._thread_principal = threading.get_ident()
+        self._ultimo_batimento = time.perf_counter_ns()
+        self._after_id = self.root.after(int(self.intervalo * 1000), self._batimento)
+
+    def _batimento(self):
+        agora = time.perf_counter_ns()
+        atraso = agora - self._ultimo_batimento - int(self.intervalo * 1e9)
+        perf_monitor.registar('ui.lag', max(atraso, 0))
+        self._ultimo_batimento = agora
+
+        if self._thread is None:
+            # Só depois do primeiro batimento: o arranque (antes do mainloop) não conta
+            self._thread = threading.Thread(target=self._vigiar, name="Inc_UILag", daemon=True)
+            self._thread.start()
+
+        if not self._parar.is_set():
+            self._after_id = self.root.after(int(self.intervalo * 1000), self._batimento)
+
+    def _vigiar(self):
+        """Thread auxiliar: deteta bloqueios e amostra a thread principal"""
+        limite_ns = int((self.intervalo + self.limite) * 1e9)
+        inicio_bloqueio = None
+        amostras_bloqueio: Counter = Counter()
+
+        while not self._parar.wait(self.amostragem):
+            ultimo = self._ultimo_batimento
+            parado = time.perf_counter_ns() - ultimo
+
+            if parado > limite_ns:
+                if inicio_bloqueio is None:
+                    inicio_bloqueio = ultimo
+                    amostras_bloqueio.clear()
+                amostra = self._amostrar()
+                if amostra:
+                    local, stack = amostra
+                    amostras_bloqueio[local] += 1
+                    if local in self.stacks or len(self.stacks) < _LOCAIS_MAX:
+                        self.stacks[local] = stack
+            elif inicio_bloqueio is not None:
+                # O batimento que pôs fim ao bloqueio chegou `intervalo` depois do previsto
+                self._fim_bloqueio(ultimo - inicio_bloqueio - int(self.intervalo * 1e9), amostras_bloqueio)
+                inicio_bloqueio = None
+
+    def _amostrar(self) -> Optional[Tuple[str, str]]:
+        """Local e stack atuais da thread principal"""
+        frame = sys._current_frames().get(self._thread_principal)
+        if frame is None:
+            return None
+        stack = traceback.extract_stack(frame)
+        return _local_da_stack(stack), ''.join(stack.format()[-15:])
+
+    def _fim_bloqueio(self, duracao_ns: int, amostras: Counter):
+        """Regista um bloqueio terminado e os locais amostrados"""
+        self.bloqueios += 1
+        for local, n in amostras.items():
+            if local not in self.amostras and len(self.amostras) >= _LOCAIS_MAX:
+                local = 'outros'
+            self.amostras[local] += n
+
+        local = amostras.most_common(1)[0][0] if amostras else 'desconhecido'
+        metrica = local
+        if metrica not in self._locais_metrica:
+            if len(self._locais_metrica) < _METRICAS_MAX:
+                self._locais_metrica.add(metrica)
+            else:
+                metrica = 'outros'
+        perf_monitor.registar(f"ui.bloqueio:{metrica}", duracao_ns)
+        self.logger.warning(
+            f"Interface bloqueada {duracao_ns / 1e9:.2f}s em {local}\n{self.stacks.get(local, '')}"
+        )
+
+    def top_bloqueios(self, n: int = 10) -> List[Dict[str, object]]:
+        """
+        Locais onde a thread principal foi vista bloqueada
+
+        Returns:
+            Lista de dicts com local, amostras, tempo estimado (s) e stack
+        """
+        return [
+            {
+                'local': local,
+                'amostras': contagem,
+                'tempo': contagem * self.amostragem,
+                'stack': self.stacks.get(local, '')
+            }
+            for local, contagem in self.amostras.most_common(n)
+        ]
+
+    def parar(self) -> None:
+        """Termina o batimento e a thread auxiliar"""
+        self._parar.set()
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=1.0)